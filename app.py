@@ -3,11 +3,14 @@ import os
 import aws_cdk as cdk
 from stacks.chatbot_stack import ChatbotStack
 from stacks.serverless_project_stack import ServerlessProjectStack
+from stacks.vector_index import VectorIndexProps
 
 app = cdk.App()
 # ChatbotStack(app, "ChatbotStack")
 
 ServerlessProjectStack(app, "ServerlessProjectStack",
+    # Bilgi bankası vektör indeksi (HNSW); değerler benchmarks/vector_index_bench.py ile seçilir
+    vector_index=VectorIndexProps(dimensions=1024, m=16, ef_construction=512, ef_search=512),
     # If you don't specify 'env', this stack will be environment-agnostic.
     # Account/Region-dependent features and context lookups will not work,
     # but a single synthesized template can be deployed anywhere.
@@ -0,0 +1,261 @@
+"""
+İstek kabulü (kullanıcı başına hız sınırı + aynı isteklerin birleştirilmesi)
+ölçümü ve doğrulaması (AWS hesabı gerektirmez).
+
+chat_handler gerçek koduyla, DynamoDB ve Bedrock `aws_standins` taklitleriyle
+(ayarlanabilir gecikme) thread havuzunda çalıştırılır:
+
+1. Çift tıklama: her kullanıcı aynı mesajı kısa aralıklarla birkaç kez
+   gönderir. Kabul katmanı kapalı / açıkken model çağrısı sayısı, yanıt
+   süreleri ve birleştirilen isteklerin lider ile aynı yanıtı aldığı raporlanır.
+2. Hız sınırı: tek kullanıcı farklı mesajları aynı anda gönderir. Tam olarak
+   `burst` istek kabul edilmeli (atomik sayaçta yarış olmamalı), kalanlar
+   `Retry-After` ile 429 almalı ve 429 alan isteklerin hiçbiri modeli
+   çağırmamalı.
+3. Lider hatası: liderin model çağrısı hata verirse bekleyenlerden biri
+   liderliği devralır; kayıt takılı kalmaz.
+
+4. Metrikler: reddedilen ve birleştirilen istekler handler'ın EMF
+   satırlarında `Admission` boyutuyla yazılmalı. Tracer'ın aktif trace'i
+   (Lambda'daki gibi) ortam başına tek olduğu için bu adım sıralı çalışır.
+
+Bir doğrulama tutmazsa 1 ile çıkar.
+
+    python benchmarks/admission_bench.py
+    python benchmarks/admission_bench.py --users 50 --clicks 3 --bedrock-latency-ms 1500
+"""
+import argparse
+import concurrent.futures
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import redirect_stdout
+
+from load_test import ENVIRONMENT, load_handler
+from search_bench import percentile
+
+# Her thread ayrı bir Lambda ortamı gibi davransın: ortak BedrockScheduler kuyrukta bekletmez
+ENVIRONMENT = dict(ENVIRONMENT, ADMISSION_TABLE_NAME='ChatRequestAdmission', METRICS_SAMPLE_RATE='0',
+                   MODEL_DEFAULT_RATE='1000', MODEL_BURST='1000')
+
+
+def emf_admission_counts(output):
+    """Yakalanan çıktıdaki EMF satırlarından Admission boyutlu sayaçlar."""
+    counts = {}
+    for line in output.splitlines():
+        if not line.startswith('{'):
+            continue
+        record = json.loads(line)
+        if 'Admission' in record:
+            counts[record['Admission']] = counts.get(record['Admission'], 0) + record.get('Requests', 0)
+    return counts
+
+
+class Harness:
+
+    def __init__(self, args):
+        os.environ.update(ENVIRONMENT)
+        os.environ.update({
+            'RATE_LIMIT_PER_MINUTE': str(args.rate_per_minute),
+            'RATE_LIMIT_BURST': str(args.burst),
+            'COALESCE_WINDOW_SECONDS': str(args.coalesce_seconds),
+        })
+        import boto3
+        from aws_standins import AwsStandIns
+        from library_common import clients
+
+        self.aws = AwsStandIns(latency_ms={'dynamodb': args.ddb_latency_ms,
+                                           'bedrock-runtime': args.bedrock_latency_ms}, jitter=args.jitter)
+        session = boto3.session.Session(region_name='us-east-1')
+        self.aws.install(session)
+        clients._session = session
+        self.handler = load_handler('chat_handler')
+        self.module = sys.modules['chat_handler_index']
+        self.admission = self.module.request_admission
+        self.threads = args.threads
+
+    def model_calls(self):
+        return self.aws.calls.get('bedrock-runtime.InvokeModel', 0)
+
+    def call(self, user_id, session_id, message):
+        event = {'httpMethod': 'POST', 'resource': '/chat', 'headers': {},
+                 'requestContext': {'identity': {'sourceIp': '127.0.0.1'},
+                                    'authorizer': {'claims': {'sub': user_id}}},
+                 'body': json.dumps({'message': message, 'session_id': session_id})}
+        started = time.perf_counter()
+        response = self.handler(event, None)
+        return response, time.perf_counter() - started
+
+    def run(self, plan, admission=True):
+        """plan: [(gecikme sn, kullanıcı, oturum, mesaj)] -> ([(yanıt, süre)], model çağrısı sayısı)."""
+        self.module.request_admission = self.admission if admission else None
+        before = self.model_calls()
+        results = [None] * len(plan)
+
+        def send(i, delay, user_id, session_id, message):
+            time.sleep(delay)
+            results[i] = self.call(user_id, session_id, message)
+
+        # Handler logları susturulur; redirect_stdout süreç geneli olduğu için thread'lerin dışında
+        with redirect_stdout(io.StringIO()):
+            with concurrent.futures.ThreadPoolExecutor(self.threads) as pool:
+                futures = [pool.submit(send, i, *step) for i, step in enumerate(plan)]
+                for future in concurrent.futures.as_completed(futures):
+                    future.result()
+        return results, self.model_calls() - before
+
+
+def double_click(harness, args, failures):
+    rng = random.Random(args.seed)
+    plan = []
+    for user in range(args.users):
+        message = f"Kütüphane {user}. kattaki çalışma salonu kaçta kapanıyor?"
+        for click in range(args.clicks):
+            # İlk tıklamadan sonraki tekrarlar: çift tıklama / tarayıcı yeniden denemesi
+            delay = 0 if click == 0 else rng.uniform(0.05, args.click_spread_ms / 1000)
+            # Tekrarlarda büyük/küçük harf ve noktalama farkı aynı isteği değiştirmez
+            plan.append((delay, f"dc-user-{user}-{args.seed}", f"dc-session-{user}",
+                         message if click % 2 == 0 else message.lower().rstrip('?')))
+    requests = len(plan)
+
+    print(f"\n1) Çift tıklama: {args.users} kullanıcı x {args.clicks} istek, "
+          f"Bedrock {args.bedrock_latency_ms:.0f} ms")
+    for admission in (False, True):
+        if admission:
+            # Önceki turun birleştirme kayıtları kullanılmasın
+            plan = [(delay, user + '-on', session, message) for delay, user, session, message in plan]
+        results, calls = harness.run(plan, admission=admission)
+        statuses = [response['statusCode'] for response, _ in results]
+        latencies = [seconds for _, seconds in results]
+        label = 'açık ' if admission else 'kapalı'
+        print(f"  kabul katmanı {label}: {calls:4d} model çağrısı / {requests} istek, "
+              f"p50 {percentile(latencies, 50) * 1e3:6.0f} ms  p99 {percentile(latencies, 99) * 1e3:6.0f} ms, "
+              f"durumlar {sorted(set(statuses))}")
+        if any(status != 200 for status in statuses):
+            print("  HATA: 200 dışı yanıt")
+            failures.append('double-click-status')
+        if admission:
+            if calls != args.users:
+                print(f"  HATA: {args.users} model çağrısı bekleniyordu")
+                failures.append('double-click-calls')
+            answers = {}
+            for (_, user, _, _), (response, _) in zip(plan, results):
+                answers.setdefault(user, set()).add(json.loads(response['body'])['response'])
+            if any(len(texts) != 1 for texts in answers.values()):
+                print("  HATA: aynı kullanıcının tekrar istekleri farklı yanıt aldı")
+                failures.append('double-click-answers')
+
+
+def rate_limit(harness, args, failures):
+    requests = args.burst * 4
+    plan = [(0, f"rl-user-{args.seed}", f"rl-session-{i}", f"Bana {i} numaralı kitabı öner") for i in range(requests)]
+    print(f"\n2) Hız sınırı: tek kullanıcı {requests} farklı istek (aynı anda), "
+          f"burst {args.burst}, {args.rate_per_minute}/dk")
+    started = time.perf_counter()
+    results, calls = harness.run(plan)
+    elapsed = time.perf_counter() - started
+    accepted = [response for response, _ in results if response['statusCode'] == 200]
+    rejected = [response for response, _ in results if response['statusCode'] == 429]
+    rejected_latency = [seconds for (response, seconds) in results if response['statusCode'] == 429]
+    # Test süresince dolan token'lar da kabul edilebilir
+    allowed = args.burst + int(elapsed * args.rate_per_minute / 60)
+    retry_after = sorted({int(response['headers']['Retry-After']) for response in rejected})
+    print(f"  {len(accepted)} kabul, {len(rejected)} x 429 (Retry-After {retry_after} sn, "
+          f"p50 {percentile(rejected_latency, 50) * 1e3:.0f} ms), {calls} model çağrısı")
+    if len(accepted) + len(rejected) != requests:
+        print("  HATA: 200 / 429 dışı yanıt")
+        failures.append('rate-limit-status')
+    if not args.burst <= len(accepted) <= allowed:
+        print(f"  HATA: {args.burst}-{allowed} kabul bekleniyordu (sayaçta yarış)")
+        failures.append('rate-limit-accepted')
+    if calls != len(accepted):
+        print("  HATA: 429 alan istekler modeli çağırdı")
+        failures.append('rate-limit-calls')
+    if not rejected or min(retry_after) < 1:
+        print("  HATA: 429 yanıtlarında Retry-After yok")
+        failures.append('rate-limit-retry-after')
+
+
+def leader_failure(harness, args, failures):
+    print("\n3) Lider hatası: ilk isteğin model çağrısı hata verir, tekrarlar devralır")
+    admission = harness.admission
+    user_id, message = f"lf-user-{args.seed}", "Ödünç süresi kaç gün?"
+    outcomes = []
+    lock = threading.Lock()
+
+    def attempt(index):
+        time.sleep(0 if index == 0 else 0.05 * index)
+        with admission.admit(user_id, message, max_wait=10) as flight:
+            if flight.coalesced:
+                outcome = ('coalesced', flight.result['response'])
+            elif index == 0:
+                time.sleep(args.bedrock_latency_ms / 1000)
+                outcome = ('failed', None)
+            else:
+                time.sleep(args.bedrock_latency_ms / 1000)
+                flight.complete({'response': f"yanıt-{index}"})
+                outcome = ('generated', f"yanıt-{index}")
+        with lock:
+            outcomes.append(outcome)
+
+    output = io.StringIO()
+    with redirect_stdout(output):
+        with concurrent.futures.ThreadPoolExecutor(4) as pool:
+            list(pool.map(attempt, range(4)))
+    kinds = sorted(kind for kind, _ in outcomes)
+    answers = {text for kind, text in outcomes if text}
+    print(f"  sonuçlar: {kinds}")
+    if kinds != ['coalesced', 'coalesced', 'failed', 'generated'] or len(answers) != 1:
+        print("  HATA: bir lider devralmalı, diğer iki istek onun yanıtını almalıydı")
+        failures.append('leader-failure')
+
+
+def metrics(harness, args, failures):
+    print("\n4) Metrikler: aynı soru iki kez, ardından burst'ü aşan farklı sorular (sıralı)")
+    user_id = f"mt-user-{args.seed}"
+    plan = [(user_id, "Kütüphane kartı nasıl yenilenir?")] * 2
+    plan += [(user_id, f"Soru {i}") for i in range(args.burst)]
+    harness.module.request_admission = harness.admission
+    output = io.StringIO()
+    with redirect_stdout(output):
+        statuses = [harness.call(user, 'mt-session', message)[0]['statusCode'] for user, message in plan]
+    counts = emf_admission_counts(output.getvalue())
+    # İlk soru + (burst - 1) farklı soru kabul edilir, sonuncusu reddedilir
+    print(f"  durumlar {statuses}, EMF {counts}")
+    if statuses.count(429) != 1 or counts.get('Coalesced') != 1 or counts.get('Rejected') != 1:
+        print("  HATA: EMF'te 1 Coalesced ve 1 Rejected bekleniyordu")
+        failures.append('metrics')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--clicks', type=int, default=3, help='Kullanıcı başına aynı istek sayısı')
+    parser.add_argument('--click-spread-ms', type=float, default=400, help='Tekrarların ilk istekten en fazla gecikmesi')
+    parser.add_argument('--rate-per-minute', type=float, default=10)
+    parser.add_argument('--burst', type=int, default=5)
+    parser.add_argument('--coalesce-seconds', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--ddb-latency-ms', type=float, default=5.0)
+    parser.add_argument('--bedrock-latency-ms', type=float, default=800.0)
+    parser.add_argument('--jitter', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    harness = Harness(args)
+    failures = []
+    double_click(harness, args, failures)
+    rate_limit(harness, args, failures)
+    leader_failure(harness, args, failures)
+    metrics(harness, args, failures)
+    print(f"\nDynamoDB / Bedrock çağrıları: {harness.aws.calls}")
+    print("Tüm doğrulamalar geçti." if not failures else f"Başarısız: {', '.join(failures)}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,815 @@
+"""
+Ağa çıkmadan çalışan DynamoDB / S3 / Bedrock taklitleri (benchmark, yerel
+sunucu ve yerel testler için).
+
+botocore'un `before-call` olayında, istek serileştirildikten sonra hazır bir
+yanıt dönülür. Böylece boto3'ün parametre doğrulama, serileştirme ve yanıt
+çözme maliyeti ölçüme dahil olur; sadece ağ çağrısının yerini, ayarlanabilir
+gecikmeli bellek içi bir taklit alır.
+
+    session = boto3.session.Session(region_name='us-east-1')
+    aws = AwsStandIns(latency_ms={'dynamodb': 5, 'bedrock-runtime': 400})
+    aws.install(session)
+    aws.dynamodb.put('LibraryBooks', {'bookId': '1', 'title': 'Nutuk'})
+
+DynamoDB taklidi kayıtları kablo formatında (AttributeValue) tutar ve
+KeyCondition / Filter ifadelerinin basit biçimlerini (=, <, >, BETWEEN,
+begins_with, attribute_exists, AND, parantezsiz OR) destekler. Desteklenmeyen bir ifade
+sessizce yanlış sonuç vermek yerine NotImplementedError fırlatır.
+ConditionExpression ve TransactWriteItems gerçek servisteki gibi atomiktir;
+koşul hataları botocore'un ClientError'ı olarak döner.
+
+S3 ve API Gateway Management API (WebSocket `post_to_connection`) istekleri
+JSON gövde taşımadığı için bu servislerin taklitleri, serileştirmeden önceki
+API parametrelerini (`Bucket=..., Key=...`) alır.
+"""
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+from decimal import Decimal
+
+# Taklidin API parametreleriyle (JSON gövdesi yerine) çağrıldığı servisler
+API_PARAMS_SERVICES = {'s3', 'apigatewaymanagementapi', 'lambda'}
+
+# Her tablonun anahtar şeması: (partition key, sort key veya None)
+DEFAULT_KEY_SCHEMAS = {
+    'LibraryBooks': ('bookId', None),
+    'LibraryBookIndex': ('token', 'bookId'),
+    'AssistantResponseCache': ('pk', 'sk'),
+    'AssistantChatHistory': ('sessionId', 'timestamp'),
+    'ChatHistory': ('sessionId', 'timestamp'),
+    'ReadingLists': ('userId', 'listId'),
+    'UserLoans': ('userId', 'loanId'),
+    'LibraryStats': ('statId', None),
+    'AssistantRequestAdmission': ('pk', 'sk'),
+    'ChatRequestAdmission': ('pk', 'sk'),
+}
+
+_CLAUSES = re.compile(
+    r'begins_with\(\s*(?P<bw_name>[#\w.]+)\s*,\s*(?P<bw_value>:\w+)\s*\)'
+    r'|(?P<fn>attribute_exists|attribute_not_exists)\(\s*(?P<fn_name>[#\w.]+)\s*\)'
+    r'|contains\(\s*(?P<ct_name>[#\w.]+)\s*,\s*(?P<ct_value>:\w+)\s*\)'
+    r'|(?P<bt_name>[#\w.]+)\s+BETWEEN\s+(?P<bt_low>:\w+)\s+AND\s+(?P<bt_high>:\w+)'
+    r'|(?P<name>[#\w.]+)\s*(?P<op><>|<=|>=|=|<|>)\s*(?P<value>:\w+)',
+    re.IGNORECASE
+)
+_CONNECTIVES = re.compile(r'^[\s()]*(?:AND[\s()]*)*$', re.IGNORECASE)
+_OR = re.compile(r'\s+OR\s+', re.IGNORECASE)
+
+
+def to_attribute(value):
+    """Python değeri -> AttributeValue (taklidin tohumlanması için)."""
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, float, Decimal)):
+        return {'N': str(value)}
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, (set, frozenset)):
+        return {'SS': sorted(value)}
+    if isinstance(value, (list, tuple)):
+        return {'L': [to_attribute(v) for v in value]}
+    if isinstance(value, dict):
+        return {'M': {k: to_attribute(v) for k, v in value.items()}}
+    if value is None:
+        return {'NULL': True}
+    raise TypeError(f"Desteklenmeyen tip: {type(value)}")
+
+
+def _plain(attribute):
+    """Karşılaştırma için AttributeValue -> Python değeri."""
+    (kind, value), = attribute.items()
+    if kind == 'N':
+        return Decimal(value)
+    if kind in ('SS', 'NS', 'BS'):
+        return set(value)
+    return value
+
+
+class StandInError(Exception):
+    """
+    Taklidin servis hatası; `AwsStandIns` bunu `status` kodlu hata yanıtına
+    çevirir. Taklit doğrudan istemci yerine kullanıldığında da botocore'un
+    ClientError'ı gibi `response['Error']['Code']` taşır.
+    """
+
+    def __init__(self, code, message, status=400, **extra):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+        self.extra = extra
+        self.response = {'Error': {'Code': code, 'Message': message}, 'ResponseMetadata': {'HTTPStatusCode': status}}
+
+
+class DynamoDBStandIn:
+
+    def __init__(self, key_schemas=None, journal=False, conflict_rate=0.0):
+        """
+        `journal`: her yazım (tablo, eski kayıt, yeni kayıt) olarak işlenme
+        sırasıyla `self.journal`'a eklenir (eşzamanlılık testleri için).
+        `conflict_rate`: transaction'ların bu oranı TransactionConflict ile
+        iptal edilir (yeniden deneme yollarını çalıştırmak için).
+        """
+        self._schemas = dict(DEFAULT_KEY_SCHEMAS, **(key_schemas or {}))
+        self._tables = {}
+        self.journal = [] if journal else None
+        self.conflict_rate = conflict_rate
+        # Transaction'lar tek tek işlemleri kilit altında çağırır
+        self._lock = threading.RLock()
+
+    # -- Tohumlama yardımcıları (Python değerleriyle) -------------------------
+
+    def put(self, table, item):
+        self._store(table, {k: to_attribute(v) for k, v in item.items()})
+
+    def items(self, table):
+        with self._lock:
+            return [item for partition in self._table(table).values() for item in partition.values()]
+
+    def drain_journal(self):
+        """Birikmiş yazımları (tablo, eski kayıt, yeni kayıt) döner ve günlüğü boşaltır."""
+        with self._lock:
+            entries, self.journal[:] = list(self.journal), []
+        return entries
+
+    def save(self, path):
+        """Tüm tabloları kablo formatında bir JSON dosyasına yazar."""
+        with self._lock:
+            tables = {name: [item for partition in table.values() for item in partition.values()]
+                      for name, table in self._tables.items()}
+        with open(path + '.part', 'w', encoding='utf-8') as f:
+            json.dump(tables, f, ensure_ascii=False)
+        os.replace(path + '.part', path)
+
+    def load(self, path):
+        """`save` ile yazılan dosyayı okur; kayıtlar günlüğe (journal) yazılmaz."""
+        with open(path, encoding='utf-8') as f:
+            tables = json.load(f)
+        with self._lock:
+            for name, items in tables.items():
+                table = self._table(name)
+                for item in items:
+                    pk, sk = self._key(name, item)
+                    table.setdefault(pk, {})[sk] = item
+        return sum(len(items) for items in tables.values())
+
+    # -- Operasyonlar (kablo formatı) -----------------------------------------
+
+    def get_item(self, params):
+        item = self._get(params['TableName'], params['Key'])
+        return {'Item': self._project(item, params)} if item else {}
+
+    def put_item(self, params):
+        with self._lock:
+            self._check(params, params['Item'])
+            self._store(params['TableName'], params['Item'])
+        return {}
+
+    def delete_item(self, params):
+        with self._lock:
+            self._check(params, params['Key'])
+            self._write(params['TableName'], params['Key'], None)
+        return {}
+
+    def update_item(self, params):
+        table = params['TableName']
+        pk, sk = self._key(table, params['Key'])
+        with self._lock:
+            self._check(params, params['Key'])
+            item = dict(self._table(table).get(pk, {}).get(sk) or params['Key'])
+            _apply_update(item, params.get('UpdateExpression', ''), params)
+            self._write(table, params['Key'], item)
+        if params.get('ReturnValues', 'NONE') != 'NONE':
+            return {'Attributes': dict(item)}
+        return {}
+
+    def transact_write_items(self, params):
+        """Tüm koşullar kilit altında kontrol edilir; biri tutmazsa hiçbiri yazılmaz."""
+        actions = [next(iter(entry.items())) for entry in params['TransactItems']]
+        if len(actions) > 100:
+            raise StandInError('ValidationException', 'Transaction en fazla 100 işlem içerebilir.')
+        keys = [(request['TableName'], self._key(request['TableName'], request.get('Key') or request.get('Item')))
+                for _, request in actions]
+        if len(set(keys)) != len(keys):
+            raise StandInError('ValidationException', 'Transaction aynı kayıtta birden fazla işlem içeremez.')
+        if self.conflict_rate and random.random() < self.conflict_rate:
+            reasons = [{'Code': 'TransactionConflict', 'Message': 'Transaction is ongoing for the item'}
+                       for _ in actions]
+            raise StandInError('TransactionCanceledException', 'Transaction cancelled [TransactionConflict]',
+                               CancellationReasons=reasons)
+        with self._lock:
+            reasons = []
+            for kind, request in actions:
+                item = self._get(request['TableName'], request.get('Key') or request.get('Item'))
+                expression = request.get('ConditionExpression')
+                if expression and not _matches(item or {}, expression, request):
+                    reason = {'Code': 'ConditionalCheckFailed', 'Message': 'The conditional request failed'}
+                    if item and request.get('ReturnValuesOnConditionCheckFailure') == 'ALL_OLD':
+                        reason['Item'] = dict(item)
+                    reasons.append(reason)
+                else:
+                    reasons.append({'Code': 'None'})
+            if any(reason['Code'] != 'None' for reason in reasons):
+                codes = ', '.join(reason['Code'] for reason in reasons)
+                raise StandInError('TransactionCanceledException',
+                                   f"Transaction cancelled, please refer cancellation reasons for specific "
+                                   f"reasons [{codes}]", CancellationReasons=reasons)
+            for kind, request in actions:
+                unconditional = {k: v for k, v in request.items() if k != 'ConditionExpression'}
+                if kind == 'Put':
+                    self.put_item(unconditional)
+                elif kind == 'Update':
+                    self.update_item(unconditional)
+                elif kind == 'Delete':
+                    self.delete_item(unconditional)
+        return {}
+
+    def batch_get_item(self, params):
+        responses = {}
+        for table, request in params['RequestItems'].items():
+            found = [self._get(table, key) for key in request['Keys']]
+            responses[table] = [self._project(item, request) for item in found if item]
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def batch_write_item(self, params):
+        for table, requests in params['RequestItems'].items():
+            for request in requests:
+                if 'PutRequest' in request:
+                    self._store(table, request['PutRequest']['Item'])
+                else:
+                    self.delete_item({'TableName': table, 'Key': request['DeleteRequest']['Key']})
+        return {'UnprocessedItems': {}}
+
+    def query(self, params):
+        table = params['TableName']
+        expression = params['KeyConditionExpression']
+        partition = self._partition_value(table, expression, params)
+        matches = [item for item in self._sorted(table, partition) if _matches(item, expression, params)]
+        if not params.get('ScanIndexForward', True):
+            matches.reverse()
+        return self._page(table, matches, params)
+
+    def scan(self, params):
+        table = params['TableName']
+        return self._page(table, self._sorted(table), params)
+
+    # -- İç yardımcılar ---------------------------------------------------------
+
+    def _table(self, name):
+        return self._tables.setdefault(name, {})
+
+    def _key(self, table, item):
+        pk, sk = self._schemas.get(table, ('pk', None))
+        return (json.dumps(item[pk], sort_keys=True), json.dumps(item[sk], sort_keys=True) if sk else '')
+
+    def _check(self, params, key):
+        """Tekil yazımların ConditionExpression'ı (kilit altında çağrılır)."""
+        expression = params.get('ConditionExpression')
+        item = self._get(params['TableName'], key)
+        if expression and not _matches(item or {}, expression, params):
+            extra = {}
+            if item and params.get('ReturnValuesOnConditionCheckFailure') == 'ALL_OLD':
+                extra['Item'] = dict(item)
+            raise StandInError('ConditionalCheckFailedException', 'The conditional request failed', **extra)
+
+    def _get(self, table, key):
+        pk, sk = self._key(table, key)
+        with self._lock:
+            return self._table(table).get(pk, {}).get(sk)
+
+    def _store(self, table, item):
+        with self._lock:
+            self._write(table, item, item)
+
+    def _write(self, table, key, item):
+        """Kaydı yazar (item None ise siler); kilit altında çağrılır."""
+        pk, sk = self._key(table, key)
+        partition = self._table(table).setdefault(pk, {})
+        old = partition.pop(sk, None) if item is None else partition.get(sk)
+        if item is not None:
+            partition[sk] = item
+        if self.journal is not None:
+            self.journal.append((table, old, item))
+
+    def _partition_value(self, table, expression, params):
+        """KeyCondition içindeki partition key eşitliği (tek bölümü okumak için)."""
+        pk = self._schemas.get(table, ('pk', None))[0]
+        for clause in _CLAUSES.finditer(expression):
+            if clause.group('op') == '=' and _resolve(clause.group('name'), params) == pk:
+                return json.dumps(params['ExpressionAttributeValues'][clause.group('value')], sort_keys=True)
+        raise NotImplementedError(f"Partition key eşitliği yok: {expression}")
+
+    def _sorted(self, table, partition=None):
+        """Bölüm ve sort key sırasıyla kayıtlar (partition verilirse sadece o bölüm)."""
+        sk = self._schemas.get(table, ('pk', None))[1]
+        with self._lock:
+            partitions = self._table(table)
+            if partition is not None:
+                groups = [(partition, list(partitions.get(partition, {}).values()))]
+            else:
+                groups = sorted((key, list(items.values())) for key, items in partitions.items())
+        ordered = []
+        for _, items in groups:
+            ordered.extend(sorted(items, key=lambda item: _plain(item[sk])) if sk else items)
+        return ordered
+
+    def _page(self, table, items, params):
+        start = params.get('ExclusiveStartKey')
+        if start:
+            start_key = self._key(table, start)
+            for i, item in enumerate(items):
+                if self._key(table, item) == start_key:
+                    items = items[i + 1:]
+                    break
+        limit = params.get('Limit')
+        page = items[:limit] if limit else items
+        response = {'ScannedCount': len(page)}
+        if limit and len(items) > limit:
+            pk, sk = self._schemas.get(table, ('pk', None))
+            last = page[-1]
+            response['LastEvaluatedKey'] = {name: last[name] for name in (pk, sk) if name}
+        if params.get('FilterExpression'):
+            page = [item for item in page if _matches(item, params['FilterExpression'], params)]
+        response['Items'] = [self._project(item, params) for item in page]
+        response['Count'] = len(page)
+        return response
+
+    def _project(self, item, params):
+        """Yanıt kopyası: boto3 resource katmanı yanıttaki kayıtları yerinde çözer."""
+        expression = params.get('ProjectionExpression')
+        if not expression:
+            return dict(item)
+        names = params.get('ExpressionAttributeNames', {})
+        fields = [names.get(name.strip(), name.strip()) for name in expression.split(',')]
+        return {name: item[name] for name in fields if name in item}
+
+
+def _resolve(name, params):
+    if '.' in name or '[' in name:
+        raise NotImplementedError(f"İç içe yol desteklenmiyor: {name}")
+    return params.get('ExpressionAttributeNames', {}).get(name, name)
+
+
+def _matches(item, expression, params):
+    """`a AND b OR c` gibi parantezsiz OR'lar: AND gruplarından biri tutarsa doğru."""
+    return any(_matches_all(item, part, params) for part in _OR.split(expression))
+
+
+def _matches_all(item, expression, params):
+    values = params.get('ExpressionAttributeValues', {})
+    if not _CONNECTIVES.match(_CLAUSES.sub('', expression)):
+        raise NotImplementedError(f"Desteklenmeyen ifade: {expression}")
+    for clause in _CLAUSES.finditer(expression):
+        g = clause.groupdict()
+        if g['bw_name']:
+            attr = item.get(_resolve(g['bw_name'], params))
+            if not attr or not str(_plain(attr)).startswith(str(_plain(values[g['bw_value']]))):
+                return False
+        elif g['fn']:
+            exists = _resolve(g['fn_name'], params) in item
+            if exists != (g['fn'] == 'attribute_exists'):
+                return False
+        elif g['ct_name']:
+            attr = item.get(_resolve(g['ct_name'], params))
+            if not attr or _plain(values[g['ct_value']]) not in _plain(attr):
+                return False
+        elif g['bt_name']:
+            attr = item.get(_resolve(g['bt_name'], params))
+            if not attr or not (_plain(values[g['bt_low']]) <= _plain(attr) <= _plain(values[g['bt_high']])):
+                return False
+        else:
+            attr = item.get(_resolve(g['name'], params))
+            if attr is None:
+                return False
+            left, right = _plain(attr), _plain(values[g['value']])
+            if not {'=': left == right, '<>': left != right, '<': left < right, '<=': left <= right,
+                    '>': left > right, '>=': left >= right}[g['op']]:
+                return False
+    return True
+
+
+_UPDATE_SECTIONS = re.compile(r'\b(SET|ADD|REMOVE|DELETE)\b', re.IGNORECASE)
+_TOP_LEVEL_COMMA = re.compile(r',(?![^()]*\))')
+_IF_NOT_EXISTS = re.compile(r'^if_not_exists\(\s*([#\w]+)\s*,\s*(:\w+)\s*\)$')
+
+
+def _map_path(item, name, params):
+    """
+    SET / REMOVE hedefi: `#a` veya harita içi `#a.#b` -> (alanı taşıyan harita, alan adı).
+    Ara harita yoksa DynamoDB gibi ValidationException; liste indeksleri desteklenmez.
+    """
+    if '[' in name:
+        raise NotImplementedError(f"Liste indeksi desteklenmiyor: {name}")
+    names = params.get('ExpressionAttributeNames', {})
+    *parents, leaf = [names.get(part, part) for part in name.split('.')]
+    for part in parents:
+        value = item.get(part)
+        if not value or 'M' not in value:
+            raise StandInError('ValidationException',
+                               'The document path provided in the update expression is invalid for update')
+        item = value['M']
+    return item, leaf
+
+
+def _apply_update(item, expression, params):
+    """
+    SET a = :v | if_not_exists(a, :v), ADD a :n, REMOVE a, DELETE a :set. SET ve
+    REMOVE harita içi yolları da (`#log.#v`) kabul eder; ADD / DELETE üst seviyededir.
+    """
+    values = params.get('ExpressionAttributeValues', {})
+    parts = _UPDATE_SECTIONS.split(expression)
+    for action, body in zip(parts[1::2], parts[2::2]):
+        action = action.upper()
+        for clause in filter(None, (c.strip() for c in _TOP_LEVEL_COMMA.split(body))):
+            if action == 'SET':
+                name, _, value = (s.strip() for s in clause.partition('='))
+                target, name = _map_path(item, name, params)
+                match = _IF_NOT_EXISTS.match(value)
+                if match:
+                    if name not in target:
+                        target[name] = values[match.group(2)]
+                elif value in values:
+                    target[name] = values[value]
+                else:
+                    raise NotImplementedError(f"Desteklenmeyen SET: {clause}")
+            elif action == 'REMOVE':
+                target, name = _map_path(item, clause, params)
+                target.pop(name, None)
+            else:
+                name, value = clause.split()
+                name, operand = _resolve(name, params), values[value]
+                current = item.get(name)
+                if 'N' in operand:
+                    base = Decimal(current['N']) if current else Decimal(0)
+                    sign = -1 if action == 'DELETE' else 1
+                    item[name] = {'N': str(base + sign * Decimal(operand['N']))}
+                else:
+                    (kind, members), = operand.items()
+                    existing = set(current[kind]) if current else set()
+                    updated = existing - set(members) if action == 'DELETE' else existing | set(members)
+                    if updated:
+                        item[name] = {kind: sorted(updated)}
+                    else:
+                        item.pop(name, None)
+
+
+class S3StandIn:
+    """
+    S3 nesne işlemleri taklidi; ETag (içeriğin MD5'i) ve koşullu istekler
+    (If-Match, If-None-Match). Doğrudan istemci yerine verilebilir
+    (`SearchIndexStore(S3StandIn(), ...)`) ya da `AwsStandIns` ile botocore
+    üzerinden kullanılır. `root` verilirse nesneler `<root>/<bucket>/<key>`
+    dosyalarına da yazılır ve açılışta oradan okunur (yerel sunucu yeniden
+    başlatıldığında korunur).
+    """
+
+    def __init__(self, root=None):
+        self.objects = {}
+        self._root = os.path.abspath(root) if root else None
+        self._lock = threading.Lock()
+        if root and os.path.isdir(root):
+            for directory, _, names in os.walk(root):
+                for name in names:
+                    path = os.path.join(directory, name)
+                    bucket, _, key = os.path.relpath(path, root).replace(os.sep, '/').partition('/')
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                    self.objects[(bucket, key)] = (data, self._etag(data))
+
+    @staticmethod
+    def _etag(data):
+        return f'"{hashlib.md5(data).hexdigest()}"'
+
+    def _found(self, Bucket, Key, IfMatch=None, IfNoneMatch=None):
+        with self._lock:
+            current = self.objects.get((Bucket, Key))
+        if current is None:
+            raise StandInError('NoSuchKey', 'The specified key does not exist.', status=404)
+        if IfMatch and IfMatch != current[1]:
+            raise StandInError('PreconditionFailed', 'At least one of the pre-conditions you specified did not hold',
+                               status=412)
+        if IfNoneMatch and IfNoneMatch in (current[1], '*'):
+            raise StandInError('304', 'Not Modified', status=304)
+        return current
+
+    def get_object(self, Bucket, Key, IfMatch=None, IfNoneMatch=None, **kwargs):
+        from botocore.response import StreamingBody
+        data, etag = self._found(Bucket, Key, IfMatch, IfNoneMatch)
+        return {'Body': StreamingBody(io.BytesIO(data), len(data)), 'ETag': etag, 'ContentLength': len(data)}
+
+    def head_object(self, Bucket, Key, IfMatch=None, IfNoneMatch=None, **kwargs):
+        data, etag = self._found(Bucket, Key, IfMatch, IfNoneMatch)
+        return {'ETag': etag, 'ContentLength': len(data)}
+
+    def put_object(self, Bucket, Key, Body=b'', IfMatch=None, IfNoneMatch=None, **kwargs):
+        data = Body.read() if hasattr(Body, 'read') else Body
+        data = data.encode('utf-8') if isinstance(data, str) else bytes(data)
+        etag = self._etag(data)
+        with self._lock:
+            current = self.objects.get((Bucket, Key))
+            if (IfMatch and (not current or current[1] != IfMatch)) or (IfNoneMatch == '*' and current):
+                raise StandInError('PreconditionFailed',
+                                   'At least one of the pre-conditions you specified did not hold', status=412)
+            self.objects[(Bucket, Key)] = (data, etag)
+            path = self._path(Bucket, Key)
+            if path:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as f:
+                    f.write(data)
+        return {'ETag': etag}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+            path = self._path(Bucket, Key)
+            if path and os.path.exists(path):
+                os.remove(path)
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix='', Delimiter=None, **kwargs):
+        with self._lock:
+            keys = sorted(key for bucket, key in self.objects if bucket == Bucket and key.startswith(Prefix))
+        if not Delimiter:
+            return {'Contents': [{'Key': key} for key in keys], 'KeyCount': len(keys), 'IsTruncated': False}
+        prefixes, contents = set(), []
+        for key in keys:
+            rest = key[len(Prefix):]
+            if Delimiter in rest:
+                prefixes.add(Prefix + rest.split(Delimiter, 1)[0] + Delimiter)
+            else:
+                contents.append({'Key': key})
+        return {'Contents': contents, 'CommonPrefixes': [{'Prefix': prefix} for prefix in sorted(prefixes)],
+                'KeyCount': len(contents) + len(prefixes), 'IsTruncated': False}
+
+    def _path(self, bucket, key):
+        if not self._root:
+            return None
+        path = os.path.normpath(os.path.join(self._root, bucket, key))
+        if not path.startswith(self._root + os.sep):
+            raise StandInError('InvalidArgument', f"Geçersiz anahtar: {key}")
+        return path
+
+
+class BedrockStandIn:
+    """
+    Converse / ConverseStream / InvokeModel / InvokeModelWithResponseStream /
+    Retrieve taklidi. Yanıtlar deterministiktir: hazır metin (veya `echo`
+    ile kullanıcının son mesajı), metinden türetilen gömmeler.
+
+    `tool_titles`: {kullanıcı mesajı: kitap başlığı}. Araç tanımı gönderilen
+    bir Converse çağrısında mesaj burada varsa model check_book_availability
+    aracını ister (kayıtlı istek karışımlarındaki model kararı).
+
+    Prompt caching: istekte `cachePoint` varsa, araçlar + sistem mesajının
+    o noktaya kadarki kısmı ilk seferde önbelleğe yazılmış
+    (`cacheWriteInputTokens`), sonraki çağrılarda okunmuş
+    (`cacheReadInputTokens`) sayılır.
+
+    Akışlı çağrılarda metin birkaç kelimelik parçalar halinde üretilir;
+    `chunk_delay_ms` parçalar arasındaki bekleme (üretim hızı) süresidir.
+    """
+
+    def __init__(self, answer_chars=400, tool_titles=None, embedding_dimensions=256, chunks=None, echo=False,
+                 chunk_delay_ms=0):
+        self._answer = ("Kütüphanemiz hafta içi 09:00-18:00 arasında açıktır. " * 40)[:answer_chars]
+        self._echo = echo
+        self._chunk_delay = chunk_delay_ms / 1000
+        self._tool_titles = dict(tool_titles or {})
+        self._dimensions = embedding_dimensions
+        self._chunks = chunks or [
+            ("Ödünç alınan kitaplar 15 gün içinde iade edilmelidir. Gecikme için günlük ceza uygulanır.", 0.72),
+            ("Kütüphane hafta içi 09:00-18:00, cumartesi 10:00-14:00 saatleri arasında açıktır.", 0.64),
+            ("Üyelik için kimlik ile danışma masasına başvurulur; üyelik ücretsizdir.", 0.41),
+        ]
+        self._cached_prefixes = set()
+        self._lock = threading.Lock()
+
+    def add_tool_title(self, message, title):
+        self._tool_titles[message] = title
+
+    def _reply(self, text):
+        return f"Yerel model yanıtı: {text}" if self._echo and text else self._answer
+
+    def _pieces(self, text):
+        words = re.findall(r'\S+\s*', text)
+        for start in range(0, len(words), 4):
+            if start and self._chunk_delay:
+                time.sleep(self._chunk_delay)
+            yield ''.join(words[start:start + 4])
+
+    def converse(self, body):
+        messages = body.get('messages', [])
+        last = messages[-1] if messages else {'content': []}
+        has_tool_result = any('toolResult' in block for block in last.get('content', []))
+        text = next((block['text'] for block in last.get('content', []) if 'text' in block), '')
+        title = self._tool_titles.get(text)
+        if has_tool_result:
+            # Araç sonucundan sonra yankı, aracı isteyen kullanıcı mesajına yapılır
+            text = next((block['text'] for message in reversed(messages) if message.get('role') == 'user'
+                         for block in message.get('content', []) if 'text' in block), '')
+        answer = self._reply(text)
+        if body.get('toolConfig') and title and not has_tool_result:
+            return {
+                'output': {'message': {'role': 'assistant', 'content': [{'toolUse': {
+                    'toolUseId': f"tool-{random.randrange(10 ** 9)}",
+                    'name': 'check_book_availability',
+                    'input': {'book_title': title},
+                }}]}},
+                'stopReason': 'tool_use',
+                'usage': self._usage(body, 20),
+            }
+        return {
+            'output': {'message': {'role': 'assistant', 'content': [{'text': answer}]}},
+            'stopReason': 'end_turn',
+            'usage': self._usage(body, len(answer) // 4),
+        }
+
+    def converse_stream(self, body):
+        result = self.converse(body)
+        return {'stream': self._converse_events(result)}
+
+    def _converse_events(self, result):
+        yield {'messageStart': {'role': 'assistant'}}
+        for index, block in enumerate(result['output']['message']['content']):
+            if 'toolUse' in block:
+                tool_use = block['toolUse']
+                yield {'contentBlockStart': {'contentBlockIndex': index, 'start': {'toolUse': {
+                    'toolUseId': tool_use['toolUseId'], 'name': tool_use['name']}}}}
+                yield {'contentBlockDelta': {'contentBlockIndex': index,
+                                             'delta': {'toolUse': {'input': json.dumps(tool_use['input'])}}}}
+            else:
+                for piece in self._pieces(block['text']):
+                    yield {'contentBlockDelta': {'contentBlockIndex': index, 'delta': {'text': piece}}}
+            yield {'contentBlockStop': {'contentBlockIndex': index}}
+        yield {'messageStop': {'stopReason': result['stopReason']}}
+        yield {'metadata': {'usage': result['usage'], 'metrics': {'latencyMs': 0}}}
+
+    def _usage(self, body, output_tokens):
+        def tokens(value):
+            return len(json.dumps(value, ensure_ascii=False)) // 4
+        # Önek sırası: araçlar, sistem mesajı, mesajlar
+        blocks = list((body.get('toolConfig') or {}).get('tools', [])) + list(body.get('system', []))
+        cached = [i for i, block in enumerate(blocks) if 'cachePoint' in block]
+        prefix = blocks[:cached[-1]] if cached else []
+        prefix_tokens = tokens(prefix) if prefix else 0
+        usage = {'inputTokens': tokens(blocks) - prefix_tokens + tokens(body.get('messages', [])),
+                 'outputTokens': output_tokens}
+        if prefix:
+            key = json.dumps(prefix, sort_keys=True)
+            with self._lock:
+                hit = key in self._cached_prefixes
+                self._cached_prefixes.add(key)
+            usage['cacheReadInputTokens' if hit else 'cacheWriteInputTokens'] = prefix_tokens
+        usage['totalTokens'] = sum(usage.values())
+        return usage
+
+    def _claude_text(self, body):
+        """Anthropic Messages gövdesindeki son kullanıcı mesajı ve yanıt metni."""
+        messages = body.get('messages', [])
+        content = messages[-1].get('content', '') if messages else ''
+        if isinstance(content, list):
+            content = next((block.get('text', '') for block in content if block.get('type') == 'text'), '')
+        return self._reply(content)
+
+    def invoke_model(self, body):
+        from botocore.response import StreamingBody
+        if 'inputText' in body:
+            # Aynı metin her zaman aynı gömmeyi verir (anlamsal önbellek / öneriler tekrarlanabilir olsun)
+            rng = random.Random(hashlib.sha256(body['inputText'].encode('utf-8')).digest())
+            payload = {'embedding': [rng.random() for _ in range(body.get('dimensions', self._dimensions))],
+                       'inputTextTokenCount': len(body['inputText']) // 4}
+        else:
+            answer = self._claude_text(body)
+            payload = {
+                'content': [{'type': 'text', 'text': answer}],
+                'stop_reason': 'end_turn',
+                'usage': {'input_tokens': len(json.dumps(body, ensure_ascii=False)) // 4,
+                          'output_tokens': len(answer) // 4},
+            }
+        raw = json.dumps(payload).encode('utf-8')
+        return {'body': StreamingBody(io.BytesIO(raw), len(raw)), 'contentType': 'application/json'}
+
+    def invoke_model_with_response_stream(self, body):
+        return {'body': self._claude_events(body), 'contentType': 'application/json'}
+
+    def _claude_events(self, body):
+        answer = self._claude_text(body)
+        events = [{'type': 'message_start', 'message': {'role': 'assistant', 'usage': {
+            'input_tokens': len(json.dumps(body, ensure_ascii=False)) // 4, 'output_tokens': 0}}},
+            {'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}}]
+        for event in events:
+            yield {'chunk': {'bytes': json.dumps(event).encode('utf-8')}}
+        for piece in self._pieces(answer):
+            event = {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': piece}}
+            yield {'chunk': {'bytes': json.dumps(event).encode('utf-8')}}
+        for event in ({'type': 'content_block_stop', 'index': 0},
+                      {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'},
+                       'usage': {'output_tokens': len(answer) // 4}},
+                      {'type': 'message_stop'}):
+            yield {'chunk': {'bytes': json.dumps(event).encode('utf-8')}}
+
+    def retrieve(self, body):
+        limit = body.get('retrievalConfiguration', {}).get('vectorSearchConfiguration', {}).get('numberOfResults', 5)
+        return {'retrievalResults': [
+            {'content': {'text': text}, 'score': score,
+             'location': {'type': 'S3', 's3Location': {'uri': f"s3://library-docs/kurallar-{i}.txt"}}}
+            for i, (text, score) in enumerate(self._chunks[:limit])
+        ]}
+
+
+class AwsStandIns:
+    """
+    Taklitleri bir boto3 oturumuna bağlar. `latency_ms` servis başına
+    (örn. {'dynamodb': 5, 'bedrock-runtime': 400}) eklenecek gecikmedir;
+    `jitter` bu gecikmenin ± oranıdır.
+    """
+
+    def __init__(self, latency_ms=None, jitter=0.2, dynamodb=None, bedrock=None, s3=None):
+        self.dynamodb = dynamodb or DynamoDBStandIn()
+        self.bedrock = bedrock or BedrockStandIn()
+        self.s3 = s3 or S3StandIn()
+        self.latency_ms = dict(latency_ms or {})
+        self.jitter = jitter
+        self.calls = {}
+        self._faults = []
+        self._lock = threading.Lock()
+        self._operations = {
+            ('dynamodb', 'GetItem'): self.dynamodb.get_item,
+            ('dynamodb', 'PutItem'): self.dynamodb.put_item,
+            ('dynamodb', 'DeleteItem'): self.dynamodb.delete_item,
+            ('dynamodb', 'UpdateItem'): self.dynamodb.update_item,
+            ('dynamodb', 'TransactWriteItems'): self.dynamodb.transact_write_items,
+            ('dynamodb', 'BatchGetItem'): self.dynamodb.batch_get_item,
+            ('dynamodb', 'BatchWriteItem'): self.dynamodb.batch_write_item,
+            ('dynamodb', 'Query'): self.dynamodb.query,
+            ('dynamodb', 'Scan'): self.dynamodb.scan,
+            ('bedrock-runtime', 'Converse'): self.bedrock.converse,
+            ('bedrock-runtime', 'ConverseStream'): self.bedrock.converse_stream,
+            ('bedrock-runtime', 'InvokeModel'): self.bedrock.invoke_model,
+            ('bedrock-runtime', 'InvokeModelWithResponseStream'): self.bedrock.invoke_model_with_response_stream,
+            ('bedrock-agent-runtime', 'Retrieve'): self.bedrock.retrieve,
+            ('s3', 'GetObject'): lambda params: self.s3.get_object(**params),
+            ('s3', 'HeadObject'): lambda params: self.s3.head_object(**params),
+            ('s3', 'PutObject'): lambda params: self.s3.put_object(**params),
+            ('s3', 'DeleteObject'): lambda params: self.s3.delete_object(**params),
+            ('s3', 'ListObjectsV2'): lambda params: self.s3.list_objects_v2(**params),
+        }
+
+    def register(self, service, operation, handler):
+        """
+        Ek operasyon taklidi: handler(istek gövdesi sözlüğü) -> çözülmüş yanıt.
+        API_PARAMS_SERVICES'teki servislerde handler API parametrelerini alır.
+        """
+        self._operations[(service, operation)] = handler
+
+    def inject(self, service, operation, rate, code='ThrottlingException', match=None):
+        """
+        Çağrıların `rate` oranında `code` hatası döner. `match` verilirse sadece
+        URL yolunda bu metni içeren çağrılar etkilenir (örn. model ID).
+        """
+        self._faults.append((service, operation, rate, code, match))
+
+    def install(self, session):
+        session.events.register('before-parameter-build', self._keep_params)
+        session.events.register('before-call', self._before_call)
+        return self
+
+    @staticmethod
+    def _keep_params(params, model, context, **kwargs):
+        if model.service_model.service_id.hyphenize() in API_PARAMS_SERVICES:
+            context['standin_params'] = dict(params)
+
+    def _before_call(self, model, params, context=None, **kwargs):
+        from botocore.awsrequest import AWSResponse
+        service = model.service_model.service_id.hyphenize()
+        handler = self._operations.get((service, model.name))
+        if handler is None:
+            raise NotImplementedError(f"Taklit edilmeyen çağrı: {service}.{model.name}")
+        with self._lock:
+            key = f"{service}.{model.name}"
+            self.calls[key] = self.calls.get(key, 0) + 1
+        for fault_service, operation, rate, code, match in self._faults:
+            if (fault_service, operation) == (service, model.name) and random.random() < rate \
+                    and (match is None or match in params.get('url_path', '')):
+                with self._lock:
+                    self.calls[f"{key}:{code}"] = self.calls.get(f"{key}:{code}", 0) + 1
+                error = {'Error': {'Code': code, 'Message': 'Injected fault'}, 'ResponseMetadata': {'HTTPStatusCode': 429}}
+                return AWSResponse('https://standin.local', 429, {}, None), error
+        latency = self.latency_ms.get(service, 0) / 1000
+        if latency:
+            time.sleep(latency * random.uniform(1 - self.jitter, 1 + self.jitter))
+        if service in API_PARAMS_SERVICES:
+            body = (context or {}).get('standin_params', {})
+        else:
+            raw = params.get('body') or b'{}'
+            body = json.loads(raw) if raw else {}
+        try:
+            return AWSResponse('https://standin.local', 200, {}, None), handler(body)
+        except StandInError as e:
+            error = {'Error': {'Code': e.code, 'Message': str(e)}, 'ResponseMetadata': {'HTTPStatusCode': e.status}}
+            return AWSResponse('https://standin.local', e.status, {}, None), dict(error, **e.extra)
@@ -0,0 +1,113 @@
+"""
+Toplu katalog yükleyicisinin yerel throughput ölçümü.
+
+AWS yerine bellek içi bir DynamoDB taklidi kullanılır: her batch_write_item
+çağrısı ayarlanabilir bir gecikmeyle yanıt verir ve saniyedeki yazım
+kapasitesi aşıldığında kayıtların bir kısmını UnprocessedItems olarak döner
+(gerçek throttling davranışı gibi). Sentetik katalog geçici bir dosyaya
+akışla yazılır ve aynı şekilde akışla okunur.
+
+    python benchmarks/catalog_import.py                     # 200k satır, CSV
+    python benchmarks/catalog_import.py --rows 1000000 --format jsonl
+    python benchmarks/catalog_import.py --capacity 20000 --latency-ms 15 --workers 32
+    python benchmarks/catalog_import.py --interrupt-at 0.5  # yarıda durdur ve devam et
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'lambda_layers', 'common', 'python'))
+
+from library_common.catalog_import import CatalogLoader, iter_records  # noqa: E402
+
+
+class DynamoStandIn:
+    """batch_write_item taklidi: sabit gecikme + saniyelik kapasite (token kovası)."""
+
+    def __init__(self, latency_ms, capacity_per_second):
+        self.items = {}
+        self._latency = latency_ms / 1000
+        self._capacity = capacity_per_second
+        self._tokens = float(capacity_per_second)
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+
+    def batch_write_item(self, RequestItems):
+        time.sleep(self._latency)
+        unprocessed = {}
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._refilled) * self._capacity)
+            self._refilled = now
+            for table, requests in RequestItems.items():
+                for request in requests:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        item = request['PutRequest']['Item']
+                        self.items[item['bookId']] = item
+                    else:
+                        unprocessed.setdefault(table, []).append(request)
+        return {'UnprocessedItems': unprocessed}
+
+
+def write_catalog(path, rows, fmt):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(['bookId', 'title', 'author', 'genre', 'isAvailable'])
+            for i in range(rows):
+                writer.writerow([f"b{i}", f"Kitap {i}", f"Yazar {i % 5000}", 'Roman', 'true'])
+        else:
+            for i in range(rows):
+                f.write(json.dumps({'bookId': f"b{i}", 'title': f"Kitap {i}", 'author': f"Yazar {i % 5000}",
+                                    'genre': 'Roman', 'isAvailable': True}) + '\n')
+
+
+def run(path, fmt, stand_in, workers, start_row=0, stop_after=None):
+    loader = CatalogLoader(stand_in, 'LibraryBooks', workers=workers, base_delay=0.01, max_delay=0.5)
+    should_stop = (lambda: loader.stats['written'] >= stop_after) if stop_after else None
+    with open(path, 'rb') as f:
+        return loader.load(iter_records(f, fmt), start_row=start_row, should_stop=should_stop)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--format', choices=('csv', 'jsonl'), default='csv')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--latency-ms', type=float, default=10.0, help='batch_write_item gecikmesi')
+    parser.add_argument('--capacity', type=int, default=40_000, help='Saniyedeki yazım kapasitesi')
+    parser.add_argument('--interrupt-at', type=float, help='Bu orana gelince durdur, sonra devam et (0-1)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"catalog.{args.format}")
+        started = time.monotonic()
+        write_catalog(path, args.rows, args.format)
+        print(f"{args.rows} satırlık katalog {time.monotonic() - started:.1f} sn'de üretildi "
+              f"({os.path.getsize(path) / 1e6:.1f} MB)")
+
+        stand_in = DynamoStandIn(args.latency_ms, args.capacity)
+        if args.interrupt_at:
+            first = run(path, args.format, stand_in, args.workers, stop_after=int(args.rows * args.interrupt_at))
+            print(f"Durduruldu: {json.dumps(first)}")
+            result = run(path, args.format, stand_in, args.workers, start_row=first['committedRows'])
+        else:
+            result = run(path, args.format, stand_in, args.workers)
+
+        print(json.dumps(result, indent=2))
+        print(f"Tablodaki benzersiz kitap: {len(stand_in.items)} / {args.rows}")
+        if len(stand_in.items) != args.rows:
+            print("HATA: eksik kayıt var.")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
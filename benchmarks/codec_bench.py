@@ -0,0 +1,209 @@
+"""
+`library_common.codec` mikro ölçümü: eski yol (boto3 resource + Decimal +
+standart json) ile yeni yol (düşük seviyeli istemci + doğrudan çözücü +
+orjson / standart json arka ucu) karşılaştırılır.
+
+Ölçülen sıcak yollar (gecikmesiz DynamoDB taklidi, işlem başına µs ve
+tracemalloc ile bellek tepe artışı):
+
+- decode:       kablo formatındaki sayfa -> Python (TypeDeserializer / codec)
+- encode:       çözülmüş sayfa -> JSON gövdesi
+- books_page:   GET /books sayfası uçtan uca (Scan + dönüştürme + JSON + ETag)
+- list_books:   GET /reading-lists/{id}?include=books (GetItem + BatchGetItem)
+- bedrock_body: chat_handler'da model yanıt gövdesinin çözülmesi ve yanıtın yazılması
+
+Her senaryoda iki yolun JSON çıktısı karşılaştırılır; farklıysa 1 ile çıkar.
+orjson kurulu değilse sadece standart kütüphane arka ucu ölçülür.
+
+    python benchmarks/codec_bench.py
+    python benchmarks/codec_bench.py --page 1000 --min-seconds 1
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+from load_test import ENVIRONMENT, load_handler
+from search_bench import make_catalog
+
+
+def old_dumps(body):
+    """Önceki library_common.http.dumps (standart json, Decimal için default)."""
+    def default(value):
+        if isinstance(value, Decimal):
+            return int(value) if value == value.to_integral_value() else float(value)
+        if isinstance(value, (set, frozenset)):
+            return sorted(value)
+        raise TypeError(type(value).__name__)
+    return json.dumps(body, default=default, ensure_ascii=False, separators=(',', ':'))
+
+
+def old_cached_response(body):
+    payload = old_dumps(body)
+    etag = '"' + hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32] + '"'
+    return {'statusCode': 200, 'headers': {'ETag': etag}, 'body': payload}
+
+
+def measure(case, min_seconds):
+    case()
+    iterations, started = 0, time.perf_counter()
+    while time.perf_counter() - started < min_seconds:
+        case()
+        iterations += 1
+    microseconds = (time.perf_counter() - started) / iterations * 1e6
+    tracemalloc.start()
+    case()
+    peak_kib = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    return microseconds, peak_kib
+
+
+def seed_books(dynamodb, count, rng):
+    books = make_catalog(count, rng)
+    for book in books:
+        book.update({
+            'description': ' '.join(rng.choice(['kitap', 'roman', 'tarih', 'yolculuk', 'şehir', 'aşk'])
+                                    for _ in range(40)),
+            'isbn': f"978{rng.randrange(10 ** 9, 10 ** 10)}",
+            'pageCount': rng.randrange(80, 900),
+            'rating': Decimal(str(round(rng.uniform(1, 5), 1))),
+        })
+        dynamodb.put('LibraryBooks', book)
+    return books
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--page', type=int, default=100, help='Sayfa / listedeki kitap sayısı')
+    parser.add_argument('--answer-chars', type=int, default=2000, help='Model yanıtının uzunluğu')
+    parser.add_argument('--min-seconds', type=float, default=0.5, help='Senaryo başına ölçüm süresi')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.update(ENVIRONMENT)
+    import boto3
+    from boto3.dynamodb.types import TypeDeserializer
+    from aws_standins import AwsStandIns
+    from library_common import clients, codec
+
+    aws = AwsStandIns()
+    session = boto3.session.Session(region_name='us-east-1')
+    aws.install(session)
+    clients._session = session
+    rng = random.Random(args.seed)
+    books = seed_books(aws.dynamodb, args.books, rng)
+    list_ids = {book['bookId'] for book in rng.sample(books, min(args.page, len(books)))}
+    aws.dynamodb.put('ReadingLists', {'userId': 'bench', 'listId': 'l1', 'name': 'Okunacaklar',
+                                      'description': '', 'createdAt': '2024-01-01T00:00:00+00:00',
+                                      'bookIds': list_ids})
+
+    with redirect_stdout(open(os.devnull, 'w')):
+        handler = load_handler('catalog_api')
+    api = sys.modules['catalog_api_index']
+    table = session.resource('dynamodb').Table('LibraryBooks')
+    lists_table = session.resource('dynamodb').Table('ReadingLists')
+    raw_client = clients.get_client('dynamodb')
+
+    wire_page = raw_client.scan(TableName='LibraryBooks', Limit=args.page)['Items']
+    deserializer = TypeDeserializer()
+    resource_page = [{name: deserializer.deserialize(value) for name, value in item.items()} for item in wire_page]
+    plain_page = list(codec.decode_items(wire_page))
+    page_fields = api.projection(api.BOOK_LIST_FIELDS, api.BOOK_ALIASES)
+    books_event = {'httpMethod': 'GET', 'resource': '/books', 'queryStringParameters': {'limit': str(args.page)}}
+    list_event = {'httpMethod': 'GET', 'resource': '/reading-lists/{listId}',
+                  'requestContext': {'authorizer': {'claims': {'cognito:username': 'bench'}}},
+                  'pathParameters': {'listId': 'l1'}, 'queryStringParameters': {'include': 'books'}}
+
+    answer = ("Kütüphanemiz hafta içi 09:00-18:00 arasında açıktır. " * 100)[:args.answer_chars]
+    model_body = json.dumps({
+        'id': 'msg_bench', 'type': 'message', 'role': 'assistant', 'model': 'claude-3-sonnet',
+        'content': [{'type': 'text', 'text': answer}], 'stop_reason': 'end_turn',
+        'usage': {'input_tokens': 1200, 'output_tokens': len(answer) // 4},
+    }, ensure_ascii=False).encode('utf-8')
+
+    def old_books_page():
+        response = table.scan(Limit=args.page, **page_fields)
+        return old_cached_response({'items': [api.to_book(item) for item in response.get('Items', [])],
+                                    'nextCursor': api.encode_cursor(response.get('LastEvaluatedKey'))})
+
+    def old_list_books():
+        item = lists_table.get_item(Key={'userId': 'bench', 'listId': 'l1'})['Item']
+        reading_list = api.to_list(item)
+        found = {}
+        ids = reading_list['bookIds']
+        for start in range(0, len(ids), api.BATCH_GET_SIZE):
+            request = {'LibraryBooks': {'Keys': [{'bookId': book_id} for book_id in ids[start:start + 100]],
+                                        **page_fields}}
+            response = session.resource('dynamodb').meta.client.batch_get_item(RequestItems=request)
+            for book in response['Responses']['LibraryBooks']:
+                found[book['bookId']] = api.to_book(book)
+        reading_list['books'] = [found[book_id] for book_id in ids if book_id in found]
+        return old_cached_response(reading_list)
+
+    def old_bedrock_body():
+        body = json.loads(model_body)
+        return json.dumps({'session_id': 's1', 'response': body['content'][0]['text']})
+
+    def new_bedrock_body():
+        body = codec.loads(model_body)
+        return codec.dumps({'session_id': 's1', 'response': body['content'][0]['text']})
+
+    scenarios = [
+        ('decode', lambda: [{name: deserializer.deserialize(value) for name, value in item.items()}
+                            for item in wire_page],
+         lambda: list(codec.decode_items(wire_page)), None),
+        ('encode', lambda: old_dumps({'items': resource_page, 'nextCursor': None}),
+         lambda: codec.dumps_list(plain_page, nextCursor=None), None),
+        ('books_page', old_books_page, lambda: handler(books_event, None), 'body'),
+        ('list_books', old_list_books, lambda: handler(list_event, None), 'body'),
+        ('bedrock_body', old_bedrock_body, new_bedrock_body, None),
+    ]
+
+    backends = ['json']
+    try:
+        import orjson  # noqa: F401
+        backends.insert(0, 'orjson')
+    except ImportError:
+        print("orjson kurulu değil; sadece standart kütüphane arka ucu ölçülüyor (pip install orjson).")
+
+    print(f"{args.books} kitap, sayfa {args.page}, model yanıtı {args.answer_chars} karakter\n")
+    print(f"{'senaryo':<14} {'eski µs':>10} " + ' '.join(f"{name + ' µs':>12} {'hız':>6}" for name in backends)
+          + f"  {'eski KiB':>9} " + ' '.join(f"{name + ' KiB':>11}" for name in backends))
+    mismatches = []
+    for name, old, new, field in scenarios:
+        old_us, old_kib = measure(old, args.min_seconds)
+        row = f"{name:<14} {old_us:10.1f} "
+        memory = f"  {old_kib:9.1f} "
+        for backend in backends:
+            codec.use_backend(backend)
+            result, expected = new(), old()
+            if field:
+                result, expected = result[field], expected[field]
+            if name == 'decode':
+                same = json.loads(old_dumps(result)) == json.loads(old_dumps(expected))
+            else:
+                same = json.loads(result) == json.loads(expected)
+            if not same:
+                mismatches.append(f"{name}/{backend}")
+            new_us, new_kib = measure(new, args.min_seconds)
+            row += f"{new_us:12.1f} {old_us / new_us:5.1f}x "
+            memory += f"{new_kib:11.1f} "
+        print(row + memory)
+    codec.use_backend()
+
+    if mismatches:
+        print(f"\nHATA: eski ve yeni yolun çıktısı farklı: {', '.join(mismatches)}")
+        return 1
+    print("\nTüm senaryolarda eski ve yeni yolun JSON çıktısı aynı.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+Lambda handler'ları için yerel soğuk başlangıç (cold start) ölçümü.
+
+Her ölçüm yeni bir Python sürecinde yapılır: handler modülünün import süresi
+ve ilk çağrının süresi ölçülür. AWS servisleri ağa çıkmadan, botocore'un
+`before-call` olayında hazır yanıt dönülerek taklit edilir (stub); böylece
+ölçülen süre sadece bizim kodumuzun ve istemci kurulumunun maliyetidir.
+
+    python benchmarks/cold_start.py                 # tüm handler'lar, lazy ve eager
+    python benchmarks/cold_start.py --runs 10
+    python benchmarks/cold_start.py --check         # baseline'a göre regresyon kontrolü
+    python benchmarks/cold_start.py --update-baseline
+
+"eager" modu, istemcilerin eskisi gibi import sırasında kurulduğu durumu
+taklit eder ve lazy kurulumun kazancını göstermek için raporlanır.
+chat_handler ve catalog_indexer her çağrıda kullandıkları istemcileri zaten
+import sırasında kurar; onlar için iki mod aynıdır. `--check`, lazy modun
+medyan süreleri baseline dosyasındaki değerleri tolerans payından fazla
+aşarsa 1 koduyla çıkar. Baseline dosyası (benchmarks/baselines/cold_start.json,
+repoda tutulur) yoksa da 1 döner; bilinçli olarak atlamak için
+`--allow-missing-baseline` verilmelidir.
+
+Not: boto3 Session nesnesi her iki modda da ölçüm dışında oluşturulur.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_PATH = os.path.join(ROOT, 'lambda_layers', 'common', 'python')
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baselines', 'cold_start.json')
+
+# Eski (eager) kodun import sırasında kurduğu istemciler
+HANDLERS = {
+    'chat_handler': {
+        'env': {'TABLE_NAME': 'ChatHistory'},
+        'eager': [('resource', 'dynamodb'), ('client', 'bedrock-runtime')],
+        'event': {'body': json.dumps({'message': 'Kütüphane kaçta açılıyor?', 'session_id': 'bench'})},
+    },
+    'library_assistant': {
+        'env': {
+            'BOOKS_TABLE_NAME': 'LibraryBooks',
+            'INDEX_TABLE_NAME': 'LibraryBookIndex',
+            'RESPONSE_CACHE_TABLE_NAME': 'AssistantResponseCache',
+            'HISTORY_TABLE_NAME': 'AssistantChatHistory',
+        },
+        'eager': [('resource', 'dynamodb'), ('client', 'bedrock-runtime'), ('client', 'bedrock-agent-runtime')],
+        'event': {'body': json.dumps({'message': 'Kütüphane kaçta açılıyor?'})},
+    },
+    'catalog_indexer': {
+        'env': {
+            'BOOKS_TABLE_NAME': 'LibraryBooks',
+            'INDEX_TABLE_NAME': 'LibraryBookIndex',
+            'RESPONSE_CACHE_TABLE_NAME': 'AssistantResponseCache',
+        },
+        'eager': [('resource', 'dynamodb')],
+        'event': {'Records': [{
+            'eventName': 'INSERT',
+            'dynamodb': {'NewImage': {
+                'bookId': {'S': 'bench-1'},
+                'title': {'S': 'Suç ve Ceza'},
+                'author': {'S': 'Fyodor Dostoyevski'},
+                'isAvailable': {'BOOL': True},
+            }},
+        }]},
+    },
+}
+
+
+def _stub_response(operation_name):
+    """Operasyon adına göre (ağ formatında) hazır yanıt."""
+    if operation_name == 'InvokeModel':
+        import io
+        from botocore.response import StreamingBody
+        payload = json.dumps({'content': [{'type': 'text', 'text': 'Merhaba!'}], 'embedding': [0.0] * 8}).encode()
+        return {'body': StreamingBody(io.BytesIO(payload), len(payload)), 'contentType': 'application/json'}
+    if operation_name == 'Converse':
+        return {
+            'output': {'message': {'role': 'assistant', 'content': [{'text': 'Merhaba!'}]}},
+            'stopReason': 'end_turn',
+            'usage': {'inputTokens': 10, 'outputTokens': 3, 'totalTokens': 13},
+        }
+    if operation_name == 'RetrieveAndGenerate':
+        return {'output': {'text': 'Merhaba!'}, 'sessionId': 'bench'}
+    return {
+        'Query': {'Items': [], 'Count': 0},
+        'Scan': {'Items': [], 'Count': 0},
+        'GetItem': {},
+        'BatchGetItem': {'Responses': {}, 'UnprocessedKeys': {}},
+        'BatchWriteItem': {'UnprocessedItems': {}},
+        'UpdateItem': {'Attributes': {'v': {'N': '1'}}},
+    }.get(operation_name, {})
+
+
+def install_stubs(session):
+    """Oturumdan kurulan tüm istemcilerin çağrılarını ağa çıkmadan yanıtlar."""
+    from botocore.awsrequest import AWSResponse
+    calls = []
+
+    def before_call(model, **kwargs):
+        calls.append(f"{model.service_model.service_id.hyphenize()}.{model.name}")
+        return AWSResponse('https://stub.local', 200, {}, None), _stub_response(model.name)
+
+    session.events.register('before-call', before_call)
+    return calls
+
+
+class _Context:
+    function_name = 'cold-start-bench'
+    aws_request_id = 'bench'
+
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+
+def run_child(name, eager):
+    """Tek bir soğuk başlangıç ölçümü (yeni süreçte çalışır)."""
+    config = HANDLERS[name]
+    sys.path[:0] = [os.path.join(ROOT, 'lambda_functions', name), LAYER_PATH]
+
+    started = time.perf_counter()
+    import boto3
+    paused = time.perf_counter()
+    session = boto3.session.Session()
+    calls = install_stubs(session)
+    from library_common import clients
+    clients._session = session
+    started += time.perf_counter() - paused
+
+    import index
+    if eager:
+        for kind, service in config['eager']:
+            (clients.get_resource if kind == 'resource' else clients.get_client)(service)
+    import_ms = (time.perf_counter() - started) * 1000
+
+    invoke_started = time.perf_counter()
+    index.handler(config['event'], _Context())
+    first_invoke_ms = (time.perf_counter() - invoke_started) * 1000
+
+    print(json.dumps({
+        'import_ms': round(import_ms, 2),
+        'first_invoke_ms': round(first_invoke_ms, 2),
+        'services': clients.initialized_services(),
+        'calls': calls,
+    }))
+
+
+def measure(name, eager, runs):
+    env = dict(os.environ, AWS_DEFAULT_REGION='us-east-1', PYTHONDONTWRITEBYTECODE='1', **HANDLERS[name]['env'])
+    env.pop('AWS_LAMBDA_RUNTIME_API', None)
+    samples = []
+    for _ in range(runs):
+        args = [sys.executable, os.path.abspath(__file__), '--child', name] + (['--eager'] if eager else [])
+        output = subprocess.run(args, env=env, capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'import_ms': round(statistics.median(s['import_ms'] for s in samples), 2),
+        'first_invoke_ms': round(statistics.median(s['first_invoke_ms'] for s in samples), 2),
+        'services': samples[-1]['services'],
+    }
+
+
+def check(results, baseline, tolerance, slack_ms):
+    failures = []
+    for name, metrics in baseline.items():
+        if name not in results:
+            continue
+        for metric, limit in metrics.items():
+            value = results[name]['lazy'][metric]
+            allowed = limit * (1 + tolerance) + slack_ms
+            if value > allowed:
+                failures.append(f"{name}.{metric}: {value:.1f} ms > {allowed:.1f} ms (baseline {limit:.1f})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--eager', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--handler', action='append', choices=sorted(HANDLERS), help='Sadece bu handler(lar)')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--check', action='store_true',
+                        help='Baseline ile karşılaştır, regresyonda ya da baseline yoksa 1 dön')
+    parser.add_argument('--allow-missing-baseline', action='store_true',
+                        help='--check: baseline dosyası yoksa hata verme, kontrolü atla')
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.20, help='İzin verilen oransal artış')
+    parser.add_argument('--slack-ms', type=float, default=5.0, help='Ölçüm gürültüsü için sabit pay')
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.eager)
+        return 0
+
+    results = {}
+    for name in args.handler or sorted(HANDLERS):
+        results[name] = {'lazy': measure(name, False, args.runs), 'eager': measure(name, True, args.runs)}
+        lazy, eager = results[name]['lazy'], results[name]['eager']
+        lazy_total = lazy['import_ms'] + lazy['first_invoke_ms']
+        eager_total = eager['import_ms'] + eager['first_invoke_ms']
+        print(f"{name:18} import {lazy['import_ms']:8.1f} ms (eager {eager['import_ms']:8.1f})  "
+              f"first invoke {lazy['first_invoke_ms']:8.1f} ms (eager {eager['first_invoke_ms']:8.1f})  "
+              f"total {lazy_total:8.1f} ms (eager {eager_total:8.1f})  "
+              f"clients {','.join(lazy['services'])}")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        baseline = {name: {metric: r['lazy'][metric] for metric in ('import_ms', 'first_invoke_ms')}
+                    for name, r in results.items()}
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baseline yazıldı: {BASELINE_PATH}")
+
+    if args.check:
+        if not os.path.exists(BASELINE_PATH):
+            if args.allow_missing_baseline:
+                print(f"Baseline dosyası yok ({BASELINE_PATH}); kontrol atlandı.")
+                return 0
+            print(f"HATA baseline dosyası yok ({BASELINE_PATH}). "
+                  "Oluşturmak için --update-baseline, atlamak için --allow-missing-baseline kullanın.")
+            return 1
+        with open(BASELINE_PATH) as f:
+            failures = check(results, json.load(f), args.tolerance, args.slack_ms)
+        for failure in failures:
+            print(f"REGRESYON {failure}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
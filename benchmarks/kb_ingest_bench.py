@@ -0,0 +1,281 @@
+"""
+Bilgi bankası artımlı yüklemesinin uçtan uca yerel testi (AWS gerektirmez).
+
+`kb_ingest` Lambda'sı gerçek koduyla çalışır: S3 olayları handler'a verilir,
+S3 bellek içi bir taklittir, bedrock-agent çağrıları (Ingest / Delete
+KnowledgeBaseDocuments) botocore üzerinden serileştirilip bir bilgi bankası
+taklidine gider; taklit her parçayı sahte bir gömücüyle (stub embedder) gömer.
+Senaryolar:
+
+- ilk yükleme (tam senkronizasyonun maliyeti de budur),
+- aynı dosyaların tekrar yüklenmesi,
+- tek paragraf düzeltmesi, belge başına paragraf eklenmesi, belge silinmesi,
+- aynı belge için eşzamanlı iki olay (manifest çakışması).
+
+Her adımdan sonra bilgi bankasının içeriği, son derlemin baştan parçalanmış
+haliyle karşılaştırılır. Ayrıca sabit boyutlu pencerelerle bölmenin aynı
+değişiklikte kaç parçayı yeniden gömdüreceği raporlanır.
+
+    python benchmarks/kb_ingest_bench.py
+    python benchmarks/kb_ingest_bench.py --documents 500 --paragraphs 80 --ingest-latency-ms 150
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import random
+import sys
+import threading
+import time
+
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'lambda_layers', 'common', 'python'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aws_standins import AwsStandIns, S3StandIn, StandInError  # noqa: E402
+from library_common import clients  # noqa: E402
+from library_common.kb_ingest import document_chunks  # noqa: E402
+from load_test import load_handler  # noqa: E402
+
+BUCKET = 'library-documents'
+ENVIRONMENT = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'DOCUMENTS_BUCKET_NAME': BUCKET,
+    'DOCUMENTS_PREFIX': 'documents/',
+    'KB_MANIFEST_PREFIX': 'kb-manifests/',
+    'KNOWLEDGE_BASE_ID': 'KBSTANDIN',
+    'KB_DATA_SOURCE_ID': 'DSSTANDIN',
+}
+
+SUBJECTS = ['Üyeler', 'Öğrenciler', 'Ziyaretçiler', 'Personel', 'Araştırmacılar', 'Misafir okuyucular']
+ACTIONS = ['en fazla beş kitap ödünç alabilir', 'kitapları on dört gün içinde iade etmelidir',
+           'süreyi bir kez uzatabilir', 'nadir eserleri sadece okuma salonunda inceleyebilir',
+           'grup çalışma odalarını iki saatliğine ayırtabilir', 'geciken her gün için ceza öder',
+           'kayıp kitabın bedelini karşılar', 'e-kitaplara uzaktan erişebilir']
+CONDITIONS = ['hafta içi', 'sınav döneminde', 'yaz tatilinde', 'kimlik kartı gösterildiğinde',
+              'görevli onayıyla', 'randevu alındığında', 'resmi tatillerde', 'kayıt yenilendikten sonra']
+
+
+class StubEmbedder:
+    """Metin -> sabit boyutlu sahte vektör; çağrı sayısını tutar."""
+
+    def __init__(self, dimensions=8):
+        self.dimensions = dimensions
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, text):
+        with self._lock:
+            self.calls += 1
+        digest = hashlib.sha256(text.encode('utf-8')).digest()
+        return [byte / 255 for byte in digest[:self.dimensions]]
+
+
+class KnowledgeBaseStandIn:
+    """CUSTOM veri kaynağı taklidi: belge kimliği -> (vektör, metin, metadata)."""
+
+    def __init__(self, embed):
+        self.embed = embed
+        self.documents = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def ingest(self, body):
+        documents = body['documents']
+        if not 1 <= len(documents) <= 10:
+            raise StandInError('ValidationException', 'documents 1-10 olmalıdır')
+        details = []
+        for document in documents:
+            custom = document['content']['custom']
+            text = custom['inlineContent']['textContent']['data']
+            metadata = {attr['key']: attr['value'].get('stringValue', attr['value'].get('numberValue'))
+                        for attr in document['metadata']['inlineAttributes']}
+            vector = self.embed(text)
+            with self._lock:
+                self.documents[custom['customDocumentIdentifier']['id']] = (vector, text, metadata)
+            details.append(self._detail(custom['customDocumentIdentifier']['id'], 'STARTING'))
+        with self._lock:
+            self.requests += 1
+        return {'documentDetails': details}
+
+    def delete(self, body):
+        identifiers = body['documentIdentifiers']
+        if not 1 <= len(identifiers) <= 10:
+            raise StandInError('ValidationException', 'documentIdentifiers 1-10 olmalıdır')
+        with self._lock:
+            self.requests += 1
+            for identifier in identifiers:
+                self.documents.pop(identifier['custom']['id'], None)
+        return {'documentDetails': [self._detail(identifier['custom']['id'], 'DELETING')
+                                    for identifier in identifiers]}
+
+    @staticmethod
+    def _detail(document_id, status):
+        return {'knowledgeBaseId': ENVIRONMENT['KNOWLEDGE_BASE_ID'], 'dataSourceId': ENVIRONMENT['KB_DATA_SOURCE_ID'],
+                'status': status, 'identifier': {'dataSourceType': 'CUSTOM', 'custom': {'id': document_id}}}
+
+
+def paragraph(rng):
+    sentences = [f"{rng.choice(SUBJECTS)} {rng.choice(CONDITIONS)} {rng.choice(ACTIONS)}."
+                 for _ in range(rng.randint(3, 7))]
+    return f"Madde {rng.randint(1, 999)}. " + ' '.join(sentences)
+
+
+def make_corpus(count, paragraphs, rng):
+    return {f"documents/politika-{i:04d}.md": [paragraph(rng) for _ in range(rng.randint(paragraphs // 2, paragraphs))]
+            for i in range(count)}
+
+
+def render(paragraphs):
+    return ('\n\n'.join(paragraphs) + '\n').encode('utf-8')
+
+
+def fixed_windows(text, size=1500):
+    """Karşılaştırma: sabit boyutlu pencerelerle bölme."""
+    return {hashlib.sha256(text[start:start + size].encode('utf-8')).hexdigest()
+            for start in range(0, len(text), size)}
+
+
+class Harness:
+
+    def __init__(self, handler, s3, kb, embedder):
+        self.handler = handler
+        self.s3 = s3
+        self.kb = kb
+        self.embedder = embedder
+        self.corpus = {}
+
+    def upload(self, documents):
+        for key, paragraphs in documents.items():
+            self.s3.put_object(Bucket=BUCKET, Key=key, Body=render(paragraphs))
+            self.corpus[key] = paragraphs
+
+    def remove(self, keys):
+        for key in keys:
+            self.s3.delete_object(Bucket=BUCKET, Key=key)
+            self.corpus.pop(key, None)
+
+    def notify(self, keys, event_name='ObjectCreated:Put', batch=10, quiet=True):
+        """S3 olaylarını (handler başına `batch` kayıt) işler; (süre, gömme çağrısı, istek) döner."""
+        calls, requests = self.embedder.calls, self.kb.requests
+        started = time.perf_counter()
+        keys = list(keys)
+        # handler'ın JSON özet satırları; redirect_stdout süreç geneli olduğundan iş parçacıklarında kapatılır
+        with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+            for start in range(0, len(keys), batch):
+                self.handler({'Records': [{'eventName': event_name,
+                                           's3': {'bucket': {'name': BUCKET}, 'object': {'key': key.replace(' ', '+')}}}
+                                          for key in keys[start:start + batch]]}, None)
+        return time.perf_counter() - started, self.embedder.calls - calls, self.kb.requests - requests
+
+    def expected(self):
+        chunks = {}
+        for key, paragraphs in self.corpus.items():
+            text = render(paragraphs).decode('utf-8')
+            for chunk in document_chunks(key, text, f"s3://{BUCKET}/{key}"):
+                chunks[chunk['id']] = chunk['text']
+        return chunks
+
+    def check(self, label):
+        expected = self.expected()
+        actual = {document_id: text for document_id, (_, text, _) in self.kb.documents.items()}
+        if actual != expected:
+            missing, extra = len(expected.keys() - actual.keys()), len(actual.keys() - expected.keys())
+            raise SystemExit(f"HATA ({label}): bilgi bankası derlemle uyuşmuyor "
+                             f"({missing} eksik, {extra} fazla parça)")
+        return len(expected)
+
+
+def report(label, seconds, embedded, requests, total):
+    print(f"{label:<34} {seconds:7.2f} sn  {embedded:6} parça gömüldü  {requests:5} istek  "
+          f"(derlem {total} parça, %{embedded / max(total, 1) * 100:.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=200)
+    parser.add_argument('--paragraphs', type=int, default=40, help='Belge başına en fazla paragraf')
+    parser.add_argument('--ingest-latency-ms', type=float, default=50, help='bedrock-agent çağrı gecikmesi')
+    parser.add_argument('--workers', type=int, default=4, help='Belge başına paralel istek sayısı')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.update(ENVIRONMENT, KB_INGEST_WORKERS=str(args.workers))
+    embedder = StubEmbedder()
+    kb = KnowledgeBaseStandIn(embedder)
+    aws = AwsStandIns(latency_ms={'bedrock-agent': args.ingest_latency_ms})
+    aws.register('bedrock-agent', 'IngestKnowledgeBaseDocuments', kb.ingest)
+    aws.register('bedrock-agent', 'DeleteKnowledgeBaseDocuments', kb.delete)
+    session = boto3.session.Session(region_name='us-east-1')
+    aws.install(session)
+    clients._session = session
+
+    handler = load_handler('kb_ingest')
+    module = sys.modules['kb_ingest_index']
+    s3 = S3StandIn()
+    module.s3 = s3
+    harness = Harness(handler, s3, kb, embedder)
+    rng = random.Random(args.seed)
+
+    # 1. İlk yükleme: tam senkronizasyon da her seferinde bu kadar parça gömer
+    corpus = make_corpus(args.documents, args.paragraphs, rng)
+    harness.upload(corpus)
+    seconds, embedded, requests = harness.notify(corpus)
+    total = harness.check('ilk yükleme')
+    report('İlk yükleme (= tam senkronizasyon)', seconds, embedded, requests, total)
+    full_sync_seconds = seconds
+
+    # 2. Aynı dosyalar tekrar yüklenir
+    harness.upload(corpus)
+    report('Değişmeden tekrar yükleme', *harness.notify(corpus), harness.check('tekrar yükleme'))
+
+    # 3. Tek bir paragraf düzeltmesi
+    key = rng.choice(sorted(harness.corpus))
+    edited = list(harness.corpus[key])
+    edited[len(edited) // 2] += ' Bu madde güncellenmiştir.'
+    harness.upload({key: edited})
+    seconds, embedded, requests = harness.notify([key])
+    report('Tek paragraf düzeltmesi', seconds, embedded, requests, harness.check('düzeltme'))
+    edit_seconds = seconds
+
+    # 4. Belgelerin başına paragraf eklenmesi (sabit pencerelerde her şey kayar)
+    keys = rng.sample(sorted(harness.corpus), min(10, len(harness.corpus)))
+    before = {key: render(harness.corpus[key]).decode('utf-8') for key in keys}
+    harness.upload({key: [paragraph(rng)] + harness.corpus[key] for key in keys})
+    seconds, embedded, requests = harness.notify(keys)
+    report(f'{len(keys)} belgenin başına paragraf', seconds, embedded, requests, harness.check('ekleme'))
+    fixed = sum(len(fixed_windows(render(harness.corpus[key]).decode('utf-8')) - fixed_windows(before[key]))
+                for key in keys)
+    print(f"{'':<34} sabit 1500 karakterlik pencerelerle: {fixed} parça yeniden gömülürdü")
+
+    # 5. Belge silinmesi
+    removed = rng.sample(sorted(harness.corpus), min(5, len(harness.corpus)))
+    harness.remove(removed)
+    report(f'{len(removed)} belge silindi', *harness.notify(removed, 'ObjectRemoved:Delete'),
+           harness.check('silme'))
+
+    # 6. Aynı belge için eşzamanlı iki olay: önce gelen eski içeriği okur, sonra yeni sürüm yazılır
+    key = rng.choice(sorted(harness.corpus))
+    harness.upload({key: harness.corpus[key][:-3] + [paragraph(rng)]})
+    with contextlib.redirect_stdout(io.StringIO()):
+        first = threading.Thread(target=harness.notify, args=([key],), kwargs={'quiet': False})
+        first.start()
+        time.sleep(args.ingest_latency_ms / 2000)
+        harness.upload({key: [paragraph(rng)] + harness.corpus[key][2:]})
+        second = threading.Thread(target=harness.notify, args=([key],), kwargs={'quiet': False})
+        second.start()
+        first.join()
+        second.join()
+    harness.check('eşzamanlı olaylar')
+    print(f"Eşzamanlı olaylar tutarlı; manifest çakışması: {module.ingestor().stats['manifestConflicts']}")
+
+    print(f"Tek düzeltme tam senkronizasyondan {full_sync_seconds / max(edit_seconds, 1e-6):.0f}x hızlı; "
+          f"gömme maliyeti değişen parça sayısıyla orantılı.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
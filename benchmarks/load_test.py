@@ -0,0 +1,403 @@
+"""
+Handler'lar için AWS hesabı gerektirmeyen yük testi ve sıcak yol ölçümleri.
+
+Kayıtlı bir istek karışımı (benchmarks/mixes/*.jsonl) `--concurrency` kadar
+işçi sürece dağıtılır. Her süreç, Lambda'daki sıcak bir konteyner gibi
+handler'ları bir kez yükler ve isteklerini sırayla işler. DynamoDB, Bedrock
+ve Knowledge Base çağrıları `aws_standins` ile ağa çıkmadan, ayarlanabilir
+gecikmeyle yanıtlanır (boto3 serileştirme / çözme maliyeti ölçüme dahildir).
+
+    python benchmarks/load_test.py                          # varsayılan karışım, 4 süreç
+    python benchmarks/load_test.py --requests 2000 --concurrency 8
+    python benchmarks/load_test.py --bedrock-latency-ms 600 --ddb-latency-ms 8
+    python benchmarks/load_test.py --update-baseline        # referans değerleri kaydet
+    python benchmarks/load_test.py --check                  # regresyonda 1 ile çık
+    python benchmarks/load_test.py --throttle-rate 0.3      # Sonnet çağrılarının %30'u kısıtlanır
+
+Rapor, her (handler, etiket) için p50 / p95 / p99 gecikme, istek başına CPU
+süresi ve bellek tepe artışını (tracemalloc, ayrı bir geçişte) içerir. Ayrıca
+sıcak yollar (Scan sayfası, JSON serileştirme, istem hazırlama) tek başına
+mikro ölçümle raporlanır. `--check`, baseline'daki p50 / p95 ve mikro ölçüm
+değerleri tolerans payından fazla aşılırsa başarısız olur. Baseline dosyası
+(benchmarks/baselines/load_test.json, repoda tutulur) yoksa da 1 döner;
+bilinçli olarak atlamak için `--allow-missing-baseline` verilmelidir.
+
+Not: Yanıt önbelleği varsayılan olarak kapalıdır; aksi halde tekrar eden
+sorular ilk seferden sonra modele hiç gitmez (`--response-cache` ile açılır).
+Yanıttan sonra yapılan geçmiş yazımları yerelde senkron çalıştığı için
+istek süresine dahildir.
+"""
+import argparse
+import contextlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_PATH = os.path.join(ROOT, 'lambda_layers', 'common', 'python')
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baselines', 'load_test.json')
+DEFAULT_MIX = os.path.join(ROOT, 'benchmarks', 'mixes', 'default.jsonl')
+# Bundan az örnekte p95 en yavaş bir-iki isteğe eşittir ve gürültüden ibarettir;
+# --check bu etiketlerde sadece p50'yi karşılaştırır
+MIN_P95_SAMPLES = 50
+
+sys.path[:0] = [LAYER_PATH, os.path.dirname(os.path.abspath(__file__))]
+
+ENVIRONMENT = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'standin',
+    'AWS_SECRET_ACCESS_KEY': 'standin',
+    'TABLE_NAME': 'ChatHistory',
+    'BOOKS_TABLE_NAME': 'LibraryBooks',
+    'INDEX_TABLE_NAME': 'LibraryBookIndex',
+    'HISTORY_TABLE_NAME': 'AssistantChatHistory',
+    'READING_LISTS_TABLE_NAME': 'ReadingLists',
+    'KNOWLEDGE_BASE_ID': 'standin-kb',
+    # Lambda'daki gibi model çağrılarını BedrockScheduler yeniden dener
+    'AWS_MAX_ATTEMPTS_BEDROCK_RUNTIME': '1',
+    # Ölçüm sırasında EMF satırları yazılmaz (hatalar yine yazılır)
+    'METRICS_SAMPLE_RATE': '0',
+}
+
+FIRST_WORDS = ['Kayıp', 'Sessiz', 'Kırmızı', 'Uzak', 'Son', 'Eski', 'Gece', 'Deniz', 'Dağ', 'Yaz']
+SECOND_WORDS = ['Şehir', 'Bahçe', 'Yolculuk', 'Ev', 'Mektup', 'Saat', 'Köprü', 'Orman', 'Ada', 'Kuş']
+AUTHORS = ['Orhan Pamuk', 'Sabahattin Ali', 'Yaşar Kemal', 'Oğuz Atay', 'Halide Edib', 'Peyami Safa']
+
+
+class _Context:
+    function_name = 'load-test'
+    aws_request_id = 'load-test'
+
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+
+def read_mix(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip() and not line.startswith('#')]
+
+
+def seed(aws, books):
+    """Katalog, ters indeks ve sürüm kaydını taklit tabloya yazar."""
+    from library_common.catalog_index import CATALOG_VERSION_KEY, book_postings
+    catalog = [{'bookId': 'b-suc', 'title': 'Suç ve Ceza', 'author': 'Fyodor Dostoyevski'},
+               {'bookId': 'b-sefiller', 'title': 'Sefiller', 'author': 'Victor Hugo'},
+               {'bookId': 'b-kurk', 'title': 'Kürk Mantolu Madonna', 'author': 'Sabahattin Ali'}]
+    rng = random.Random(7)
+    for i in range(books):
+        catalog.append({'bookId': f"b{i}",
+                        'title': f"{rng.choice(FIRST_WORDS)} {rng.choice(SECOND_WORDS)} {i}",
+                        'author': rng.choice(AUTHORS)})
+    for book in catalog:
+        book.update({'genre': 'Roman', 'cover': f"https://covers.local/{book['bookId']}.jpg",
+                     'isAvailable': rng.random() > 0.3})
+        aws.dynamodb.put('LibraryBooks', book)
+        for token, weight in book_postings(book).items():
+            aws.dynamodb.put('LibraryBookIndex', {'token': token, 'bookId': book['bookId'], 'w': weight})
+    aws.dynamodb.put('LibraryBookIndex', dict(CATALOG_VERSION_KEY, v=1, sv=1, log={}))
+
+
+def load_handler(name, module='index', handler='handler'):
+    """
+    lambda_functions/<name>/<module>.py modülünü benzersiz bir adla
+    (<name>_<module>) yükler ve handler fonksiyonunu döner. `module` ve
+    `handler`, CDK'daki "module.handler" değerinin iki parçasıdır.
+    """
+    directory = os.path.join(ROOT, 'lambda_functions', name)
+    path = os.path.join(directory, *module.split('.')) + '.py'
+    if not os.path.isfile(path):
+        raise ValueError(f"{name}: '{module}.{handler}' handler'ının modülü bulunamadı ({path})")
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    spec = importlib.util.spec_from_file_location(f"{name}_{module.replace('.', '_')}", path)
+    loaded = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = loaded
+    spec.loader.exec_module(loaded)
+    function = getattr(loaded, handler, None)
+    if not callable(function):
+        raise ValueError(f"{name}: '{module}.{handler}' handler'ı {path} içinde tanımlı değil")
+    return function
+
+
+def start_environment(options):
+    """Ortam değişkenleri, taklitler ve handler'lar (her işçi sürecinde bir kez)."""
+    os.environ.update(ENVIRONMENT)
+    if options['response_cache']:
+        os.environ['RESPONSE_CACHE_TABLE_NAME'] = 'AssistantResponseCache'
+    import boto3
+    from aws_standins import AwsStandIns, BedrockStandIn
+    from library_common import clients
+
+    bedrock = BedrockStandIn(answer_chars=options['answer_chars'],
+                             tool_titles={r['message']: r['tool_title'] for r in options['mix'] if 'tool_title' in r})
+    aws = AwsStandIns(latency_ms={
+        'dynamodb': options['ddb_latency_ms'],
+        'bedrock-runtime': options['bedrock_latency_ms'],
+        'bedrock-agent-runtime': options['kb_latency_ms'],
+    }, jitter=options['jitter'], bedrock=bedrock)
+    if options['throttle_rate']:
+        for operation in ('Converse', 'InvokeModel'):
+            aws.inject('bedrock-runtime', operation, options['throttle_rate'], match='sonnet')
+    session = boto3.session.Session(region_name='us-east-1')
+    aws.install(session)
+    clients._session = session
+    seed(aws, options['books'])
+    handlers = {name: load_handler(name) for name in sorted({r['handler'] for r in options['mix']})}
+    return aws, handlers
+
+
+def build_event(record, worker):
+    if 'event' in record:
+        return record['event']
+    body = {'message': record['message']}
+    if record.get('session'):
+        # Aynı oturum işçi boyunca sürer; geçmiş ve özet büyüdükçe istem hazırlama da ölçülür
+        body['session_id'] = f"load-{worker}-{record.get('label', 'default')}"
+    return {'httpMethod': 'POST', 'body': json.dumps(body, ensure_ascii=False)}
+
+
+def run_worker(args):
+    worker, options, plan = args
+    random.seed(worker)
+    output = contextlib.nullcontext() if options['show_logs'] else contextlib.redirect_stdout(open(os.devnull, 'w'))
+    with output:
+        aws, handlers = start_environment(options)
+        context = _Context()
+        mix = options['mix']
+
+        def invoke(index):
+            record = mix[index]
+            return handlers[record['handler']](build_event(record, worker), context)
+
+        for index in plan[:options['warmup']]:
+            invoke(index)
+
+        samples = []
+        errors = 0
+        started = time.time()
+        for index in plan[options['warmup']:]:
+            wall, cpu = time.perf_counter(), time.process_time()
+            result = invoke(index)
+            samples.append((index, (time.perf_counter() - wall) * 1000, (time.process_time() - cpu) * 1000))
+            if isinstance(result, dict) and result.get('statusCode', 200) >= 400:
+                errors += 1
+        finished = time.time()
+
+        # Bellek: ayrı geçişte, istek başına tepe artışı (tracemalloc gecikmeyi bozmasın diye)
+        allocations = []
+        tracemalloc.start()
+        for index in plan[options['warmup']:][:options['alloc_samples']]:
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            invoke(index)
+            allocations.append((index, (tracemalloc.get_traced_memory()[1] - baseline) / 1024))
+        tracemalloc.stop()
+
+    return {'samples': samples, 'allocations': allocations, 'errors': errors,
+            'started': started, 'finished': finished, 'calls': aws.calls}
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(mix, results):
+    groups = {}
+    for result in results:
+        for index, wall_ms, cpu_ms in result['samples']:
+            record = mix[index]
+            key = f"{record['handler']}/{record.get('label', 'default')}"
+            group = groups.setdefault(key, {'wall': [], 'cpu': [], 'alloc': []})
+            group['wall'].append(wall_ms)
+            group['cpu'].append(cpu_ms)
+        for index, kib in result['allocations']:
+            record = mix[index]
+            groups[f"{record['handler']}/{record.get('label', 'default')}"]['alloc'].append(kib)
+    summary = {}
+    for key, group in sorted(groups.items()):
+        summary[key] = {
+            'count': len(group['wall']),
+            'p50': round(percentile(group['wall'], 50), 2),
+            'p95': round(percentile(group['wall'], 95), 2),
+            'p99': round(percentile(group['wall'], 99), 2),
+            'cpu_ms': round(sum(group['cpu']) / len(group['cpu']), 3),
+            'peak_kib': round(sum(group['alloc']) / len(group['alloc']), 1) if group['alloc'] else None,
+        }
+    return summary
+
+
+def micro_benchmarks(options, min_seconds=0.1, rounds=5):
+    """Sıcak yolların (gecikmesiz) tek başına ölçümü: işlem başına µs ve bellek tepe artışı."""
+    options = dict(options, ddb_latency_ms=0, bedrock_latency_ms=0, kb_latency_ms=0,
+                   mix=[{'handler': 'catalog_api'}, {'handler': 'library_assistant'}])
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        aws, handlers = start_environment(options)
+    from library_common.clients import get_resource
+    from library_common.http import json_response
+    from library_common.rag import Chunk, context_prompt, select_context
+    from library_common.session_memory import SessionContext, Turn
+    assistant = sys.modules['library_assistant_index']
+
+    books_table = get_resource('dynamodb').Table('LibraryBooks')
+    page = books_table.scan(Limit=100)['Items']
+    turns = [Turn(f"2024-01-01T00:00:{i:02d}", f"Soru {i}: " + "kitap " * 20, "Yanıt " * 60) for i in range(10)]
+    session = SessionContext('micro', "Önceki konuşmanın özeti. " * 20, '', turns, [])
+    chunks = [Chunk(text * 3, score, f"s3://docs/{i}") for i, (text, score) in enumerate(aws.bedrock._chunks)] * 3
+    books_event = {'httpMethod': 'GET', 'resource': '/books', 'queryStringParameters': {'limit': '100'}}
+
+    def prompt_assembly():
+        prompts = assistant.prompt_registry.select(session_id='micro')
+        system_prompts = assistant.session_system_prompts(prompts.system_for(assistant.MODEL_ID), session)
+        system_prompts = system_prompts + ({'text': context_prompt(select_context(chunks, 1500, 0.4))},)
+        return json.dumps({'messages': session.converse_messages('Yeni soru'), 'system': system_prompts,
+                           'toolConfig': prompts.tools_for(assistant.MODEL_ID)}, ensure_ascii=False)
+
+    cases = {
+        'dynamodb_scan_page': lambda: books_table.scan(Limit=100),
+        'catalog_api_books_page': lambda: handlers['catalog_api'](books_event, _Context()),
+        'serialize_books_page': lambda: json_response(200, {'items': page, 'nextCursor': 'x' * 40}),
+        'prompt_assembly': prompt_assembly,
+    }
+    results = {}
+    for name, case in cases.items():
+        case()
+        # timeit gibi turların en iyisi alınır; ortak makinedeki anlık yavaşlamalar baseline'ı bozmaz
+        best = None
+        for _ in range(rounds):
+            iterations, started = 0, time.perf_counter()
+            while time.perf_counter() - started < min_seconds:
+                case()
+                iterations += 1
+            per_call = (time.perf_counter() - started) / iterations
+            best = per_call if best is None else min(best, per_call)
+        tracemalloc.start()
+        case()
+        peak_kib = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+        results[name] = {'us': round(best * 1e6, 1), 'peak_kib': round(peak_kib, 1)}
+    return results
+
+
+def check(summary, micro, baseline, tolerance, slack_ms, slack_us):
+    failures = []
+    for key, limits in baseline.get('requests', {}).items():
+        if key not in summary:
+            continue
+        metrics = ('p50', 'p95') if summary[key]['count'] >= MIN_P95_SAMPLES else ('p50',)
+        for metric in metrics:
+            allowed = limits[metric] * (1 + tolerance) + slack_ms
+            if summary[key][metric] > allowed:
+                failures.append(f"{key}.{metric}: {summary[key][metric]:.1f} ms > {allowed:.1f} ms "
+                                f"(baseline {limits[metric]:.1f})")
+    for name, limits in baseline.get('micro', {}).items():
+        if name in micro:
+            allowed = limits['us'] * (1 + tolerance) + slack_us
+            if micro[name]['us'] > allowed:
+                failures.append(f"micro.{name}: {micro[name]['us']:.1f} µs > {allowed:.1f} µs "
+                                f"(baseline {limits['us']:.1f})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='İstek karışımı (JSONL)')
+    parser.add_argument('--requests', type=int, default=400, help='Toplam ölçülen istek sayısı')
+    parser.add_argument('--concurrency', type=int, default=4, help='İşçi süreç (sıcak konteyner) sayısı')
+    parser.add_argument('--warmup', type=int, default=10, help='İşçi başına ölçülmeyen ilk istekler')
+    parser.add_argument('--ddb-latency-ms', type=float, default=3.0)
+    parser.add_argument('--bedrock-latency-ms', type=float, default=60.0)
+    parser.add_argument('--kb-latency-ms', type=float, default=25.0)
+    parser.add_argument('--jitter', type=float, default=0.2, help='Gecikmenin ± oranı')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Sonnet çağrılarının ThrottlingException ile dönme oranı')
+    parser.add_argument('--books', type=int, default=2000, help='Taklit katalogdaki kitap sayısı')
+    parser.add_argument('--answer-chars', type=int, default=400, help='Model yanıtı uzunluğu')
+    parser.add_argument('--alloc-samples', type=int, default=20, help='İşçi başına bellek ölçülen istek')
+    parser.add_argument('--response-cache', action='store_true', help='Yanıt önbelleğini aç')
+    parser.add_argument('--show-logs', action='store_true', help="Handler çıktılarını gizleme")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--check', action='store_true',
+                        help='Baseline ile karşılaştır, regresyonda ya da baseline yoksa 1 dön')
+    parser.add_argument('--allow-missing-baseline', action='store_true',
+                        help='--check: baseline dosyası yoksa hata verme, kontrolü atla')
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='İzin verilen oransal artış')
+    parser.add_argument('--slack-ms', type=float, default=3.0, help='İstek ölçümlerinde sabit pay')
+    parser.add_argument('--slack-us', type=float, default=20.0, help='Mikro ölçümlerde sabit pay')
+    args = parser.parse_args()
+
+    mix = read_mix(args.mix)
+    options = {key: getattr(args, key) for key in (
+        'ddb_latency_ms', 'bedrock_latency_ms', 'kb_latency_ms', 'jitter', 'books', 'answer_chars',
+        'alloc_samples', 'response_cache', 'show_logs', 'warmup', 'throttle_rate')}
+    options['mix'] = mix
+
+    # Ağırlıklı, tekrarlanabilir istek planı; işçilere eşit bölünür
+    rng = random.Random(args.seed)
+    weights = [record.get('weight', 1) for record in mix]
+    per_worker = max(1, args.requests // args.concurrency)
+    plans = [rng.choices(range(len(mix)), weights, k=per_worker + args.warmup) for _ in range(args.concurrency)]
+
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(args.concurrency) as pool:
+        results = pool.map(run_worker, [(worker, options, plan) for worker, plan in enumerate(plans)])
+
+    summary = summarize(mix, results)
+    total = sum(len(r['samples']) for r in results)
+    elapsed = max(r['finished'] for r in results) - min(r['started'] for r in results)
+    print(f"{total} istek, {args.concurrency} süreç, {elapsed:.2f} sn, {total / elapsed:.1f} istek/sn, "
+          f"hata (4xx/5xx) {sum(r['errors'] for r in results)}")
+    print(f"{'handler/etiket':40} {'adet':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'cpu ms':>8} {'tepe KiB':>9}")
+    for key, row in summary.items():
+        peak = f"{row['peak_kib']:9.1f}" if row['peak_kib'] is not None else f"{'-':>9}"
+        print(f"{key:40} {row['count']:5d} {row['p50']:8.1f} {row['p95']:8.1f} {row['p99']:8.1f} "
+              f"{row['cpu_ms']:8.2f} {peak}")
+
+    calls = {}
+    for result in results:
+        for name, count in result['calls'].items():
+            calls[name] = calls.get(name, 0) + count
+    print("AWS çağrıları: " + ", ".join(f"{name}={count}" for name, count in sorted(calls.items())))
+
+    micro = micro_benchmarks(options)
+    for name, row in micro.items():
+        print(f"mikro {name:30} {row['us']:10.1f} µs/işlem  tepe {row['peak_kib']:8.1f} KiB")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        baseline = {
+            'requests': {key: {m: row[m] for m in ('p50', 'p95', 'p99', 'cpu_ms')} for key, row in summary.items()},
+            'micro': {name: {'us': row['us']} for name, row in micro.items()},
+        }
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baseline yazıldı: {BASELINE_PATH}")
+
+    if args.check:
+        if not os.path.exists(BASELINE_PATH):
+            if args.allow_missing_baseline:
+                print(f"Baseline dosyası yok ({BASELINE_PATH}); kontrol atlandı.")
+                return 0
+            print(f"HATA baseline dosyası yok ({BASELINE_PATH}). "
+                  "Oluşturmak için --update-baseline, atlamak için --allow-missing-baseline kullanın.")
+            return 1
+        with open(BASELINE_PATH) as f:
+            failures = check(summary, micro, json.load(f), args.tolerance, args.slack_ms, args.slack_us)
+        for failure in failures:
+            print(f"REGRESYON {failure}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+Ödünç / iade işlemlerinin eşzamanlılık testi (AWS hesabı gerektirmez).
+
+Az sayıda kitap için çok sayıda kullanıcı aynı anda `POST /loans` ve toplu
+`POST /loans/return` istekleri gönderir (catalog_api handler'ı, thread
+havuzu). DynamoDB `aws_standins` ile taklit edilir; taklit her yazımı
+işlenme sırasıyla kaydeder. Test sonunda:
+
+- Kitabı müsait değilken tekrar ödünç veren bir yazım olmamalı (çifte ödünç),
+- her kitabın en fazla bir aktif ödüncü olmalı,
+- kitabın `isAvailable` / `currentLoanId` alanları aktif ödünçle tutarlı olmalı.
+
+    python benchmarks/loan_stress.py                          # 64 thread, 4000 istek
+    python benchmarks/loan_stress.py --threads 200 --books 5 --conflict-rate 0.1
+    python benchmarks/loan_stress.py --naive                  # oku-sonra-yaz; ihlalleri göstermeli
+
+İhlal bulunursa 1 ile çıkar.
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+from load_test import ENVIRONMENT, load_handler
+
+ENVIRONMENT = dict(ENVIRONMENT, LOANS_TABLE_NAME='UserLoans')
+
+
+def naive_checkout(client, user_id, book_id):
+    """Karşılaştırma için koşulsuz oku-sonra-yaz ödünç (eski yaklaşım)."""
+    book = client.get_item(TableName='LibraryBooks', Key={'bookId': book_id}).get('Item')
+    if not book or not book.get('isAvailable'):
+        return 409, None
+    loan_id = f"naive-{time.time_ns()}-{random.randrange(1 << 30)}"
+    client.update_item(
+        TableName='LibraryBooks', Key={'bookId': book_id},
+        UpdateExpression='SET isAvailable = :false, currentLoanId = :loan',
+        ExpressionAttributeValues={':false': False, ':loan': loan_id}
+    )
+    client.put_item(TableName='UserLoans', Item={
+        'userId': user_id, 'loanId': loan_id, 'bookId': book_id, 'status': 'active',
+    })
+    return 201, loan_id
+
+
+def double_checkouts(journal):
+    """Müsait olmayan bir kitabı başka bir ödünce bağlayan yazımlar."""
+    violations = []
+    for table, old, new in journal:
+        if table != 'LibraryBooks' or not (old and new):
+            continue
+        lent = new.get('isAvailable') == {'BOOL': False}
+        if lent and old.get('isAvailable') == {'BOOL': False} and old.get('currentLoanId') != new.get('currentLoanId'):
+            violations.append((new['bookId']['S'], old.get('currentLoanId', {}).get('S'),
+                               new.get('currentLoanId', {}).get('S')))
+    return violations
+
+
+def final_state_errors(dynamodb):
+    """Son durumda kitap kayıtları ile aktif ödünçler tutarlı mı?"""
+    active = {}
+    for loan in dynamodb.items('UserLoans'):
+        if loan['status']['S'] == 'active':
+            active.setdefault(loan['bookId']['S'], []).append(loan['loanId']['S'])
+    errors = []
+    for book in dynamodb.items('LibraryBooks'):
+        book_id = book['bookId']['S']
+        loans = active.get(book_id, [])
+        if len(loans) > 1:
+            errors.append(f"{book_id}: {len(loans)} aktif ödünç")
+        available = book['isAvailable']['BOOL']
+        current = book.get('currentLoanId', {}).get('S')
+        if available != (not loans) or (loans and current not in loans):
+            errors.append(f"{book_id}: isAvailable={available}, currentLoanId={current}, aktif={loans}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=64, help='Eşzamanlı istek sayısı')
+    parser.add_argument('--requests', type=int, default=4000)
+    parser.add_argument('--books', type=int, default=10, help='Kitap sayısı (az kitap = daha çok çekişme)')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--return-ratio', type=float, default=0.4, help='İsteklerin iade oranı')
+    parser.add_argument('--ddb-latency-ms', type=float, default=2.0)
+    parser.add_argument('--jitter', type=float, default=0.5)
+    parser.add_argument('--conflict-rate', type=float, default=0.0,
+                        help='TransactionConflict ile iptal edilen transaction oranı')
+    parser.add_argument('--naive', action='store_true', help='Koşulsuz oku-sonra-yaz ödünç kullan')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.update(ENVIRONMENT)
+    import boto3
+    from aws_standins import AwsStandIns, DynamoDBStandIn
+    from library_common import clients
+
+    dynamodb = DynamoDBStandIn(journal=True, conflict_rate=args.conflict_rate)
+    aws = AwsStandIns(latency_ms={'dynamodb': args.ddb_latency_ms}, jitter=args.jitter, dynamodb=dynamodb)
+    session = boto3.session.Session(region_name='us-east-1')
+    aws.install(session)
+    clients._session = session
+    for i in range(args.books):
+        dynamodb.put('LibraryBooks', {'bookId': f"b{i}", 'title': f"Kitap {i}", 'isAvailable': True})
+    handler = load_handler('catalog_api')
+    client = session.resource('dynamodb').meta.client
+
+    rng = random.Random(args.seed)
+    plan = [(f"u{rng.randrange(args.users)}", rng.random() < args.return_ratio, f"b{rng.randrange(args.books)}")
+            for _ in range(args.requests)]
+    held = {}  # kullanıcı -> başarılı ödünç id'leri (iade isteklerini oluşturmak için)
+    held_lock = threading.Lock()
+    statuses = {}
+
+    def call(method, resource, user_id, body):
+        # Ödünç rotaları kullanıcıyı sadece Cognito yetkilendiricisinin claim'lerinden alır
+        event = {'httpMethod': method, 'resource': resource,
+                 'requestContext': {'authorizer': {'claims': {'cognito:username': user_id}}},
+                 'body': json.dumps(body)}
+        response = handler(event, None)
+        return response['statusCode'], json.loads(response['body'])
+
+    def run(step):
+        user_id, is_return, book_id = step
+        with held_lock:
+            loan_ids = held.pop(user_id, []) if is_return else []
+        if loan_ids:
+            status, body = call('POST', '/loans/return', user_id, {'loanIds': loan_ids})
+            kind = 'return'
+        elif args.naive:
+            status, loan_id = naive_checkout(client, user_id, book_id)
+            body = {'loanId': loan_id}
+            kind = 'checkout'
+        else:
+            status, body = call('POST', '/loans', user_id, {'bookId': book_id})
+            kind = 'checkout'
+        if kind == 'checkout' and status == 201:
+            with held_lock:
+                held.setdefault(user_id, []).append(body['loanId'])
+        with held_lock:
+            statuses[(kind, status)] = statuses.get((kind, status), 0) + 1
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(args.threads) as pool:
+        for future in concurrent.futures.as_completed([pool.submit(run, step) for step in plan]):
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.requests} istek, {args.threads} thread, {args.books} kitap, {elapsed:.2f} sn "
+          f"({args.requests / elapsed:.0f} istek/sn)")
+    print("Durumlar: " + ", ".join(f"{kind} {status}={count}" for (kind, status), count in sorted(statuses.items())))
+    print(f"DynamoDB çağrıları: {aws.calls}")
+
+    violations = double_checkouts(dynamodb.journal)
+    errors = final_state_errors(dynamodb)
+    for book_id, previous, current in violations[:10]:
+        print(f"ÇİFTE ÖDÜNÇ {book_id}: {previous} aktifken {current} yazıldı")
+    for error in errors[:10]:
+        print(f"TUTARSIZLIK {error}")
+    print(f"Çifte ödünç: {len(violations)}, tutarsız kitap: {len(errors)}")
+    return 1 if violations or errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,435 @@
+"""
+Yerel, OpenSearch uyumlu k-NN taklidi (AWS / Docker gerektirmez).
+
+Vektör indeksi ayarlarını denemek için OpenSearch REST API'sinin Bedrock
+bilgi bankasının ve `library_common.vector_index`'in kullandığı kısmını
+HTTP üzerinden sunar: indeks oluşturma / silme / okuma, `_settings` ve
+`_mapping` güncellemesi, `_bulk`, `_count`, `_refresh` ve `_search`
+(`knn` ve `match_all`). knn_vector alanları gerçek bir HNSW grafiğiyle
+indekslenir (m, ef_construction, indeks ayarındaki ef_search); böylece
+parametrelerin recall ve incelenen aday sayısı üzerindeki etkisi gerçek
+motora benzer şekilde ölçülür. Mutlak gecikme Python'a aittir; motorlar
+arası karşılaştırma için yanıttaki `_standin.distanceComputations` kullanılır.
+
+    python benchmarks/opensearch_standin.py --port 9200
+"""
+import argparse
+import heapq
+import http.server
+import itertools
+import json
+import math
+import random
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+
+DEFAULT_EF_SEARCH = 100
+DEFAULT_MAX_RESULT_WINDOW = 10000
+DYNAMIC_SETTINGS = {'index.knn.algo_param.ef_search', 'index.refresh_interval',
+                    'index.max_result_window', 'index.number_of_replicas'}
+
+
+class StandInError(Exception):
+
+    def __init__(self, status, error_type, reason):
+        super().__init__(reason)
+        self.status = status
+        self.error_type = error_type
+        self.reason = reason
+
+    def body(self):
+        return {'error': {'type': self.error_type, 'reason': self.reason}, 'status': self.status}
+
+
+class HnswGraph:
+    """
+    Katmanlı küçük dünya grafiği (Malkov & Yashunin). Komşu seçimi sezgiseldir
+    (hnswlib / faiss gibi): aday, seçilmiş bir komşuya sorgudan daha yakınsa atlanır.
+    """
+
+    def __init__(self, dimensions, space_type, m, ef_construction, seed=0):
+        self.dimensions = dimensions
+        self.space_type = space_type
+        self.m = m
+        self.max_links = (2 * m, m)  # 0. katman / üst katmanlar
+        self.ef_construction = ef_construction
+        self.level_factor = 1 / math.log(max(m, 2))
+        self.vectors = np.zeros((1024, dimensions), dtype=np.float32)
+        self.squares = np.zeros(1024, dtype=np.float32)
+        self.count = 0
+        self.links = []
+        self.entry = -1
+        self.top = -1
+        self._rng = random.Random(seed)
+
+    def _prepare(self, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        if vector.shape != (self.dimensions,):
+            raise StandInError(400, 'mapper_parsing_exception',
+                               f"Vector dimension mismatch. Expected: {self.dimensions}, Given: {vector.size}")
+        if self.space_type == 'cosinesimil':
+            norm = float(np.linalg.norm(vector))
+            vector = vector / norm if norm else vector
+        return vector
+
+    def _distances(self, query, ids):
+        dots = self.vectors[ids] @ query
+        if self.space_type == 'l2':
+            return self.squares[ids] - 2 * dots + float(query @ query)
+        if self.space_type == 'innerproduct':
+            return -dots
+        return 1 - dots
+
+    def score(self, distance):
+        """OpenSearch'ün mesafeyi skora çevirme kuralı."""
+        if self.space_type == 'l2':
+            return 1 / (1 + max(distance, 0.0))
+        if self.space_type == 'innerproduct':
+            inner = -distance
+            return inner + 1 if inner >= 0 else 1 / (1 - inner)
+        return (2 - distance) / 2
+
+    def _search_layer(self, query, entry_points, ef, level, counter):
+        visited = {node for _, node in entry_points}
+        candidates = list(entry_points)
+        heapq.heapify(candidates)
+        results = [(-distance, node) for distance, node in entry_points]
+        heapq.heapify(results)
+        while candidates:
+            distance, node = heapq.heappop(candidates)
+            if distance > -results[0][0]:
+                break
+            neighbors = [neighbor for neighbor in self.links[node][level] if neighbor not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+            counter[0] += len(neighbors)
+            bound = -results[0][0]
+            for neighbor, neighbor_distance in zip(neighbors, self._distances(query, neighbors).tolist()):
+                if len(results) < ef or neighbor_distance < bound:
+                    heapq.heappush(candidates, (neighbor_distance, neighbor))
+                    heapq.heappush(results, (-neighbor_distance, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+                    bound = -results[0][0]
+        return sorted((-distance, node) for distance, node in results)
+
+    def _select(self, candidates, limit):
+        """candidates: mesafeye göre sıralı (mesafe, düğüm)."""
+        if len(candidates) <= limit:
+            return [node for _, node in candidates]
+        selected = []
+        for distance, node in candidates:
+            if selected and float(self._distances(self.vectors[node], selected).min()) < distance:
+                continue
+            selected.append(node)
+            if len(selected) == limit:
+                break
+        return selected
+
+    def _shrink(self, node, level):
+        links = self.links[node][level]
+        distances = self._distances(self.vectors[node], links).tolist()
+        self.links[node][level] = self._select(sorted(zip(distances, links)), self.max_links[min(level, 1)])
+
+    def add(self, vector):
+        vector = self._prepare(vector)
+        node = self.count
+        if node == len(self.vectors):
+            self.vectors = np.concatenate([self.vectors, np.zeros_like(self.vectors)])
+            self.squares = np.concatenate([self.squares, np.zeros_like(self.squares)])
+        self.vectors[node] = vector
+        self.squares[node] = float(vector @ vector)
+        self.count += 1
+        level = int(-math.log(1 - self._rng.random()) * self.level_factor)
+        self.links.append([[] for _ in range(level + 1)])
+        if self.entry < 0:
+            self.entry, self.top = node, level
+            return node
+
+        counter = [0]
+        entry_points = [(float(self._distances(vector, [self.entry])[0]), self.entry)]
+        for layer in range(self.top, level, -1):
+            entry_points = self._search_layer(vector, entry_points, 1, layer, counter)[:1]
+        for layer in range(min(self.top, level), -1, -1):
+            candidates = self._search_layer(vector, entry_points, self.ef_construction, layer, counter)
+            neighbors = self._select(candidates, self.m)
+            self.links[node][layer] = neighbors
+            for neighbor in neighbors:
+                self.links[neighbor][layer].append(node)
+                if len(self.links[neighbor][layer]) > self.max_links[min(layer, 1)]:
+                    self._shrink(neighbor, layer)
+            entry_points = candidates
+        if level > self.top:
+            self.entry, self.top = node, level
+        return node
+
+    def search(self, vector, k, ef):
+        """[(mesafe, düğüm)] ve incelenen vektör sayısı."""
+        if self.entry < 0:
+            return [], 0
+        query = self._prepare(vector)
+        counter = [1]
+        entry_points = [(float(self._distances(query, [self.entry])[0]), self.entry)]
+        for layer in range(self.top, 0, -1):
+            entry_points = self._search_layer(query, entry_points, 1, layer, counter)[:1]
+        return self._search_layer(query, entry_points, max(ef, k), 0, counter)[:k], counter[0]
+
+
+def _flatten(settings, prefix=''):
+    flat = {}
+    for key, value in (settings or {}).items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def _index_settings(settings):
+    flat = {}
+    for key, value in _flatten(settings).items():
+        key = key if key.startswith('index.') else 'index.' + key
+        flat[key] = str(value).lower() if isinstance(value, bool) else str(value)
+    return flat
+
+
+class StandInIndex:
+
+    def __init__(self, name, body):
+        self.name = name
+        self.settings = {'index.number_of_shards': '1', 'index.number_of_replicas': '0'}
+        self.settings.update(_index_settings(body.get('settings')))
+        self.properties = {}
+        self.graphs = {}
+        self.rows = {}  # alan -> grafik düğümü sırasıyla belge satırları
+        self.documents = []
+        self.ids = {}
+        self.lock = threading.Lock()
+        self.put_mapping((body.get('mappings') or {}).get('properties') or {})
+
+    def put_mapping(self, properties):
+        for field, mapping in properties.items():
+            existing = self.properties.get(field)
+            if existing is not None:
+                if existing != mapping:
+                    raise StandInError(400, 'illegal_argument_exception',
+                                       f"mapper [{field}] cannot be changed from its current definition")
+                continue
+            if mapping.get('type') == 'knn_vector':
+                if self.settings.get('index.knn') != 'true':
+                    raise StandInError(400, 'mapper_parsing_exception', 'index.knn must be true for knn_vector')
+                method = mapping.get('method', {})
+                parameters = method.get('parameters', {})
+                self.graphs[field] = HnswGraph(int(mapping['dimension']), method.get('space_type', 'l2'),
+                                               int(parameters.get('m', 16)),
+                                               int(parameters.get('ef_construction', 100)))
+                self.rows[field] = []
+            self.properties[field] = mapping
+
+    def put_settings(self, settings):
+        flat = _index_settings(settings)
+        fixed = sorted(set(flat) - DYNAMIC_SETTINGS)
+        if fixed:
+            raise StandInError(400, 'illegal_argument_exception', f"Can't update non dynamic settings {fixed}")
+        self.settings.update(flat)
+
+    def describe(self):
+        return {'aliases': {}, 'mappings': {'properties': self.properties},
+                'settings': {'index': {key[len('index.'):]: value for key, value in self.settings.items()}}}
+
+    def add(self, document_id, source):
+        with self.lock:
+            row = len(self.documents)
+            for field, graph in self.graphs.items():
+                if source.get(field) is not None:
+                    graph.add(source[field])
+                    self.rows[field].append(row)
+            self.documents.append((document_id, source))
+            self.ids[document_id] = row
+
+    def search(self, body):
+        query = body.get('query') or {'match_all': {}}
+        includes = body.get('_source', True)
+        started = time.perf_counter()
+        computations = 0
+        if 'knn' in query:
+            field, params = next(iter(query['knn'].items()))
+            graph = self.graphs.get(field)
+            if graph is None:
+                raise StandInError(400, 'illegal_argument_exception', f"Field '{field}' is not knn_vector type.")
+            k = int(params.get('k', 10))
+            ef = int((params.get('method_parameters') or {}).get(
+                'ef_search', self.settings.get('index.knn.algo_param.ef_search', DEFAULT_EF_SEARCH)))
+            with self.lock:
+                found, computations = graph.search(params['vector'], k, ef)
+                hits = [(graph.score(distance), self.rows[field][node]) for distance, node in found]
+            hits = hits[:int(body.get('size', k))]
+        elif 'match_all' in query:
+            start, size = int(body.get('from', 0)), int(body.get('size', 10))
+            window = int(self.settings.get('index.max_result_window', DEFAULT_MAX_RESULT_WINDOW))
+            if start + size > window:
+                raise StandInError(400, 'illegal_argument_exception',
+                                   f"Result window is too large, from + size must be less than or equal to: [{window}]")
+            hits = [(1.0, row) for row in range(start, min(start + size, len(self.documents)))]
+        else:
+            raise StandInError(400, 'parsing_exception', f"Taklitte desteklenmeyen sorgu: {list(query)}")
+
+        results = []
+        for score, row in hits:
+            document_id, source = self.documents[row]
+            hit = {'_index': self.name, '_id': document_id, '_score': score}
+            if includes is not False:
+                hit['_source'] = ({key: source[key] for key in includes if key in source}
+                                  if isinstance(includes, list) else source)
+            results.append(hit)
+        return {
+            'took': int((time.perf_counter() - started) * 1000),
+            'timed_out': False,
+            'hits': {'total': {'value': len(self.documents) if 'match_all' in query else len(results),
+                               'relation': 'eq'},
+                     'max_score': max((hit['_score'] for hit in results), default=None),
+                     'hits': results},
+            '_standin': {'distanceComputations': computations},
+        }
+
+
+class OpenSearchStandIn:
+    """Arka planda çalışan taklit sunucu: `start()` uç noktayı döner."""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.indices = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        standin = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                path = urllib.parse.urlsplit(self.path).path
+                try:
+                    status, payload = standin.dispatch(self.command, path, raw)
+                except StandInError as e:
+                    status, payload = e.status, e.body()
+                except (ValueError, KeyError, TypeError) as e:
+                    status, payload = 400, StandInError(400, 'parse_exception', str(e)).body()
+                data = b'' if self.command == 'HEAD' else json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_PUT = do_POST = do_DELETE = do_HEAD = _handle
+
+        self._server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self._thread = None
+
+    @property
+    def endpoint(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.endpoint
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _index(self, name):
+        index = self.indices.get(name)
+        if index is None:
+            raise StandInError(404, 'index_not_found_exception', f"no such index [{name}]")
+        return index
+
+    def dispatch(self, method, path, raw):
+        parts = [urllib.parse.unquote(part) for part in path.strip('/').split('/') if part]
+        body = json.loads(raw) if raw and not path.endswith('/_bulk') else {}
+        if not parts:
+            return 200, {'version': {'number': '2.13.0', 'distribution': 'opensearch-standin'}}
+        if parts == ['_bulk']:
+            return 200, self._bulk(None, raw)
+        name, action = parts[0], parts[1] if len(parts) > 1 else None
+
+        if action is None:
+            if method == 'PUT':
+                with self._lock:
+                    if name in self.indices:
+                        raise StandInError(400, 'resource_already_exists_exception', f"index [{name}] already exists")
+                    self.indices[name] = StandInIndex(name, body)
+                return 200, {'acknowledged': True, 'shards_acknowledged': True, 'index': name}
+            if method in ('GET', 'HEAD'):
+                return 200, {name: self._index(name).describe()}
+            if method == 'DELETE':
+                with self._lock:
+                    self._index(name)
+                    del self.indices[name]
+                return 200, {'acknowledged': True}
+        index = self._index(name)
+        if action == '_settings':
+            if method == 'PUT':
+                index.put_settings(body)
+                return 200, {'acknowledged': True}
+            return 200, {name: {'settings': index.describe()['settings']}}
+        if action == '_mapping':
+            if method == 'PUT':
+                index.put_mapping(body.get('properties') or {})
+                return 200, {'acknowledged': True}
+            return 200, {name: {'mappings': index.describe()['mappings']}}
+        if action == '_bulk':
+            return 200, self._bulk(name, raw)
+        if action == '_count':
+            return 200, {'count': len(index.documents)}
+        if action == '_refresh':
+            return 200, {'_shards': {'total': 1, 'successful': 1, 'failed': 0}}
+        if action == '_search':
+            return 200, index.search(body)
+        raise StandInError(400, 'invalid_request', f"Taklitte desteklenmeyen istek: {method} {path}")
+
+    def _bulk(self, default_index, raw):
+        started = time.perf_counter()
+        lines = [line for line in raw.decode('utf-8').split('\n') if line.strip()]
+        items, errors = [], False
+        for action_line, source_line in zip(lines[::2], lines[1::2]):
+            operation, meta = next(iter(json.loads(action_line).items()))
+            name = meta.get('_index', default_index)
+            document_id = meta.get('_id') or f"standin-{next(self._ids)}"
+            try:
+                if operation not in ('index', 'create'):
+                    raise StandInError(400, 'illegal_argument_exception', f"Taklitte desteklenmeyen işlem: {operation}")
+                self._index(name).add(document_id, json.loads(source_line))
+                items.append({operation: {'_index': name, '_id': document_id, 'status': 201, 'result': 'created'}})
+            except StandInError as e:
+                errors = True
+                items.append({operation: {'_index': name, '_id': document_id, 'status': e.status,
+                                          'error': {'type': e.error_type, 'reason': e.reason}}})
+        return {'took': int((time.perf_counter() - started) * 1000), 'errors': errors, 'items': items}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9200)
+    args = parser.parse_args()
+    standin = OpenSearchStandIn(args.host, args.port)
+    print(f"OpenSearch taklidi: {standin.endpoint} (Ctrl+C ile durdurun)")
+    try:
+        standin._server.serve_forever()
+    except KeyboardInterrupt:
+        standin._server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Öneri servisinin (gömme matrisi + top-k kosinüs) yerel ölçümü (AWS gerektirmez).
+
+Titan yerine deterministik sentetik gömmeler kullanılır: aynı tür ve yazarın
+kitapları birbirine yakın düşer, böylece sonuçların anlamlılığı da kontrol
+edilebilir. Matris bellek içi S3 taklidine yayınlanır ve Lambda'daki gibi
+`/tmp`'ye indirilip mmap ile açılır. Ölçülenler:
+
+- matrisin üretimi ve değişen kitaplar için artımlı yeniden üretim,
+- soğuk yükleme (indirme + mmap) ve tazelik kontrolü,
+- "benzer kitaplar" ve "ödünçlerime göre" sorgu gecikmesi (p50 / p95 / p99),
+- karşılaştırma: tüm skorları sıralamak (argsort) ve saf Python döngüsü.
+
+    python benchmarks/recommend_bench.py                          # 100k kitap, 256 boyut
+    python benchmarks/recommend_bench.py --books 500000 --dimensions 512
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'lambda_layers', 'common', 'python'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from aws_standins import S3StandIn  # noqa: E402
+from library_common.recommendations import EmbeddingStore, build_matrix  # noqa: E402
+from search_bench import make_catalog, percentile, report  # noqa: E402
+
+
+class SyntheticEmbedder:
+    """Metin -> tür merkezi + yazar merkezi + gürültü (metnin özetinden tohumlanır)."""
+
+    def __init__(self, dimensions, seed):
+        self.dimensions = dimensions
+        self.seed = seed
+        self.calls = 0
+
+    def _direction(self, key):
+        rng = np.random.default_rng([self.seed, zlib.crc32(key.encode('utf-8'))])
+        return rng.standard_normal(self.dimensions, dtype=np.float32)
+
+    def __call__(self, text):
+        self.calls += 1
+        _, author, genre = text.split('. ')[:3]
+        vector = self._direction('genre:' + genre) + 0.8 * self._direction('author:' + author)
+        return vector + 0.6 * self._direction('text:' + text)
+
+
+def python_top_k(matrix, vector, k, exclude):
+    """Karşılaştırma: her satır için Python'da iç çarpım."""
+    vector = vector.tolist()
+    scores = []
+    for row, values in enumerate(matrix.tolist()):
+        if row not in exclude:
+            scores.append((sum(a * b for a, b in zip(values, vector)), row))
+    return [row for _, row in sorted(scores, reverse=True)[:k]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=100_000)
+    parser.add_argument('--dimensions', type=int, default=256)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--loans', type=int, default=20, help='"Ödünçlerime göre" profilindeki kitap sayısı')
+    parser.add_argument('--changes', type=int, default=100, help='Artımlı üretimde metni değişen kitap sayısı')
+    parser.add_argument('--naive-queries', type=int, default=3, help='Saf Python ile ölçülecek sorgu sayısı')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    books = make_catalog(args.books, rng)
+    embedder = SyntheticEmbedder(args.dimensions, args.seed)
+
+    started = time.perf_counter()
+    matrix, entries, embedded = build_matrix(books, embedder, args.dimensions)
+    print(f"{args.books} kitap x {args.dimensions} boyut: matris {time.perf_counter() - started:.2f} sn'de "
+          f"üretildi ({embedded} gömme çağrısı), {matrix.nbytes / 1e6:.1f} MB")
+
+    s3 = S3StandIn()
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = EmbeddingStore(s3, 'bench', local_dir=tmp)
+        writer.publish(matrix, entries, 'synthetic')
+        reader = EmbeddingStore(s3, 'bench', local_dir=tmp, check_interval=0)
+        started = time.perf_counter()
+        index = reader.current()
+        print(f"Soğuk yükleme (indirme + mmap + books.json): {(time.perf_counter() - started) * 1e3:.1f} ms")
+        started = time.perf_counter()
+        reader.current()
+        print(f"Tazelik kontrolü (değişmemiş, 304): {(time.perf_counter() - started) * 1e3:.3f} ms")
+
+        ids = [entry['id'] for entry in entries]
+        started = time.perf_counter()
+        index.similar(rng.choice(ids), args.k)
+        print(f"İlk sorgu (sayfalar diskten okunur): {(time.perf_counter() - started) * 1e3:.2f} ms")
+
+        similar, profiles, same = [], [], 0
+        by_id = {book['bookId']: book for book in books}
+        for _ in range(args.queries):
+            book_id = rng.choice(ids)
+            started = time.perf_counter()
+            items = index.similar(book_id, args.k)
+            similar.append(time.perf_counter() - started)
+            book = by_id[book_id]
+            same += sum(item['genre'] == book['genre'] or item['author'] == book['author'] for item in items)
+
+            loans = rng.sample(ids, args.loans)
+            started = time.perf_counter()
+            index.for_books(loans, args.k)
+            profiles.append(time.perf_counter() - started)
+        report('benzer kitaplar', similar)
+        report(f'ödünçlere göre/{args.loans}', profiles)
+        print(f"Benzer kitapların {same / (args.queries * args.k):.0%}'i aynı tür veya yazardan")
+
+        # Karşılaştırma: aynı skorlar, tüm liste sıralanarak
+        full_sort, mismatches = [], 0
+        for _ in range(min(args.queries, 200)):
+            row = rng.randrange(len(ids))
+            expected = [item['id'] for item in index.similar(ids[row], args.k)]
+            started = time.perf_counter()
+            scores = index.matrix @ index.matrix[row]
+            scores[row] = -np.inf
+            top = np.argsort(-scores, kind='stable')[:args.k]
+            full_sort.append(time.perf_counter() - started)
+            mismatches += [ids[i] for i in top] != expected
+        report('argsort (tam sıra)', full_sort)
+
+        naive = []
+        dense = np.asarray(index.matrix)
+        for _ in range(args.naive_queries):
+            row = rng.randrange(len(ids))
+            started = time.perf_counter()
+            python_top_k(dense, dense[row], args.k, {row})
+            naive.append(time.perf_counter() - started)
+        report('saf Python', naive)
+
+        changed = rng.sample(books, min(args.changes, len(books)))
+        updated = {book['bookId']: dict(book, description=f"Yeni baskı {book['bookId']}") for book in changed}
+        started = time.perf_counter()
+        _, _, embedded = build_matrix((updated.get(book['bookId'], book) for book in books), embedder,
+                                      args.dimensions, previous=index)
+        print(f"Artımlı üretim ({len(changed)} kitap değişti): {time.perf_counter() - started:.2f} sn, "
+              f"{embedded} gömme çağrısı")
+
+    if mismatches or embedded != len(changed):
+        print(f"HATA: {mismatches} sorguda argsort ile farklı sonuç / {embedded} gömme çağrısı.")
+        return 1
+    print(f"p99 benzer kitaplar: {percentile(similar, 99) * 1e3:.2f} ms "
+          f"({math.ceil(1 / max(percentile(similar, 50), 1e-9))} sorgu/sn tek iş parçacığı)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+/books/search indeksinin yerel ölçümü (AWS gerektirmez).
+
+Sentetik bir katalogdan indeks dosyası üretilir, bellek içi bir S3 taklidine
+yazılır ve Lambda'daki gibi `/tmp`'ye indirilip mmap ile açılır. Ölçülenler:
+
+- indeks üretimi (rebuild) ve dosya boyutu,
+- soğuk yükleme (indirme + mmap + başlık çözme),
+- sorgu türlerine göre gecikme (p50 / p95 / p99),
+- stream'den gelen küçük bir değişiklik grubunun indekse işlenmesi,
+- karşılaştırma için eski yöntem: tüm katalog üzerinde tarayıcıdaki gibi
+  `includes` ile süzme (filterBooks).
+
+    python benchmarks/search_bench.py                      # 100k kitap
+    python benchmarks/search_bench.py --books 500000 --queries 500
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'lambda_layers', 'common', 'python'))
+
+from library_common.search_index import SearchIndexStore, build_index  # noqa: E402
+from aws_standins import S3StandIn  # noqa: E402
+
+FIRST_WORDS = ['Kayıp', 'Sessiz', 'Kırmızı', 'Uzak', 'Son', 'Eski', 'Gece', 'Deniz', 'Dağ', 'Yaz',
+               'Beyaz', 'Kara', 'Yalnız', 'Küçük', 'Büyük', 'Derin', 'Soğuk', 'Sıcak', 'Yeni', 'Kısa']
+SECOND_WORDS = ['Şehir', 'Bahçe', 'Yolculuk', 'Ev', 'Mektup', 'Saat', 'Köprü', 'Orman', 'Ada', 'Kuş',
+                'Kale', 'Nehir', 'Sokak', 'Rüzgar', 'Kitap', 'Yıldız', 'Liman', 'Tren', 'Kapı', 'Pencere']
+FIRST_NAMES = ['Orhan', 'Sabahattin', 'Yaşar', 'Oğuz', 'Halide', 'Peyami', 'Ahmet', 'Elif', 'Zeynep', 'Cemal',
+               'Sait', 'Aziz', 'Tezer', 'Füruzan', 'Adalet', 'Bilge', 'Nazım', 'Attilâ', 'Leyla', 'Murat']
+LAST_NAMES = ['Pamuk', 'Ali', 'Kemal', 'Atay', 'Edib', 'Safa', 'Tanpınar', 'Şafak', 'Süreya', 'Nesin',
+              'Faik', 'Özlü', 'Ağaoğlu', 'Karasu', 'Hikmet', 'İlhan', 'Erdem', 'Uşaklıgil', 'Baykurt', 'Tekin']
+GENRES = ['Roman', 'Bilim Kurgu', 'Tarih', 'Edebiyat', 'Şiir', 'Deneme', 'Polisiye', 'Çocuk']
+
+
+def make_catalog(count, rng):
+    authors = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(max(1, count // 50))]
+    return [{
+        'bookId': f"b{i}",
+        'title': f"{rng.choice(FIRST_WORDS)} {rng.choice(SECOND_WORDS)} {i}",
+        'author': rng.choice(authors),
+        'genre': rng.choice(GENRES),
+        'cover': f"https://covers.example/{i}.jpg",
+        'isAvailable': rng.random() > 0.2,
+    } for i in range(count)]
+
+
+def make_queries(books, count, rng):
+    """(tür, parametreler) listesi; tarayıcıdaki tipik kullanımlar."""
+    queries = []
+    for _ in range(count):
+        book = rng.choice(books)
+        title_words = book['title'].split()
+        kind = rng.choice(['prefix', 'title', 'substring', 'author', 'typeahead', 'genre', 'filters', 'browse'])
+        if kind == 'prefix':
+            params = {'query': title_words[0][:3]}
+        elif kind == 'title':
+            params = {'query': book['title']}
+        elif kind == 'substring':
+            params = {'query': title_words[1][1:]}
+        elif kind == 'author':
+            params = {'query': book['author'].split()[-1]}
+        elif kind == 'typeahead':
+            params = {'query': f"{book['author'].split()[0]} {book['author'].split()[-1][:2]}"}
+        elif kind == 'genre':
+            params = {'genre': book['genre']}
+        elif kind == 'filters':
+            params = {'query': title_words[0], 'genre': book['genre'], 'available': 1}
+        else:
+            params = {'offset': rng.randrange(0, len(books), 24)}
+        queries.append((kind, params))
+    return queries
+
+
+def naive_filter(books, query='', genre=None, **_):
+    """Eski filterBooks: tüm katalog üzerinde küçük harf + includes."""
+    term = query.lower()
+    return [book for book in books
+            if (term in book['title'].lower() or term in book['author'].lower())
+            and (not genre or book['genre'] == genre)]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] if ordered else 0.0
+
+
+def report(name, samples):
+    print(f"{name:<18} n={len(samples):<5} p50 {percentile(samples, 50) * 1e3:8.3f} ms  "
+          f"p95 {percentile(samples, 95) * 1e3:8.3f} ms  p99 {percentile(samples, 99) * 1e3:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--naive-queries', type=int, default=50, help='Eski yöntemle ölçülecek sorgu sayısı')
+    parser.add_argument('--changes', type=int, default=100, help='Stream grubundaki değişen kitap sayısı')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    books = make_catalog(args.books, rng)
+
+    started = time.perf_counter()
+    data = build_index(books)
+    build_seconds = time.perf_counter() - started
+    catalog_json = len(json.dumps(books, ensure_ascii=False).encode('utf-8'))
+    print(f"{args.books} kitap: indeks {build_seconds:.2f} sn'de üretildi, {len(data) / 1e6:.1f} MB "
+          f"(katalog JSON {catalog_json / 1e6:.1f} MB)")
+
+    s3 = S3StandIn()
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = SearchIndexStore(s3, 'bench', 'search/books.idx', local_path=os.path.join(tmp, 'writer.idx'))
+        writer.replace(books)
+        reader = SearchIndexStore(s3, 'bench', 'search/books.idx', local_path=os.path.join(tmp, 'reader.idx'),
+                                  check_interval=0)
+        started = time.perf_counter()
+        index = reader.current()
+        print(f"Soğuk yükleme (indirme + mmap): {(time.perf_counter() - started) * 1e3:.1f} ms")
+        started = time.perf_counter()
+        reader.current()
+        print(f"Tazelik kontrolü (değişmemiş, 304): {(time.perf_counter() - started) * 1e3:.3f} ms")
+
+        samples = {}
+        for kind, params in make_queries(books, args.queries, rng):
+            started = time.perf_counter()
+            index.search(**params)
+            samples.setdefault(kind, []).append(time.perf_counter() - started)
+        for kind in sorted(samples):
+            report(kind, samples[kind])
+        report('tümü', [value for values in samples.values() for value in values])
+
+        naive = []
+        for kind, params in make_queries(books, args.naive_queries, rng):
+            started = time.perf_counter()
+            naive_filter(books, **params)
+            naive.append(time.perf_counter() - started)
+        report('eski filterBooks', naive)
+
+        changed = rng.sample(books, min(args.changes, len(books)))
+        changes = {book['bookId']: dict(book, isAvailable=not book['isAvailable']) for book in changed}
+        changes[changed[0]['bookId']] = None
+        started = time.perf_counter()
+        count = writer.update(changes)
+        print(f"Stream grubu ({len(changes)} değişiklik) işlendi: {time.perf_counter() - started:.2f} sn, "
+              f"{count} kitap")
+
+        updated = reader.current()
+        if updated.search(changed[0]['title'])['items'][:1] == [changed[0]['bookId']]:
+            print("HATA: silinen kitap hâlâ indekste.")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Vektör indeksi HNSW parametreleri için recall / gecikme ölçümü.
+
+Varsayılan olarak yerel OpenSearch taklidine (`opensearch_standin.py`, gerçek
+HNSW grafiği) karşı çalışır; `--endpoint` ile yerel bir OpenSearch'e (örn.
+Docker) ya da `--aws-region` ile imzalı olarak bir AOSS koleksiyonuna da
+yöneltilebilir. İndeks, Custom Resource'un kullandığı `ensure_index` ile
+kurulur ve her m / ef_construction denemesinde göç ettirilir (belgeler
+kopyalanıp yeni grafikle geri yazılır); ef_search denemeleri indeksi yeniden
+kurmadan ayarı günceller. Böylece göç yolu da her çalıştırmada sınanır.
+
+Gömmeler, Titan çıktısı gibi normalize edilmiş kümeli sentetik vektörlerdir;
+doğru komşular kaba kuvvetle (NumPy) bulunur. Her kombinasyon için recall@k,
+sorgu gecikmesi (p50 / p99) ve (taklitte) sorgu başına incelenen vektör
+sayısı raporlanır; hedef recall'u sağlayan en ucuz ayar önerilir.
+
+    python benchmarks/vector_index_bench.py
+    python benchmarks/vector_index_bench.py --vectors 20000 --dimensions 1024 --m 16 32 --ef-search 64 128 256 512
+    python benchmarks/vector_index_bench.py --endpoint http://localhost:9200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'lambda_layers', 'common', 'python'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from library_common.vector_index import OpenSearchClient, delete_index, ensure_index, normalize_spec  # noqa: E402
+from opensearch_standin import OpenSearchStandIn  # noqa: E402
+from search_bench import percentile  # noqa: E402
+
+INDEX_NAME = 'vector-index-bench'
+LOAD_BATCH_SIZE = 500
+
+
+def make_vectors(count, dimensions, clusters, rng):
+    """Kümeli, normalize edilmiş vektörler (aynı konudaki parçalar birbirine yakın)."""
+    centers = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, count)] + 0.9 * rng.standard_normal((count, dimensions),
+                                                                                      dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def true_neighbors(vectors, queries, k, space_type):
+    scores = queries @ vectors.T
+    if space_type == 'l2':
+        scores = scores - 0.5 * (vectors * vectors).sum(axis=1)
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def load(client, spec, vectors):
+    for start in range(0, len(vectors), LOAD_BATCH_SIZE):
+        client.bulk_index(INDEX_NAME, [
+            {spec['vectorField']: vector, spec['textField']: f"Parça {start + offset}",
+             spec['metadataField']: json.dumps({'row': start + offset})}
+            for offset, vector in enumerate(vectors[start:start + LOAD_BATCH_SIZE].tolist())
+        ])
+    client.request('POST', f"/{INDEX_NAME}/_refresh", allow=(400, 404))
+
+
+def measure(client, spec, queries, expected, k):
+    latencies, computations, found = [], [], 0
+    for query, neighbors in zip(queries.tolist(), expected):
+        started = time.perf_counter()
+        _, payload = client.request('POST', f"/{INDEX_NAME}/_search", {
+            'size': k, '_source': [spec['metadataField']],
+            'query': {'knn': {spec['vectorField']: {'vector': query, 'k': k}}},
+        })
+        latencies.append(time.perf_counter() - started)
+        rows = {json.loads(hit['_source'][spec['metadataField']])['row'] for hit in payload['hits']['hits']}
+        found += len(rows & set(neighbors.tolist()))
+        computations.append(payload.get('_standin', {}).get('distanceComputations', 0))
+    return found / (len(queries) * k), latencies, float(np.mean(computations))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vectors', type=int, default=5000)
+    parser.add_argument('--dimensions', type=int, default=256, help='Titan v2: 256 / 512 / 1024')
+    parser.add_argument('--clusters', type=int, default=50)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--engine', default='faiss')
+    parser.add_argument('--space-type', default='l2')
+    parser.add_argument('--m', type=int, nargs='+', default=[8, 16, 32])
+    parser.add_argument('--ef-construction', type=int, nargs='+', default=[128])
+    parser.add_argument('--ef-search', type=int, nargs='+', default=[16, 32, 64, 128, 256])
+    parser.add_argument('--target-recall', type=float, default=0.95)
+    parser.add_argument('--endpoint', help='Taklit yerine bu OpenSearch uç noktası')
+    parser.add_argument('--aws-region', help='--endpoint bir AOSS koleksiyonuysa istekleri SigV4 ile imzalar')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    standin = None
+    if args.endpoint:
+        credentials = None
+        if args.aws_region:
+            import boto3
+            credentials = boto3.session.Session().get_credentials()
+        client = OpenSearchClient(args.endpoint, region=args.aws_region, credentials=credentials)
+    else:
+        standin = OpenSearchStandIn()
+        client = OpenSearchClient(standin.start())
+
+    rng = np.random.default_rng(args.seed)
+    vectors = make_vectors(args.vectors, args.dimensions, args.clusters, rng)
+    queries = make_vectors(args.queries, args.dimensions, args.clusters, np.random.default_rng(args.seed + 1))
+    started = time.perf_counter()
+    expected = true_neighbors(vectors, queries, args.k, args.space_type)
+    print(f"{args.vectors} vektör x {args.dimensions} boyut, {args.queries} sorgu; kaba kuvvet "
+          f"{(time.perf_counter() - started) * 1e3:.0f} ms")
+
+    delete_index(client, INDEX_NAME)
+    rows, failures = [], 0
+    try:
+        for m in args.m:
+            for ef_construction in args.ef_construction:
+                spec = normalize_spec({
+                    'indexName': INDEX_NAME, 'dimensions': args.dimensions, 'engine': args.engine,
+                    'spaceType': args.space_type, 'm': m, 'efConstruction': ef_construction,
+                    'efSearch': args.ef_search[0],
+                })
+                if client.get_index(INDEX_NAME) is not None and args.vectors > 10000:
+                    client.request('PUT', f"/{INDEX_NAME}/_settings", {'index': {'max_result_window': args.vectors}})
+                started = time.perf_counter()
+                result = ensure_index(client, spec, max_documents=args.vectors, settle_seconds=0)
+                if result['action'] == 'created':
+                    load(client, spec, vectors)
+                build = time.perf_counter() - started
+                count = client.count(INDEX_NAME)
+                label = 'yükleme' if result['action'] == 'created' else 'göç'
+                print(f"\nm={m} ef_construction={ef_construction}: {label} {build:.1f} sn "
+                      f"({result['action']}, {count} belge)")
+                if count != args.vectors:
+                    print(f"HATA: indekste {count} belge var, {args.vectors} bekleniyordu")
+                    failures += 1
+
+                for ef_search in args.ef_search:
+                    result = ensure_index(client, dict(spec, efSearch=ef_search), settle_seconds=0)
+                    if result['action'] not in ('updated', 'unchanged'):
+                        print(f"HATA: ef_search değişikliği {result['action']} ile sonuçlandı")
+                        failures += 1
+                    recall, latencies, computations = measure(client, spec, queries, expected, args.k)
+                    rows.append((m, ef_construction, ef_search, recall, percentile(latencies, 50),
+                                 percentile(latencies, 99), computations, build))
+                    print(f"  ef_search={ef_search:<5} recall@{args.k} {recall:6.3f}  "
+                          f"p50 {percentile(latencies, 50) * 1e3:7.2f} ms  p99 {percentile(latencies, 99) * 1e3:7.2f} ms"
+                          + (f"  {computations:8.0f} vektör/sorgu" if computations else ''))
+    finally:
+        delete_index(client, INDEX_NAME)
+        if standin:
+            standin.stop()
+
+    # En ucuz uygun ayar: taklitte incelenen vektör sayısı, gerçek motorda p50 gecikme
+    cost = (lambda row: row[6]) if any(row[6] for row in rows) else (lambda row: row[4])
+    passing = [row for row in rows if row[3] >= args.target_recall]
+    if passing:
+        m, ef_construction, ef_search, recall, p50, _, _, _ = min(passing, key=cost)
+        print(f"\nÖneri (recall >= {args.target_recall}): m={m} ef_construction={ef_construction} "
+              f"ef_search={ef_search} (recall {recall:.3f}, p50 {p50 * 1e3:.2f} ms; "
+              f"kaba kuvvet sorgu başına {args.vectors} vektör inceler)")
+        print(f"  VectorIndexProps(dimensions={args.dimensions}, m={m}, ef_construction={ef_construction}, "
+              f"ef_search={ef_search})")
+    else:
+        print(f"\nHiçbir ayar recall >= {args.target_recall} sağlamadı; daha büyük m / ef_search deneyin.")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
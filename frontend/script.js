@@ -3,7 +3,10 @@ const CONFIG = {
     userPoolId: 'eu-north-1_mSgPpFbTd', 
     clientId: '358evs3lh5npe0nea2uiu9tp5i', 
     // 👇 API Linkini Buraya Yapıştır
-    apiUrl: 'https://f2s450v279.execute-api.eu-north-1.amazonaws.com/dev' 
+    apiUrl: 'https://f2s450v279.execute-api.eu-north-1.amazonaws.com/dev', 
+    // 👇 Streaming için Outputs'daki LibraryStreamUrl (wss://...). Boş bırakılırsa normal /chat kullanılır.
+    streamUrl: '',
+    streamRoute: 'assistant'
 };
 
 // --- DEĞİŞKENLER ---
@@ -29,7 +32,8 @@ async function fetchBooks() {
     try {
         const response = await fetch(`${CONFIG.apiUrl}/books`);
         if (!response.ok) throw new Error('Veri çekilemedi');
-        books = await response.json();
+        const data = await response.json();
+        books = Array.isArray(data) ? data : data.items; // /books sayfalı yanıt döner: {items, nextCursor}
         renderBooks(books);
     } catch (err) { console.error(err); }
 }
@@ -40,8 +44,7 @@ async function fetchFavorites() {
     try {
         const response = await fetch(`${CONFIG.apiUrl}/reading-lists`, {
             headers: { 
-                'Authorization': idToken,
-                'X-User-ID': currentUsername // 👇 ÖNEMLİ: Sabit kullanıcı adını gönderiyoruz
+                'Authorization': idToken // Kullanıcı sunucuda token'dan okunur
             }
         });
         if (response.ok) {
@@ -100,8 +103,7 @@ async function toggleFavorite(bookId, bookTitle) {
             method: method,
             headers: { 
                 'Content-Type': 'application/json', 
-                'Authorization': idToken,
-                'X-User-ID': currentUsername // 👇 ÖNEMLİ: Sabit ID
+                'Authorization': idToken
             },
             body: JSON.stringify(body)
         });
@@ -300,7 +302,6 @@ function openEditBookModal(id) {
     document.getElementById('edit-book-genre').value = book.genre;
     document.getElementById('edit-book-isbn').value = book.isbn;
     document.getElementById('edit-book-desc').value = book.description;
-    document.getElementById('edit-book-status').value = book.status || 'Müsait';
 
     document.getElementById('edit-book-modal').classList.remove('hidden');
 }
@@ -315,8 +316,7 @@ document.getElementById('edit-book-form')?.addEventListener('submit', (e) => {
         cover: document.getElementById('edit-book-cover').value,
         description: document.getElementById('edit-book-desc').value,
         genre: document.getElementById('edit-book-genre').value,
-        isbn: document.getElementById('edit-book-isbn').value,
-        status: document.getElementById('edit-book-status').value
+        isbn: document.getElementById('edit-book-isbn').value
     };
     saveBookToBackend(updatedBook);
     closeEditBookModal();
@@ -351,14 +351,24 @@ document.getElementById('chat-form')?.addEventListener('submit', async (e) => {
     inp.value = '';
     const loadId = addLoading();
 
+    if (CONFIG.streamUrl) {
+        try {
+            await sendStreamingMessage(msg, loadId);
+            return;
+        } catch (err) {
+            console.warn("Streaming başarısız, normal isteğe dönülüyor.", err);
+        }
+    }
+
     try {
         const res = await fetch(`${CONFIG.apiUrl}/chat`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ message: msg })
+            body: JSON.stringify({ message: msg, session_id: chatSessionId || undefined })
         });
         const data = await res.json();
         removeMessage(loadId);
+        rememberChatSession(data.session_id);
         addMessage(data.response || data.message || "Anlaşılamadı.", 'bot');
     } catch (err) {
         removeMessage(loadId);
@@ -366,6 +376,72 @@ document.getElementById('chat-form')?.addEventListener('submit', async (e) => {
     }
 });
 
+// --- STREAMING (WebSocket) ---
+// CONFIG.streamUrl tanımlıysa yanıt parça parça gelir ve baloncuğa eklenir.
+let chatSocket = null;
+const pendingStreams = {};
+
+// Sunucu son turları bu ID ile hatırlar (sekme kapanana kadar aynı oturum)
+let chatSessionId = sessionStorage.getItem('chatSessionId');
+
+function rememberChatSession(id) {
+    if (!id || id === chatSessionId) return;
+    chatSessionId = id;
+    sessionStorage.setItem('chatSessionId', id);
+}
+
+function openChatSocket() {
+    return new Promise((resolve, reject) => {
+        if (chatSocket && chatSocket.readyState === WebSocket.OPEN) { resolve(chatSocket); return; }
+        const ws = new WebSocket(CONFIG.streamUrl);
+        ws.onopen = () => { chatSocket = ws; resolve(ws); };
+        ws.onerror = (err) => reject(err);
+        ws.onclose = () => {
+            chatSocket = null;
+            Object.keys(pendingStreams).forEach(id => {
+                pendingStreams[id].onError(new Error('Bağlantı kapandı'));
+                delete pendingStreams[id];
+            });
+        };
+        ws.onmessage = (e) => {
+            const frame = JSON.parse(e.data);
+            const pending = pendingStreams[frame.requestId];
+            if (!pending) return;
+            if (frame.type === 'delta') {
+                pending.onDelta(frame.text);
+            } else if (frame.type === 'done') {
+                delete pendingStreams[frame.requestId];
+                rememberChatSession(frame.session_id);
+                pending.onDone(frame);
+            } else if (frame.type === 'error') {
+                delete pendingStreams[frame.requestId];
+                pending.onError(new Error(frame.error));
+            }
+        };
+    });
+}
+
+async function streamChat(message, onDelta) {
+    const ws = await openChatSocket();
+    const requestId = 'r-' + Date.now() + '-' + Math.random().toString(36).slice(2, 8);
+    return new Promise((resolve, reject) => {
+        pendingStreams[requestId] = { onDelta, onDone: resolve, onError: reject };
+        ws.send(JSON.stringify({ action: CONFIG.streamRoute || 'assistant', requestId, message, session_id: chatSessionId || undefined }));
+    });
+}
+
+// Yanıtı parça parça yazar; ilk parça gelince yükleniyor animasyonu kalkar
+async function sendStreamingMessage(msg, loadId) {
+    let bubble = null;
+    const frame = await streamChat(msg, (text) => {
+        if (!bubble) { removeMessage(loadId); bubble = addMessage('', 'bot'); }
+        bubble.textContent += text;
+        const msgs = document.getElementById('messages');
+        if (msgs) msgs.scrollTop = msgs.scrollHeight;
+    });
+    if (!bubble) { removeMessage(loadId); addMessage(frame.response || "...", 'bot'); }
+}
+
 function addMessage(text, sender) {
     const msgs = document.getElementById('messages');
     const div = document.createElement('div');
@@ -374,6 +450,7 @@ function addMessage(text, sender) {
     div.innerHTML = `<div class="${bubbleColor} rounded-2xl ${sender === 'user' ? 'rounded-tr-none' : 'rounded-tl-none'} py-3 px-4 max-w-[85%] shadow-sm text-sm"><p>${text}</p></div>`;
     msgs.appendChild(div);
     msgs.scrollTop = msgs.scrollHeight;
+    return div.querySelector('p');
 }
 function addLoading() {
     const id = 'l-'+Date.now();
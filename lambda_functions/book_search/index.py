@@ -0,0 +1,145 @@
+import json
+import os
+
+from library_common.clients import lazy_client, lazy_resource
+from library_common.http import (
+    BadRequest, cached_response, decode_cursor, encode_cursor, json_response, page_limit, query_param,
+)
+from library_common.search_index import SearchIndexStore
+
+# GET /books/search: S3'teki kompakt indeks üzerinden başlık/yazar araması,
+# tür / yazar / durum filtreleri, facet sayıları ve sayfalama.
+# index_handler: catalog_indexer'ın (LibraryBooks Stream'inin tek okuyucusu)
+# asenkron çağrısıyla {"bookIds": [...]} kitapları için indeksi günceller;
+# {"action": "rebuild"} ile elle çağrıldığında tüm tabloyu tarayıp baştan yazar.
+s3 = lazy_client('s3')
+dynamodb = lazy_resource('dynamodb')
+
+BOOKS_TABLE_NAME = os.environ.get('BOOKS_TABLE_NAME', 'LibraryBooks')
+INDEX_BUCKET_NAME = os.environ.get('INDEX_BUCKET_NAME')
+SEARCH_INDEX_KEY = os.environ.get('SEARCH_INDEX_KEY', 'search/books.idx')
+SEARCH_INDEX_CHECK_SECONDS = float(os.environ.get('SEARCH_INDEX_CHECK_SECONDS', '30'))
+MAX_QUERY_LENGTH = 200
+
+STATUS_VALUES = {'Müsait': 1, 'Ödünç Verilmiş': 0, 'true': 1, 'false': 0}
+# İndekste saklanan alanlar (search_index.to_record)
+INDEXED_FIELDS = 'bookId, title, author, genre, cover, isAvailable'
+BATCH_GET_SIZE = 100
+
+_store = None
+
+
+def index_store():
+    global _store
+    if _store is None:
+        _store = SearchIndexStore(s3, INDEX_BUCKET_NAME, SEARCH_INDEX_KEY,
+                                  check_interval=SEARCH_INDEX_CHECK_SECONDS)
+    return _store
+
+
+def to_book(record):
+    return dict(record, status='Müsait' if record['isAvailable'] else 'Ödünç Verilmiş')
+
+
+def availability_filter(event):
+    """available=true|false veya status=Müsait|Ödünç Verilmiş -> 1 / 0 / None."""
+    value = query_param(event, 'available') or query_param(event, 'status')
+    if not value:
+        return None
+    if value not in STATUS_VALUES:
+        raise BadRequest('available true veya false olmalıdır.')
+    return STATUS_VALUES[value]
+
+
+def search(event):
+    query = (query_param(event, 'q') or '').strip()
+    if len(query) > MAX_QUERY_LENGTH:
+        raise BadRequest(f"Sorgu en fazla {MAX_QUERY_LENGTH} karakter olabilir.")
+    cursor = decode_cursor(query_param(event, 'cursor')) or {}
+    offset = cursor.get('offset', 0)
+    if not isinstance(offset, int) or offset < 0:
+        raise BadRequest('Geçersiz sayfa imleci.')
+    limit = page_limit(event)
+
+    index = index_store().current()
+    if index is None:
+        return json_response(503, {'error': 'Arama indeksi henüz oluşturulmadı.'})
+    result = index.search(
+        query,
+        genre=query_param(event, 'genre'),
+        author=query_param(event, 'author'),
+        available=availability_filter(event),
+        offset=offset,
+        limit=limit,
+    )
+    next_offset = offset + limit
+    return cached_response(event, {
+        'items': [to_book(record) for record in result['items']],
+        'total': result['total'],
+        'facets': result['facets'],
+        'nextCursor': encode_cursor({'offset': next_offset}) if next_offset < result['total'] else None,
+        'indexBuiltAt': index.built_at,
+    })
+
+
+def handler(event, context):
+    if (event.get('httpMethod'), event.get('resource')) != ('GET', '/books/search'):
+        return json_response(404, {'error': 'Bulunamadı.'})
+    try:
+        return search(event)
+    except BadRequest as e:
+        return json_response(400, {'error': str(e)})
+    except Exception as e:
+        print(f"Search Error: {e}")
+        return json_response(500, {'error': 'Sunucu hatası', 'details': str(e)})
+
+
+# --- İndeks güncelleme (catalog_indexer çağrısı) ---
+
+def current_books(book_ids):
+    """
+    Kitapların tablodaki güncel hali: {bookId: kayıt veya None (silindi)}.
+    Stream görüntüsü yerine tablo (ConsistentRead) okunur; asenkron çağrılar
+    sırasız gelse de indekse kitabın son hali yazılır.
+    """
+    ids = list(dict.fromkeys(str(book_id) for book_id in book_ids))
+    books = dict.fromkeys(ids)
+    for start in range(0, len(ids), BATCH_GET_SIZE):
+        request = {BOOKS_TABLE_NAME: {
+            'Keys': [{'bookId': book_id} for book_id in ids[start:start + BATCH_GET_SIZE]],
+            'ProjectionExpression': INDEXED_FIELDS,
+            'ConsistentRead': True,
+        }}
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            for item in response['Responses'].get(BOOKS_TABLE_NAME, []):
+                books[str(item['bookId'])] = item
+            request = response.get('UnprocessedKeys')
+    return books
+
+
+def rebuild_index():
+    table = dynamodb.Table(BOOKS_TABLE_NAME)
+    kwargs = {
+        'ProjectionExpression': INDEXED_FIELDS,
+    }
+    items = []
+    while True:
+        response = table.scan(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return index_store().replace(items)
+
+
+def index_handler(event, context):
+    if event.get('action') == 'rebuild':
+        count = rebuild_index()
+        print(f"Arama indeksi yeniden oluşturuldu: {count} kitap")
+        return {'indexed': count}
+
+    changes = current_books(event.get('bookIds') or [])
+    count = index_store().update(changes) if changes else None
+    print(json.dumps({'changedBooks': len(changes), 'indexedBooks': count}))
+    return {'indexed': len(changes)}
@@ -0,0 +1,403 @@
+import os
+import datetime
+import uuid
+from botocore.exceptions import ClientError
+
+from library_common import codec
+from library_common.clients import lazy_client, lazy_resource
+from library_common.http import (
+    BadRequest, Forbidden, Unauthorized, cached_payload, cached_response, decode_cursor, encode_cursor, json_response,
+    page_limit, projection, query_param, require_admin, require_user,
+)
+from library_common.catalog_stats import StatsStore, summarize
+from library_common.loans import LoanError, LoanService
+
+# /books, /reading-lists, /loans ve /stats REST uçları.
+# Liste görünümleri tek bir küçük sayfa döner (Limit + LastEvaluatedKey imleci),
+# sadece istenen alanlar okunur (ProjectionExpression) ve GET yanıtları ETag
+# taşır; değişmeyen veri için istemciye gövdesiz 304 döner.
+# Okumalar düşük seviyeli istemciyle yapılır: kayıtlar Decimal'e uğramadan
+# doğrudan Python tiplerine çözülür (library_common.codec); yazımlar resource ile.
+dynamodb = lazy_resource('dynamodb')
+dynamodb_client = lazy_client('dynamodb')
+
+BOOKS_TABLE_NAME = os.environ.get('BOOKS_TABLE_NAME', 'LibraryBooks')
+LISTS_TABLE_NAME = os.environ.get('READING_LISTS_TABLE_NAME', 'ReadingLists')
+LOANS_TABLE_NAME = os.environ.get('LOANS_TABLE_NAME', 'UserLoans')
+LOAN_DAYS = int(os.environ.get('LOAN_DAYS', '14'))
+MAX_RETURNS_PER_REQUEST = 100
+STATS_TABLE_NAME = os.environ.get('STATS_TABLE_NAME', 'LibraryStats')
+# Sayaçlar stream ile birkaç saniye gecikmeli güncellenir; kısa süre önbellekte tutulabilir
+STATS_MAX_AGE_SECONDS = int(os.environ.get('STATS_MAX_AGE_SECONDS', '60'))
+
+# API alan adı -> tablo alanı
+BOOK_ALIASES = {'id': 'bookId'}
+BOOK_FIELDS = ('id', 'title', 'author', 'cover', 'genre', 'description', 'isbn', 'isAvailable')
+# Kart görünümü için yeterli alanlar (açıklama gibi uzun alanlar detayda okunur)
+BOOK_LIST_FIELDS = ('id', 'title', 'author', 'cover', 'genre', 'isAvailable')
+
+LIST_ALIASES = {'id': 'listId'}
+LIST_FIELDS = ('id', 'userId', 'name', 'description', 'createdAt', 'bookIds')
+
+BATCH_GET_SIZE = 100
+
+_loan_service = None
+_stats_store = None
+
+
+def loan_service():
+    global _loan_service
+    if _loan_service is None:
+        _loan_service = LoanService(dynamodb.meta.client, BOOKS_TABLE_NAME, LOANS_TABLE_NAME, LOAN_DAYS)
+    return _loan_service
+
+
+def stats_store():
+    global _stats_store
+    if _stats_store is None:
+        _stats_store = StatsStore(dynamodb.meta.client, STATS_TABLE_NAME)
+    return _stats_store
+
+
+def requested_fields(event, allowed, default):
+    fields = query_param(event, 'fields')
+    if not fields:
+        return default
+    selected = [f.strip() for f in fields.split(',') if f.strip() in allowed]
+    if not selected:
+        raise BadRequest(f"Geçerli alanlar: {', '.join(allowed)}")
+    return tuple(dict.fromkeys(['id'] + selected))
+
+
+def to_book(item):
+    book = {('id' if key == 'bookId' else key): value for key, value in item.items()}
+    if 'isAvailable' in book:
+        book['status'] = 'Müsait' if book['isAvailable'] else 'Ödünç Verilmiş'
+    return book
+
+
+def to_list(item):
+    reading_list = {('id' if key == 'listId' else key): value for key, value in item.items()}
+    if 'bookIds' in reading_list:
+        reading_list['bookIds'] = sorted(reading_list['bookIds'])
+    return reading_list
+
+
+def parse_body(event):
+    try:
+        body = codec.loads(event.get('body') or '{}')
+    except ValueError:
+        raise BadRequest('Geçersiz JSON gövdesi.')
+    if not isinstance(body, dict):
+        raise BadRequest('Geçersiz JSON gövdesi.')
+    return body
+
+
+def page(response):
+    """Kablo formatındaki LastEvaluatedKey -> imleç (resource ile aynı biçim)."""
+    return encode_cursor(codec.decode_item(response.get('LastEvaluatedKey')))
+
+
+def start_key(event):
+    """İmleç -> düşük seviyeli istemcinin ExclusiveStartKey'i."""
+    return codec.encode_item(decode_cursor(query_param(event, 'cursor')))
+
+
+def batch_get_books(book_ids, fields):
+    """Kitapları BatchGetItem ile (100'lük gruplar, işlenmeyen anahtarlar tekrar) okur."""
+    books = {}
+    ids = list(dict.fromkeys(book_ids))
+    for start in range(0, len(ids), BATCH_GET_SIZE):
+        request = {BOOKS_TABLE_NAME: {
+            'Keys': [{'bookId': {'S': book_id}} for book_id in ids[start:start + BATCH_GET_SIZE]],
+            **projection(fields, BOOK_ALIASES),
+        }}
+        while request:
+            response = dynamodb_client.batch_get_item(RequestItems=request)
+            for item in codec.decode_items(response['Responses'].get(BOOKS_TABLE_NAME, [])):
+                books[item['bookId']] = to_book(item)
+            request = response.get('UnprocessedKeys')
+    # Listedeki sırayı koru; silinmiş kitapları atla
+    return [books[book_id] for book_id in ids if book_id in books]
+
+
+# --- /books ---
+
+def list_books(event, params):
+    fields = requested_fields(event, BOOK_FIELDS, BOOK_LIST_FIELDS)
+    kwargs = {'TableName': BOOKS_TABLE_NAME, 'Limit': page_limit(event), **projection(fields, BOOK_ALIASES)}
+    exclusive_start_key = start_key(event)
+    if exclusive_start_key:
+        kwargs['ExclusiveStartKey'] = exclusive_start_key
+    response = dynamodb_client.scan(**kwargs)
+    # Kayıtlar çözülüp dönüştürülürken JSON'a yazılır
+    return cached_payload(event, codec.dumps_list(
+        (to_book(item) for item in codec.decode_items(response.get('Items', []))),
+        nextCursor=page(response)
+    ))
+
+
+def get_book(event, params):
+    fields = requested_fields(event, BOOK_FIELDS, BOOK_FIELDS)
+    item = dynamodb_client.get_item(
+        TableName=BOOKS_TABLE_NAME, Key={'bookId': {'S': params['bookId']}}, **projection(fields, BOOK_ALIASES)
+    ).get('Item')
+    if not item:
+        return json_response(404, {'error': 'Kitap bulunamadı.'})
+    return cached_response(event, to_book(codec.decode_item(item)))
+
+
+def save_book(event, params):
+    """
+    Kitap ekler veya günceller; sadece gönderilen alanlar yazılır. Müsaitlik
+    (isAvailable / currentLoanId) yalnızca /loans üzerinden LoanService ile
+    değişir; burada yazılsaydı aktif ödüncü olan kitap müsait görünebilirdi.
+    Katalog yazımı yönetici grubunu (ADMIN_GROUP) ister.
+    """
+    require_admin(event)
+    body = parse_body(event)
+    book_id = str(body.get('id') or body.get('bookId') or '')
+    if not book_id:
+        raise BadRequest('id alanı zorunludur.')
+    if 'isAvailable' in body or 'status' in body:
+        raise BadRequest('Kitap durumu buradan değiştirilemez; ödünç ve iade /loans ile yapılır.')
+    values = {field: body[field] for field in ('title', 'author', 'cover', 'genre', 'description', 'isbn')
+              if body.get(field) is not None}
+    if not values:
+        raise BadRequest('Güncellenecek alan yok.')
+
+    names = {f"#f{i}": field for i, field in enumerate(values)}
+    expression = 'SET ' + ', '.join(f"#f{i} = :v{i}" for i in range(len(values)))
+    attribute_values = {f":v{i}": value for i, value in enumerate(values.values())}
+    # Yeni kitaplar varsayılan olarak müsaittir
+    expression += ', #avail = if_not_exists(#avail, :true)'
+    names['#avail'] = 'isAvailable'
+    attribute_values[':true'] = True
+
+    item = dynamodb.Table(BOOKS_TABLE_NAME).update_item(
+        Key={'bookId': book_id},
+        UpdateExpression=expression,
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=attribute_values,
+        ReturnValues='ALL_NEW'
+    )['Attributes']
+    return json_response(200, to_book(item))
+
+
+def delete_book(event, params):
+    """Kitabı siler (yönetici); ödünçteki kitap iade edilmeden silinemez."""
+    require_admin(event)
+    book_id = params.get('bookId') or parse_body(event).get('id')
+    if not book_id:
+        raise BadRequest('id alanı zorunludur.')
+    try:
+        dynamodb.Table(BOOKS_TABLE_NAME).delete_item(
+            Key={'bookId': str(book_id)},
+            ConditionExpression='attribute_not_exists(currentLoanId)'
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return json_response(409, {'error': 'Ödünçteki kitap silinemez; önce iade edilmelidir.'})
+        raise
+    return json_response(200, {'deleted': str(book_id)})
+
+
+# --- /reading-lists ---
+# Liste sahibi Cognito token'ındaki kullanıcıdır. Yöneticiler (ADMIN_GROUP)
+# userId ile başka bir kullanıcının listelerini görebilir ve düzenleyebilir.
+
+def list_owner(event, body=None):
+    user_id = require_user(event)
+    owner = query_param(event, 'userId') or (body or {}).get('userId')
+    if owner and owner != user_id:
+        require_admin(event)
+        return str(owner)
+    return user_id
+
+
+def list_reading_lists(event, params):
+    """
+    Kullanıcının listeleri: userId bölümünde tek bir Query sayfası.
+    scope=all (yönetim paneli, sadece yöneticiler) tüm listelerin sayfalı taramasıdır.
+    """
+    fields = requested_fields(event, LIST_FIELDS, LIST_FIELDS)
+    kwargs = {'TableName': LISTS_TABLE_NAME, 'Limit': page_limit(event, default=50),
+              **projection(fields, LIST_ALIASES)}
+    exclusive_start_key = start_key(event)
+    if exclusive_start_key:
+        kwargs['ExclusiveStartKey'] = exclusive_start_key
+
+    if query_param(event, 'scope') == 'all':
+        require_admin(event)
+        response = dynamodb_client.scan(**kwargs)
+    else:
+        user_id = list_owner(event)
+        kwargs['ExpressionAttributeNames']['#owner'] = 'userId'
+        response = dynamodb_client.query(
+            KeyConditionExpression='#owner = :owner', ExpressionAttributeValues={':owner': {'S': user_id}}, **kwargs
+        )
+    return cached_payload(event, codec.dumps_list(
+        (to_list(item) for item in codec.decode_items(response.get('Items', []))),
+        nextCursor=page(response)
+    ))
+
+
+def get_reading_list(event, params):
+    """Tek liste; include=books ile listedeki kitaplar da aynı yanıtta döner."""
+    user_id = list_owner(event)
+    item = dynamodb_client.get_item(
+        TableName=LISTS_TABLE_NAME, Key={'userId': {'S': user_id}, 'listId': {'S': params['listId']}}
+    ).get('Item')
+    if not item:
+        return json_response(404, {'error': 'Liste bulunamadı.'})
+    reading_list = to_list(codec.decode_item(item))
+    if query_param(event, 'include') == 'books':
+        fields = requested_fields(event, BOOK_FIELDS, BOOK_LIST_FIELDS)
+        reading_list['books'] = batch_get_books(reading_list.get('bookIds', []), fields)
+    return cached_response(event, reading_list)
+
+
+def create_reading_list(event, params):
+    body = parse_body(event)
+    user_id = list_owner(event, body)
+    name = (body.get('name') or '').strip()
+    if not name:
+        raise BadRequest('name zorunludur.')
+    item = {
+        'userId': user_id,
+        'listId': uuid.uuid4().hex,
+        'name': name,
+        'description': body.get('description', ''),
+        'createdAt': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+    book_ids = {str(book_id) for book_id in body.get('bookIds') or []}
+    if book_ids:
+        item['bookIds'] = book_ids # Boş string set DynamoDB'de yazılamaz
+    dynamodb.Table(LISTS_TABLE_NAME).put_item(Item=item)
+    return json_response(201, to_list(item))
+
+
+def update_reading_list(event, params):
+    """{action: 'add' | 'remove', bookId} ile listeye kitap ekler/çıkarır."""
+    body = parse_body(event)
+    user_id = list_owner(event, body)
+    action = body.get('action')
+    book_id = body.get('bookId')
+    if not (book_id and action in ('add', 'remove')):
+        raise BadRequest("bookId ve action ('add' | 'remove') zorunludur.")
+    try:
+        item = dynamodb.Table(LISTS_TABLE_NAME).update_item(
+            Key={'userId': user_id, 'listId': params['listId']},
+            UpdateExpression=f"{'ADD' if action == 'add' else 'DELETE'} bookIds :ids",
+            ConditionExpression='attribute_exists(listId)',
+            ExpressionAttributeValues={':ids': {str(book_id)}},
+            ReturnValues='ALL_NEW'
+        )['Attributes']
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return json_response(404, {'error': 'Liste bulunamadı.'})
+        raise
+    return json_response(200, to_list(item))
+
+
+def delete_reading_list(event, params):
+    user_id = list_owner(event)
+    dynamodb.Table(LISTS_TABLE_NAME).delete_item(Key={'userId': user_id, 'listId': params['listId']})
+    return json_response(200, {'deleted': params['listId']})
+
+
+# --- /loans ---
+# Kullanıcı sadece Cognito token'ından alınır (X-User-ID / userId ile başkasının
+# ödünçleri listelenemez, ödünç alınamaz veya iade edilemez).
+
+def list_loans(event, params):
+    """Kullanıcının ödünçleri (yeniden eskiye); status=active sadece iade edilmemişler."""
+    user_id = require_user(event)
+    items, last_key = loan_service().list_loans(
+        user_id,
+        active_only=query_param(event, 'status') == 'active',
+        limit=page_limit(event, default=50),
+        start_key=decode_cursor(query_param(event, 'cursor'))
+    )
+    return cached_response(event, {'items': items, 'nextCursor': encode_cursor(last_key)})
+
+
+def checkout_book(event, params):
+    user_id = require_user(event)
+    body = parse_body(event)
+    book_id = body.get('bookId')
+    if not book_id:
+        raise BadRequest('bookId zorunludur.')
+    try:
+        loan = loan_service().checkout(user_id, str(book_id))
+    except LoanError as e:
+        return json_response(e.status, {'error': str(e)})
+    return json_response(201, loan)
+
+
+def return_books(event, params):
+    """{loanIds: [...]} ile birden fazla ödüncü tek istekte iade eder."""
+    user_id = require_user(event)
+    body = parse_body(event)
+    loan_ids = body.get('loanIds') or ([body['loanId']] if body.get('loanId') else [])
+    if not (isinstance(loan_ids, list) and loan_ids):
+        raise BadRequest('loanIds zorunludur.')
+    if len(loan_ids) > MAX_RETURNS_PER_REQUEST:
+        raise BadRequest(f"Tek istekte en fazla {MAX_RETURNS_PER_REQUEST} iade yapılabilir.")
+    result = loan_service().return_loans(user_id, loan_ids)
+    # Kısmi başarı: iade edilenler ve edilemeyenler birlikte döner
+    return json_response(200 if result['returned'] or not result['failed'] else 409, result)
+
+
+# --- /stats ---
+
+def get_stats(event, params):
+    """
+    Yönetim paneli özeti: kitap / müsait / ödünçte sayıları, tür ve yazar
+    dağılımı, liste ve kullanıcı sayıları. Katalog boyutundan bağımsız olarak
+    iki kayıtlık tek bir BatchGetItem'dır.
+    """
+    try:
+        top_authors = int(query_param(event, 'authors', '10'))
+    except ValueError:
+        raise BadRequest('authors sayı olmalıdır.')
+    body = summarize(stats_store().read_summary(), top_authors=max(0, min(top_authors, 100)))
+    return cached_response(event, body, cache_control=f"public, max-age={STATS_MAX_AGE_SECONDS}")
+
+
+ROUTES = {
+    ('GET', '/books'): list_books,
+    ('POST', '/books'): save_book,
+    ('DELETE', '/books'): delete_book,
+    ('GET', '/books/{bookId}'): get_book,
+    ('DELETE', '/books/{bookId}'): delete_book,
+    ('GET', '/reading-lists'): list_reading_lists,
+    ('POST', '/reading-lists'): create_reading_list,
+    ('GET', '/reading-lists/{listId}'): get_reading_list,
+    ('PUT', '/reading-lists/{listId}'): update_reading_list,
+    ('DELETE', '/reading-lists/{listId}'): delete_reading_list,
+    ('GET', '/loans'): list_loans,
+    ('POST', '/loans'): checkout_book,
+    ('POST', '/loans/return'): return_books,
+    ('GET', '/stats'): get_stats,
+}
+
+
+def handler(event, context):
+    route = ROUTES.get((event.get('httpMethod'), event.get('resource')))
+    if not route:
+        return json_response(404, {'error': 'Bulunamadı.'})
+    try:
+        return route(event, event.get('pathParameters') or {})
+    except BadRequest as e:
+        return json_response(400, {'error': str(e)})
+    except Unauthorized as e:
+        return json_response(401, {'error': str(e)})
+    except Forbidden as e:
+        return json_response(403, {'error': str(e)})
+    except ClientError as e:
+        print(f"DynamoDB Error: {e}")
+        return json_response(500, {'error': 'AWS Service Error', 'details': str(e)})
+    except Exception as e:
+        print(f"Error: {e}")
+        return json_response(500, {'error': 'Sunucu hatası', 'details': str(e)})
@@ -0,0 +1,93 @@
+import json
+import os
+import urllib.parse
+
+from library_common.catalog_import import CatalogLoader, detect_format, iter_records
+from library_common.clients import lazy_client, lazy_resource
+
+# LibraryDocumentsBucket'a catalog-imports/ altına yüklenen CSV / JSONL
+# kataloglarını LibraryBooks tablosuna aktarır. Süre dolmadan önce kontrol
+# noktasını S3'e yazar ve kendini aynı dosya için yeniden çağırır; dosya
+# değişmediyse (ETag) kaldığı satırdan devam eder.
+#
+# Elle başlatmak için: {"bucket": "...", "key": "catalog-imports/books.csv"}
+dynamodb = lazy_resource('dynamodb')
+s3 = lazy_client('s3')
+lambda_client = lazy_client('lambda')
+
+BOOKS_TABLE_NAME = os.environ.get('BOOKS_TABLE_NAME', 'LibraryBooks')
+DOCUMENTS_BUCKET_NAME = os.environ.get('DOCUMENTS_BUCKET_NAME')
+CHECKPOINT_PREFIX = os.environ.get('IMPORT_CHECKPOINT_PREFIX', 'catalog-imports/_checkpoints/')
+WORKERS = int(os.environ.get('IMPORT_WORKERS', '16'))
+# Bu kadar süre kala yeni grup üretmeyi bırak, bekleyenleri bitir ve devam çağrısı yap
+SAFETY_MARGIN_MS = int(os.environ.get('IMPORT_SAFETY_MARGIN_MS', '60000'))
+
+
+def targets(event):
+    """S3 bildirimi veya elle verilen {bucket, key} -> [(bucket, key)]"""
+    if 'Records' in event:
+        return [(record['s3']['bucket']['name'], urllib.parse.unquote_plus(record['s3']['object']['key']))
+                for record in event['Records'] if 's3' in record]
+    return [(event.get('bucket', DOCUMENTS_BUCKET_NAME), event['key'])]
+
+
+def checkpoint_key(key):
+    return CHECKPOINT_PREFIX + key.replace('/', '__') + '.json'
+
+
+def read_checkpoint(bucket, key, etag):
+    try:
+        body = s3.get_object(Bucket=bucket, Key=checkpoint_key(key))['Body'].read()
+    except s3.exceptions.NoSuchKey:
+        return {'committedRows': 0}
+    checkpoint = json.loads(body)
+    # Dosya değiştiyse baştan başla
+    if checkpoint.get('etag') != etag:
+        return {'committedRows': 0}
+    return checkpoint
+
+
+def write_checkpoint(bucket, key, etag, committed_rows, result):
+    s3.put_object(
+        Bucket=bucket,
+        Key=checkpoint_key(key),
+        Body=json.dumps({**result, 'etag': etag, 'committedRows': committed_rows}).encode('utf-8'),
+        ContentType='application/json'
+    )
+
+
+def import_object(bucket, key, context):
+    obj = s3.get_object(Bucket=bucket, Key=key)
+    etag = obj['ETag']
+    checkpoint = read_checkpoint(bucket, key, etag)
+    if checkpoint.get('complete'):
+        print(f"{key} zaten içe aktarılmış, atlanıyor.")
+        return checkpoint
+
+    loader = CatalogLoader(
+        dynamodb.meta.client, BOOKS_TABLE_NAME, workers=WORKERS,
+        on_checkpoint=lambda rows, result: write_checkpoint(bucket, key, etag, rows, result)
+    )
+    result = loader.load(
+        iter_records(obj['Body'], detect_format(key)),
+        start_row=checkpoint['committedRows'],
+        should_stop=lambda: context.get_remaining_time_in_millis() < SAFETY_MARGIN_MS
+    )
+    print(json.dumps({'key': key, **result}))
+
+    if not result['complete']:
+        lambda_client.invoke(
+            FunctionName=context.function_name,
+            InvocationType='Event',
+            Payload=json.dumps({'bucket': bucket, 'key': key}).encode('utf-8')
+        )
+    return result
+
+
+def handler(event, context):
+    results = []
+    for bucket, key in targets(event):
+        if key.startswith(CHECKPOINT_PREFIX):
+            continue
+        results.append(import_object(bucket, key, context))
+    return {'imports': results}
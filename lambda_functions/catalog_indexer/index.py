@@ -0,0 +1,133 @@
+import json
+import os
+from boto3.dynamodb.types import TypeDeserializer
+
+from library_common.clients import get_resource, lazy_client
+from library_common.catalog_index import book_postings, bump_catalog_version
+from library_common.response_cache import ANY_BOOK, invalidate_book_dependencies
+from library_common.search_index import to_record
+
+# LibraryBooks DynamoDB Stream'ini dinleyerek LibraryBookIndex tablosunu güncel tutar.
+# {"action": "rebuild"} ile elle çağrıldığında tüm kataloğu baştan indeksler.
+# Her çağrı DynamoDB kullandığından kaynak init aşamasında kurulur.
+# DynamoDB Streams bir shard'ı en fazla iki okuyucuya verir (bu fonksiyon ve
+# catalog_stats); S3 arama indeksi bu yüzden ayrı bir stream okuyucusu değildir:
+# aramayı etkileyen kitaplar book_search.index_handler'a asenkron bildirilir.
+dynamodb = get_resource('dynamodb')
+lambda_client = lazy_client('lambda')
+
+BOOKS_TABLE_NAME = os.environ.get('BOOKS_TABLE_NAME', 'LibraryBooks')
+INDEX_TABLE_NAME = os.environ.get('INDEX_TABLE_NAME', 'LibraryBookIndex')
+RESPONSE_CACHE_TABLE_NAME = os.environ.get('RESPONSE_CACHE_TABLE_NAME')
+SEARCH_INDEXER_FUNCTION_NAME = os.environ.get('SEARCH_INDEXER_FUNCTION_NAME')
+
+_deserializer = TypeDeserializer()
+
+
+def _deserialize(image):
+    if not image:
+        return None
+    return {key: _deserializer.deserialize(value) for key, value in image.items()}
+
+
+def apply_change(writer, old_book, new_book):
+    """
+    Bir kitabın eski ve yeni hali arasındaki farkı indekse yazar.
+    Sadece değişen kelimeler silinir/eklenir. Kelimeler değiştiyse True döner.
+    """
+    book = new_book or old_book
+    book_id = book['bookId']
+    old_postings = book_postings(old_book)
+    new_postings = book_postings(new_book)
+
+    for token in old_postings.keys() - new_postings.keys():
+        writer.delete_item(Key={'token': token, 'bookId': book_id})
+    for token, weight in new_postings.items():
+        if old_postings.get(token) != weight:
+            writer.put_item(Item={'token': token, 'bookId': book_id, 'w': weight})
+    return old_postings != new_postings
+
+
+def invalidate_responses(book_ids, structural):
+    """Değişen kitaplara dayanan önbellekteki asistan yanıtlarını siler."""
+    if not RESPONSE_CACHE_TABLE_NAME:
+        return 0
+    ids = set(book_ids)
+    if structural:
+        ids.add(ANY_BOOK)
+    return invalidate_book_dependencies(dynamodb.Table(RESPONSE_CACHE_TABLE_NAME), ids)
+
+
+def search_changed(old_book, new_book):
+    """Ekleme / silme veya arama indeksindeki bir alanın (başlık, yazar, tür, kapak, durum) değişmesi."""
+    return not (old_book and new_book) or to_record(old_book) != to_record(new_book)
+
+
+def notify_search_index(book_ids):
+    """Arama indeksini değişen kitaplar için günceller (InvocationType=Event; kitaplar tablodan okunur)."""
+    if not (SEARCH_INDEXER_FUNCTION_NAME and book_ids):
+        return 0
+    lambda_client.invoke(
+        FunctionName=SEARCH_INDEXER_FUNCTION_NAME,
+        InvocationType='Event',
+        Payload=json.dumps({'bookIds': sorted(book_ids)}).encode('utf-8')
+    )
+    return len(book_ids)
+
+
+def rebuild_index():
+    """LibraryBooks tablosunu baştan sona tarayıp indeksi yeniden yazar."""
+    books_table = dynamodb.Table(BOOKS_TABLE_NAME)
+    index_table = dynamodb.Table(INDEX_TABLE_NAME)
+    kwargs = {'ProjectionExpression': 'bookId, title, author'}
+    count = 0
+    with index_table.batch_writer(overwrite_by_pkeys=['token', 'bookId']) as writer:
+        while True:
+            response = books_table.scan(**kwargs)
+            for book in response.get('Items', []):
+                apply_change(writer, None, book)
+                count += 1
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    bump_catalog_version(index_table, [], structural=True)
+    invalidate_responses([], structural=True)
+    return count
+
+
+def handler(event, context):
+    if event.get('action') == 'rebuild':
+        count = rebuild_index()
+        print(f"İndeks yeniden oluşturuldu: {count} kitap")
+        return {'indexed': count}
+
+    index_table = dynamodb.Table(INDEX_TABLE_NAME)
+    records = event.get('Records', [])
+    changed_ids = set()
+    search_ids = set()
+    structural = False
+    with index_table.batch_writer(overwrite_by_pkeys=['token', 'bookId']) as writer:
+        for record in records:
+            change = record.get('dynamodb', {})
+            old_book = _deserialize(change.get('OldImage'))
+            new_book = _deserialize(change.get('NewImage'))
+            if not (old_book or new_book):
+                continue
+            structural |= apply_change(writer, old_book, new_book)
+            book_id = (new_book or old_book)['bookId']
+            changed_ids.add(book_id)
+            if search_changed(old_book, new_book):
+                search_ids.add(book_id)
+
+    # Lambda içi katalog önbelleklerinin tazelenmesi için sürümü artır
+    version = None
+    invalidated = 0
+    if changed_ids:
+        version = bump_catalog_version(index_table, changed_ids, structural)
+        invalidated = invalidate_responses(changed_ids, structural)
+    # Bildirim başarısız olursa grup yeniden denenir (indeks yazımları tekrar edilebilir)
+    search_notified = notify_search_index(search_ids)
+
+    print(json.dumps({'indexedRecords': len(records), 'catalogVersion': version, 'structural': structural,
+                      'invalidatedResponses': invalidated, 'searchNotified': search_notified}))
+    return {'indexed': len(records)}
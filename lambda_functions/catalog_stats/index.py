@@ -0,0 +1,113 @@
+import datetime
+import json
+import os
+from boto3.dynamodb.types import TypeDeserializer
+
+from library_common.clients import lazy_resource
+from library_common.catalog_stats import (
+    CATALOG, LISTS, StatsChanges, StatsStore, book_counters, counter_delta, list_counters,
+)
+
+# LibraryBooks ve ReadingLists DynamoDB Stream'lerini dinleyerek LibraryStats
+# özet kayıtlarındaki sayaçları günceller (GET /stats bunları okur).
+# {"action": "rebuild"} ile elle çağrıldığında sayaçları tablolardan baştan hesaplar.
+dynamodb = lazy_resource('dynamodb')
+
+BOOKS_TABLE_NAME = os.environ.get('BOOKS_TABLE_NAME', 'LibraryBooks')
+LISTS_TABLE_NAME = os.environ.get('READING_LISTS_TABLE_NAME', 'ReadingLists')
+STATS_TABLE_NAME = os.environ.get('STATS_TABLE_NAME', 'LibraryStats')
+
+_deserializer = TypeDeserializer()
+_stats_store = None
+
+
+def stats_store():
+    global _stats_store
+    if _stats_store is None:
+        _stats_store = StatsStore(dynamodb.meta.client, STATS_TABLE_NAME)
+    return _stats_store
+
+
+def _deserialize(image):
+    if not image:
+        return None
+    return {key: _deserializer.deserialize(value) for key, value in image.items()}
+
+
+def _source_table(record):
+    # arn:aws:dynamodb:<bölge>:<hesap>:table/<tablo>/stream/<zaman>
+    arn = record.get('eventSourceARN', '')
+    return arn.split(':table/', 1)[-1].split('/', 1)[0]
+
+
+def _created_at(change):
+    seconds = change.get('ApproximateCreationDateTime')
+    if seconds is None:
+        return ''
+    return datetime.datetime.fromtimestamp(float(seconds), datetime.timezone.utc).isoformat()
+
+
+def record_change(record):
+    """Stream kaydı -> (statId, sayaç farkı, userId, liste sayısı farkı); ilgisizse None."""
+    change = record.get('dynamodb', {})
+    old = _deserialize(change.get('OldImage'))
+    new = _deserialize(change.get('NewImage'))
+    table = _source_table(record)
+    if table == BOOKS_TABLE_NAME:
+        return CATALOG, counter_delta(book_counters(old), book_counters(new)), None, 0
+    if table == LISTS_TABLE_NAME and (old or new):
+        user_id = (new or old)['userId']
+        return LISTS, counter_delta(list_counters(old), list_counters(new)), user_id, bool(new) - bool(old)
+    return None
+
+
+def _scan(table_name, projection):
+    """Tablonun tüm kayıtlarını (sadece gerekli alanlar) sayfa sayfa döner."""
+    table = dynamodb.Table(table_name)
+    kwargs = {'ProjectionExpression': ', '.join(f"#p{i}" for i in range(len(projection))),
+              'ExpressionAttributeNames': {f"#p{i}": name for i, name in enumerate(projection)}}
+    while True:
+        response = table.scan(**kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def rebuild_stats():
+    return stats_store().rebuild(
+        _scan(BOOKS_TABLE_NAME, ('bookId', 'genre', 'author', 'isAvailable')),
+        _scan(LISTS_TABLE_NAME, ('userId', 'listId', 'bookIds')),
+    )
+
+
+def handler(event, context):
+    if event.get('action') == 'rebuild':
+        result = rebuild_stats()
+        print(f"İstatistikler yeniden hesaplandı: {json.dumps(result)}")
+        return result
+
+    records = event.get('Records', [])
+    # Kayıtlar sırayla gruplanır; bir grup tek transaction'a sığmalıdır
+    groups = [StatsChanges()]
+    for record in records:
+        change = record_change(record)
+        if not change:
+            continue
+        stat_id, delta, user_id, user_delta = change
+        if not (delta or user_delta):
+            continue
+        if not groups[-1].fits(stat_id, delta, user_id):
+            groups.append(StatsChanges())
+        groups[-1].add(record.get('eventID', ''), stat_id, delta, user_id, user_delta,
+                       _created_at(record.get('dynamodb', {})))
+
+    applied = skipped = 0
+    for changes in filter(None, groups):
+        if stats_store().apply(changes):
+            applied += 1
+        else:
+            skipped += 1
+
+    print(json.dumps({'statsRecords': len(records), 'appliedGroups': applied, 'skippedGroups': skipped}))
+    return {'processed': len(records)}
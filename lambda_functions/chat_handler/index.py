@@ -1,86 +1,198 @@
 import json
-import boto3
 import os
-import datetime
 import uuid
+from contextlib import nullcontext
 from botocore.exceptions import ClientError
 
-# İstemcileri handler dışında başlatarak performansı artırıyoruz (Cold Start optimizasyonu)
-dynamodb = boto3.resource('dynamodb')
-bedrock = boto3.client('bedrock-runtime')
+from library_common.admission import Flight, RateLimited, RequestAdmission, requester
+from library_common import codec
+from library_common.after_response import AfterResponseHook
+from library_common.bedrock_scheduler import BedrockScheduler, ModelSaturated
+from library_common.bedrock_stream import iter_claude_text
+from library_common.buffered_writer import BufferedBatchWriter
+from library_common.clients import get_client, get_resource
+from library_common.http import Unauthorized
+from library_common.metrics import Tracer
+from library_common.session_memory import KEY_NAMES, SessionMemory
+from library_common.websocket import WebSocketSender, is_websocket_event
+
+# İstemciler handler dışında (init aşamasında) kurulur. Her çağrı ikisini de
+# kullandığından tembel kurulum maliyeti sadece ilk isteğe taşır; init'te kurmak
+# soğuk başlangıcın toplamını değiştirmez, ilk isteği hızlandırır.
+dynamodb = get_resource('dynamodb')
+bedrock = get_client('bedrock-runtime')
+
+# Aşama süreleri ve token kullanımı (CloudWatch EMF)
+tracer = Tracer('ChatHandler')
 
 # Çevresel değişkenlerden tablo adını alıyoruz
 TABLE_NAME = os.environ.get('TABLE_NAME')
 table = dynamodb.Table(TABLE_NAME)
 
+# session_id oturum tablosunun anahtarıdır; sayı / nesne gibi değerler reddedilir
+SESSION_ID_ERROR = 'session_id must be a string'
+
 # Claude 3 Sonnet Model ID
 MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+# Sonnet kısıtlandığında aynı istek formatıyla denenecek daha hızlı model
+FALLBACK_MODEL_ID = os.environ.get('FALLBACK_MODEL_ID', "anthropic.claude-3-haiku-20240307-v1:0")
+
+# Model başına hız sınırı, kalan süreye göre yeniden deneme ve yedek model
+bedrock_scheduler = BedrockScheduler(
+    bedrock,
+    rates=json.loads(os.environ.get('MODEL_RATE_LIMITS') or '{}'),
+    default_rate=float(os.environ.get('MODEL_DEFAULT_RATE', '5')),
+    burst=int(os.environ.get('MODEL_BURST', '10')),
+    fallbacks={MODEL_ID: [FALLBACK_MODEL_ID]} if FALLBACK_MODEL_ID else None,
+    reserve_ms=int(os.environ.get('MODEL_RESERVE_MS', '3000')),
+    tracer=tracer
+)
+
+# Oturum hafızası: son N tur + eski turların özeti, token bütçesi ile sınırlı
+memory = SessionMemory(
+    table,
+    max_turns=int(os.environ.get('SESSION_MAX_TURNS', '10')),
+    token_budget=int(os.environ.get('SESSION_TOKEN_BUDGET', '3000'))
+)
+
+# Kullanıcı başına hız sınırı ve aynı isteklerin birleştirilmesi (tablo tanımlıysa)
+ADMISSION_TABLE_NAME = os.environ.get('ADMISSION_TABLE_NAME')
+request_admission = None
+if ADMISSION_TABLE_NAME:
+    request_admission = RequestAdmission(
+        dynamodb.Table(ADMISSION_TABLE_NAME),
+        rate_per_minute=float(os.environ.get('RATE_LIMIT_PER_MINUTE', '10')),
+        burst=int(os.environ.get('RATE_LIMIT_BURST', '5')),
+        coalesce_seconds=int(os.environ.get('COALESCE_WINDOW_SECONDS', '10')),
+        tracer=tracer
+    )
 
+# Geçmiş kayıtları tamponlanır ve yanıt döndükten sonra batch_write_item ile
+# yazılır (internal extension ortamı, yazım bitene kadar dondurmaz)
+history_writer = BufferedBatchWriter(dynamodb.meta.client)
+after_response = AfterResponseHook('chat-history-writer').start()
+
+def build_payload(user_message, session):
+    """Claude 3 için payload formatı (oturum geçmişi ile)"""
+    payload = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": 1000,
+        "messages": session.anthropic_messages(user_message)
+    }
+    summary = session.summary_prompt()
+    if summary:
+        payload["system"] = summary
+    return payload
+
+def serialize(payload):
+    with tracer.stage('Serialize'):
+        return codec.dumps(payload)
+
+def admit(event, user_message):
+    """Model çağrılmadan önce istek kabulü; tablo tanımlı değilse her istek kabul edilir."""
+    if not request_admission:
+        return nullcontext(Flight(None, None, None))
+    return request_admission.admit(requester(event), user_message, max_wait=bedrock_scheduler.remaining())
+
+def save_history(session, user_message, bot_response):
+    """Geçmişi DynamoDB'ye kaydet (gerekirse özet kaydı da güncellenir); yazım yanıttan sonra yapılır"""
+    for item in memory.turn_items(session, user_message, bot_response):
+        history_writer.put(TABLE_NAME, item, KEY_NAMES)
+    after_response.defer(history_writer.flush)
+
+@after_response.wrap
+@tracer.wrap
+@bedrock_scheduler.wrap
 def handler(event, context):
+    if is_websocket_event(event):
+        return stream_handler(event, context)
+
     try:
         # 1. Gelen isteği ayrıştır (Parse input)
-        body = json.loads(event.get('body', '{}'))
+        with tracer.stage('Parse'):
+            body = codec.loads(event.get('body', '{}'))
         user_message = body.get('message')
-        session_id = body.get('session_id', str(uuid.uuid4())) # Session ID yoksa yeni oluştur
+        session_id = body.get('session_id') or str(uuid.uuid4()) # Session ID yoksa (veya null / boşsa) yeni oluştur
         
         if not user_message:
             return {
                 'statusCode': 400,
                 'body': json.dumps({'error': 'Message field is required'})
             }
+        if not isinstance(session_id, str):
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': SESSION_ID_ERROR})
+            }
 
-        # 2. Bedrock (Claude 3 Sonnet) API'sini çağır
-        # Claude 3 için payload formatı
-        payload = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 1000,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": user_message
-                        }
-                    ]
-                }
-            ]
-        }
+        # 2. Hız sınırı (aşıldıysa model çağrılmadan 429) ve aynı isteğin birleştirilmesi
+        with admit(event, user_message) as flight:
+            if flight.coalesced:
+                bot_response = flight.result['response']
+            else:
+                # 3. Oturum geçmişini oku (tek Query) ve Bedrock (Claude 3 Sonnet) API'sini çağır
+                with tracer.stage('Session'):
+                    session = memory.load(session_id, user_message)
+                payload = build_payload(user_message, session)
 
-        response = bedrock.invoke_model(
-            modelId=MODEL_ID,
-            body=json.dumps(payload)
-        )
+                with tracer.stage('Model'):
+                    response = bedrock_scheduler.invoke_model(
+                        modelId=MODEL_ID,
+                        body=codec.dumps_bytes(payload)
+                    )
+                    # Yanıtı işle (gövde baytları doğrudan çözülür)
+                    response_body = codec.loads(response['body'].read())
+                bot_response = response_body['content'][0]['text']
+                tracer.add_usage(response_body.get('usage'))
+                flight.complete({'response': bot_response})
 
-        # Yanıtı işle
-        response_body = json.loads(response['body'].read())
-        bot_response = response_body['content'][0]['text']
+                # 4. Geçmişi DynamoDB'ye kaydet (birleştirilen istekte lider zaten kaydetti)
+                save_history(session, user_message, bot_response)
 
-        # 3. Geçmişi DynamoDB'ye kaydet
-        timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
-        
-        table.put_item(
-            Item={
-                'sessionId': session_id,
-                'timestamp': timestamp,
-                'user_message': user_message,
-                'bot_response': bot_response
-            }
-        )
-
-        # 4. Yanıtı dön
+        # 5. Yanıtı dön
         return {
             'statusCode': 200,
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*' # CORS için
             },
-            'body': json.dumps({
+            'body': serialize({
                 'session_id': session_id,
                 'response': bot_response
             })
         }
 
+    except ModelSaturated as e:
+        print(f"Bedrock Error: {e}")
+        return {
+            'statusCode': 503,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Retry-After': str(e.retry_after)
+            },
+            'body': json.dumps({'error': 'Model is busy, please retry later', 'retryAfter': e.retry_after})
+        }
+    except Unauthorized as e:
+        return {
+            'statusCode': 401,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': str(e)})
+        }
+    except RateLimited as e:
+        print(f"Admission: {e}")
+        return {
+            'statusCode': 429,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Retry-After': str(e.retry_after)
+            },
+            'body': json.dumps({'error': 'Too many requests, please retry later', 'retryAfter': e.retry_after})
+        }
     except ClientError as e:
         print(f"AWS Error: {e}")
         return {
@@ -93,3 +205,73 @@ def handler(event, context):
             'statusCode': 500,
             'body': json.dumps({'error': 'Internal Server Error', 'details': str(e)})
         }
+
+
+def stream_handler(event, context):
+    """
+    WebSocket üzerinden gelen mesajı işler; model yanıtı
+    invoke_model_with_response_stream ile parça parça gönderilir.
+    """
+    route_key = event['requestContext'].get('routeKey')
+    if route_key in ('$connect', '$disconnect'):
+        return {'statusCode': 200}
+
+    body = codec.loads(event.get('body') or '{}')
+    sender = WebSocketSender(event, body.get('requestId'))
+    user_message = body.get('message')
+    session_id = body.get('session_id') or str(uuid.uuid4())
+    if not user_message:
+        sender.send({'type': 'error', 'error': 'Message field is required'})
+        return {'statusCode': 400}
+    if not isinstance(session_id, str):
+        sender.send({'type': 'error', 'error': SESSION_ID_ERROR})
+        return {'statusCode': 400}
+
+    try:
+        with admit(event, user_message) as flight:
+            sender.send({'type': 'start', 'session_id': session_id})
+            if flight.coalesced:
+                sender.delta(flight.result['response'])
+                sender.send({'type': 'done', 'session_id': session_id, 'response': flight.result['response'],
+                             'coalesced': True})
+                return {'statusCode': 200}
+
+            with tracer.stage('Session'):
+                session = memory.load(session_id, user_message)
+            usage = {}
+            with tracer.stage('Model'):
+                response = bedrock_scheduler.invoke_model_with_response_stream(
+                    modelId=MODEL_ID,
+                    body=codec.dumps_bytes(build_payload(user_message, session))
+                )
+                parts = []
+                for text in iter_claude_text(response, usage):
+                    parts.append(text)
+                    sender.delta(text)
+            bot_response = ''.join(parts)
+            tracer.add_usage(usage)
+            flight.complete({'response': bot_response})
+
+            sender.send({'type': 'done', 'session_id': session_id, 'response': bot_response})
+            save_history(session, user_message, bot_response)
+            return {'statusCode': 200}
+
+    except Unauthorized as e:
+        sender.send({'type': 'error', 'error': str(e)})
+        return {'statusCode': 401}
+    except RateLimited as e:
+        print(f"Admission: {e}")
+        sender.send({'type': 'error', 'error': 'Too many requests, please retry later', 'retryAfter': e.retry_after})
+        return {'statusCode': 429}
+    except ModelSaturated as e:
+        print(f"Bedrock Error: {e}")
+        sender.send({'type': 'error', 'error': 'Model is busy, please retry later', 'retryAfter': e.retry_after})
+        return {'statusCode': 503}
+    except ClientError as e:
+        print(f"AWS Error: {e}")
+        sender.send({'type': 'error', 'error': 'AWS Service Error', 'details': str(e)})
+        return {'statusCode': 500}
+    except Exception as e:
+        print(f"Error: {e}")
+        sender.send({'type': 'error', 'error': 'Internal Server Error', 'details': str(e)})
+        return {'statusCode': 500}
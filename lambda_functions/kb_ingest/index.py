@@ -0,0 +1,77 @@
+import json
+import os
+import urllib.parse
+
+from library_common.clients import lazy_client
+from library_common.kb_ingest import DocumentIngestor, KnowledgeBaseSink
+
+# LibraryDocumentsBucket içindeki documents/ altındaki belgeler değişince (S3
+# olayı) sadece değişen parçaları bilgi bankasına yazar / siler.
+# {"action": "sync", "keys": [...]} ile elle çağrılabilir; {"action": "sync"}
+# (anahtar verilmeden) önekteki tüm belgeleri eşitler.
+s3 = lazy_client('s3')
+bedrock_agent = lazy_client('bedrock-agent')
+
+DOCUMENTS_BUCKET_NAME = os.environ.get('DOCUMENTS_BUCKET_NAME')
+DOCUMENTS_PREFIX = os.environ.get('DOCUMENTS_PREFIX', 'documents/')
+MANIFEST_PREFIX = os.environ.get('KB_MANIFEST_PREFIX', 'kb-manifests/')
+KNOWLEDGE_BASE_ID = os.environ.get('KNOWLEDGE_BASE_ID')
+DATA_SOURCE_ID = os.environ.get('KB_DATA_SOURCE_ID')
+INGEST_WORKERS = int(os.environ.get('KB_INGEST_WORKERS', '4'))
+
+_ingestor = None
+
+
+def ingestor():
+    global _ingestor
+    if _ingestor is None:
+        sink = KnowledgeBaseSink(bedrock_agent, KNOWLEDGE_BASE_ID, DATA_SOURCE_ID, workers=INGEST_WORKERS)
+        _ingestor = DocumentIngestor(s3, DOCUMENTS_BUCKET_NAME, sink, manifest_prefix=MANIFEST_PREFIX)
+    return _ingestor
+
+
+def event_keys(event):
+    """S3 olayındaki nesne anahtarları (sırası korunur, tekrarlar bir kez)."""
+    keys = []
+    for record in event.get('Records', []):
+        key = record.get('s3', {}).get('object', {}).get('key')
+        if key:
+            keys.append(urllib.parse.unquote_plus(key))
+    return list(dict.fromkeys(keys))
+
+
+def list_documents():
+    """Önekteki tüm belgeler ve manifest'i olup nesnesi silinmiş olanlar."""
+    keys = []
+    for prefix, strip in ((DOCUMENTS_PREFIX, ''), (MANIFEST_PREFIX + DOCUMENTS_PREFIX, '.json')):
+        kwargs = {'Bucket': DOCUMENTS_BUCKET_NAME, 'Prefix': prefix}
+        while True:
+            response = s3.list_objects_v2(**kwargs)
+            for item in response.get('Contents', []):
+                key = item['Key']
+                if strip:
+                    key = key[len(MANIFEST_PREFIX):-len(strip)]
+                keys.append(key)
+            if not response.get('IsTruncated'):
+                break
+            kwargs['ContinuationToken'] = response['NextContinuationToken']
+    return list(dict.fromkeys(keys))
+
+
+def handler(event, context):
+    if event.get('action') == 'sync':
+        keys = event.get('keys') or list_documents()
+    else:
+        keys = event_keys(event)
+
+    results = []
+    for key in keys:
+        if not key.startswith(DOCUMENTS_PREFIX) or key.endswith('/'):
+            continue
+        try:
+            results.append(ingestor().sync(key))
+        except Exception as e:
+            print(f"KB Ingest Error ({key}): {e}")
+            raise
+    print(json.dumps({'documents': len(results), 'results': results, 'stats': ingestor().stats}))
+    return {'processed': len(results)}
@@ -1,61 +1,519 @@
 import json
-import boto3
 import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from contextlib import nullcontext
 from botocore.exceptions import ClientError
-from boto3.dynamodb.conditions import Attr
+
+from library_common.admission import Flight, RateLimited, RequestAdmission, requester
+from library_common import codec
+from library_common.after_response import AfterResponseHook
+from library_common.bedrock_scheduler import BedrockScheduler, ModelSaturated
+from library_common.buffered_writer import BufferedBatchWriter
+from library_common.catalog_cache import CatalogCache
+from library_common.clients import lazy, lazy_client, lazy_resource, lazy_table
+from library_common.http import Unauthorized
+from library_common.catalog_index import read_catalog_version, search_books_batch
+from library_common.metrics import Tracer
+from library_common.rag import ChunkCache, Retriever, context_prompt, select_context
+from library_common.bedrock_stream import collect_converse_stream
+from library_common.response_cache import ResponseCache
+from library_common.session_memory import KEY_NAMES, SessionContext, SessionMemory
+from library_common.text import normalize
+from library_common.websocket import WebSocketSender, is_websocket_event
+from intent_router import CATALOG, CHAT, KNOWLEDGE, IntentRouter, RouteStats, model_classifier
+from prompt_registry import PromptRegistry
+from tool_engine import ToolEngine
 
 # İstemcileri başlat
 # Not: Bu kod AWS ortamında çalıştırıldığında IAM rolleri sayesinde yetki alacaktır.
 # Yerel testlerde AWS CLI yapılandırması gereklidir.
-dynamodb = boto3.resource('dynamodb')
-bedrock = boto3.client('bedrock-runtime')
-bedrock_agent_runtime = boto3.client('bedrock-agent-runtime')
+# İstemciler ilk kullanımda kurulur; örn. Knowledge Base'e gitmeyen istekler
+# bedrock-agent-runtime istemcisini hiç kurmaz.
+dynamodb = lazy_resource('dynamodb')
+bedrock = lazy_client('bedrock-runtime')
+bedrock_agent_runtime = lazy_client('bedrock-agent-runtime')
+
+# Aşama süreleri ve token kullanımı (CloudWatch EMF)
+tracer = Tracer('LibraryAssistant')
 
 # Sabitler ve Ortam Değişkenleri
 # Bu değişkenler Lambda konfigürasyonunda tanımlanmalıdır.
 TABLE_NAME = os.environ.get('BOOKS_TABLE_NAME', 'LibraryBooks')
+INDEX_TABLE_NAME = os.environ.get('INDEX_TABLE_NAME', 'LibraryBookIndex')
 KNOWLEDGE_BASE_ID = os.environ.get('KNOWLEDGE_BASE_ID')
 MODEL_ID = os.environ.get('MODEL_ID', "anthropic.claude-3-sonnet-20240229-v1:0")
+# Model art arda en fazla kaç tur araç çağırabilir
+MAX_TOOL_ROUNDS = int(os.environ.get('MAX_TOOL_ROUNDS', '3'))
+
+# Sistem mesajı ve araç tanımları: sürümlü kayıt defterinden bir kez yüklenir
+# (değiştirilemez yapılar; cachePoint'li biçimleri de hazırdır)
+prompt_registry = PromptRegistry.load(
+    os.environ.get('PROMPT_REGISTRY_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts.json'),
+    forced_version=os.environ.get('PROMPT_VERSION') or None
+)
+
+# Araçlar ve DynamoDB sorguları için thread havuzları. boto3 istemcileri
+# thread-safe olduğu için aramalar resource yerine dynamodb.meta.client kullanır.
+tool_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('TOOL_MAX_WORKERS', '4')))
+query_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('QUERY_MAX_WORKERS', '8')))
+
+# Sıcak konteynerlerde tekrar eden kitap sorguları DynamoDB'ye gitmeden cevaplanır
+catalog_cache = CatalogCache(
+    version_loader=lambda: read_catalog_version(dynamodb.Table(INDEX_TABLE_NAME)),
+    ttl_seconds=int(os.environ.get('CATALOG_CACHE_TTL_SECONDS', '300')),
+    max_entries=int(os.environ.get('CATALOG_CACHE_MAX_ENTRIES', '1024')),
+    version_check_interval=float(os.environ.get('CATALOG_VERSION_CHECK_SECONDS', '5'))
+)
+
+# Sık sorulan sorular için yanıt önbelleği (konteyner LRU + DynamoDB)
+RESPONSE_CACHE_TABLE_NAME = os.environ.get('RESPONSE_CACHE_TABLE_NAME')
+EMBEDDING_MODEL_ID = os.environ.get('RESPONSE_CACHE_EMBEDDING_MODEL_ID')
+
+def embed_text(text):
+    """Titan Text Embeddings ile metnin vektörünü üretir (anlamsal önbellek için)."""
+    response = bedrock_scheduler.invoke_model(
+        modelId=EMBEDDING_MODEL_ID,
+        body=codec.dumps_bytes({"inputText": text, "dimensions": 256, "normalize": True})
+    )
+    return codec.loads(response['body'].read())['embedding']
+
+response_cache = None
+if RESPONSE_CACHE_TABLE_NAME:
+    response_cache = ResponseCache(
+        lazy_table(RESPONSE_CACHE_TABLE_NAME),
+        ttl_seconds=int(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', '86400')),
+        tool_ttl_seconds=int(os.environ.get('RESPONSE_CACHE_TOOL_TTL_SECONDS', '600')),
+        max_entries=int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '512')),
+        embedder=embed_text if EMBEDDING_MODEL_ID else None,
+        similarity_threshold=float(os.environ.get('RESPONSE_CACHE_SIMILARITY', '0.92'))
+    )
+    # Kitap durumu değişince ona dayanan yanıtlar da düşürülür
+    catalog_cache.add_listener(response_cache.invalidate_books)
+
+# Oturum hafızası (son N tur + özet); tablo tanımlı değilse her istek bağımsızdır
+HISTORY_TABLE_NAME = os.environ.get('HISTORY_TABLE_NAME')
+session_memory = None
+if HISTORY_TABLE_NAME:
+    session_memory = SessionMemory(
+        lazy_table(HISTORY_TABLE_NAME),
+        max_turns=int(os.environ.get('SESSION_MAX_TURNS', '10')),
+        token_budget=int(os.environ.get('SESSION_TOKEN_BUDGET', '3000'))
+    )
+
+# Geçmiş yazımları yanıt döndükten sonra toplu yapılır
+history_writer = BufferedBatchWriter(lazy(lambda: dynamodb.meta.client))
+after_response = AfterResponseHook('assistant-history-writer').start()
+
+# Knowledge Base: önce retrieve, bağlam tek converse çağrısına eklenir
+RAG_MIN_SCORE = float(os.environ.get('RAG_MIN_SCORE', '0.4'))
+RAG_CONTEXT_TOKENS = int(os.environ.get('RAG_CONTEXT_TOKENS', '1500'))
+rag_retriever = None
+if KNOWLEDGE_BASE_ID:
+    rag_retriever = Retriever(
+        bedrock_agent_runtime, KNOWLEDGE_BASE_ID,
+        cache=ChunkCache(
+            max_entries=int(os.environ.get('RAG_CACHE_MAX_ENTRIES', '256')),
+            ttl_seconds=int(os.environ.get('RAG_CACHE_TTL_SECONDS', '900'))
+        ),
+        number_of_results=int(os.environ.get('RAG_NUMBER_OF_RESULTS', '8'))
+    )
+
+# Ucuz niyet yönlendirici: emin olunan istekler Sonnet'in araç tespiti
+# çağrısına gitmeden katalog aracına, KB'ye veya hızlı modele gönderilir
+ROUTER_ENABLED = os.environ.get('ROUTER_ENABLED', 'true').lower() == 'true'
+ROUTER_MODEL_ID = os.environ.get('ROUTER_MODEL_ID') # Örn. anthropic.claude-3-haiku-20240307-v1:0
+FAST_MODEL_ID = os.environ.get('FAST_MODEL_ID', "anthropic.claude-3-haiku-20240307-v1:0")
+# Hızlı yol katalog sonucunu doğrudan ancak başlık bu oranda benzerse döner
+TITLE_MATCH_RATIO = 0.9
+
+# Model çağrıları: model başına hız sınırı, kalan süreye göre yeniden deneme ve
+# kısıtlanan model için yedek (varsayılan: Sonnet -> hızlı model)
+bedrock_scheduler = BedrockScheduler(
+    bedrock,
+    rates=json.loads(os.environ.get('MODEL_RATE_LIMITS') or '{}'), # {"model ID": istek/sn}
+    default_rate=float(os.environ.get('MODEL_DEFAULT_RATE', '5')),
+    burst=int(os.environ.get('MODEL_BURST', '10')),
+    fallbacks=json.loads(os.environ.get('MODEL_FALLBACKS') or json.dumps({MODEL_ID: [FAST_MODEL_ID]})),
+    reserve_ms=int(os.environ.get('MODEL_RESERVE_MS', '3000')),
+    tracer=tracer,
+    adapt=prompt_registry.adapt
+)
+
+# İstek kabulü: kullanıcı başına hız sınırı ve aynı isteklerin birleştirilmesi
+# (çift tıklama / yeniden deneme ikinci bir model üretimi başlatmaz)
+ADMISSION_TABLE_NAME = os.environ.get('ADMISSION_TABLE_NAME')
+request_admission = None
+if ADMISSION_TABLE_NAME:
+    request_admission = RequestAdmission(
+        lazy_table(ADMISSION_TABLE_NAME),
+        rate_per_minute=float(os.environ.get('RATE_LIMIT_PER_MINUTE', '10')),
+        burst=int(os.environ.get('RATE_LIMIT_BURST', '5')),
+        coalesce_seconds=int(os.environ.get('COALESCE_WINDOW_SECONDS', '10')),
+        tracer=tracer
+    )
 
-def get_book_availability(book_title):
+intent_router = IntentRouter(
+    min_confidence=float(os.environ.get('ROUTER_MIN_CONFIDENCE', '0.75')),
+    classifier=model_classifier(bedrock_scheduler, ROUTER_MODEL_ID) if ROUTER_MODEL_ID else None
+)
+route_stats = RouteStats(baseline_ms=float(os.environ.get('ROUTER_BASELINE_MS', '1500')))
+
+def format_availability(book_title, records):
+    if not records:
+        return f"Katalogda '{book_title}' isminde bir kitap bulunamadı."
+        
+    results = []
+    for record in records:
+        status = "Müsait" if record.is_available else "Ödünç Verilmiş"
+        results.append(f"Kitap: {record.title}, Yazar: {record.author}, Durum: {status}, ID: {record.book_id}")
+        
+    return "\n".join(results)
+
+def find_books(book_titles, touched_ids=None):
+    """Başlık başına katalog kayıtları ({başlık: [BookRecord]}); hatalar çağırana bırakılır."""
+    found = {title: catalog_cache.get(title) for title in dict.fromkeys(book_titles)}
+    missing = [title for title, records in found.items() if records is None]
+    if missing:
+        # Başlık/yazar ters indeksi üzerinden arama (tablo taraması yapılmaz)
+        print(f"DynamoDB'de aranıyor: {missing}")
+        with tracer.stage('DynamoDB'):
+            items_by_title = search_books_batch(missing, dynamodb.meta.client, INDEX_TABLE_NAME, TABLE_NAME,
+                                                executor=query_executor)
+        for title, items in items_by_title.items():
+            found[title] = catalog_cache.put(title, items)
+
+    if touched_ids is not None:
+        for records in found.values():
+            touched_ids.update(record.book_id for record in records)
+    return found
+
+def title_matches(asked, record_title):
+    """Sorulan başlık kayıtla birebir (veya yazım farkı kadar) aynı mı?"""
+    asked, record_title = normalize(asked), normalize(record_title)
+    return asked == record_title or SequenceMatcher(None, asked, record_title).ratio() >= TITLE_MATCH_RATIO
+
+def get_books_availability(book_titles, touched_ids=None):
     """
-    DynamoDB'de kitap arar ve durumunu döner.
+    Birden fazla kitabı DynamoDB'de arar ve her biri için durum metni döner.
     Structured Data (Yapısal Veri) Sorgusu
+    Önbellekte olmayan başlıklar tek seferde aranır (ortak BatchGetItem).
+    `touched_ids` verilirse sonuçtaki kitapların ID'leri eklenir (yanıt önbelleği için).
     """
-    table = dynamodb.Table(TABLE_NAME)
-    
     try:
-        # Basitlik için Scan kullanıyoruz. Prod ortamında GSI veya Query kullanılmalı.
-        print(f"DynamoDB'de aranıyor: {book_title}")
-        response = table.scan(
-            FilterExpression=Attr('title').contains(book_title)
-        )
-        items = response.get('Items', [])
-        
-        if not items:
-            return f"Katalogda '{book_title}' isminde bir kitap bulunamadı."
-            
-        results = []
-        for item in items:
-            status = "Müsait" if item.get('isAvailable') else "Ödünç Verilmiş"
-            results.append(f"Kitap: {item.get('title')}, Yazar: {item.get('author')}, Durum: {status}, ID: {item.get('bookId')}")
-            
-        return "\n".join(results)
+        found = find_books(book_titles, touched_ids)
+        return [format_availability(title, found[title]) for title in book_titles]
     except Exception as e:
         print(f"DynamoDB Error: {e}")
-        return "Veritabanı hatası nedeniyle kitap durumu kontrol edilemedi."
+        return ["Veritabanı hatası nedeniyle kitap durumu kontrol edilemedi."] * len(book_titles)
+
+def get_book_availability(book_title, touched_ids=None):
+    """
+    DynamoDB'de kitap arar ve durumunu döner.
+    """
+    return get_books_availability([book_title], touched_ids)[0]
+
+def build_tool_engine(touched_ids=None):
+    """İstek için araç motoru; aynı turdaki tüm kitap aramaları birleştirilir."""
+    engine = ToolEngine(tool_executor)
+    engine.register_batch(
+        'check_book_availability',
+        lambda inputs: get_books_availability([i.get('book_title', '') for i in inputs], touched_ids)
+    )
+    return engine
+
+def converse_call(model_id, prompts, extra_system=(), use_tools=False, on_text=None, first_stage='Intent'):
+    """
+    messages -> Converse yanıtı; on_text verilirse yanıt akışla üretilir ve parçalar iletilir.
+    Sistem mesajı: sürümün statik öneki (+ destekleyen modelde cachePoint) ve
+    ardından isteğe özel bloklar (`extra_system`: özet, KB bağlamı).
+    İlk çağrı `first_stage`, araç sonuçlarıyla yapılan sonrakiler 'SecondCall' olarak ölçülür.
+    """
+    kwargs = {'modelId': model_id, 'system': prompts.system_for(model_id) + tuple(extra_system)}
+    if use_tools:
+        kwargs['toolConfig'] = prompts.tools_for(model_id)
+    calls = 0
+    def call(messages):
+        nonlocal calls
+        started = time.monotonic()
+        with tracer.stage(first_stage if calls == 0 else 'SecondCall'):
+            if on_text:
+                response = collect_converse_stream(
+                    bedrock_scheduler.converse_stream(messages=messages, **kwargs), on_text=on_text)
+            else:
+                response = bedrock_scheduler.converse(messages=messages, **kwargs)
+        calls += 1
+        usage = response.get('usage')
+        tracer.add_usage(usage)
+        record_prompt_usage(prompts.version, usage, (time.monotonic() - started) * 1000)
+        return response
+    return call
+
+def record_prompt_usage(version, usage, elapsed_ms):
+    """İstem sürümü başına token ve gecikme (A/B karşılaştırması ve önbellek kazancı için)."""
+    trace = tracer.current
+    dimensions = {'PromptVersion': version}
+    trace.count_for(dimensions, 'ModelCalls')
+    trace.count_for(dimensions, 'ModelLatency', elapsed_ms, unit='Milliseconds')
+    for name in ('inputTokens', 'outputTokens', 'cacheReadInputTokens', 'cacheWriteInputTokens'):
+        trace.count_for(dimensions, name[0].upper() + name[1:], (usage or {}).get(name, 0))
+
+def first_text(message):
+    """Mesajdaki ilk metin bloğu (araç bloklarından önce metin olmayabilir)."""
+    for block in message.get('content', []):
+        if 'text' in block:
+            return block['text']
+    return ""
+
+def run_tool_loop(converse, messages, response, engine, on_tool=None):
+    """
+    Model araç istemeyi bırakana veya MAX_TOOL_ROUNDS dolana kadar araçları
+    çalıştırıp sonuçları modele geri gönderir. Son yanıtı döner.
+    """
+    rounds = 0
+    while response['stopReason'] == 'tool_use' and rounds < MAX_TOOL_ROUNDS:
+        rounds += 1
+        print(f"Tool turu {rounds} çalıştırılıyor.")
+        with tracer.stage('Tool'):
+            messages.append(engine.execute(response['output']['message'], on_tool=on_tool))
+        response = converse(messages)
+        messages.append(response['output']['message'])
+    if response['stopReason'] == 'tool_use':
+        print(f"Tool tur sınırına ({MAX_TOOL_ROUNDS}) ulaşıldı.")
+    return response
+
+def retrieve_context(user_message):
+    """
+    Knowledge Base'den parçaları getirir ve sistem mesajına eklenecek bağlamı
+    döner: (bağlam metni veya None, başarılı mı). En iyi skor eşiğin altındaysa
+    bağlam eklenmez ve modelin kendi cevabı kullanılır.
+    """
+    if not rag_retriever:
+        return None, True
+    try:
+        with tracer.stage('RAG'):
+            chunks, from_cache = rag_retriever.retrieve(user_message)
+    except Exception as e:
+        print(f"RAG Error: {e}")
+        return None, False
+    selected = select_context(chunks, RAG_CONTEXT_TOKENS, RAG_MIN_SCORE)
+    print(json.dumps({'rag': {
+        'retrieved': len(chunks),
+        'selected': len(selected),
+        'topScore': round(chunks[0].score, 3) if chunks else None,
+        'cacheHit': from_cache,
+    }}))
+    return (context_prompt(selected) if selected else None), True
+
+def rag_system_prompts(system_prompts, user_message):
+    """Sistem mesajına (varsa) KB bağlamını ekler: (sistem mesajları, önbelleğe yazılabilir mi)."""
+    context, ok = retrieve_context(user_message)
+    if context:
+        system_prompts = system_prompts + ({"text": context},)
+    # Getirme hata verdiyse yanıt bağlamsız üretildi; önbelleğe yazılmaz
+    return system_prompts, ok
+
+def routed_answer(route, user_message, session, prompts, on_text=None):
+    """
+    Yönlendiricinin emin olduğu isteği Sonnet'e gitmeden cevaplar:
+    (yanıt, kitap ID'leri, önbelleğe yazılabilir mi). Sonnet'e devredilecekse None.
+    """
+    if route.intent == CATALOG:
+        touched_ids = set()
+        found = find_books(route.titles, touched_ids)
+        # Sonuç yoksa başlık yanlış çıkarılmış olabilir; kararı Sonnet versin
+        if not touched_ids:
+            return None
+        exact = {title: [record for record in found[title] if title_matches(title, record.title)]
+                 for title in route.titles}
+        if all(exact.values()):
+            final_text = "Katalogda bulduklarım:\n" + "\n".join(
+                format_availability(title, exact[title]) for title in route.titles)
+            if on_text:
+                on_text(final_text)
+            return final_text, touched_ids, True
+        # Arama yalnızca benzer başlıklar buldu (örn. "Suç" -> "Suç ve Ceza");
+        # sonuçların soruyu karşılayıp karşılamadığına hızlı model karar verir
+        results = "\n".join(format_availability(title, found[title]) for title in route.titles)
+        extra_system = session_system_prompts((), session) + (
+            {"text": "Katalog arama sonuçları (sorulan başlıkla birebir eşleşmeyebilir):\n" + results},)
+        converse = converse_call(FAST_MODEL_ID, prompts, extra_system, on_text=on_text, first_stage='FastCall')
+        response = converse(session.converse_messages(user_message))
+        return first_text(response['output']['message']), touched_ids, True
+
+    if route.intent not in (KNOWLEDGE, CHAT):
+        return None
+    extra_system = session_system_prompts((), session)
+    cacheable = True
+    if route.intent == KNOWLEDGE and rag_retriever:
+        context, cacheable = retrieve_context(user_message)
+        # İlgili belge bulunamadıysa araçlı tam akış denenir
+        if not context:
+            return None
+        extra_system = extra_system + ({"text": context},)
+    converse = converse_call(FAST_MODEL_ID, prompts, extra_system, on_text=on_text, first_stage='FastCall')
+    response = converse(session.converse_messages(user_message))
+    return first_text(response['output']['message']), None, cacheable
+
+def sonnet_answer(user_message, session, prompts, on_text=None, on_tool=None):
+    """Araçlı tam akış (Intent Detection + Yanıt): (yanıt, kitap ID'leri, önbelleğe yazılabilir mi)"""
+    # İsteğe özel sistem blokları; sürümün statik öneki (persona + araçlar) hazır gelir
+    extra_system = session_system_prompts((), session)
+
+    # Knowledge Base (Unstructured Data / RAG): ayrı bir üretim yerine,
+    # ilgili parçalar aynı çağrının sistem mesajına eklenir
+    extra_system, cacheable = rag_system_prompts(extra_system, user_message)
+
+    # Mesaj Geçmişi (token bütçesine sığan son turlar + yeni mesaj)
+    messages = session.converse_messages(user_message)
+
+    # Bedrock'a Çağrı; ilk çağrının metni (araç kullanılmazsa) son yanıttır
+    print("Bedrock Converse çağrılıyor...")
+    converse = converse_call(MODEL_ID, prompts, extra_system, use_tools=True, on_text=on_text)
+    response = converse(messages)
+    output_message = response['output']['message']
+    messages.append(output_message)
+
+    # Tool Kullanımı Kontrolü (Structured Data)
+    if response['stopReason'] != 'tool_use':
+        return first_text(output_message), None, cacheable
+
+    print("Tool kullanımı tespit edildi.")
+    touched_ids = set() # Yanıtın dayandığı kitaplar
+    # Araçları çalıştır ve sonuçlarla Bedrock'a tekrar sor (gerekirse birkaç tur)
+    final_response = run_tool_loop(converse, messages, response, build_tool_engine(touched_ids), on_tool=on_tool)
+    return first_text(final_response['output']['message']), touched_ids, cacheable
 
+def generate_answer(user_message, session, prompts, on_text=None, on_tool=None):
+    """Önce ucuz yönlendirici denenir; emin olunamazsa Sonnet'e devredilir."""
+    route = None
+    if ROUTER_ENABLED:
+        with tracer.stage('Router'):
+            route = intent_router.route(user_message)
+        tracer.set('Route', route.intent)
+    started = time.monotonic()
+    answer = None
+    if route:
+        try:
+            answer = routed_answer(route, user_message, session, prompts, on_text=on_text)
+        except Exception as e:
+            # Hızlı yol hata verirse kullanıcıya hata yerine tam akış denenir
+            print(f"Router Error: {e}")
+    escalated = answer is None
+    tracer.set('Escalated', escalated)
+    if escalated:
+        answer = sonnet_answer(user_message, session, prompts, on_text=on_text, on_tool=on_tool)
+        route_stats.observe_escalation((time.monotonic() - started) * 1000)
+    if route:
+        route_stats.log(route, (time.monotonic() - started) * 1000, escalated)
+    return answer
+
+def select_prompts(body, session_id):
+    """İstem sürümü: istekte açıkça verilen veya oturuma göre A/B ağırlıklı seçilen."""
+    prompts = prompt_registry.select(body.get('prompt_version'), session_id)
+    tracer.set('PromptVersion', prompts.version)
+    return prompts
+
+def uses_response_cache(session, prompts):
+    # Geçmişi olan oturumlarda yanıt bağlama bağlıdır; deney sürümlerinin
+    # yanıtları varsayılan sürümün önbelleğine karışmaz
+    return session.is_empty and prompts.version == prompt_registry.default
+
+def load_session(session_id, user_message):
+    """Oturum geçmişini tek Query ile okur; hata olursa geçmişsiz devam edilir."""
+    if session_memory:
+        try:
+            with tracer.stage('Session'):
+                return session_memory.load(session_id, user_message)
+        except Exception as e:
+            print(f"Session Error: {e}")
+    return SessionContext(session_id, '', '', [], [])
+
+def session_system_prompts(system_prompts, session):
+    """Eski turların özeti varsa sistem mesajına eklenir."""
+    summary = session.summary_prompt()
+    return system_prompts + ({"text": summary},) if summary else system_prompts
+
+def remember(session, user_message, final_text):
+    if not (session_memory and final_text):
+        return
+    try:
+        for item in session_memory.turn_items(session, user_message, final_text):
+            history_writer.put(HISTORY_TABLE_NAME, item, KEY_NAMES)
+        after_response.defer(history_writer.flush)
+    except Exception as e:
+        print(f"Session Error: {e}")
+
+def lookup_cached_response(user_message):
+    """Önbellekte yanıt varsa (kayıt, katman) döner; önbellek hataları isteği bozmaz."""
+    if not response_cache:
+        return None, None
+    try:
+        with tracer.stage('Cache'):
+            # Araç yanıtlarının tazeliği için katalog sürümünü kontrol et
+            catalog_cache.refresh()
+            return response_cache.get(user_message)
+    except Exception as e:
+        print(f"Cache Error: {e}")
+        return None, None
+
+def store_response(user_message, final_text, started, book_ids):
+    if not (response_cache and final_text):
+        return
+    try:
+        latency_ms = (time.monotonic() - started) * 1000
+        response_cache.put(user_message, final_text, latency_ms, book_ids=book_ids)
+    except Exception as e:
+        print(f"Cache Error: {e}")
+
+def log_cache_report(layer, entry):
+    tracer.set('CacheLayer', layer or 'MISS')
+    report = {'catalogCache': catalog_cache.snapshot()}
+    if response_cache:
+        report['responseCache'] = response_cache.report(layer, entry)
+    print(json.dumps(report))
+
+def serialize(payload):
+    with tracer.stage('Serialize'):
+        return codec.dumps(payload)
+
+def admit(event, user_message):
+    """Model çağrılmadan önce istek kabulü; tablo tanımlı değilse her istek kabul edilir."""
+    if not request_admission:
+        return nullcontext(Flight(None, None, None))
+    return request_admission.admit(requester(event), user_message, max_wait=bedrock_scheduler.remaining())
+
+def rate_limited_response(e):
+    print(f"Admission: {e}")
+    return {
+        'statusCode': 429,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*',
+            'Retry-After': str(e.retry_after)
+        },
+        'body': json.dumps({'error': 'Çok fazla istek gönderdiniz, lütfen biraz sonra tekrar deneyin.',
+                            'retryAfter': e.retry_after})
+    }
+
+@after_response.wrap
+@tracer.wrap
+@bedrock_scheduler.wrap
 def handler(event, context):
     """
     Lambda Ana Handler Fonksiyonu
     """
-    print("Event:", json.dumps(event))
-    
+    if is_websocket_event(event):
+        return stream_handler(event, context)
+
     try:
         # 1. Gelen mesajı al
-        body = json.loads(event.get('body', '{}'))
+        with tracer.stage('Parse'):
+            body = codec.loads(event.get('body', '{}'))
         user_message = body.get('message')
-        session_id = body.get('session_id') # İleride session yönetimi için kullanılabilir
+        session_id = body.get('session_id') or str(uuid.uuid4()) # Session ID yoksa yeni oluştur
         
         if not user_message:
             return {
@@ -67,138 +525,95 @@ def handler(event, context):
                 'body': json.dumps({'error': 'Mesaj alanı zorunludur.'})
             }
 
-        # 2. Bedrock Converse API Yapılandırması
-        # Sistem Mesajı (Persona)
-        system_prompts = [{
-            "text": "Sen profesyonel, kibar ve yardımsever bir kütüphane asistanısın. "
-                    "Kullanıcıların kitap bulmasına yardımcı oluyorsun. "
-                    "Eğer kullanıcı spesifik bir kitabın durumunu veya varlığını sorarsa, 'check_book_availability' aracını kullan. "
-                    "Eğer genel bir soru sorarsa veya kütüphane kuralları hakkında bilgi isterse aracı kullanma. "
-                    "Yanıtlarını Türkçe ver."
-        }]
-
-        # Araç Tanımı (Tool Definition) - Function Calling
-        tool_config = {
-            "tools": [
-                {
-                    "toolSpec": {
-                        "name": "check_book_availability",
-                        "description": "Kütüphane kataloğunda kitap arar ve müsaitlik durumunu kontrol eder.",
-                        "inputSchema": {
-                            "json": {
-                                "type": "object",
-                                "properties": {
-                                    "book_title": {
-                                        "type": "string",
-                                        "description": "Aranacak kitabın adı veya başlığı."
-                                    }
-                                },
-                                "required": ["book_title"]
-                            }
-                        }
-                    }
+        # 2. İstek kabulü: kullanıcının hız sınırı aşıldıysa model çağrılmadan 429;
+        # aynı soru az önce / şu anda cevaplanıyorsa o yanıt paylaşılır
+        with admit(event, user_message) as flight:
+            if flight.coalesced:
+                return {
+                    'statusCode': 200,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*',
+                        'Access-Control-Allow-Methods': 'POST, OPTIONS',
+                        'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+                        'X-Cache': 'COALESCED'
+                    },
+                    'body': serialize({'session_id': session_id, **flight.result})
                 }
-            ]
-        }
 
-        # Mesaj Geçmişi
-        messages = [{
-            "role": "user",
-            "content": [{"text": user_message}]
-        }]
-
-        # 3. Bedrock'a İlk Çağrı (Intent Detection)
-        print("Bedrock Converse çağrılıyor...")
-        response = bedrock.converse(
-            modelId=MODEL_ID,
-            messages=messages,
-            system=system_prompts,
-            toolConfig=tool_config
-        )
-        
-        output_message = response['output']['message']
-        messages.append(output_message)
-        
-        final_text = ""
-
-        # 4. Tool Use Kontrolü (Structured Data)
-        if response['stopReason'] == 'tool_use':
-            print("Tool kullanımı tespit edildi.")
-            tool_requests = output_message['content']
-            
-            for content_block in tool_requests:
-                if 'toolUse' in content_block:
-                    tool_use = content_block['toolUse']
-                    tool_name = tool_use['name']
-                    tool_use_id = tool_use['toolUseId']
-                    
-                    if tool_name == 'check_book_availability':
-                        # Aracı çalıştır (DynamoDB Sorgusu)
-                        book_title = tool_use['input']['book_title']
-                        tool_result_text = get_book_availability(book_title)
-                        
-                        # Sonucu mesaj geçmişine ekle
-                        messages.append({
-                            "role": "user",
-                            "content": [{
-                                "toolResult": {
-                                    "toolUseId": tool_use_id,
-                                    "content": [{"text": tool_result_text}]
-                                }
-                            }]
-                        })
-            
-            # 5. Bedrock'a İkinci Çağrı (Sonuç ile birlikte yanıt üretimi)
-            final_response = bedrock.converse(
-                modelId=MODEL_ID,
-                messages=messages,
-                system=system_prompts,
-                toolConfig=tool_config
-            )
-            final_text = final_response['output']['message']['content'][0]['text']
-            
-        else:
-            # 6. Tool kullanılmadıysa Knowledge Base'e sor (Unstructured Data / RAG)
-            print("Tool kullanılmadı, Knowledge Base (RAG) akışı başlatılıyor...")
-            
-            if KNOWLEDGE_BASE_ID:
-                try:
-                    # RetrieveAndGenerate API kullanımı
-                    rag_response = bedrock_agent_runtime.retrieve_and_generate(
-                        input={
-                            'text': user_message
-                        },
-                        retrieveAndGenerateConfiguration={
-                            'type': 'KNOWLEDGE_BASE',
-                            'knowledgeBaseConfiguration': {
-                                'knowledgeBaseId': KNOWLEDGE_BASE_ID,
-                                'modelArn': f'arn:aws:bedrock:us-east-1::foundation-model/{MODEL_ID}'
-                            }
-                        }
-                    )
-                    final_text = rag_response['output']['text']
-                    print("RAG yanıtı alındı.")
-                except Exception as e:
-                    print(f"RAG Error: {e}")
-                    # RAG hata verirse veya yapılandırılmamışsa Converse'den gelen ilk yanıtı kullan (Fallback)
-                    final_text = output_message['content'][0]['text']
-            else:
-                # KB ID yoksa Converse yanıtını kullan
-                print("Knowledge Base ID tanımlı değil, standart yanıt dönülüyor.")
-                final_text = output_message['content'][0]['text']
+            # Oturum geçmişi (son turlar + özet) ve istem sürümü
+            started = time.monotonic()
+            session = load_session(session_id, user_message)
+            prompts = select_prompts(body, session_id)
+
+            # Aynı soru daha önce cevaplandıysa modeli hiç çağırma. Geçmişi olan
+            # oturumlarda yanıt bağlama bağlı olduğu için önbellek kullanılmaz.
+            use_cache = uses_response_cache(session, prompts)
+            cached, cache_layer = lookup_cached_response(user_message) if use_cache else (None, None)
+            if cached:
+                remember(session, user_message, cached.response)
+                log_cache_report(cache_layer, cached)
+                flight.complete({'response': cached.response})
+                return {
+                    'statusCode': 200,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*',
+                        'Access-Control-Allow-Methods': 'POST, OPTIONS',
+                        'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+                        'X-Cache': f'HIT-{cache_layer}'
+                    },
+                    'body': serialize({'session_id': session_id, 'response': cached.response})
+                }
+
+            # 3. Yanıt: yönlendirici emin olduğu istekleri katalog aracına, KB'ye veya
+            # hızlı modele gönderir; diğerleri araçlı tam akışa (Sonnet) devredilir
+            final_text, touched_ids, cacheable = generate_answer(user_message, session, prompts)
 
-        # 7. Yanıtı Dön
+            if cacheable and use_cache:
+                store_response(user_message, final_text, started, touched_ids)
+            remember(session, user_message, final_text)
+            # Önbellek boyutlandırması için sayaçlar
+            log_cache_report(None, None)
+            flight.complete({'response': final_text, 'prompt_version': prompts.version})
+
+        # 4. Yanıtı Dön
         return {
             'statusCode': 200,
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*', # CORS
                 'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+                'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+                'X-Cache': 'MISS'
             },
-            'body': json.dumps({'response': final_text})
+            'body': serialize({'session_id': session_id, 'response': final_text, 'prompt_version': prompts.version})
         }
 
+    except Unauthorized as e:
+        return {
+            'statusCode': 401,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'error': str(e)})
+        }
+    except RateLimited as e:
+        return rate_limited_response(e)
+    except ModelSaturated as e:
+        # Tüm modeller kısıtlandı: istemci Retry-After süresi sonra tekrar denemeli
+        print(f"Bedrock Error: {e}")
+        return {
+            'statusCode': 503,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Retry-After': str(e.retry_after)
+            },
+            'body': json.dumps({'error': 'Asistan şu anda yoğun, lütfen biraz sonra tekrar deneyin.',
+                                'retryAfter': e.retry_after})
+        }
     except Exception as e:
         print(f"Critical Error: {e}")
         return {
@@ -208,4 +623,74 @@ def handler(event, context):
                 'Access-Control-Allow-Origin': '*'
             },
             'body': json.dumps({'error': 'Sunucu hatası', 'details': str(e)})
-        }
\ No newline at end of file
+        }
+
+def stream_handler(event, context):
+    """
+    WebSocket (streaming) isteklerini işler. Akış normal handler ile aynıdır;
+    tek fark, son yanıtın parçaları üretildikçe istemciye gönderilmesidir.
+    """
+    route_key = event['requestContext'].get('routeKey')
+    if route_key in ('$connect', '$disconnect'):
+        return {'statusCode': 200}
+
+    body = codec.loads(event.get('body') or '{}')
+    sender = WebSocketSender(event, body.get('requestId'))
+    user_message = body.get('message')
+    session_id = body.get('session_id') or str(uuid.uuid4())
+    if not user_message:
+        sender.send({'type': 'error', 'error': 'Mesaj alanı zorunludur.'})
+        return {'statusCode': 400}
+
+    try:
+        with admit(event, user_message) as flight:
+            sender.send({'type': 'start', 'session_id': session_id})
+            if flight.coalesced:
+                sender.delta(flight.result['response'])
+                sender.send({'type': 'done', 'session_id': session_id, 'coalesced': True, **flight.result})
+                return {'statusCode': 200}
+
+            started = time.monotonic()
+            session = load_session(session_id, user_message)
+            prompts = select_prompts(body, session_id)
+            use_cache = uses_response_cache(session, prompts)
+            cached, cache_layer = lookup_cached_response(user_message) if use_cache else (None, None)
+            if cached:
+                log_cache_report(cache_layer, cached)
+                flight.complete({'response': cached.response})
+                sender.delta(cached.response)
+                sender.send({'type': 'done', 'session_id': session_id, 'response': cached.response, 'cache': cache_layer})
+                remember(session, user_message, cached.response)
+                return {'statusCode': 200}
+
+            # Yanıt parçaları üretildikçe canlı gönderilir
+            final_text, touched_ids, cacheable = generate_answer(
+                user_message, session, prompts, on_text=sender.delta,
+                on_tool=lambda name: sender.send({'type': 'tool', 'name': name})
+            )
+
+            if cacheable and use_cache:
+                store_response(user_message, final_text, started, touched_ids)
+            log_cache_report(None, None)
+            flight.complete({'response': final_text, 'prompt_version': prompts.version})
+            sender.send({'type': 'done', 'session_id': session_id, 'response': final_text, 'prompt_version': prompts.version})
+            remember(session, user_message, final_text)
+            return {'statusCode': 200}
+
+    except Unauthorized as e:
+        sender.send({'type': 'error', 'error': str(e)})
+        return {'statusCode': 401}
+    except RateLimited as e:
+        print(f"Admission: {e}")
+        sender.send({'type': 'error', 'error': 'Çok fazla istek gönderdiniz, lütfen biraz sonra tekrar deneyin.',
+                     'retryAfter': e.retry_after})
+        return {'statusCode': 429}
+    except ModelSaturated as e:
+        print(f"Bedrock Error: {e}")
+        sender.send({'type': 'error', 'error': 'Asistan şu anda yoğun, lütfen biraz sonra tekrar deneyin.',
+                     'retryAfter': e.retry_after})
+        return {'statusCode': 503}
+    except Exception as e:
+        print(f"Critical Error: {e}")
+        sender.send({'type': 'error', 'error': 'Sunucu hatası', 'details': str(e)})
+        return {'statusCode': 500}
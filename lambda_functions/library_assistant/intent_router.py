@@ -0,0 +1,226 @@
+"""
+Sonnet'e gitmeden önce isteğin niyetini (intent) belirleyen ucuz yönlendirici.
+
+Her mesaj önce yerel kurallarla puanlanır (anahtar kelime / regex ağırlıkları):
+- 'catalog'   : belirli bir kitabın durumu soruluyor, başlık mesajdan çıkarılabiliyor
+- 'knowledge' : kütüphane kuralları, saatler, üyelik gibi belge (KB) soruları
+- 'chat'      : selamlaşma, teşekkür gibi kısa sohbet
+Kurallar emin değilse ve ROUTER_MODEL_ID tanımlıysa küçük bir model tek
+kelimelik bir etiket üretir. Yine emin olunamazsa 'unsure' döner ve istek
+araçlı tam akışa (Sonnet) devredilir.
+"""
+import json
+import re
+import threading
+import time
+from typing import NamedTuple
+
+from library_common.text import normalize
+
+CATALOG, KNOWLEDGE, CHAT, UNSURE = 'catalog', 'knowledge', 'chat', 'unsure'
+
+# (desen, ağırlık) — desenler normalize edilmiş (küçük harf, aksansız) metinde aranır
+_RULES = {
+    CATALOG: [
+        (r'\b(var mi|mevcut mu|bulunuyor mu|rafta mi)\b', 2.0),
+        (r'\b(musait|odunc|emanet|kiralan|kiralik)\w*', 2.0),
+        (r'\bkita[pb]\w*', 1.0),
+        (r'\b(alabilir miyim|okuyabilir miyim)\b', 2.0),
+    ],
+    KNOWLEDGE: [
+        (r'\b(kural|yonetmelik|politika|ceza|gecikme|iade suresi|sure)\w*', 2.0),
+        (r'\b(saat|acik|acil|kapali|kapan|tatil|hafta ?sonu)\w*', 2.0),
+        (r'\b(uye|uyelik|kart|kayit|aidat|ucret)\w*', 2.0),
+        (r'\b(nasil|nedir|ne zaman|kacta|kac gun|kac kitap)\b', 1.0),
+    ],
+    CHAT: [
+        (r'^(merhaba|selam|gunaydin|iyi aksamlar|iyi gunler|hey)\b', 3.0),
+        (r'\b(tesekkur|sag ol|sagol|eyvallah|gorusuruz|hosca kal)\w*', 3.0),
+        (r'^(nasilsin|naber|kimsin)\b', 3.0),
+    ],
+}
+_COMPILED = {intent: [(re.compile(p), w) for p, w in rules] for intent, rules in _RULES.items()}
+# Kural sorusu kalıpları ("kaç kitap", "alabilir miyim"): mesajda başlık yoksa
+# genel `kitap` / `ödünç` eşleşmelerini geçersiz kılar
+_POLICY = re.compile(r'\bkac (kitap|gun|hafta|tane)\b|\b(alabilir miyim|alabilirim|alir miyim|okuyabilir miyim)\b')
+_POLICY_WEIGHT = 3.0
+
+# Başlık çıkarımı orijinal metin üzerinde yapılır (büyük harf ve aksanlar korunur)
+_QUOTED = re.compile(r'["“”«»]([^"“”«»]{2,80})["“”«»]|\'([^\']{2,80})\'(?!\w)')
+_BEFORE_KITAP = re.compile(r'^(.{2,80}?)\s+(?:adlı\s+|isimli\s+|adındaki\s+)?kita[pb]\w*', re.IGNORECASE)
+_BEFORE_QUESTION = re.compile(
+    r'^(.{2,80}?)\s+(?:var\s+mı|mevcut\s+mu|rafta\s+mı|müsait\s+mi|ödünç\s+\w+|alabilir\s+miyim|okuyabilir\s+miyim)',
+    re.IGNORECASE)
+_LEADING_FILLER = re.compile(r'^(?:acaba|peki|kütüphanede|kütüphanenizde|sizde|elinizde)\s+', re.IGNORECASE)
+_SUFFIX = re.compile(r"['’]\w+$")
+# Başlık gibi görünmeyen zamir, soru kelimesi ve genel ifadeler (normalize edilmiş ilk kelime)
+_NOT_TITLES = {'bu', 'o', 'su', 'bunu', 'onu', 'bir', 'kitap', 'kitaplar', 'roman',
+               'kac', 'kacta', 'kaci', 'ne', 'neden', 'nasil', 'nerede', 'nereden', 'hangi', 'hangisi',
+               'kim', 'niye', 'nicin'}
+# Kütüphane işleyişine dair ifadeler başlık sayılmaz ("Üyelik kartımı kaybettim kitabı")
+_NOT_TITLE_PHRASES = re.compile(r'^(uye|kart|kutuphane|saat|aidat|ucret|gecikme|iade suresi|hafta ?sonu)')
+
+_CLASSIFY_PROMPT = (
+    "Kütüphane asistanına gelen mesajı sınıflandır. Sadece tek kelime yaz:\n"
+    "catalog = belirli bir kitabın varlığı veya müsaitliği soruluyor\n"
+    "knowledge = kütüphane kuralları, saatler, üyelik gibi genel bilgi\n"
+    "chat = selamlaşma, teşekkür veya sohbet\n"
+    "unsure = emin değilsin"
+)
+
+
+class Route(NamedTuple):
+    intent: str
+    confidence: float
+    titles: tuple
+    source: str  # 'rules' | 'model'
+    elapsed_ms: float
+
+
+def extract_title(message):
+    """
+    Mesajdan tek bir kitap başlığı çıkarmayı dener; bulamazsa None.
+    Tırnak içindeki başlıklar olduğu gibi alınır. Tırnaksız başlıklar
+    ("... kitabı", "... var mı?") soru kelimesiyle başlıyorsa, virgüllü bir
+    cümle parçasıysa veya kütüphane işleyişine dair bir ifadeyse reddedilir.
+    """
+    match = _QUOTED.search(message)
+    if match:
+        return (match.group(1) or match.group(2)).strip()
+    text = message.strip().rstrip('?!. ')
+    for pattern in (_BEFORE_KITAP, _BEFORE_QUESTION):
+        match = pattern.match(text)
+        if match:
+            title = _LEADING_FILLER.sub('', match.group(1).strip())
+            title = _SUFFIX.sub('', title).strip(' ,')
+            if _plausible(title):
+                return title
+    return None
+
+
+def _plausible(title):
+    folded = normalize(title)
+    if not folded or ',' in folded:
+        return False
+    return folded.split()[0] not in _NOT_TITLES and not _NOT_TITLE_PHRASES.match(folded)
+
+
+def score(message):
+    """Kurallara göre niyet puanları."""
+    text = normalize(message)
+    return {intent: sum(w for pattern, w in rules if pattern.search(text))
+            for intent, rules in _COMPILED.items()}
+
+
+class IntentRouter:
+
+    def __init__(self, min_confidence=0.75, classifier=None, max_chat_words=8):
+        """
+        `classifier(message) -> str` kurallar emin olmadığında çağrılır
+        (örn. küçük bir modelle). Yoksa emin olunamayan istekler 'unsure' döner.
+        """
+        self._min_confidence = min_confidence
+        self._classifier = classifier
+        self._max_chat_words = max_chat_words
+
+    def route(self, message):
+        started = time.monotonic()
+        title = extract_title(message)
+        # Başlığın içindeki kelimeler puanlamaya katılmaz ("Suç ve Ceza var mı?"
+        # bir kural sorusu değildir); başlık yoksa kural sorusu kalıpları öne geçer
+        if title:
+            intent, confidence = self._rules(message.replace(title, ' '))
+        else:
+            intent, confidence = self._rules(message, policy=bool(_POLICY.search(normalize(message))))
+        titles = ()
+        if intent == CATALOG:
+            # Başlık çıkarılamazsa aracı kimin çağıracağına model karar versin
+            if title:
+                titles = (title,)
+            else:
+                intent, confidence = UNSURE, 0.0
+        source = 'rules'
+
+        if confidence < self._min_confidence and self._classifier:
+            source = 'model'
+            try:
+                intent = self._classifier(message)
+            except Exception as e:
+                print(f"Router Error: {e}")
+                intent = UNSURE
+            confidence = 1.0 if intent in (KNOWLEDGE, CHAT) else 0.0
+            # Model katalog dese bile başlığı kurallar çıkaramadıysa Sonnet'e bırak
+            if intent == CATALOG:
+                titles = (title,) if title else ()
+                confidence = 1.0 if title else 0.0
+
+        if confidence < self._min_confidence:
+            intent = UNSURE
+        return Route(intent, round(confidence, 3), titles, source,
+                     round((time.monotonic() - started) * 1000, 2))
+
+    def _rules(self, message, policy=False):
+        scores = score(message)
+        if policy:
+            scores[CATALOG] = 0.0
+            scores[KNOWLEDGE] += _POLICY_WEIGHT
+        # Uzun mesajlar selamla başlasa bile sohbet sayılmaz
+        if len(message.split()) > self._max_chat_words:
+            scores[CHAT] = 0.0
+        total = sum(scores.values())
+        if not total:
+            return UNSURE, 0.0
+        intent = max(scores, key=scores.get)
+        best = scores[intent]
+        # Güven: kazananın payı, zayıf tek eşleşmelerde düşürülür
+        confidence = (best / total) * min(1.0, best / 2.0)
+        return intent, confidence
+
+
+def model_classifier(client, model_id):
+    """Küçük bir modelle (örn. Claude 3 Haiku) tek etiketlik sınıflandırıcı."""
+    def classify(message):
+        response = client.converse(
+            modelId=model_id,
+            messages=[{"role": "user", "content": [{"text": message}]}],
+            system=[{"text": _CLASSIFY_PROMPT}],
+            inferenceConfig={"maxTokens": 5, "temperature": 0}
+        )
+        text = ''.join(block.get('text', '') for block in response['output']['message']['content'])
+        label = normalize(text).strip(' .')
+        return label if label in (CATALOG, KNOWLEDGE, CHAT) else UNSURE
+    return classify
+
+
+class RouteStats:
+    """
+    Kazanılan süreyi tahmin etmek için Sonnet ilk çağrı süresinin kayan
+    ortalaması (EWMA) ve niyet sayaçları. Konteyner ömrü boyunca tutulur.
+    """
+
+    def __init__(self, baseline_ms=1500.0, alpha=0.2):
+        self._baseline_ms = baseline_ms
+        self._alpha = alpha
+        self._lock = threading.Lock()
+        self.counts = {}
+
+    def observe_escalation(self, elapsed_ms):
+        with self._lock:
+            self._baseline_ms += self._alpha * (elapsed_ms - self._baseline_ms)
+
+    def log(self, route, handled_ms, escalated):
+        with self._lock:
+            key = f"{route.intent}{'->sonnet' if escalated else ''}"
+            self.counts[key] = self.counts.get(key, 0) + 1
+            report = {
+                'intent': route.intent,
+                'confidence': route.confidence,
+                'source': route.source,
+                'routerMs': route.elapsed_ms,
+                'escalated': escalated,
+                'handledMs': round(handled_ms, 1),
+                # Sonnet'in araç tespiti çağrısına göre tahmini kazanç
+                'savedMs': 0.0 if escalated else round(self._baseline_ms - handled_ms, 1),
+                'counts': dict(self.counts),
+            }
+        print(json.dumps({'route': report}))
@@ -0,0 +1,138 @@
+"""
+Sürümlü istem (prompt) kayıt defteri.
+
+Sistem mesajı ve araç tanımları `prompts.json` dosyasından konteyner
+başlarken bir kez okunur ve değiştirilemez yapılara çevrilir; istek başına
+sözlük kurulmaz. Her sürüm için iki biçim hazırlanır:
+
+- düz: Converse'e olduğu gibi gönderilir,
+- önbellekli: statik önek (araçlar + sistem mesajı) sonuna Bedrock
+  `cachePoint` bloğu eklenir. Sadece `cache_point_models` listesindeki
+  (prompt caching destekleyen) modellerde kullanılır. Önek modelin asgari
+  önbellek boyutundan (Claude için ~1024 token) kısaysa Bedrock önbelleğe
+  yazmaz; istek yine normal işlenir.
+
+A/B: istek `prompt_version` gönderirse o sürüm, göndermezse oturum
+kimliğinin özetiyle `traffic` ağırlıklarına göre (aynı oturum hep aynı
+sürüm) seçilir. PROMPT_VERSION ortam değişkeni tüm trafiği tek sürüme sabitler.
+"""
+import json
+import zlib
+from typing import NamedTuple
+
+CACHE_POINT = {'cachePoint': {'type': 'default'}}
+
+
+def supports_cache_point(cache_models, model_id):
+    # Bölgeler arası inference profile ID'leri ('us.anthropic...') de eşleşir
+    return any(prefix in model_id for prefix in cache_models)
+
+
+class FrozenDict(dict):
+    """Değiştirilemeyen sözlük; boto3'e normal bir dict olarak geçer."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('İstem yapıları değiştirilemez.')
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+
+class FrozenList(list):
+    """Değiştirilemeyen liste; Converse'ün document alanları (inputSchema) tuple kabul etmez."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('İstem yapıları değiştirilemez.')
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+
+
+def freeze(value, document=False):
+    """Sözlükler FrozenDict, listeler tuple (document içinde FrozenList) olur."""
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item, document)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        items = (freeze(item, document) for item in value)
+        return FrozenList(items) if document else tuple(items)
+    return value
+
+
+class PromptSet(NamedTuple):
+    version: str
+    system: tuple
+    tool_config: FrozenDict
+    cached_system: tuple
+    cached_tool_config: FrozenDict
+    cache_models: tuple
+
+    def system_for(self, model_id):
+        return self.cached_system if supports_cache_point(self.cache_models, model_id) else self.system
+
+    def tools_for(self, model_id):
+        return self.cached_tool_config if supports_cache_point(self.cache_models, model_id) else self.tool_config
+
+
+def _build(version, spec, cache_models):
+    system = ({'text': spec['system']},)
+    tools = [{'toolSpec': {
+        'name': tool['name'],
+        'description': tool['description'],
+        'inputSchema': {'json': freeze(tool['input_schema'], document=True)},
+    }} for tool in spec.get('tools', [])]
+    return PromptSet(
+        version=version,
+        system=freeze(system),
+        tool_config=freeze({'tools': tools}),
+        cached_system=freeze(system + (CACHE_POINT,)),
+        cached_tool_config=freeze({'tools': tools + [CACHE_POINT]}),
+        cache_models=tuple(cache_models),
+    )
+
+
+def without_cache_points(kwargs):
+    """Converse parametrelerinden cachePoint bloklarını çıkarır (desteklemeyen yedek modeller için)."""
+    kwargs = dict(kwargs)
+    if 'system' in kwargs:
+        kwargs['system'] = tuple(block for block in kwargs['system'] if 'cachePoint' not in block)
+    if 'toolConfig' in kwargs:
+        tools = tuple(tool for tool in kwargs['toolConfig']['tools'] if 'cachePoint' not in tool)
+        kwargs['toolConfig'] = dict(kwargs['toolConfig'], tools=tools)
+    return kwargs
+
+
+class PromptRegistry:
+
+    def __init__(self, data, forced_version=None):
+        cache_models = data.get('cache_point_models', [])
+        self.versions = {version: _build(version, spec, cache_models) for version, spec in data['versions'].items()}
+        self.default = forced_version or data['default']
+        if self.default not in self.versions:
+            raise ValueError(f"Bilinmeyen istem sürümü: {self.default}")
+        traffic = {} if forced_version else data.get('traffic', {})
+        self._traffic = [(version, weight) for version, weight in traffic.items()
+                         if weight > 0 and version in self.versions]
+        self._total = sum(weight for _, weight in self._traffic)
+        self._cache_models = tuple(cache_models)
+
+    @classmethod
+    def load(cls, path, forced_version=None):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f), forced_version)
+
+    def adapt(self, model_id, kwargs):
+        """BedrockScheduler için: istek yedek modele giderken cachePoint'ler gerekirse çıkarılır."""
+        return kwargs if supports_cache_point(self._cache_models, model_id) else without_cache_points(kwargs)
+
+    def select(self, requested=None, session_id=None):
+        """İstenen sürüm geçerliyse o; yoksa oturuma göre ağırlıklı seçim; yoksa varsayılan."""
+        if requested in self.versions:
+            return self.versions[requested]
+        if self._total and session_id:
+            point = zlib.crc32(session_id.encode('utf-8')) % self._total
+            for version, weight in self._traffic:
+                if point < weight:
+                    return self.versions[version]
+                point -= weight
+        return self.versions[self.default]
@@ -0,0 +1,78 @@
+"""
+Converse API araç çağrılarını (toolUse) çalıştıran motor.
+
+Bir turdaki tüm toolUse blokları aynı anda çalıştırılır:
+- `register_batch` ile kaydedilen araçların bütün çağrıları tek bir
+  fonksiyon çağrısında toplanır (örn. birden fazla kitap tek sorguyla),
+- diğer araçlar ve farklı araç grupları thread havuzunda paralel çalışır.
+
+Sonuçlar, modelin istediği sırayla tek bir 'user' mesajında döner.
+"""
+
+
+class ToolEngine:
+
+    def __init__(self, executor):
+        self._executor = executor
+        self._handlers = {}
+        self._batch_handlers = {}
+
+    def register(self, name, handler):
+        """handler(input: dict) -> str"""
+        self._handlers[name] = handler
+
+    def register_batch(self, name, handler):
+        """handler(inputs: list[dict]) -> list[str] (aynı sırayla)"""
+        self._batch_handlers[name] = handler
+
+    def execute(self, output_message, on_tool=None):
+        """Mesajdaki toolUse bloklarını çalıştırır ve toolResult mesajını döner."""
+        tool_uses = [block['toolUse'] for block in output_message['content'] if 'toolUse' in block]
+        results = {}
+
+        batches = {}
+        futures = []
+        for tool_use in tool_uses:
+            name = tool_use['name']
+            if on_tool:
+                on_tool(name)
+            if name in self._batch_handlers:
+                batches.setdefault(name, []).append(tool_use)
+            elif name in self._handlers:
+                future = self._executor.submit(self._handlers[name], tool_use['input'])
+                futures.append(([tool_use], future, False))
+            else:
+                results[tool_use['toolUseId']] = _error_result(tool_use, f"Bilinmeyen araç: {name}")
+
+        for name, grouped in batches.items():
+            future = self._executor.submit(self._batch_handlers[name], [t['input'] for t in grouped])
+            futures.append((grouped, future, True))
+
+        for grouped, future, is_batch in futures:
+            try:
+                outputs = future.result()
+                if not is_batch:
+                    outputs = [outputs]
+                for tool_use, text in zip(grouped, outputs):
+                    results[tool_use['toolUseId']] = _result(tool_use, text)
+            except Exception as e:
+                print(f"Tool Error ({grouped[0]['name']}): {e}")
+                for tool_use in grouped:
+                    results[tool_use['toolUseId']] = _error_result(tool_use, "Araç çalıştırılırken hata oluştu.")
+
+        return {"role": "user", "content": [results[t['toolUseId']] for t in tool_uses]}
+
+
+def _result(tool_use, text):
+    return {
+        "toolResult": {
+            "toolUseId": tool_use['toolUseId'],
+            "content": [{"text": text}]
+        }
+    }
+
+
+def _error_result(tool_use, text):
+    result = _result(tool_use, text)
+    result['toolResult']['status'] = 'error'
+    return result
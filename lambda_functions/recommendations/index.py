@@ -0,0 +1,92 @@
+import os
+from botocore.exceptions import ClientError
+
+from library_common.clients import lazy_client, lazy_resource
+from library_common.http import BadRequest, Unauthorized, cached_response, json_response, page_limit, require_user
+from library_common.loans import LoanService
+from library_common.recommendations import EmbeddingStore
+
+# Kitap önerileri (gömme vektörleri S3'te, konteynerde mmap ile açılır):
+# GET /books/{bookId}/similar  -> bu kitaba benzeyenler
+# GET /recommendations         -> kullanıcının son ödünçlerine göre öneriler
+#                                 (ödünç geçmişi kişisel veridir; kullanıcı sadece Cognito token'ından alınır)
+s3 = lazy_client('s3')
+dynamodb = lazy_resource('dynamodb')
+
+BOOKS_TABLE_NAME = os.environ.get('BOOKS_TABLE_NAME', 'LibraryBooks')
+LOANS_TABLE_NAME = os.environ.get('LOANS_TABLE_NAME', 'UserLoans')
+INDEX_BUCKET_NAME = os.environ.get('INDEX_BUCKET_NAME')
+EMBEDDINGS_PREFIX = os.environ.get('EMBEDDINGS_PREFIX', 'recommendations/')
+EMBEDDINGS_CHECK_SECONDS = float(os.environ.get('EMBEDDINGS_CHECK_SECONDS', '300'))
+# Profil için okunan son ödünç sayısı
+LOAN_HISTORY = int(os.environ.get('RECOMMENDATION_LOAN_HISTORY', '20'))
+# Öneriler günde birkaç kez değişir; kısa süre önbellekte tutulabilir
+RECOMMENDATIONS_MAX_AGE_SECONDS = int(os.environ.get('RECOMMENDATIONS_MAX_AGE_SECONDS', '300'))
+
+_store = None
+_loan_service = None
+
+
+def embedding_store():
+    global _store
+    if _store is None:
+        _store = EmbeddingStore(s3, INDEX_BUCKET_NAME, EMBEDDINGS_PREFIX, check_interval=EMBEDDINGS_CHECK_SECONDS)
+    return _store
+
+
+def loan_service():
+    global _loan_service
+    if _loan_service is None:
+        _loan_service = LoanService(dynamodb.meta.client, BOOKS_TABLE_NAME, LOANS_TABLE_NAME)
+    return _loan_service
+
+
+def not_ready():
+    return json_response(503, {'error': 'Öneri indeksi henüz oluşturulmadı.'})
+
+
+def similar_books(event, params):
+    index = embedding_store().current()
+    if index is None:
+        return not_ready()
+    items = index.similar(params['bookId'], k=page_limit(event, default=10, maximum=50))
+    if items is None:
+        return json_response(404, {'error': 'Kitap öneri indeksinde bulunamadı.'})
+    return cached_response(event, {'bookId': params['bookId'], 'items': items, 'version': index.version},
+                           cache_control=f"public, max-age={RECOMMENDATIONS_MAX_AGE_SECONDS}")
+
+
+def user_recommendations(event, params):
+    user_id = require_user(event)
+    index = embedding_store().current()
+    if index is None:
+        return not_ready()
+    loans, _ = loan_service().list_loans(user_id, limit=LOAN_HISTORY)
+    book_ids = [loan['bookId'] for loan in loans if loan.get('bookId')]
+    items = index.for_books(book_ids, k=page_limit(event, default=10, maximum=50))
+    return cached_response(event, {'items': items, 'basedOn': len(book_ids), 'version': index.version},
+                           cache_control=f"private, max-age={RECOMMENDATIONS_MAX_AGE_SECONDS}")
+
+
+ROUTES = {
+    ('GET', '/books/{bookId}/similar'): similar_books,
+    ('GET', '/recommendations'): user_recommendations,
+}
+
+
+def handler(event, context):
+    route = ROUTES.get((event.get('httpMethod'), event.get('resource')))
+    if not route:
+        return json_response(404, {'error': 'Bulunamadı.'})
+    try:
+        return route(event, event.get('pathParameters') or {})
+    except BadRequest as e:
+        return json_response(400, {'error': str(e)})
+    except Unauthorized as e:
+        return json_response(401, {'error': str(e)})
+    except ClientError as e:
+        print(f"Recommendations AWS Error: {e}")
+        return json_response(500, {'error': 'AWS Service Error', 'details': str(e)})
+    except Exception as e:
+        print(f"Recommendations Error: {e}")
+        return json_response(500, {'error': 'Sunucu hatası', 'details': str(e)})
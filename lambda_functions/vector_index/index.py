@@ -0,0 +1,66 @@
+import json
+import os
+import time
+
+import boto3
+
+from library_common.vector_index import OpenSearchClient, VectorIndexError, delete_index, ensure_index, normalize_spec
+
+# CloudFormation Custom Resource (CDK Provider framework): AOSS koleksiyonundaki
+# Bedrock vektör indeksini oluşturur, ayarları değişince günceller veya göç
+# ettirir, kaynak silinince indeksi siler. Özellikler: CollectionEndpoint +
+# library_common.vector_index spec alanları.
+REGION = os.environ.get('AWS_REGION', 'us-east-1')
+# Veri erişim politikası yeni oluşturulduysa AOSS yetkisi birkaç dakika içinde yayılır
+ACCESS_WAIT_SECONDS = int(os.environ.get('AOSS_ACCESS_WAIT_SECONDS', '300'))
+SETTLE_SECONDS = int(os.environ.get('VECTOR_INDEX_SETTLE_SECONDS', '10'))
+
+
+def opensearch(endpoint):
+    return OpenSearchClient(endpoint, region=REGION, credentials=boto3.session.Session().get_credentials())
+
+
+def with_access_retry(operation):
+    """403 (politika henüz yayılmadı) alındıkça tekrar dener; işlemler idempotenttir."""
+    deadline = time.monotonic() + ACCESS_WAIT_SECONDS
+    delay = 5
+    while True:
+        try:
+            return operation()
+        except VectorIndexError as e:
+            if e.status != 403 or time.monotonic() > deadline:
+                raise
+            print(f"Vector Index: erişim bekleniyor ({e})")
+            time.sleep(delay)
+            delay = min(delay * 2, 30)
+
+
+def physical_id(endpoint, spec):
+    return f"{endpoint.rstrip('/')}/{spec['indexName']}"
+
+
+def handler(event, context):
+    request_type = event['RequestType']
+    properties = dict(event.get('ResourceProperties') or {})
+    properties.pop('ServiceToken', None)
+    endpoint = properties.pop('CollectionEndpoint')
+    spec = normalize_spec(properties)
+    client = opensearch(endpoint)
+
+    try:
+        if request_type == 'Delete':
+            # Fiziksel kimlik değiştiyse (yeni indeks adı / koleksiyon) eski indeks de bu yolla silinir
+            old_endpoint, _, old_name = event['PhysicalResourceId'].rpartition('/')
+            if old_name and old_endpoint:
+                with_access_retry(lambda: delete_index(opensearch(old_endpoint), old_name))
+            return {'PhysicalResourceId': event['PhysicalResourceId']}
+
+        result = with_access_retry(lambda: ensure_index(client, spec, settle_seconds=SETTLE_SECONDS))
+        print(json.dumps({'request': request_type, 'index': spec['indexName'], **result}, ensure_ascii=False))
+        return {
+            'PhysicalResourceId': physical_id(endpoint, spec),
+            'Data': {'IndexName': spec['indexName'], 'Action': result['action']},
+        }
+    except Exception as e:
+        print(f"Vector Index Error: {e}")
+        raise
@@ -0,0 +1,60 @@
+import os
+
+import jwt
+
+# WebSocket API $connect yetkilendiricisi (Lambda authorizer, REQUEST tipi).
+# Tarayıcı WebSocket'i başlık gönderemediği için Cognito ID token'ı `token`
+# sorgu parametresiyle gelir. İmza kullanıcı havuzunun JWKS anahtarlarıyla,
+# iss / aud / token_use ve süre PyJWT ile doğrulanır (PyJwtLayer).
+# Dönen context bağlantının sonraki mesajlarında requestContext.authorizer
+# olarak iletilir; library_common.http kullanıcıyı oradan okur.
+USER_POOL_ID = os.environ.get('USER_POOL_ID', '')
+APP_CLIENT_ID = os.environ.get('APP_CLIENT_ID', '')
+REGION = os.environ.get('AWS_REGION', 'us-east-1')
+ISSUER = f"https://cognito-idp.{REGION}.amazonaws.com/{USER_POOL_ID}"
+TOKEN_PARAMETER = 'token'
+
+# Anahtarlar ilk doğrulamada indirilir ve konteyner boyunca önbellekte tutulur
+jwks_client = jwt.PyJWKClient(f"{ISSUER}/.well-known/jwks.json", cache_keys=True)
+
+
+def verify(token):
+    """Cognito ID token'ının claim'leri; geçersizse jwt.PyJWTError."""
+    signing_key = jwks_client.get_signing_key_from_jwt(token)
+    claims = jwt.decode(token, signing_key.key, algorithms=['RS256'], audience=APP_CLIENT_ID, issuer=ISSUER,
+                        options={'require': ['exp', 'iss', 'aud', 'sub']})
+    if claims.get('token_use') != 'id':
+        raise jwt.InvalidTokenError('ID token bekleniyordu.')
+    return claims
+
+
+def policy(principal_id, effect, resource, context=None):
+    document = {
+        'principalId': principal_id,
+        'policyDocument': {
+            'Version': '2012-10-17',
+            'Statement': [{'Action': 'execute-api:Invoke', 'Effect': effect, 'Resource': resource}],
+        },
+    }
+    if context:
+        document['context'] = context
+    return document
+
+
+def handler(event, context):
+    token = (event.get('queryStringParameters') or {}).get(TOKEN_PARAMETER)
+    try:
+        if not token:
+            raise jwt.InvalidTokenError('Token yok.')
+        claims = verify(token)
+    except jwt.PyJWTError as e:
+        print(f"Authorizer Error: {e}")
+        return policy('anonymous', 'Deny', event['methodArn'])
+
+    # Context değerleri düz metin olmalı; gruplar REST yetkilendiricisindeki gibi virgülle ayrılır
+    groups = claims.get('cognito:groups') or []
+    return policy(claims['sub'], 'Allow', event['methodArn'], {
+        'sub': claims['sub'],
+        'cognito:username': claims.get('cognito:username') or claims['sub'],
+        'cognito:groups': ','.join(groups),
+    })
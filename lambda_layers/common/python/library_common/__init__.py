@@ -0,0 +1,6 @@
+"""
+Kütüphane Lambda fonksiyonlarının ortak kodu.
+
+Bu paket bir Lambda Layer olarak yüklenir (`lambda_layers/common`), bu yüzden
+Lambda ortamında doğrudan `import library_common` ile kullanılabilir.
+"""
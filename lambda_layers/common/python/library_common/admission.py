@@ -0,0 +1,298 @@
+"""
+Asistan uç noktaları için istek kabulü: kullanıcı başına hız sınırı ve
+aynı isteklerin birleştirilmesi (single-flight).
+
+Çift tıklama veya tarayıcının yeniden denemesi, aynı soru için ikinci bir
+Bedrock üretimi başlatıyordu. Her istek, model çağrılmadan önce buradan geçer:
+
+1. Birleştirme: anahtar (kullanıcı, normalize edilmiş mesaj) özetidir. İlk
+   istek kaydı koşullu PutItem ile sahiplenir (lider). Aynı anahtarla gelen
+   diğer istekler liderin sonucunu bekler ve aynı yanıtı döner; sonuç
+   `coalesce_seconds` boyunca paylaşılır. Lider hata verirse kaydı siler,
+   bekleyenlerden biri liderliği devralır.
+2. Hız sınırı: sadece lider (modeli çağıracak istek) kullanıcının token
+   bucket'ından bir token harcar. Bucket, GCRA biçiminde tek bir sayaçtır
+   (`tat`: bir sonraki isteğin "teorik varış zamanı", ms); koşullu
+   UpdateItem ile atomik olarak ilerletilir, okuma-yazma yarışı olmaz.
+   Token yoksa `RateLimited` fırlatılır; handler bunu `Retry-After` ile 429
+   olarak döner.
+
+    pk                  | sk     |
+    --------------------+--------+------------------------------------------
+    bucket#<kullanıcı>  | bucket | tat, expiresAt
+    flight#<özet>       | flight | state (pending/done), owner, result, expiresAt
+
+Kayıtlar TTL (`expiresAt`) ile kendiliğinden silinir. Tablo erişilemezse
+istek kabul edilir (hız sınırı asistanı kullanılmaz hale getirmemeli).
+
+    with admission.admit(user_id, message, max_wait=scheduler.remaining()) as flight:
+        if flight.coalesced:
+            return flight.result
+        ...
+        flight.complete({'response': text})
+"""
+import hashlib
+import math
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+from library_common.http import Unauthorized, authenticated_user
+from library_common.text import normalize_prompt
+
+BUCKET_SORT_KEY = 'bucket'
+FLIGHT_SORT_KEY = 'flight'
+PENDING = 'pending'
+DONE = 'done'
+# Aynı kullanıcının eşzamanlı istekleri tat sayacında çakışırsa yeniden deneme sayısı
+MAX_BUCKET_ATTEMPTS = 5
+
+# Kimliksiz isteklerin kaynak IP'sine göre sınırlanmasına sadece yerelde / geliştirmede
+# izin verilir (tools/local_server.py açar). Aynı NAT arkasındaki kullanıcılar tek bir
+# kovayı ve birleştirilen yanıtları paylaşacağı için üretimde istek reddedilir.
+ALLOW_ANONYMOUS = os.environ.get('ALLOW_ANONYMOUS_REQUESTS') == '1'
+
+_deserializer = TypeDeserializer()
+
+
+class RateLimited(Exception):
+    """Kullanıcının token bucket'ı boş; `retry_after` saniye sonra tekrar denenebilir."""
+
+    def __init__(self, user_id, retry_after):
+        super().__init__(f"İstek sınırı aşıldı: {user_id}")
+        self.user_id = user_id
+        self.retry_after = retry_after
+
+
+def requester(event):
+    """
+    Hız sınırının anahtarı: Cognito kullanıcısı (token claim'leri). İstemcinin
+    gönderdiği X-User-ID / userId kullanılmaz; aksi halde her istekte farklı
+    bir kimlik yazılarak sınır aşılabilirdi. Kullanıcı yoksa Unauthorized;
+    ALLOW_ANONYMOUS açıksa (yerel) isteğin kaynak IP'si kullanılır.
+    """
+    user_id = authenticated_user(event)
+    if user_id:
+        return f"user#{user_id}"
+    if not ALLOW_ANONYMOUS:
+        raise Unauthorized('Asistanı kullanmak için oturum açmanız gerekiyor.')
+    source_ip = (event.get('requestContext') or {}).get('identity', {}).get('sourceIp')
+    return f"ip#{source_ip or 'unknown'}"
+
+
+def flight_key(user_id, message):
+    digest = hashlib.sha256(f"{user_id}\n{normalize_prompt(message)}".encode('utf-8')).hexdigest()
+    return f"flight#{digest[:32]}"
+
+
+def _is_conditional_failure(error):
+    return error.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException'
+
+
+def _old_item(error):
+    """ReturnValuesOnConditionCheckFailure=ALL_OLD ile dönen kayıt (hata yanıtı kablo formatındadır)."""
+    return {name: _deserializer.deserialize(value) for name, value in error.response.get('Item', {}).items()}
+
+
+class Flight:
+    """Bir isteğin birleştirme kaydı. `coalesced` ise `result` liderin sonucudur."""
+
+    __slots__ = ('key', 'owner', 'coalesced', 'result', '_admission', '_open')
+
+    def __init__(self, admission, key, owner, coalesced=False, result=None):
+        self._admission = admission
+        self.key = key
+        self.owner = owner
+        self.coalesced = coalesced
+        self.result = result
+        self._open = owner is not None
+
+    def complete(self, result):
+        """Sonucu bekleyen ve pencere içinde gelen aynı isteklerle paylaşır."""
+        if self._open:
+            self._open = False
+            self._admission._finish(self, result)
+
+    def abandon(self):
+        """Lider sonuç üretemedi: kayıt silinir, bekleyenlerden biri devralır."""
+        if self._open:
+            self._open = False
+            self._admission._release(self)
+
+
+class RequestAdmission:
+
+    def __init__(self, table, rate_per_minute=10, burst=5, coalesce_seconds=10, lease_seconds=60,
+                 poll_interval=0.2, tracer=None):
+        """
+        `rate_per_minute` / `burst`: kullanıcı başına sürekli hız ve art arda
+        izin verilen istek sayısı.
+        `coalesce_seconds`: tamamlanan bir sonucun aynı isteklerle paylaşıldığı süre.
+        `lease_seconds`: liderin kaydı en fazla bu kadar tutar (çöken lider
+        bekleyenleri sonsuza kadar bekletmez).
+        """
+        self._table = table
+        self._interval_ms = max(1, round(60000 / rate_per_minute))
+        self._tolerance_ms = (max(1, burst) - 1) * self._interval_ms
+        self._coalesce = coalesce_seconds
+        self._lease = lease_seconds
+        self._poll = poll_interval
+        self._tracer = tracer
+
+    @contextmanager
+    def admit(self, user_id, message, max_wait=30.0):
+        """
+        İsteği kabul eder ve Flight döner; sınır aşıldıysa RateLimited fırlatır.
+        Blok sonuç kaydedilmeden (complete) çıkarsa kayıt bırakılır.
+        `max_wait`: aynı isteğin sonucu için en fazla bekleme (sn).
+        """
+        flight = self._join(user_id, message, max_wait)
+        try:
+            yield flight
+        finally:
+            flight.abandon()
+
+    # -- Birleştirme ----------------------------------------------------------------
+
+    def _join(self, user_id, message, max_wait):
+        key = flight_key(user_id, message)
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + min(max_wait, self._lease)
+        try:
+            while True:
+                item = self._claim(key, owner)
+                if item is None:
+                    return self._admitted(user_id, Flight(self, key, owner))
+                if item.get('state') != DONE:
+                    # Lider henüz bitirmedi: sonucu bekle
+                    item = self._wait(key, deadline)
+                if item is None:
+                    # Lider başarısız oldu (kayıt silindi): liderliği almayı tekrar dene
+                    continue
+                if item.get('state') == DONE:
+                    self._count('Coalesced')
+                    return Flight(self, key, None, coalesced=True, result=item.get('result'))
+                # Bekleme süresi doldu; lider hâlâ çalışıyor, bu istek birleştirilmeden devam eder
+                print(f"Admission: {key} için bekleme süresi doldu.")
+                self._count('WaitTimeouts')
+                return self._admitted(user_id, Flight(self, key, None))
+        except ClientError as e:
+            print(f"Admission Error: {e}")
+            return Flight(self, key, None)
+
+    def _claim(self, key, owner):
+        """Kaydı sahiplenir ve None döner; başkasına aitse mevcut kaydı döner."""
+        now = int(time.time())
+        try:
+            self._table.put_item(
+                Item={'pk': key, 'sk': FLIGHT_SORT_KEY, 'state': PENDING, 'owner': owner,
+                      'expiresAt': now + self._lease},
+                ConditionExpression='attribute_not_exists(pk) OR expiresAt < :now',
+                ExpressionAttributeValues={':now': now},
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+            return None
+        except ClientError as e:
+            if not _is_conditional_failure(e):
+                raise
+            return _old_item(e) or {'state': PENDING}
+
+    def _wait(self, key, deadline):
+        """
+        Tutarlı okuma ile bekler: tamamlanan kaydı, kayıt silindiyse / kirası
+        dolduysa None'ı, süre dolduysa bekleyen kaydı döner.
+        """
+        while time.monotonic() < deadline:
+            time.sleep(min(self._poll, max(0.0, deadline - time.monotonic())))
+            item = self._table.get_item(Key={'pk': key, 'sk': FLIGHT_SORT_KEY}, ConsistentRead=True).get('Item')
+            if item is None or int(item.get('expiresAt', 0)) < time.time():
+                return None
+            if item.get('state') == DONE:
+                return item
+        return {'state': PENDING}
+
+    def _finish(self, flight, result):
+        try:
+            self._table.put_item(
+                Item={'pk': flight.key, 'sk': FLIGHT_SORT_KEY, 'state': DONE, 'owner': flight.owner,
+                      'result': result, 'expiresAt': int(time.time()) + self._coalesce},
+                ConditionExpression='#owner = :owner',
+                ExpressionAttributeNames={'#owner': 'owner'},
+                ExpressionAttributeValues={':owner': flight.owner}
+            )
+        except ClientError as e:
+            # Kira dolup kayıt başka bir isteğe geçtiyse sonucu onun üzerine yazma
+            if not _is_conditional_failure(e):
+                print(f"Admission Error: {e}")
+
+    def _release(self, flight):
+        try:
+            self._table.delete_item(
+                Key={'pk': flight.key, 'sk': FLIGHT_SORT_KEY},
+                ConditionExpression='#owner = :owner',
+                ExpressionAttributeNames={'#owner': 'owner'},
+                ExpressionAttributeValues={':owner': flight.owner}
+            )
+        except ClientError as e:
+            if not _is_conditional_failure(e):
+                print(f"Admission Error: {e}")
+
+    # -- Hız sınırı -----------------------------------------------------------------
+
+    def _admitted(self, user_id, flight):
+        """Modeli çağıracak istek için token harcar; token yoksa kaydı bırakıp RateLimited fırlatır."""
+        try:
+            self._take_token(user_id)
+        except RateLimited:
+            flight.abandon()
+            self._count('Rejected')
+            raise
+        except ClientError as e:
+            print(f"Admission Error: {e}")
+        return flight
+
+    def _take_token(self, user_id):
+        """
+        GCRA: izin verilirse tat = max(tat, şimdi) + aralık. tat şimdiden
+        `burst - 1` aralıktan fazla ilerideyse bucket boştur.
+        """
+        key = {'pk': f"bucket#{user_id}", 'sk': BUCKET_SORT_KEY}
+        now = int(time.time() * 1000)
+        # Boş veya dolu (tat geçmişte) bucket: tek yazımla
+        condition = 'attribute_not_exists(tat) OR tat <= :now'
+        values = {':now': now}
+        tat = now
+        for _ in range(MAX_BUCKET_ATTEMPTS):
+            if tat - now > self._tolerance_ms:
+                retry_after = math.ceil((tat - now - self._tolerance_ms) / 1000)
+                raise RateLimited(user_id, max(1, retry_after))
+            new_tat = tat + self._interval_ms
+            try:
+                self._table.update_item(
+                    Key=key,
+                    UpdateExpression='SET tat = :tat, expiresAt = :expires',
+                    ConditionExpression=condition,
+                    ExpressionAttributeValues={**values, ':tat': new_tat, ':expires': new_tat // 1000 + 60},
+                    ReturnValuesOnConditionCheckFailure='ALL_OLD'
+                )
+                return
+            except ClientError as e:
+                if not _is_conditional_failure(e):
+                    raise
+                old = _old_item(e).get('tat')
+            if old is None:
+                break
+            old = int(old)
+            # Sayaç gelecekte: görülen değerden ilerlet (araya başka yazım girdiyse tekrar dene)
+            tat = max(old, now)
+            condition = 'tat = :old'
+            values = {':old': old}
+        raise RateLimited(user_id, max(1, math.ceil(self._interval_ms / 1000)))
+
+    def _count(self, name):
+        if self._tracer:
+            self._tracer.current.count_for({'Admission': name}, 'Requests', always=True)
@@ -0,0 +1,98 @@
+"""
+Yanıt döndükten sonra iş çalıştırmak için Lambda "internal extension" kancası.
+
+Lambda, bir çağrıda handler yanıt döndüğünde istemciye yanıtı hemen iletir;
+ancak kayıtlı extension'lar `/extension/event/next` çağırana kadar ortamı
+dondurmaz. Bu modül, INVOKE olaylarına kaydolan bir arka plan thread'i
+başlatır: handler bitince ertelenen işler (örn. DynamoDB yazımları) bu
+thread'de çalışır ve ancak bittikten sonra ortam serbest bırakılır. Böylece
+işler kullanıcı gecikmesine eklenmez ve konteyner donarken yarıda kalmaz.
+
+Extensions API yoksa (yerel çalıştırma, kayıt hatası) ertelenen işler
+handler dönmeden önce senkron olarak çalıştırılır.
+"""
+import functools
+import json
+import os
+import threading
+import urllib.request
+
+_EXTENSION_API = "2020-01-01/extension"
+
+
+class AfterResponseHook:
+
+    def __init__(self, name='library-after-response'):
+        self._name = name
+        self._tasks = []
+        self._lock = threading.Lock()
+        self._handler_done = threading.Event()
+        self._extension_id = None
+
+    @property
+    def active(self):
+        return self._extension_id is not None
+
+    def start(self):
+        """
+        Extension'ı kaydeder ve olay döngüsünü başlatır. Kayıt, Lambda
+        init aşamasında (modül yüklenirken) yapılmalıdır.
+        """
+        runtime_api = os.environ.get('AWS_LAMBDA_RUNTIME_API')
+        if not runtime_api or self.active:
+            return self
+        try:
+            request = urllib.request.Request(
+                f"http://{runtime_api}/{_EXTENSION_API}/register",
+                data=json.dumps({'events': ['INVOKE']}).encode('utf-8'),
+                headers={'Lambda-Extension-Name': self._name},
+                method='POST'
+            )
+            with urllib.request.urlopen(request) as response:
+                self._extension_id = response.headers['Lambda-Extension-Identifier']
+        except Exception as e:
+            print(f"Extension Register Error: {e}")
+            return self
+        threading.Thread(target=self._loop, args=(runtime_api,), daemon=True).start()
+        return self
+
+    def defer(self, task):
+        """task() yanıt döndükten sonra çalıştırılır."""
+        with self._lock:
+            self._tasks.append(task)
+
+    def wrap(self, handler):
+        """Handler'ı, her çağrının sonunda ertelenen işleri tetikleyecek şekilde sarar."""
+        @functools.wraps(handler)
+        def wrapped(event, context):
+            try:
+                return handler(event, context)
+            finally:
+                if self.active:
+                    self._handler_done.set()
+                else:
+                    self.run_pending()
+        return wrapped
+
+    def run_pending(self):
+        with self._lock:
+            tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            try:
+                task()
+            except Exception as e:
+                print(f"After Response Error: {e}")
+
+    def _loop(self, runtime_api):
+        next_request = urllib.request.Request(
+            f"http://{runtime_api}/{_EXTENSION_API}/event/next",
+            headers={'Lambda-Extension-Identifier': self._extension_id}
+        )
+        while True:
+            # İlk çağrı init'in bittiğini bildirir; sonrakiler önceki çağrının
+            # işlerinin bittiğini. Yeni bir INVOKE gelince döner.
+            with urllib.request.urlopen(next_request) as response:
+                json.loads(response.read() or b'{}')
+            self._handler_done.wait()
+            self._handler_done.clear()
+            self.run_pending()
@@ -0,0 +1,219 @@
+"""
+Bedrock model çağrıları için hız sınırlama, yeniden deneme ve yedek model.
+
+Yoğun saatlerde `ThrottlingException` doğrudan 500 olarak dönüyordu. Bu
+sınıf `bedrock-runtime` istemcisinin model çağrılarını sarar:
+
+- Model başına token bucket: konteyner, modele saniyede en fazla `rate`
+  istek gönderir. Kısıtlandıkça hız yarıya iner, başarılı çağrılarla
+  yavaşça yapılandırılan değere geri döner (AIMD). Bedrock kotası hesap
+  genelinde olduğu için sabit bir değer yerine bu uyarlama kullanılır.
+- Kısıtlama / geçici hatalarda jitter'lı üstel bekleme ile yeniden deneme;
+  beklemeler Lambda'nın kalan süresini (`context.get_remaining_time_in_millis()`)
+  aşmaz.
+- Birincil model doyduysa (denemeler veya süre bittiyse) `fallbacks`'teki
+  daha ucuz / hızlı modele geçilir. Hepsi doyduysa `ModelSaturated`
+  fırlatılır; handler bunu `Retry-After` ile 503 olarak döner.
+
+Akışlı çağrılarda (`converse_stream`) sadece akışı açan çağrı yeniden
+denenir; istemciye metin gönderilmeye başladıktan sonra tekrar denenmez.
+
+botocore'un kendi yeniden denemeleri bu istemci için kapatılmalıdır
+(`AWS_MAX_ATTEMPTS_BEDROCK_RUNTIME=1`), aksi halde beklemeler süre
+bütçesinden habersiz iki katına çıkar.
+"""
+import functools
+import random
+import threading
+import time
+
+# Aynı modelle yeniden denenebilir hatalar; ilk ikisi modelin doyduğunu gösterir
+THROTTLE_ERRORS = {'ThrottlingException', 'TooManyRequestsException', 'ServiceUnavailableException'}
+RETRYABLE_ERRORS = THROTTLE_ERRORS | {'ModelNotReadyException', 'InternalServerException'}
+
+
+class ModelSaturated(Exception):
+    """Birincil ve yedek modellerin hiçbiri süre bütçesi içinde yanıt vermedi."""
+
+    def __init__(self, model_id, retry_after):
+        super().__init__(f"Model kapasitesi dolu: {model_id}")
+        self.model_id = model_id
+        self.retry_after = retry_after
+
+
+def _error_code(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+
+class TokenBucket:
+    """Uyarlanabilir hızlı token bucket (istek / sn)."""
+
+    def __init__(self, rate, burst, min_rate=0.5, recovery=0.05):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self._capacity = float(burst)
+        self._tokens = float(burst)
+        self._min_rate = min_rate
+        self._recovery = recovery
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait):
+        """
+        Bir token ayırır, gerekirse bekler. Bekleme `max_wait` saniyeyi
+        aşacaksa ayırmaz ve False döner.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Token eksiye düşebilir: sıradaki istekler sırayla bekler
+            wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+            if wait > max_wait:
+                return False
+            self._tokens -= 1
+        if wait:
+            time.sleep(wait)
+        return True
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(self._min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self._recovery)
+
+
+class BedrockScheduler:
+
+    def __init__(self, client, rates=None, default_rate=5.0, burst=10, fallbacks=None, max_attempts=4,
+                 base_delay=0.25, max_delay=4.0, max_queue_wait=1.0, reserve_ms=3000, tracer=None, adapt=None):
+        """
+        `rates`: {model ID: istek/sn}; tanımsız modeller `default_rate` kullanır.
+        `fallbacks`: {model ID: [yedek model ID, ...]} (sırayla denenir).
+        `max_queue_wait`: yedeği olan bir model için bucket'ta en fazla bekleme (sn).
+        `reserve_ms`: kalan süreden yanıtı tamamlamak için ayrılan pay.
+        `adapt(model ID, parametreler) -> parametreler`: istek her modele
+        gönderilmeden önce uyarlanır (örn. yedek modelin desteklemediği alanlar).
+        """
+        self._client = client
+        self._rates = dict(rates or {})
+        self._default_rate = default_rate
+        self._burst = burst
+        self._fallbacks = {model: list(models) for model, models in (fallbacks or {}).items()}
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._max_queue_wait = max_queue_wait
+        self._reserve = reserve_ms / 1000
+        self._tracer = tracer
+        self._adapt = adapt
+        self._buckets = {}
+        self._deadline = None
+        self._lock = threading.Lock()
+        # Konteyner ömrü boyunca model başına sayaçlar
+        self.counters = {}
+
+    # -- Bedrock istemcisi ile aynı imzalar ----------------------------------------
+
+    def converse(self, **kwargs):
+        return self.call('converse', **kwargs)
+
+    def converse_stream(self, **kwargs):
+        return self.call('converse_stream', **kwargs)
+
+    def invoke_model(self, **kwargs):
+        return self.call('invoke_model', **kwargs)
+
+    def invoke_model_with_response_stream(self, **kwargs):
+        return self.call('invoke_model_with_response_stream', **kwargs)
+
+    # -- Süre bütçesi ---------------------------------------------------------------
+
+    def wrap(self, handler):
+        """Handler süresince beklemeleri Lambda'nın kalan süresiyle sınırlar."""
+        @functools.wraps(handler)
+        def wrapped(event, context):
+            remaining = getattr(context, 'get_remaining_time_in_millis', None)
+            self._deadline = time.monotonic() + remaining() / 1000 - self._reserve if remaining else None
+            try:
+                return handler(event, context)
+            finally:
+                self._deadline = None
+        return wrapped
+
+    def remaining(self):
+        """Bekleme için kalan süre (sn); handler dışında sınırsız."""
+        if self._deadline is None:
+            return float('inf')
+        return max(0.0, self._deadline - time.monotonic())
+
+    # -- Çağrı ------------------------------------------------------------------------
+
+    def call(self, operation, modelId, **kwargs):
+        """Çağrıyı birincil modelle, gerekirse yedek modellerle yapar."""
+        models = [modelId] + self._fallbacks.get(modelId, [])
+        for i, model_id in enumerate(models):
+            if i:
+                self._count(models[i - 1], 'Fallbacks')
+                print(f"Bedrock: {models[i - 1]} doydu, {model_id} deneniyor.")
+            request = self._adapt(model_id, kwargs) if self._adapt else kwargs
+            done, response = self._attempt(operation, model_id, request, last=i == len(models) - 1)
+            if done:
+                return response
+        raise ModelSaturated(modelId, retry_after=max(1, round(self._max_delay)))
+
+    def _attempt(self, operation, model_id, kwargs, last):
+        """(başarılı mı, yanıt). Model doyduysa (False, None); diğer hatalar fırlatılır."""
+        bucket = self._bucket(model_id)
+        method = getattr(self._client, operation)
+        for attempt in range(self._max_attempts):
+            # Yedek model varsa birincil için uzun süre sırada beklenmez
+            max_wait = self.remaining() if last else min(self.remaining(), self._max_queue_wait)
+            if not bucket.acquire(max_wait):
+                self._count(model_id, 'Rejected')
+                return False, None
+            try:
+                response = method(modelId=model_id, **kwargs)
+            except Exception as e:
+                code = _error_code(e)
+                if code not in RETRYABLE_ERRORS:
+                    self._count(model_id, 'Errors')
+                    raise
+                if code in THROTTLE_ERRORS:
+                    bucket.on_throttle()
+                    self._count(model_id, 'Throttles')
+                delay = min(self._max_delay, self._base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+                if attempt == self._max_attempts - 1 or delay > self.remaining():
+                    return False, None
+                self._count(model_id, 'Retries')
+                time.sleep(delay)
+                continue
+            bucket.on_success()
+            self._count(model_id, 'Successes')
+            return True, response
+        return False, None
+
+    def _bucket(self, model_id):
+        bucket = self._buckets.get(model_id)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.setdefault(
+                    model_id, TokenBucket(self._rates.get(model_id, self._default_rate), self._burst))
+        return bucket
+
+    def _count(self, model_id, name):
+        with self._lock:
+            counters = self.counters.setdefault(model_id, {})
+            counters[name] = counters.get(name, 0) + 1
+        if self._tracer:
+            self._tracer.current.count_for({'ModelId': model_id}, name, always=True)
+
+    def snapshot(self):
+        """Sayaçlar ve modellerin o anki izinli hızı (log için)."""
+        with self._lock:
+            return {model: dict(counters, rate=round(self._buckets[model].rate, 2))
+                    if model in self._buckets else dict(counters)
+                    for model, counters in self.counters.items()}
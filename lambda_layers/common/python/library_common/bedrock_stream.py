@@ -0,0 +1,81 @@
+"""
+Bedrock streaming API'lerinin olaylarını toplayan yardımcılar.
+"""
+import json
+
+
+def collect_converse_stream(response, on_text=None):
+    """
+    `converse_stream` olaylarını tüketir ve `converse` ile aynı yapıda bir
+    sonuç döner: {'output': {'message': ...}, 'stopReason': ..., 'usage': ...}.
+
+    Metin parçaları geldikçe `on_text(parça)` çağrılır. Araç (toolUse)
+    girdileri parça parça JSON olarak geldiği için blok bitince çözülür.
+    """
+    blocks = {}
+    role = 'assistant'
+    stop_reason = None
+    usage = {}
+
+    for event in response['stream']:
+        if 'messageStart' in event:
+            role = event['messageStart'].get('role', role)
+        elif 'contentBlockStart' in event:
+            start = event['contentBlockStart']
+            tool_use = start.get('start', {}).get('toolUse')
+            if tool_use:
+                blocks[start['contentBlockIndex']] = {
+                    'toolUse': {'toolUseId': tool_use['toolUseId'], 'name': tool_use['name'], 'input': ''}
+                }
+        elif 'contentBlockDelta' in event:
+            delta_event = event['contentBlockDelta']
+            index = delta_event['contentBlockIndex']
+            delta = delta_event['delta']
+            if 'text' in delta:
+                block = blocks.setdefault(index, {'text': ''})
+                block['text'] += delta['text']
+                if on_text:
+                    on_text(delta['text'])
+            elif 'toolUse' in delta:
+                block = blocks.setdefault(index, {'toolUse': {'input': ''}})
+                block['toolUse']['input'] += delta['toolUse'].get('input', '')
+        elif 'messageStop' in event:
+            stop_reason = event['messageStop'].get('stopReason')
+        elif 'metadata' in event:
+            usage = event['metadata'].get('usage', {})
+
+    content = []
+    for index in sorted(blocks):
+        block = blocks[index]
+        if 'toolUse' in block:
+            raw_input = block['toolUse']['input']
+            block['toolUse']['input'] = json.loads(raw_input) if raw_input else {}
+        content.append(block)
+
+    return {
+        'output': {'message': {'role': role, 'content': content}},
+        'stopReason': stop_reason,
+        'usage': usage,
+    }
+
+
+def iter_claude_text(response, usage=None):
+    """
+    `invoke_model_with_response_stream` (Anthropic Messages formatı) yanıtından
+    metin parçalarını sırayla üretir. `usage` sözlüğü verilirse token sayıları
+    (input_tokens, output_tokens) akış bittikçe içine yazılır.
+    """
+    for event in response['body']:
+        chunk = event.get('chunk')
+        if not chunk:
+            continue
+        payload = json.loads(chunk['bytes'])
+        kind = payload.get('type')
+        if kind == 'content_block_delta':
+            text = payload.get('delta', {}).get('text')
+            if text:
+                yield text
+        elif usage is not None and kind == 'message_start':
+            usage.update(payload.get('message', {}).get('usage', {}))
+        elif usage is not None and kind == 'message_delta':
+            usage.update(payload.get('usage', {}))
@@ -0,0 +1,94 @@
+"""
+Konteyner içinde biriktirilen kayıtları `batch_write_item` ile yazan yardımcı.
+
+`put` yalnızca belleğe ekler; `flush` kayıtları 25'lik gruplar halinde
+yazar. DynamoDB'nin işleyemediği kayıtlar (UnprocessedItems) üstel bekleme
+ve jitter ile yeniden denenir. Denemeler tükenirse kayıtlar tamponda kalır
+ve bir sonraki `flush` ile tekrar gönderilir; hiçbir kayıt sessizce düşmez.
+
+İstemci olarak resource'un `meta.client`'ı verilmelidir; böylece kayıtlar
+düz Python tipleriyle (AttributeValue'ya çevirmeden) yazılabilir.
+"""
+import random
+import threading
+import time
+
+BATCH_SIZE = 25
+
+
+class BufferedBatchWriter:
+
+    def __init__(self, client, max_attempts=6, base_delay=0.05, max_delay=2.0):
+        self._client = client
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        # (tablo, anahtar) -> kayıt; aynı anahtara ikinci yazım öncekini ezer
+        # (tek bir batch içinde aynı anahtar iki kez bulunamaz)
+        self._pending = {}
+        self._key_names = {}
+        self._lock = threading.Lock()
+        self.stats = {'written': 0, 'retries': 0, 'carriedOver': 0}
+
+    def put(self, table_name, item, key_names):
+        self._key_names[table_name] = tuple(key_names)
+        key = self._key(table_name, item)
+        with self._lock:
+            self._pending.pop(key, None)
+            self._pending[key] = (table_name, item)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def flush(self):
+        """Tampondaki kayıtları yazar; yazılan kayıt sayısını döner."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        entries = list(pending.items())
+        failed = []
+        for start in range(0, len(entries), BATCH_SIZE):
+            failed.extend(self._write_batch(entries[start:start + BATCH_SIZE]))
+
+        if failed:
+            with self._lock:
+                # Yeniden denenecekler, bu arada gelen daha yeni kayıtları ezmemeli
+                for key, value in failed:
+                    self._pending.setdefault(key, value)
+            self.stats['carriedOver'] += len(failed)
+            print(f"BatchWrite: {len(failed)} kayıt sonraki denemeye bırakıldı.")
+        written = len(entries) - len(failed)
+        self.stats['written'] += written
+        return written
+
+    def _write_batch(self, entries):
+        """Bir grubu yazar; denemeler tükenirse yazılamayanları döner."""
+        request_items = {}
+        for _, (table_name, item) in entries:
+            request_items.setdefault(table_name, []).append({'PutRequest': {'Item': item}})
+
+        for attempt in range(self._max_attempts):
+            try:
+                response = self._client.batch_write_item(RequestItems=request_items)
+                request_items = response.get('UnprocessedItems') or {}
+            except Exception as e:
+                # Throttling vb. hatalarda tüm grup yeniden denenir
+                print(f"BatchWrite Error: {e}")
+            if not request_items:
+                return []
+            self.stats['retries'] += 1
+            if attempt + 1 < self._max_attempts:
+                time.sleep(self._backoff(attempt))
+
+        return [(self._key(table_name, request['PutRequest']['Item']), (table_name, request['PutRequest']['Item']))
+                for table_name, requests in request_items.items() for request in requests]
+
+    def _key(self, table_name, item):
+        return (table_name,) + tuple(item[name] for name in self._key_names[table_name])
+
+    def _backoff(self, attempt):
+        # "Full jitter": 0 ile üstel sınır arasında rastgele bekleme
+        return random.uniform(0, min(self._max_delay, self._base_delay * (2 ** attempt)))
+
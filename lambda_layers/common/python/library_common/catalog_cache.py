@@ -0,0 +1,150 @@
+"""
+Lambda konteyneri içinde yaşayan (warm) katalog önbelleği.
+
+Arama sorgusu -> kitap kayıtları eşlemesini TTL'li ve boyutu sınırlı bir LRU
+içinde tutar. Kayıtlar boto3'ün Decimal içeren dict'leri yerine küçük,
+değiştirilemez `BookRecord` demetleri olarak saklanır.
+
+Tazelik, katalog sürüm kaydı ile sağlanır (bkz. catalog_index.bump_catalog_version).
+Sürüm en fazla `version_check_interval` saniyede bir okunur; arada gelen
+istekler hiç ağ çağrısı yapmadan önbellekten cevaplanır. Katalog değiştiğinde
+`add_listener` ile kaydolan fonksiyonlar da (örn. yanıt önbelleği) haberdar edilir.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from library_common.text import normalize
+
+
+class BookRecord(NamedTuple):
+    book_id: str
+    title: str
+    author: str
+    is_available: bool
+
+    @classmethod
+    def from_item(cls, item):
+        return cls(
+            str(item.get('bookId')),
+            item.get('title') or '',
+            item.get('author') or '',
+            bool(item.get('isAvailable')),
+        )
+
+
+class CatalogCache:
+
+    def __init__(self, version_loader, ttl_seconds=300, max_entries=1024, version_check_interval=5):
+        self._version_loader = version_loader
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._check_interval = version_check_interval
+        self._entries = OrderedDict()  # sorgu -> (bitiş zamanı, (BookRecord, ...))
+        self._by_book = {}             # bookId -> {sorgu, ...}
+        self._version = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0, 'versionChecks': 0}
+
+    def get(self, query):
+        """Önbellekteki kayıtları döner; yoksa veya süresi dolduysa None."""
+        self.refresh()
+        key = normalize(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def put(self, query, items):
+        """DynamoDB kayıtlarını BookRecord'a çevirip önbelleğe yazar."""
+        key = normalize(query)
+        records = tuple(BookRecord.from_item(item) for item in items)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self._ttl, records)
+            for record in records:
+                self._by_book.setdefault(record.book_id, set()).add(key)
+            while len(self._entries) > self._max_entries:
+                self._drop(next(iter(self._entries)))
+                self.stats['evictions'] += 1
+        return records
+
+    def add_listener(self, callback):
+        """
+        Katalog değiştiğinde `callback(book_ids)` çağrılır; tüm katalog
+        geçersizse book_ids None olur.
+        """
+        self._listeners.append(callback)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_book.clear()
+
+    def snapshot(self):
+        """Loglamak için sayaçların ve doluluğun bir kopyası."""
+        with self._lock:
+            return dict(self.stats, size=len(self._entries), version=self._version)
+
+    def _drop(self, key):
+        _, records = self._entries.pop(key)
+        for record in records:
+            keys = self._by_book.get(record.book_id)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._by_book[record.book_id]
+
+    def _invalidate_books(self, book_ids):
+        with self._lock:
+            keys = set()
+            for book_id in book_ids:
+                keys |= self._by_book.get(book_id, set())
+            for key in keys:
+                if key in self._entries:
+                    self._drop(key)
+            self.stats['invalidations'] += len(keys)
+
+    def refresh(self):
+        """Sürüm kontrol aralığı dolduysa katalog sürümünü okur."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self._check_interval
+        self.stats['versionChecks'] += 1
+        try:
+            meta = self._version_loader()
+        except Exception as e:
+            # Sürüm okunamazsa TTL bayatlığı sınırlamaya devam eder
+            print(f"Katalog sürümü okunamadı: {e}")
+            return
+
+        version = meta['v']
+        previous = self._version
+        self._version = version
+        if previous is None or version == previous:
+            return
+
+        missing = [v for v in range(previous + 1, version + 1) if v not in meta['log']]
+        if meta['sv'] > previous or missing or version < previous:
+            # Başlık/yazar değişti ya da aradaki değişiklikler bilinmiyor
+            self.stats['invalidations'] += len(self._entries)
+            self.clear()
+            changed = None
+        else:
+            changed = set()
+            for v in range(previous + 1, version + 1):
+                changed |= meta['log'][v]
+            self._invalidate_books(changed)
+        for callback in self._listeners:
+            callback(changed)
@@ -0,0 +1,252 @@
+"""
+Toplu katalog içe aktarma: CSV / JSONL satırları -> LibraryBooks.
+
+- Dosya belleğe alınmaz; satırlar akıştan (örn. S3 StreamingBody) üreteçle okunur.
+- Kayıtlar 25'lik gruplar halinde paralel `batch_write_item` işçileriyle yazılır.
+- Üretici, işçilerin yetişemediği durumda bekler (sınırlı sayıda bekleyen grup).
+- Throttling (UnprocessedItems veya throttling hataları) görüldüğünde eşzamanlı
+  yazım sayısı yarıya iner, başarılı yazımlarla kademeli olarak geri artar (AIMD);
+  yeniden denemeler üstel bekleme + jitter ile yapılır.
+- Yazımlar bookId'ye göre idempotent (PutRequest) olduğu için, kaldığı yerden
+  devam ederken kontrol noktasından sonraki satırların tekrar yazılması güvenlidir.
+  Kontrol noktası, kendisinden önceki tüm grupları yazılmış en büyük satır sayısıdır.
+"""
+import codecs
+import csv
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BATCH_SIZE = 25
+OPTIONAL_FIELDS = ('author', 'cover', 'genre', 'description', 'isbn')
+THROTTLE_ERRORS = {'ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded'}
+
+
+def detect_format(key):
+    return 'jsonl' if key.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def iter_records(stream, fmt):
+    """
+    Bayt akışından satır satır dict üretir. Çözülemeyen JSON satırları için
+    None üretilir (satır numaraları kontrol noktasıyla tutarlı kalsın diye).
+    """
+    reader = codecs.getreader('utf-8-sig')(stream)
+    if fmt == 'jsonl':
+        for line in reader:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+    else:
+        yield from csv.DictReader(reader)
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ('false', '0', 'no', 'hayır', 'hayir', 'ödünç verilmiş')
+
+
+def to_item(record):
+    """Satırı LibraryBooks kaydına çevirir; bookId veya başlık yoksa None."""
+    if not isinstance(record, dict):
+        return None
+    book_id = str(record.get('bookId') or record.get('id') or '').strip()
+    title = str(record.get('title') or '').strip()
+    if not (book_id and title):
+        return None
+    item = {'bookId': book_id, 'title': title}
+    for field in OPTIONAL_FIELDS:
+        value = record.get(field)
+        if value not in (None, ''):
+            item[field] = str(value).strip()
+    item['isAvailable'] = _parse_bool(record.get('isAvailable', True))
+    return item
+
+
+class AdaptiveConcurrency:
+    """Eşzamanlı yazım sınırı: throttling'de yarıya iner, başarılarla birer artar."""
+
+    def __init__(self, maximum):
+        self._maximum = maximum
+        self._limit = maximum
+        self._active = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self):
+        return self._limit
+
+    def acquire(self):
+        with self._cond:
+            while self._active >= self._limit:
+                self._cond.wait()
+            self._active += 1
+
+    def release(self, throttled):
+        with self._cond:
+            self._active -= 1
+            if throttled:
+                self._limit = max(1, self._limit // 2)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._limit < self._maximum and self._successes >= self._limit:
+                    self._limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+class _Progress:
+    """Sırasız biten grupları izleyip kesintisiz yazılmış satır sayısını tutar."""
+
+    def __init__(self, start_row):
+        self.committed_rows = start_row
+        self._row_ends = {}
+        self._done = set()
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def register(self, seq, row_end):
+        with self._lock:
+            self._row_ends[seq] = row_end
+
+    def complete(self, seq):
+        with self._lock:
+            self._done.add(seq)
+            while self._next in self._done:
+                self._done.discard(self._next)
+                self.committed_rows = self._row_ends.pop(self._next)
+                self._next += 1
+
+
+class CatalogLoader:
+
+    def __init__(self, client, table_name, workers=8, max_attempts=10, base_delay=0.05, max_delay=5.0,
+                 on_checkpoint=None, checkpoint_interval=10.0):
+        self._client = client
+        self._table_name = table_name
+        self._workers = workers
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._on_checkpoint = on_checkpoint
+        self._checkpoint_interval = checkpoint_interval
+        self._concurrency = AdaptiveConcurrency(workers)
+        self._stats_lock = threading.Lock()
+        self.stats = {'written': 0, 'skipped': 0, 'throttles': 0, 'retries': 0}
+
+    def load(self, records, start_row=0, should_stop=None):
+        """
+        Kayıtları yazar. `start_row` kadar satır atlanır (kaldığı yerden devam).
+        `should_stop()` True dönerse yeni grup üretilmez ve bekleyenler bitirilir.
+        Özet sözlüğü döner; 'complete' False ise `committedRows` ile devam edilmelidir.
+        """
+        started = time.monotonic()
+        progress = _Progress(start_row)
+        # Üretici en fazla bu kadar grup önde gidebilir (bellek ve kuyruk sınırı)
+        in_flight = threading.BoundedSemaphore(self._workers * 2)
+        errors = []
+        seq = 0
+        row = 0
+        stopped = False
+        last_checkpoint = time.monotonic()
+
+        def submit(batch, row_end):
+            nonlocal seq
+            progress.register(seq, row_end)
+            in_flight.acquire()
+            future = executor.submit(self._write, list(batch.values()))
+            future.add_done_callback(lambda f, s=seq: self._finished(f, s, progress, in_flight, errors))
+            seq += 1
+
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            batch = {}
+            for record in records:
+                row += 1
+                if row <= start_row:
+                    continue
+                item = to_item(record)
+                if item is None:
+                    with self._stats_lock:
+                        self.stats['skipped'] += 1
+                else:
+                    # Aynı grupta aynı anahtar iki kez bulunamaz; son satır geçerli
+                    batch[item['bookId']] = item
+                if len(batch) == BATCH_SIZE:
+                    submit(batch, row)
+                    batch = {}
+                if errors or (should_stop and should_stop()):
+                    stopped = True
+                    break
+                if self._on_checkpoint and time.monotonic() - last_checkpoint >= self._checkpoint_interval:
+                    self._on_checkpoint(progress.committed_rows, self.report(started, progress, False))
+                    last_checkpoint = time.monotonic()
+            # Son (eksik) grup ve atlanan son satırlar da kontrol noktasına dahil edilir
+            if not errors:
+                submit(batch, max(row, start_row))
+
+        result = self.report(started, progress, not stopped and not errors)
+        if self._on_checkpoint:
+            self._on_checkpoint(progress.committed_rows, result)
+        if errors:
+            raise RuntimeError(f"İçe aktarma durdu ({progress.committed_rows}. satırda): {errors[0]}")
+        return result
+
+    def report(self, started, progress, complete):
+        elapsed = time.monotonic() - started
+        return {
+            **self.stats,
+            'committedRows': progress.committed_rows,
+            'elapsedSeconds': round(elapsed, 3),
+            'itemsPerSecond': round(self.stats['written'] / elapsed, 1) if elapsed else 0.0,
+            'concurrency': self._concurrency.limit,
+            'complete': complete,
+        }
+
+    def _finished(self, future, seq, progress, in_flight, errors):
+        in_flight.release()
+        error = future.exception()
+        if error:
+            errors.append(error)
+        else:
+            progress.complete(seq)
+
+    def _write(self, items):
+        if not items:
+            return
+        request = {self._table_name: [{'PutRequest': {'Item': item}} for item in items]}
+        for attempt in range(self._max_attempts):
+            throttled = False
+            self._concurrency.acquire()
+            try:
+                response = self._client.batch_write_item(RequestItems=request)
+                request = response.get('UnprocessedItems') or {}
+                throttled = bool(request)
+            except Exception as e:
+                code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+                if code not in THROTTLE_ERRORS:
+                    raise
+                throttled = True
+            finally:
+                self._concurrency.release(throttled)
+
+            written = len(items) - sum(len(r) for r in request.values())
+            with self._stats_lock:
+                self.stats['written'] += written
+                if throttled:
+                    self.stats['throttles'] += 1
+            if not request:
+                return
+            items = [r['PutRequest']['Item'] for r in request.get(self._table_name, [])]
+            with self._stats_lock:
+                self.stats['retries'] += 1
+            time.sleep(random.uniform(0, min(self._max_delay, self._base_delay * (2 ** attempt))))
+        raise RuntimeError(f"{len(items)} kayıt {self._max_attempts} denemede yazılamadı.")
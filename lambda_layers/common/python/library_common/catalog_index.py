@@ -0,0 +1,210 @@
+"""
+LibraryBooks için ters indeks (inverted index) araması.
+
+İndeks tablosunda her (kelime, kitap) çifti için bir kayıt tutulur:
+
+    token (PK)  | bookId (SK) | w
+    ------------+-------------+----
+    "nutuk"     | "1"         | 2     (başlıkta geçiyor)
+    "ataturk"   | "1"         | 1     (yazarda geçiyor)
+
+Arama, sorgudaki her kelime için tek bir Query yapar, sonuçları puanlar ve
+en iyi adayların güncel durumunu LibraryBooks'tan tek bir BatchGetItem ile
+okur. Böylece tüm tabloyu okuyan Scan işlemine gerek kalmaz. Aynı anda birden
+fazla başlık aranırsa (`search_books_batch`) ortak kelimeler bir kez sorgulanır
+ve tüm adaylar tek bir BatchGetItem ile okunur.
+
+Fonksiyonlar, thread'ler arasında paylaşılabilen DynamoDB istemcisini
+(`dynamodb.meta.client`) bekler; resource nesneleri thread-safe değildir.
+
+İndeks, `catalog_indexer` Lambda'sı tarafından LibraryBooks DynamoDB
+Stream'i üzerinden güncel tutulur. Her stream grubundan sonra aynı tablodaki
+katalog sürüm kaydı (CATALOG_VERSION_KEY) artırılır; Lambda içi önbellekler
+bu kayıt ile kendini tazeler. Yerel testlerde `AWS_ENDPOINT_URL_DYNAMODB`
+ortam değişkeni ile DynamoDB Local'e yönlendirilebilir.
+"""
+import math
+from boto3.dynamodb.conditions import Key
+
+from library_common.text import normalize, tokenize
+
+TITLE_WEIGHT = 2
+AUTHOR_WEIGHT = 1
+
+# Çok yaygın bir kelime için okunacak en fazla indeks kaydı
+MAX_POSTINGS_PER_TOKEN = 500
+
+# BatchGetItem tek istekte en fazla 100 anahtar kabul eder
+_BATCH_GET_LIMIT = 100
+
+BOOK_PROJECTION = 'bookId, title, author, isAvailable'
+
+# Katalog sürüm kaydı. Gerçek kelimeler alt çizgi içermediği için çakışmaz.
+CATALOG_VERSION_KEY = {'token': '__catalog__', 'bookId': 'version'}
+
+# Sürüm kaydında saklanan son değişiklik gruplarının sayısı
+VERSION_LOG_SIZE = 50
+
+
+def book_postings(book):
+    """
+    Bir kitap kaydı için {kelime: ağırlık} sözlüğü üretir.
+    Kelime hem başlıkta hem yazarda geçiyorsa ağırlıklar toplanır.
+    """
+    postings = {}
+    if not book:
+        return postings
+    for token in set(tokenize(book.get('title'), drop_stopwords=False)):
+        postings[token] = postings.get(token, 0) + TITLE_WEIGHT
+    for token in set(tokenize(book.get('author'), drop_stopwords=False)):
+        postings[token] = postings.get(token, 0) + AUTHOR_WEIGHT
+    return postings
+
+
+def _query_token(client, index_table_name, token):
+    """Bir kelimenin indeks kayıtlarını (sayfalayarak) okur."""
+    postings = []
+    kwargs = {
+        'TableName': index_table_name,
+        'KeyConditionExpression': Key('token').eq(token),
+        'ProjectionExpression': 'bookId, w',
+    }
+    while len(postings) < MAX_POSTINGS_PER_TOKEN:
+        response = client.query(**kwargs)
+        postings.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return postings[:MAX_POSTINGS_PER_TOKEN]
+
+
+def score_candidates(token_postings):
+    """
+    {kelime: [indeks kaydı]} yapısından {bookId: puan} üretir.
+    Nadir kelimeler (az kitapta geçenler) daha yüksek puan alır.
+    """
+    scores = {}
+    for postings in token_postings.values():
+        if not postings:
+            continue
+        idf = 1.0 / math.log2(2 + len(postings))
+        for posting in postings:
+            book_id = posting['bookId']
+            scores[book_id] = scores.get(book_id, 0.0) + float(posting.get('w', 1)) * idf
+    return scores
+
+
+def batch_get_books(client, table_name, book_ids):
+    """Verilen kitapları LibraryBooks'tan BatchGetItem ile okur."""
+    books = {}
+    pending = [{'bookId': book_id} for book_id in dict.fromkeys(book_ids)]
+    while pending:
+        chunk, pending = pending[:_BATCH_GET_LIMIT], pending[_BATCH_GET_LIMIT:]
+        request = {table_name: {'Keys': chunk, 'ProjectionExpression': BOOK_PROJECTION}}
+        while request:
+            response = client.batch_get_item(RequestItems=request)
+            for item in response.get('Responses', {}).get(table_name, []):
+                books[item['bookId']] = item
+            request = response.get('UnprocessedKeys') or None
+    return books
+
+
+def rank_books(query, scores, books, limit):
+    """
+    Aday kitapları puana göre sıralar. Başlığın sorguyla birebir eşleşmesi
+    veya sorguyu ifade olarak içermesi ek puan getirir.
+    """
+    phrase = normalize(query)
+    ranked = []
+    for book_id, score in scores.items():
+        book = books.get(book_id)
+        if not book:
+            # İndeks, silinmiş bir kitabı henüz temizlememiş olabilir
+            continue
+        title = normalize(book.get('title'))
+        if phrase and title == phrase:
+            score += 5.0
+        elif phrase and phrase in title:
+            score += 3.0
+        ranked.append((score, title, book))
+    ranked.sort(key=lambda entry: (-entry[0], entry[1]))
+    return [book for _, _, book in ranked[:limit]]
+
+
+def search_books_batch(queries, client, index_table_name, books_table_name, limit=5, executor=None):
+    """
+    Birden fazla başlık/yazar aramasını birlikte yapar ve {sorgu: [kitap]} döner.
+
+    Kelime sorguları `executor` (ThreadPoolExecutor) verilirse paralel çalışır.
+    Tüm sorguların adayları tek bir BatchGetItem ile okunur.
+    """
+    query_tokens = {query: list(dict.fromkeys(tokenize(query))) for query in dict.fromkeys(queries)}
+    all_tokens = list(dict.fromkeys(token for tokens in query_tokens.values() for token in tokens))
+
+    fetch = lambda token: _query_token(client, index_table_name, token)
+    if executor and len(all_tokens) > 1:
+        postings_by_token = dict(zip(all_tokens, executor.map(fetch, all_tokens)))
+    else:
+        postings_by_token = {token: fetch(token) for token in all_tokens}
+
+    # Sadece en iyi adayların güncel durumunu oku
+    candidate_scores = {}
+    for query, tokens in query_tokens.items():
+        scores = score_candidates({token: postings_by_token[token] for token in tokens})
+        candidates = sorted(scores, key=scores.get, reverse=True)[:limit * 3]
+        candidate_scores[query] = {book_id: scores[book_id] for book_id in candidates}
+
+    all_candidates = [book_id for scores in candidate_scores.values() for book_id in scores]
+    books = batch_get_books(client, books_table_name, all_candidates) if all_candidates else {}
+    return {query: rank_books(query, scores, books, limit) for query, scores in candidate_scores.items()}
+
+
+def search_books(query, client, index_table_name, books_table_name, limit=5, executor=None):
+    """
+    Başlık/yazar araması yapar ve puana göre sıralanmış kitap kayıtlarını döner.
+    """
+    return search_books_batch([query], client, index_table_name, books_table_name, limit, executor)[query]
+
+
+def bump_catalog_version(index_table, book_ids, structural):
+    """
+    Katalog sürümünü bir artırır ve bu sürümde değişen kitapları kaydeder.
+
+    `structural` True ise (kitap eklendi/silindi ya da başlık/yazar değişti)
+    arama sonuçları da değişmiş olabilir; önbellekler tamamen temizlenir.
+    Sadece durum (isAvailable gibi) değiştiyse ilgili kitaplar düşürülür.
+    """
+    response = index_table.update_item(
+        Key=CATALOG_VERSION_KEY,
+        UpdateExpression='ADD v :one SET #log = if_not_exists(#log, :empty)',
+        ExpressionAttributeNames={'#log': 'log'},
+        ExpressionAttributeValues={':one': 1, ':empty': {}},
+        ReturnValues='UPDATED_NEW'
+    )
+    version = int(response['Attributes']['v'])
+
+    update = 'SET #log.#v = :ids'
+    values = {':ids': sorted(book_ids)}
+    if structural:
+        update += ', sv = :v'
+        values[':v'] = version
+    update += ' REMOVE #log.#old'
+    index_table.update_item(
+        Key=CATALOG_VERSION_KEY,
+        UpdateExpression=update,
+        ExpressionAttributeNames={'#log': 'log', '#v': str(version), '#old': str(version - VERSION_LOG_SIZE)},
+        ExpressionAttributeValues=values
+    )
+    return version
+
+
+def read_catalog_version(index_table):
+    """
+    Katalog sürüm kaydını okur: {'v': int, 'sv': int, 'log': {sürüm: [bookId]}}.
+    """
+    item = index_table.get_item(Key=CATALOG_VERSION_KEY).get('Item') or {}
+    return {
+        'v': int(item.get('v', 0)),
+        'sv': int(item.get('sv', 0)),
+        'log': {int(version): set(ids) for version, ids in item.get('log', {}).items()},
+    }
@@ -0,0 +1,291 @@
+"""
+Katalog ve okuma listesi özetleri (LibraryStats).
+
+Yönetim paneli her açılışta tüm okuma listelerini indirip sayıları
+tarayıcıda hesaplıyordu (O(katalog)). Bunun yerine sayaçlar önceden
+hesaplanıp iki özet kayıtta tutulur; `GET /stats` bunları tek bir
+BatchGetItem ile okur:
+
+    statId      | alanlar
+    ------------+------------------------------------------------------------
+    "catalog"   | books, available, genre#<tür>, author#<yazar>, updatedAt
+    "lists"     | lists, listBooks, users, updatedAt
+    "user#<id>" | lists, lastBatch   (kullanıcı sayısı için yardımcı kayıt)
+
+`catalog_stats` Lambda'sı LibraryBooks ve ReadingLists DynamoDB Stream'lerini
+dinler. Her kaydın eski ve yeni halinin sayaç farkı toplanır ve grup başına
+tek bir `TransactWriteItems` ile (`ADD`) yazılır:
+
+- Catalog grupları için ClientRequestToken grubun olay kimliklerinin
+  özetidir; Lambda aynı grubu yeniden denerse (10 dk içinde) DynamoDB
+  işlemi tekrar uygulamaz.
+- Liste gruplarında kullanıcı kayıtları da aynı transaction'da, okunan
+  değere koşullu yazılır ve grubun özetini (`lastBatch`) taşır. Yeniden denemede
+  bu özet görülürse grup zaten uygulanmıştır ve atlanır.
+
+Akış başlamadan önceki kayıtlar sayılmaz; ilk kurulumda (ve gerektiğinde)
+`{"action": "rebuild"}` ile sayaçlar tablolardan baştan hesaplanır.
+
+İstemci olarak resource'un `meta.client`'ı verilmelidir.
+"""
+import datetime
+import hashlib
+import random
+import time
+
+CATALOG, LISTS = 'catalog', 'lists'
+SUMMARY_IDS = (CATALOG, LISTS)
+USER_PREFIX = 'user#'
+GENRE_PREFIX, AUTHOR_PREFIX = 'genre#', 'author#'
+UNSPECIFIED = 'Belirtilmemiş'
+
+# Transaction en fazla 100 işlem; iki özet kaydı dışındakiler kullanıcı kayıtlarıdır
+MAX_TRANSACTION_ITEMS = 100
+MAX_USERS_PER_TRANSACTION = MAX_TRANSACTION_ITEMS - len(SUMMARY_IDS)
+# UpdateExpression 4 KB ile sınırlı; bir özet kaydında tek seferde değişen en fazla sayaç
+MAX_COUNTERS_PER_UPDATE = 100
+_BATCH_GET_LIMIT = 100
+
+
+def _label(value):
+    return str(value).strip() if value not in (None, '') and str(value).strip() else UNSPECIFIED
+
+
+def book_counters(book):
+    """Bir kitabın özet kayda katkısı ({sayaç: değer}); silinmiş kitap için boş."""
+    if not book:
+        return {}
+    available = 1 if book.get('isAvailable', True) else 0
+    return {
+        'books': 1,
+        'available': available,
+        GENRE_PREFIX + _label(book.get('genre')): 1,
+        AUTHOR_PREFIX + _label(book.get('author')): 1,
+    }
+
+
+def list_counters(reading_list):
+    if not reading_list:
+        return {}
+    return {'lists': 1, 'listBooks': len(reading_list.get('bookIds') or ())}
+
+
+def counter_delta(old, new):
+    """İki katkı arasındaki sıfır olmayan farklar."""
+    delta = {key: new.get(key, 0) - old.get(key, 0) for key in old.keys() | new.keys()}
+    return {key: value for key, value in delta.items() if value}
+
+
+class StatsChanges:
+    """Tek bir transaction'a sığan stream kayıtlarının toplam değişimi."""
+
+    def __init__(self):
+        self.counters = {}  # statId -> {sayaç: fark}
+        self.users = {}     # userId -> liste sayısı farkı
+        self.event_ids = []
+        self.updated_at = ''
+
+    def __bool__(self):
+        return bool(self.counters or self.users)
+
+    def fits(self, stat_id, delta, user_id=None):
+        counters = self.counters.get(stat_id, {})
+        # 'users' sayacı için bir yer ayrılır
+        if len(counters.keys() | delta.keys()) >= MAX_COUNTERS_PER_UPDATE:
+            return False
+        return user_id is None or user_id in self.users or len(self.users) < MAX_USERS_PER_TRANSACTION
+
+    def add(self, event_id, stat_id, delta, user_id=None, user_delta=0, created_at=''):
+        self.event_ids.append(event_id)
+        # Yeniden denemede parametreler aynı kalsın diye zaman olaydan alınır
+        self.updated_at = max(self.updated_at, created_at)
+        counters = self.counters.setdefault(stat_id, {})
+        for key, value in delta.items():
+            counters[key] = counters.get(key, 0) + value
+        if user_id is not None and user_delta:
+            self.users[user_id] = self.users.get(user_id, 0) + user_delta
+
+    def token(self):
+        """Grubun kimliği: yeniden denemelerde aynı kalır (ClientRequestToken en fazla 36 karakter)."""
+        return hashlib.sha256('|'.join(self.event_ids).encode('utf-8')).hexdigest()[:36]
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def _is_cancelled(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code') == 'TransactionCanceledException'
+
+
+def _reasons(error):
+    return [reason.get('Code', 'None') for reason in error.response.get('CancellationReasons', [])]
+
+
+class StatsStore:
+
+    def __init__(self, client, table_name='LibraryStats', max_attempts=4, base_delay=0.05):
+        self._client = client
+        self._table = table_name
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+
+    def apply(self, changes):
+        """Değişimi yazar; grup daha önce uygulanmışsa False döner."""
+        token = changes.token()
+        for attempt in range(self._max_attempts):
+            current = self._user_counts(list(changes.users))
+            if any(item.get('lastBatch') == token for item in current.values()):
+                return False
+            items = self._transaction(changes, current, token)
+            if not items:
+                return False
+            try:
+                self._client.transact_write_items(TransactItems=items, ClientRequestToken=token)
+                return True
+            except Exception as e:
+                if not _is_cancelled(e) or attempt == self._max_attempts - 1:
+                    raise
+                # Aynı kayda eşzamanlı yazım (TransactionConflict) veya kullanıcı
+                # kaydı okunduktan sonra değişti: değerleri yeniden okuyup dene
+                print(f"Stats Retry: {_reasons(e)}")
+                time.sleep(random.uniform(0, self._base_delay * 2 ** attempt))
+        return False
+
+    def rebuild(self, books, reading_lists):
+        """Sayaçları kayıtların tamamından hesaplayıp özet kayıtların üzerine yazar."""
+        catalog, lists, users = {}, {}, {}
+        for book in books:
+            for key, value in book_counters(book).items():
+                catalog[key] = catalog.get(key, 0) + value
+        for reading_list in reading_lists:
+            for key, value in list_counters(reading_list).items():
+                lists[key] = lists.get(key, 0) + value
+            users[reading_list['userId']] = users.get(reading_list['userId'], 0) + 1
+        lists['users'] = len(users)
+
+        now = _now()
+        stale = self._user_stat_ids() - {USER_PREFIX + user_id for user_id in users}
+        requests = [{'PutRequest': {'Item': {'statId': CATALOG, 'updatedAt': now, **catalog}}},
+                    {'PutRequest': {'Item': {'statId': LISTS, 'updatedAt': now, **lists}}}]
+        requests += [{'PutRequest': {'Item': {'statId': USER_PREFIX + user_id, 'lists': count}}}
+                     for user_id, count in users.items()]
+        requests += [{'DeleteRequest': {'Key': {'statId': stat_id}}} for stat_id in stale]
+        self._batch_write(requests)
+        return {'books': catalog.get('books', 0), 'lists': lists.get('lists', 0), 'users': len(users)}
+
+    def read_summary(self):
+        """İki özet kaydı tek BatchGetItem ile okur: {statId: kayıt}."""
+        request = {self._table: {'Keys': [{'statId': stat_id} for stat_id in SUMMARY_IDS]}}
+        items = {}
+        while request:
+            response = self._client.batch_get_item(RequestItems=request)
+            for item in response['Responses'].get(self._table, []):
+                items[item['statId']] = item
+            request = response.get('UnprocessedKeys')
+        return items
+
+    # -- İç yardımcılar ---------------------------------------------------------
+
+    def _transaction(self, changes, current, token):
+        counters = {stat_id: dict(values) for stat_id, values in changes.counters.items()}
+        items = []
+        users = 0
+        for user_id, delta in changes.users.items():
+            item = current.get(user_id)
+            old = int(item['lists']) if item else 0
+            new = max(0, old + delta)
+            users += (new > 0) - (old > 0)
+            update = {
+                'TableName': self._table,
+                'Key': {'statId': USER_PREFIX + user_id},
+                'UpdateExpression': 'SET #lists = :new, lastBatch = :batch',
+                'ExpressionAttributeNames': {'#lists': 'lists'},
+                'ExpressionAttributeValues': {':new': new, ':batch': token},
+            }
+            if item:
+                update['ConditionExpression'] = '#lists = :old'
+                update['ExpressionAttributeValues'][':old'] = item['lists']
+            else:
+                update['ConditionExpression'] = 'attribute_not_exists(statId)'
+            items.append({'Update': update})
+        if users:
+            counters.setdefault(LISTS, {})['users'] = users
+
+        now = changes.updated_at or _now()
+        for stat_id, values in counters.items():
+            values = {key: value for key, value in values.items() if value}
+            if not values:
+                continue
+            names = {f"#c{i}": key for i, key in enumerate(values)}
+            attribute_values = {f":c{i}": value for i, value in enumerate(values.values())}
+            items.insert(0, {'Update': {
+                'TableName': self._table,
+                'Key': {'statId': stat_id},
+                'UpdateExpression': 'ADD ' + ', '.join(f"#c{i} :c{i}" for i in range(len(values)))
+                                    + ' SET updatedAt = :now',
+                'ExpressionAttributeNames': names,
+                'ExpressionAttributeValues': {**attribute_values, ':now': now},
+            }})
+        return items
+
+    def _user_counts(self, user_ids):
+        counts = {}
+        for start in range(0, len(user_ids), _BATCH_GET_LIMIT):
+            request = {self._table: {
+                'Keys': [{'statId': USER_PREFIX + user_id} for user_id in user_ids[start:start + _BATCH_GET_LIMIT]],
+                'ConsistentRead': True,
+            }}
+            while request:
+                response = self._client.batch_get_item(RequestItems=request)
+                for item in response['Responses'].get(self._table, []):
+                    counts[item['statId'][len(USER_PREFIX):]] = item
+                request = response.get('UnprocessedKeys')
+        return counts
+
+    def _user_stat_ids(self):
+        stat_ids = set()
+        kwargs = {'TableName': self._table, 'ProjectionExpression': 'statId'}
+        while True:
+            response = self._client.scan(**kwargs)
+            stat_ids.update(item['statId'] for item in response.get('Items', [])
+                            if item['statId'].startswith(USER_PREFIX))
+            if 'LastEvaluatedKey' not in response:
+                return stat_ids
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def _batch_write(self, requests):
+        for start in range(0, len(requests), 25):
+            pending = {self._table: requests[start:start + 25]}
+            while pending:
+                pending = self._client.batch_write_item(RequestItems=pending).get('UnprocessedItems')
+
+
+def summarize(items, top_authors=10):
+    """Özet kayıtları -> /stats yanıtı. Sıfıra inmiş sayaçlar atlanır."""
+    catalog = items.get(CATALOG, {})
+    lists = items.get(LISTS, {})
+
+    def counts(prefix, name):
+        entries = [{name: key[len(prefix):], 'count': int(value)}
+                   for key, value in catalog.items() if key.startswith(prefix) and int(value) > 0]
+        return sorted(entries, key=lambda entry: (-entry['count'], entry[name]))
+
+    authors = counts(AUTHOR_PREFIX, 'author')
+    total_books = int(catalog.get('books', 0))
+    available = int(catalog.get('available', 0))
+    total_lists = int(lists.get('lists', 0))
+    list_books = int(lists.get('listBooks', 0))
+    return {
+        'books': {'total': total_books, 'available': available, 'loaned': total_books - available},
+        'genres': counts(GENRE_PREFIX, 'genre'),
+        'topAuthors': authors[:top_authors],
+        'authorCount': len(authors),
+        'lists': {
+            'total': total_lists,
+            'books': list_books,
+            'averageSize': round(list_books / total_lists, 1) if total_lists else 0,
+            'users': int(lists.get('users', 0)),
+        },
+        'updatedAt': max(catalog.get('updatedAt', ''), lists.get('updatedAt', '')) or None,
+    }
@@ -0,0 +1,134 @@
+"""
+Tembel (lazy) ve tekil AWS istemci kayıt defteri.
+
+Modül seviyesinde `boto3.client(...)` çağırmak, isteğin o servise hiç
+ihtiyacı olmasa bile soğuk başlangıçta servis modelinin (JSON) yüklenmesine
+ve istemcinin kurulmasına yol açar. Buradaki vekil (proxy) nesneler ilk
+kullanıldıklarında kurulur ve konteyner ömrü boyunca tekrar kullanılır:
+
+    bedrock = lazy_client('bedrock-runtime')   # henüz bir şey kurulmaz
+    bedrock.converse(...)                      # ilk çağrıda kurulur
+
+Tüm istemciler ayarlanmış bir botocore Config ile kurulur: bağlantı havuzu
+(thread havuzlarıyla uyumlu), TCP keep-alive, sınırlı bağlantı/okuma süreleri
+ve adaptive retry. Servis bazlı ayarlar ortam değişkenleriyle değiştirilebilir.
+"""
+import os
+import threading
+
+# Servis başına okuma süresi (sn); model yanıtları DynamoDB'den çok daha uzun sürebilir
+_READ_TIMEOUTS = {
+    'dynamodb': 5,
+    'bedrock-runtime': 60,
+    'bedrock-agent-runtime': 60,
+}
+
+_lock = threading.Lock()
+_session = None
+_clients = {}
+_resources = {}
+
+
+def client_config(service_name):
+    from botocore.config import Config
+    suffix = service_name.upper().replace('-', '_')
+    return Config(
+        max_pool_connections=int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '32')),
+        tcp_keepalive=True,
+        connect_timeout=float(os.environ.get('AWS_CONNECT_TIMEOUT', '2')),
+        read_timeout=float(os.environ.get(f"AWS_READ_TIMEOUT_{suffix}", _READ_TIMEOUTS.get(service_name, 10))),
+        retries={
+            'mode': 'adaptive',
+            # Örn. AWS_MAX_ATTEMPTS_BEDROCK_RUNTIME=1: yeniden denemeyi BedrockScheduler yapar
+            'max_attempts': int(os.environ.get(f"AWS_MAX_ATTEMPTS_{suffix}", os.environ.get('AWS_MAX_ATTEMPTS', '3')))
+        }
+    )
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        import boto3
+        _session = boto3.session.Session()
+    return _session
+
+
+def get_client(service_name, **kwargs):
+    """Servis istemcisini (ilk çağrıda kurarak) döner. boto3 istemcileri thread-safe'tir."""
+    key = (service_name, tuple(sorted(kwargs.items())))
+    existing = _clients.get(key)
+    if existing is not None:
+        return existing
+    with _lock:
+        if key not in _clients:
+            _clients[key] = _get_session().client(service_name, config=client_config(service_name), **kwargs)
+        return _clients[key]
+
+
+def get_resource(service_name):
+    """
+    Servis resource nesnesini döner. Resource'lar thread-safe değildir;
+    thread havuzlarında `resource.meta.client` kullanılmalıdır.
+    """
+    existing = _resources.get(service_name)
+    if existing is not None:
+        return existing
+    with _lock:
+        if service_name not in _resources:
+            _resources[service_name] = _get_session().resource(service_name, config=client_config(service_name))
+        return _resources[service_name]
+
+
+class _Lazy:
+    """İlk öznitelik erişiminde `factory()` ile kurulan nesneye yönlendiren vekil."""
+
+    __slots__ = ('_factory', '_target')
+
+    def __init__(self, factory):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_target', None)
+
+    def _resolve(self):
+        target = object.__getattribute__(self, '_target')
+        if target is None:
+            target = object.__getattribute__(self, '_factory')()
+            object.__setattr__(self, '_target', target)
+        return target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    @property
+    def initialized(self):
+        return object.__getattribute__(self, '_target') is not None
+
+
+def lazy(factory):
+    return _Lazy(factory)
+
+
+def lazy_client(service_name, **kwargs):
+    return _Lazy(lambda: get_client(service_name, **kwargs))
+
+
+def lazy_resource(service_name):
+    return _Lazy(lambda: get_resource(service_name))
+
+
+def lazy_table(table_name):
+    """DynamoDB Table nesnesi; tablo adı modül yüklenirken bilinse de kurulum ilk kullanıma ertelenir."""
+    return _Lazy(lambda: get_resource('dynamodb').Table(table_name))
+
+
+def initialized_services():
+    """Kurulmuş istemci ve resource'lar (soğuk başlangıç ölçümü için)."""
+    return sorted({key[0] for key in _clients} | set(_resources))
+
+
+def reset():
+    """Kayıt defterini temizler (benchmark ve yerel testler için)."""
+    global _session
+    with _lock:
+        _clients.clear()
+        _resources.clear()
+        _session = None
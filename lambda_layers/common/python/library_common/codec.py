@@ -0,0 +1,223 @@
+"""
+Handler'ların sıcak yolu için DynamoDB kayıt çözme ve JSON kodlama.
+
+`boto3.resource` her yanıtı `TypeDeserializer` ile çözer: her sayı bir
+`Decimal` olur, her alan için birkaç fonksiyon çağrısı yapılır ve yanıt
+JSON'a yazılırken `Decimal`'ler tekrar int / float'a çevrilir. Liste
+uçlarında (100 kitaplık sayfa, okuma listesi + kitaplar) bu, sıcak
+konteynerde ölçülebilir CPU süresidir. Bu modül:
+
+- Düşük seviyeli istemcinin (kablo formatı, AttributeValue) kayıtlarını tek
+  geçişte doğrudan Python tiplerine çözer (`decode_item`): sayılar int / float,
+  kümeler set, NULL None olur. `encode_item` ters yönü yapar (ExclusiveStartKey
+  ve sorgu değerleri için).
+- JSON kodlama / çözme için takılabilir bir arka uç kullanır: `orjson`
+  kuruluysa (Lambda'da `lambda_layers/orjson` katmanı) o, değilse standart
+  kütüphane. `JSON_CODEC=json` ortam değişkeni standart kütüphaneyi zorlar;
+  `register_backend` ile başka bir kodlayıcı eklenebilir. Çıktı iki arka uçta
+  da aynı biçimdedir (boşluksuz, UTF-8; ETag'ler arka uca göre değişmez).
+- Büyük liste yanıtlarını parça parça kodlar (`dumps_list`): kayıtlar bir
+  üreteçten çözülüp dönüştürülürken `STREAM_CHUNK` kayıtlık gruplar halinde
+  yazılır; tüm sonuç listesi bellekte Python nesneleri olarak tutulmaz. Kayıt
+  başına ayrı kodlama çağrısı yerine grup kullanılır (çağrı maliyeti
+  orjson'da kodlamanın kendisinden büyüktür).
+
+Benchmark: `benchmarks/codec_bench.py`.
+"""
+import json
+import os
+from decimal import Decimal
+
+# dumps_list'in bir kodlama çağrısında yazdığı kayıt sayısı
+STREAM_CHUNK = 50
+
+
+def _default(value):
+    # resource katmanından gelen sayılar Decimal, string set'ler set olarak gelir
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"JSON'a çevrilemeyen tip: {type(value).__name__}")
+
+
+# -- DynamoDB kablo formatı ----------------------------------------------------------
+
+def _number(text):
+    """DynamoDB sayısı -> int / float (Decimal -> JSON dönüşümüyle aynı sonuç)."""
+    if '.' not in text and 'e' not in text and 'E' not in text:
+        return int(text)
+    value = float(text)
+    # 1.0 / 1E+2 gibi tam sayılar JSON'da tam sayı olarak yazılır
+    return int(value) if value.is_integer() and abs(value) < 2 ** 53 else value
+
+
+def _decode_map(value):
+    return {name: _decode(attribute) for name, attribute in value.items()}
+
+
+_DECODERS = {
+    'S': lambda value: value,
+    'N': _number,
+    'BOOL': lambda value: value,
+    'NULL': lambda value: None,
+    'M': _decode_map,
+    'L': lambda value: [_decode(attribute) for attribute in value],
+    'SS': set,
+    'NS': lambda value: {_number(number) for number in value},
+    'B': bytes,
+    'BS': lambda value: {bytes(blob) for blob in value},
+}
+
+
+def _decode(attribute):
+    (kind, value), = attribute.items()
+    return _DECODERS[kind](value)
+
+
+def decode_item(item):
+    """AttributeValue kaydı -> Python sözlüğü (None ise None)."""
+    if item is None:
+        return None
+    return {name: _decode(attribute) for name, attribute in item.items()}
+
+
+def decode_items(items):
+    """Kayıtları sırayla çözen üreteç (sayfanın tamamı bellekte iki kez tutulmaz)."""
+    for item in items:
+        yield {name: _decode(attribute) for name, attribute in item.items()}
+
+
+def encode_value(value):
+    """Python değeri -> AttributeValue."""
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, float, Decimal)):
+        return {'N': str(value)}
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, (bytes, bytearray)):
+        return {'B': bytes(value)}
+    if isinstance(value, dict):
+        return {'M': {name: encode_value(member) for name, member in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [encode_value(member) for member in value]}
+    if isinstance(value, (set, frozenset)):
+        if all(isinstance(member, str) for member in value):
+            return {'SS': sorted(value)}
+        if all(isinstance(member, (bytes, bytearray)) for member in value):
+            return {'BS': sorted(bytes(member) for member in value)}
+        return {'NS': sorted(str(member) for member in value)}
+    raise TypeError(f"DynamoDB'ye yazılamayan tip: {type(value).__name__}")
+
+
+def encode_item(item):
+    """Python sözlüğü -> AttributeValue kaydı (örn. imleçten gelen ExclusiveStartKey)."""
+    if item is None:
+        return None
+    return {name: encode_value(value) for name, value in item.items()}
+
+
+# -- JSON -----------------------------------------------------------------------------
+
+class JsonBackend:
+    """
+    `dumps(nesne) -> bytes` (boşluksuz UTF-8) ve `loads(str | bytes) -> nesne`.
+    `dumps_text` verilmezse str çıktı `dumps` sonucunun çözülmesiyle elde edilir.
+    """
+
+    __slots__ = ('name', 'dumps', 'loads', 'dumps_text')
+
+    def __init__(self, name, dumps, loads, dumps_text=None):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+        self.dumps_text = dumps_text or (lambda value: dumps(value).decode('utf-8'))
+
+
+def _stdlib_backend():
+    encoder = json.JSONEncoder(default=_default, ensure_ascii=False, separators=(',', ':'))
+    return JsonBackend('json', lambda value: encoder.encode(value).encode('utf-8'), json.loads, encoder.encode)
+
+
+def _orjson_backend():
+    import orjson
+    option = orjson.OPT_NON_STR_KEYS  # Standart kütüphane gibi int anahtarları string'e çevirir
+    return JsonBackend('orjson', lambda value: orjson.dumps(value, default=_default, option=option), orjson.loads)
+
+
+_FACTORIES = {'json': _stdlib_backend, 'orjson': _orjson_backend}
+_backend = None
+
+
+def register_backend(name, dumps, loads, dumps_text=None):
+    """Ek JSON arka ucu; `use_backend(name)` veya JSON_CODEC=name ile seçilir."""
+    _FACTORIES[name] = lambda: JsonBackend(name, dumps, loads, dumps_text)
+
+
+def use_backend(name=None):
+    """
+    Arka ucu seçer ve döner. name None ise JSON_CODEC ortam değişkeni, o da
+    yoksa kuruluysa orjson, değilse standart kütüphane kullanılır.
+    """
+    global _backend
+    name = name or os.environ.get('JSON_CODEC') or 'auto'
+    if name == 'auto':
+        try:
+            _backend = _orjson_backend()
+        except ImportError:
+            _backend = _stdlib_backend()
+    else:
+        _backend = _FACTORIES[name]()
+    return _backend
+
+
+def backend():
+    return _backend or use_backend()
+
+
+def dumps(value):
+    """JSON metni (str); API Gateway yanıt gövdeleri için."""
+    return backend().dumps_text(value)
+
+
+def dumps_bytes(value):
+    """JSON baytları (UTF-8); Bedrock istek gövdeleri ve S3 nesneleri için."""
+    return backend().dumps(value)
+
+
+def loads(data):
+    """str veya bytes JSON'u çözer (örn. Bedrock yanıt gövdesi `response['body'].read()`)."""
+    return backend().loads(data)
+
+
+def iter_list(items, **fields):
+    """
+    `{"items": [...], <fields>}` gövdesinin parçaları (bytes). Kayıtlar
+    üreteçten alındıkça `STREAM_CHUNK`'lık gruplar halinde kodlanır;
+    `fields` liste bittikten sonra yazılır.
+    """
+    encode = backend().dumps
+    yield b'{"items":['
+    separator = b''
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == STREAM_CHUNK:
+            # "[a,b]" -> "a,b": grubun köşeli parantezleri atılıp listeye eklenir
+            yield separator + encode(chunk)[1:-1]
+            separator = b','
+            chunk = []
+    if chunk:
+        yield separator + encode(chunk)[1:-1]
+    yield b']'
+    for name, value in fields.items():
+        yield b',' + encode(name) + b':' + encode(value)
+    yield b'}'
+
+
+def dumps_list(items, **fields):
+    """`iter_list` parçalarının tamamı (str); `dumps({'items': list(items), **fields})` ile aynı metin."""
+    return b''.join(iter_list(items, **fields)).decode('utf-8')
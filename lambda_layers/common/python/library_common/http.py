@@ -0,0 +1,177 @@
+"""
+API Gateway (REST, Lambda proxy) yanıtları için ortak yardımcılar:
+JSON gövde, CORS başlıkları, ETag / If-None-Match ve sayfalama imleci.
+JSON kodlama `library_common.codec` üzerinden yapılır (orjson varsa o).
+"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+
+from library_common import codec
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization, If-None-Match',
+    'Access-Control-Expose-Headers': 'ETag',
+}
+
+
+class BadRequest(Exception):
+    """İstemci hatası; handler 400 olarak döner."""
+
+
+class Unauthorized(Exception):
+    """Doğrulanmış kullanıcı yok; handler 401 olarak döner."""
+
+
+class Forbidden(Exception):
+    """Kullanıcı doğrulandı ama işlem için yetkisi yok; handler 403 olarak döner."""
+
+
+# Yönetim işlemlerine (katalog yazımı, tüm listeler) izin verilen Cognito grubu
+ADMIN_GROUP = os.environ.get('ADMIN_GROUP', 'admins')
+
+
+def dumps(body):
+    # DynamoDB sayıları (Decimal) ve string set'ler de yazılabilir
+    return codec.dumps(body)
+
+
+def json_response(status_code, body, headers=None):
+    return {
+        'statusCode': status_code,
+        'headers': {'Content-Type': 'application/json', **CORS_HEADERS, **(headers or {})},
+        'body': dumps(body),
+    }
+
+
+def header(event, name):
+    """Başlık değerini büyük/küçük harf duyarsız okur."""
+    name = name.lower()
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def query_param(event, name, default=None):
+    return (event.get('queryStringParameters') or {}).get(name, default)
+
+
+def _claims(event):
+    # REST API Cognito yetkilendiricisi claim'leri `claims` altında iletir;
+    # WebSocket Lambda yetkilendiricisinin (ws_authorizer) context'i doğrudan gelir
+    authorizer = (event.get('requestContext') or {}).get('authorizer') or {}
+    return authorizer.get('claims') or authorizer
+
+
+def authenticated_user(event):
+    """
+    Cognito yetkilendiricisinin doğruladığı kullanıcı (kullanıcı adı, yoksa
+    sub); yoksa None. İstemcinin gönderdiği kimlikler (X-User-ID, userId)
+    hiçbir rotada dikkate alınmaz.
+    """
+    claims = _claims(event)
+    return claims.get('cognito:username') or claims.get('sub')
+
+
+def user_groups(event):
+    """
+    Token'daki Cognito grupları. REST API yetkilendiricisi claim'i metin
+    olarak iletir ("admins" veya "[admins, editors]"); liste de kabul edilir.
+    """
+    groups = _claims(event).get('cognito:groups') or []
+    if isinstance(groups, str):
+        groups = re.split(r'[\s,]+', groups.strip('[]'))
+    return {group for group in groups if group}
+
+
+def require_user(event):
+    """
+    Kişisel veriye (okuma listeleri, ödünçler, öneriler) erişen rotalar için
+    kullanıcı; yetkilendirici kullanıcı vermediyse Unauthorized.
+    """
+    user_id = authenticated_user(event)
+    if not user_id:
+        raise Unauthorized('Bu işlem için oturum açmanız gerekiyor.')
+    return user_id
+
+
+def is_admin(event):
+    return ADMIN_GROUP in user_groups(event)
+
+
+def require_admin(event):
+    """Yönetim işlemleri: kullanıcı ADMIN_GROUP grubunda değilse Forbidden."""
+    user_id = require_user(event)
+    if not is_admin(event):
+        raise Forbidden('Bu işlem için yönetici yetkisi gerekiyor.')
+    return user_id
+
+
+def cached_response(event, body, cache_control='no-cache'):
+    """
+    GET yanıtı: gövdenin özetinden ETag üretir; istemcinin If-None-Match
+    başlığı eşleşirse gövdesiz 304 döner. 'no-cache' tarayıcının her
+    seferinde yeniden doğrulamasını (ama değişmediyse indirmemesini) sağlar.
+    """
+    return cached_payload(event, dumps(body), cache_control)
+
+
+def cached_payload(event, payload, cache_control='no-cache'):
+    """Önceden kodlanmış JSON gövdesi (örn. `codec.dumps_list`) için cached_response."""
+    etag = '"' + hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32] + '"'
+    headers = {**CORS_HEADERS, 'ETag': etag, 'Cache-Control': cache_control}
+
+    if_none_match = header(event, 'If-None-Match')
+    if if_none_match and etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]:
+        return {'statusCode': 304, 'headers': headers, 'body': ''}
+    return {'statusCode': 200, 'headers': {'Content-Type': 'application/json', **headers}, 'body': payload}
+
+
+def encode_cursor(last_evaluated_key):
+    """DynamoDB LastEvaluatedKey -> URL'de taşınabilir imleç (yoksa None)."""
+    if not last_evaluated_key:
+        return None
+    raw = dumps(last_evaluated_key).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """İmleç -> ExclusiveStartKey. Bozuk imleçte BadRequest fırlatır."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        key = codec.loads(raw)
+    except (binascii.Error, ValueError):
+        raise BadRequest('Geçersiz sayfa imleci.')
+    if not isinstance(key, dict):
+        raise BadRequest('Geçersiz sayfa imleci.')
+    return key
+
+
+def page_limit(event, default=24, maximum=100):
+    value = query_param(event, 'limit')
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise BadRequest('limit sayı olmalıdır.')
+    return max(1, min(limit, maximum))
+
+
+def projection(fields, aliases=None):
+    """
+    Alan listesinden ProjectionExpression ve ExpressionAttributeNames üretir.
+    Ayrılmış kelimeler (örn. 'name') için her alan #p0, #p1... ile yazılır.
+    `aliases` API alan adını tablo alanına çevirir (örn. {'id': 'bookId'}).
+    """
+    aliases = aliases or {}
+    names = {}
+    for i, field in enumerate(dict.fromkeys(aliases.get(f, f) for f in fields)):
+        names[f"#p{i}"] = field
+    return {'ProjectionExpression': ', '.join(names), 'ExpressionAttributeNames': names}
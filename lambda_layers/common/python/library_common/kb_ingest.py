@@ -0,0 +1,324 @@
+"""
+Bilgi bankası (Knowledge Base) belgelerinin artımlı yüklenmesi.
+
+S3 veri kaynağı sadece tam senkronizasyonla güncellenir: tek bir belge
+değişse bile bütün derlem yeniden gömülür ve senkronizasyon bitene kadar
+arama eski kalır. Burada her belge değiştiğinde sadece o belge işlenir:
+
+1. Nesnenin içeriği hash'lenir; manifest'teki hash ile aynıysa hiçbir şey
+   yapılmaz (aynı dosyanın tekrar yüklenmesi, tekrar gelen S3 olayı).
+2. Metin parçalara bölünür. Parça sınırları içeriğe göre seçilir (paragrafın
+   hash'i), sabit boyutlu pencerelerle değil: başa bir paragraf eklemek
+   sonraki bütün parçaları kaydırmaz, sadece değişen bölgenin parçaları değişir.
+3. Parça kimliği `<anahtar>#<parça hash'i>` olduğundan değişmeyen parçalar
+   aynı kimliği korur. Manifest'te olmayan parçalar yüklenir (gömülür),
+   artık olmayanlar silinir; işlemler paralel gruplar halinde yapılır.
+4. Manifest (`<önek><anahtar>.json`) koşullu PUT ile yazılır. Aynı belge
+   için eşzamanlı iki olay gelirse geride kalan en güncel manifest ve
+   nesneyle tekrar dener: belgenin güncel parçalarını bir kez tamamen
+   yükler ve kendi yazdığı eski parçaları da siler. Her zaman nesnenin
+   güncel hali işlenir.
+
+Maliyet ve süre derlemin boyutuyla değil, değişikliğin boyutuyla orantılıdır.
+Parçalar `KnowledgeBaseSink` ile bölme stratejisi NONE olan özel (CUSTOM)
+veri kaynağına yazılır; Bedrock parçaları tekrar bölmeden gömer.
+"""
+import concurrent.futures
+import datetime
+import hashlib
+import html.parser
+import json
+import os
+import random
+import re
+import time
+import zlib
+
+# Parça boyutu (karakter): en az MIN'den sonra içerik sınırında kesilir, MAX aşılmaz
+MIN_CHUNK_CHARS = 600
+MAX_CHUNK_CHARS = 2400
+# Paragrafların yaklaşık 1/BOUNDARY_MODULUS'ü parça sınırıdır
+BOUNDARY_MODULUS = 3
+# Bedrock Ingest/DeleteKnowledgeBaseDocuments en fazla 10 belge alır
+SINK_BATCH_SIZE = 10
+
+TEXT_EXTENSIONS = {'.txt', '.md', '.markdown', '.csv'}
+HTML_EXTENSIONS = {'.html', '.htm'}
+
+_NOT_FOUND = {'404', 'NoSuchKey', 'NotFound'}
+_WRITE_CONFLICTS = {'412', 'PreconditionFailed', '409', 'ConditionalRequestConflict'}
+_PARAGRAPH_RE = re.compile(r'\n\s*\n')
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+
+class UnsupportedDocument(Exception):
+    """Metni çıkarılamayan dosya türü; belge atlanır."""
+
+
+def _error_code(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class _TextExtractor(html.parser.HTMLParser):
+    """HTML -> düz metin; blok etiketleri paragraf sınırı olur."""
+
+    BLOCKS = {'p', 'div', 'section', 'article', 'li', 'tr', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+    SKIP = {'script', 'style'}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip += 1
+        elif tag in self.BLOCKS:
+            self.parts.append('\n\n')
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip = max(0, self._skip - 1)
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def extract_text(key, data):
+    """Nesne içeriği -> metin; desteklenmeyen türlerde UnsupportedDocument."""
+    extension = os.path.splitext(key)[1].lower()
+    if extension not in TEXT_EXTENSIONS | HTML_EXTENSIONS:
+        raise UnsupportedDocument(f"Desteklenmeyen belge türü: {extension or key}")
+    text = data.decode('utf-8-sig', errors='replace').replace('\r\n', '\n')
+    if extension in HTML_EXTENSIONS:
+        extractor = _TextExtractor()
+        extractor.feed(text)
+        text = ''.join(extractor.parts)
+    return text
+
+
+def _pieces(text):
+    """Paragraflar; MAX_CHUNK_CHARS'tan uzun olanlar cümlelere, gerekirse sabit boyuta bölünür."""
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = ' '.join(paragraph.split())
+        if not paragraph:
+            continue
+        if len(paragraph) <= MAX_CHUNK_CHARS:
+            yield paragraph
+            continue
+        for sentence in _SENTENCE_RE.split(paragraph):
+            for start in range(0, len(sentence), MAX_CHUNK_CHARS):
+                yield sentence[start:start + MAX_CHUNK_CHARS]
+
+
+def split_chunks(text):
+    """
+    Metni parçalara böler. Bir parça en az MIN_CHUNK_CHARS olduktan sonra
+    hash'i sınır koşulunu sağlayan bir paragrafta biter; böylece sınırlar
+    paragrafların konumuna değil içeriğine bağlıdır.
+    """
+    chunks, current, size = [], [], 0
+    for piece in _pieces(text):
+        if current and size + len(piece) + 2 > MAX_CHUNK_CHARS:
+            chunks.append('\n\n'.join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + 2
+        if size >= MIN_CHUNK_CHARS and zlib.crc32(piece.encode('utf-8')) % BOUNDARY_MODULUS == 0:
+            chunks.append('\n\n'.join(current))
+            current, size = [], 0
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
+
+def document_chunks(key, text, source_uri):
+    """Metin -> [{'id', 'hash', 'text', 'metadata'}]; aynı metinli parçalar bir kez alınır."""
+    chunks, seen = [], set()
+    for position, chunk in enumerate(split_chunks(text)):
+        digest = _sha256(chunk.encode('utf-8'))[:32]
+        if digest in seen:
+            continue
+        seen.add(digest)
+        chunks.append({
+            'id': f"{key}#{digest}",
+            'hash': digest,
+            'text': chunk,
+            'metadata': {'source': source_uri, 'documentKey': key, 'position': position},
+        })
+    return chunks
+
+
+def _batches(items, size):
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+class KnowledgeBaseSink:
+    """
+    Parçaları Bedrock bilgi bankasının özel (CUSTOM) veri kaynağına yazar.
+    Veri kaynağının bölme stratejisi NONE olmalıdır: her parça tek belge
+    olarak gömülür. Gruplar (en fazla 10 belge) paralel gönderilir.
+    """
+
+    def __init__(self, client, knowledge_base_id, data_source_id, workers=4):
+        self._client = client
+        self._knowledge_base_id = knowledge_base_id
+        self._data_source_id = data_source_id
+        self._workers = workers
+
+    def upsert(self, chunks):
+        self._run(self._ingest, _batches(chunks, SINK_BATCH_SIZE))
+
+    def delete(self, chunk_ids):
+        self._run(self._delete, _batches(chunk_ids, SINK_BATCH_SIZE))
+
+    def _run(self, operation, batches):
+        if not batches:
+            return
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(self._workers, len(batches))) as pool:
+            list(pool.map(operation, batches))
+
+    def _ingest(self, chunks):
+        self._client.ingest_knowledge_base_documents(
+            knowledgeBaseId=self._knowledge_base_id,
+            dataSourceId=self._data_source_id,
+            documents=[{
+                'content': {
+                    'dataSourceType': 'CUSTOM',
+                    'custom': {
+                        'customDocumentIdentifier': {'id': chunk['id']},
+                        'sourceType': 'IN_LINE',
+                        'inlineContent': {'type': 'TEXT', 'textContent': {'data': chunk['text']}},
+                    },
+                },
+                'metadata': {
+                    'type': 'IN_LINE_ATTRIBUTE',
+                    'inlineAttributes': [
+                        {'key': name, 'value': {'type': 'NUMBER', 'numberValue': value}
+                         if isinstance(value, (int, float)) else {'type': 'STRING', 'stringValue': str(value)}}
+                        for name, value in chunk['metadata'].items()
+                    ],
+                },
+            } for chunk in chunks],
+        )
+
+    def _delete(self, chunk_ids):
+        self._client.delete_knowledge_base_documents(
+            knowledgeBaseId=self._knowledge_base_id,
+            dataSourceId=self._data_source_id,
+            documentIdentifiers=[{'dataSourceType': 'CUSTOM', 'custom': {'id': chunk_id}}
+                                 for chunk_id in chunk_ids],
+        )
+
+
+class DocumentIngestor:
+    """S3'teki belgeleri manifest'lerle karşılaştırıp sadece farkı sink'e yazar."""
+
+    def __init__(self, s3, bucket, sink, manifest_prefix='kb-manifests/', max_attempts=5, base_delay=0.2):
+        self._s3 = s3
+        self._bucket = bucket
+        self._sink = sink
+        self._manifest_prefix = manifest_prefix
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self.stats = {'documents': 0, 'unchanged': 0, 'skipped': 0, 'removed': 0,
+                      'chunksUpserted': 0, 'chunksDeleted': 0, 'chunksKept': 0, 'manifestConflicts': 0}
+
+    def sync(self, key):
+        """
+        Belgeyi S3'teki güncel haliyle eşitler (nesne silindiyse parçalarını
+        siler). Olay türünden bağımsızdır; tekrar çağrılması zararsızdır.
+        Sonuç: {'key', 'status', 'upserted', 'deleted', 'kept'}.
+        """
+        written = set()
+        for attempt in range(self._max_attempts):
+            try:
+                return self._sync_once(key, written, repair=attempt > 0)
+            except Exception as e:
+                if _error_code(e) not in _WRITE_CONFLICTS or attempt == self._max_attempts - 1:
+                    raise
+                self.stats['manifestConflicts'] += 1
+                time.sleep(random.uniform(0, self._base_delay * 2 ** attempt))
+        return None
+
+    def _sync_once(self, key, written, repair):
+        """
+        `written`: önceki denemelerde yazılan parça kimlikleri (artık yoksa
+        silinir). `repair`: manifest çakışmasından sonra; eşzamanlı işlem
+        manifest'teki bir parçayı silmiş olabileceğinden hepsi yüklenir.
+        """
+        manifest, manifest_etag = self._read_manifest(key)
+        previous = {chunk['id'] for chunk in manifest['chunks']} if manifest else set()
+        stale = previous | written
+        try:
+            response = self._s3.get_object(Bucket=self._bucket, Key=key)
+        except Exception as e:
+            if _error_code(e) not in _NOT_FOUND:
+                raise
+            # Nesne silinmiş: parçaları ve manifest'i kaldır
+            self._sink.delete(sorted(stale))
+            if manifest:
+                self._s3.delete_object(Bucket=self._bucket, Key=self._manifest_key(key))
+            self.stats['removed'] += 1
+            self.stats['chunksDeleted'] += len(stale)
+            return self._result(key, 'removed', 0, len(stale), 0)
+
+        data = response['Body'].read()
+        content_hash = _sha256(data)
+        if manifest and manifest['contentHash'] == content_hash and not written:
+            self.stats['unchanged'] += 1
+            return self._result(key, 'unchanged', 0, 0, len(previous))
+        try:
+            text = extract_text(key, data)
+        except UnsupportedDocument as e:
+            print(f"KB Ingest: {key} atlandı ({e})")
+            self.stats['skipped'] += 1
+            return self._result(key, 'skipped', 0, 0, 0)
+
+        chunks = document_chunks(key, text, f"s3://{self._bucket}/{key}")
+        current = {chunk['id'] for chunk in chunks}
+        added = chunks if repair else [chunk for chunk in chunks if chunk['id'] not in previous]
+        removed = sorted(stale - current)
+        written.update(chunk['id'] for chunk in added)
+        self._sink.upsert(added)
+        self._sink.delete(removed)
+        self._write_manifest(key, {
+            'key': key,
+            'contentHash': content_hash,
+            'chunks': [{'id': chunk['id'], 'hash': chunk['hash'], 'chars': len(chunk['text'])} for chunk in chunks],
+            'updatedAt': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }, manifest_etag)
+
+        kept = len(chunks) - len(added)
+        self.stats['documents'] += 1
+        self.stats['chunksUpserted'] += len(added)
+        self.stats['chunksDeleted'] += len(removed)
+        self.stats['chunksKept'] += kept
+        return self._result(key, 'updated', len(added), len(removed), kept)
+
+    @staticmethod
+    def _result(key, status, upserted, deleted, kept):
+        return {'key': key, 'status': status, 'upserted': upserted, 'deleted': deleted, 'kept': kept}
+
+    def _manifest_key(self, key):
+        return f"{self._manifest_prefix}{key}.json"
+
+    def _read_manifest(self, key):
+        try:
+            response = self._s3.get_object(Bucket=self._bucket, Key=self._manifest_key(key))
+        except Exception as e:
+            if _error_code(e) in _NOT_FOUND:
+                return None, None
+            raise
+        return json.loads(response['Body'].read()), response['ETag']
+
+    def _write_manifest(self, key, manifest, etag):
+        condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+        self._s3.put_object(Bucket=self._bucket, Key=self._manifest_key(key),
+                            Body=json.dumps(manifest, ensure_ascii=False).encode('utf-8'),
+                            ContentType='application/json', **condition)
@@ -0,0 +1,239 @@
+"""
+Ödünç verme ve iade işlemleri (LibraryBooks + UserLoans).
+
+Okuyup sonra yazmak (isAvailable'ı oku, müsaitse güncelle) eşzamanlı
+isteklerde aynı kitabın iki kişiye verilmesine yol açar. Bu yüzden her
+işlem tek bir `TransactWriteItems` çağrısıdır:
+
+- Ödünç: kitap `isAvailable = true` koşuluyla `false` yapılır ve kullanıcının
+  bölümüne yeni kayıt eklenir. Koşul tutmazsa hiçbir şey yazılmaz.
+- İade: kayıt `status = active` koşuluyla kapatılır, kitap yalnızca hâlâ bu
+  kayda bağlıysa (`currentLoanId`) tekrar müsait yapılır. Kitap başka bir
+  kayda bağlıysa veya bağı kaybolmuşsa ödünç kaydı yine de kapatılır, kitaba
+  dokunulmaz (aksi halde bu ödünç hiç iade edilemezdi).
+
+UserLoans anahtarı `userId` + `loanId`'dir; `loanId` zaman sıralı olduğu için
+kullanıcının ödünçleri tek bir Query ile (yeniden eskiye) okunur.
+
+İstemci olarak resource'un `meta.client`'ı verilmelidir; değerler düz
+Python tipleriyle yazılır.
+"""
+import datetime
+import random
+import time
+import uuid
+
+# Bir transaction en fazla 100 işlem içerebilir; her iade 2 işlemdir
+MAX_TRANSACTION_ITEMS = 100
+RETURNS_PER_TRANSACTION = MAX_TRANSACTION_ITEMS // 2
+
+ACTIVE, RETURNED = 'active', 'returned'
+# İade transaction'ındaki işlemin hangi kayda ait olduğu
+_LOAN_ROW, _BOOK_ROW = 'loan', 'book'
+
+
+class LoanError(Exception):
+    """İşlem yapılamadı; `status` handler'ın döneceği HTTP kodudur."""
+    status = 409
+
+
+class BookNotFound(LoanError):
+    status = 404
+
+
+class BookUnavailable(LoanError):
+    status = 409
+
+
+def new_loan_id(now):
+    # Zaman sıralı: aynı milisaniyedeki ödünçler rastgele sonekle ayrılır
+    return f"{now.strftime('%Y%m%dT%H%M%S%f')[:-3]}-{uuid.uuid4().hex[:8]}"
+
+
+def _reasons(error):
+    """TransactionCanceledException -> işlem başına iptal kodu ('None' = sorun yok)."""
+    return [reason.get('Code', 'None') for reason in error.response.get('CancellationReasons', [])]
+
+
+def _is_cancelled(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code') == 'TransactionCanceledException'
+
+
+class LoanService:
+
+    def __init__(self, client, books_table='LibraryBooks', loans_table='UserLoans', loan_days=14,
+                 max_attempts=4, base_delay=0.02):
+        self._client = client
+        self._books_table = books_table
+        self._loans_table = loans_table
+        self._loan_days = loan_days
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self.stats = {'checkouts': 0, 'returns': 0, 'rejected': 0, 'conflictRetries': 0, 'detachedReturns': 0}
+
+    def checkout(self, user_id, book_id):
+        """Kitabı kullanıcıya verir; müsait değilse BookUnavailable, yoksa BookNotFound."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        loan = {
+            'userId': user_id,
+            'loanId': new_loan_id(now),
+            'bookId': book_id,
+            'status': ACTIVE,
+            'loanedAt': now.isoformat(),
+            'dueAt': (now + datetime.timedelta(days=self._loan_days)).isoformat(),
+        }
+        items = [
+            {'Update': {
+                'TableName': self._books_table,
+                'Key': {'bookId': book_id},
+                'UpdateExpression': 'SET #avail = :false, currentLoanId = :loan, loanedBy = :user',
+                'ConditionExpression': 'attribute_exists(bookId) AND #avail = :true',
+                'ExpressionAttributeNames': {'#avail': 'isAvailable'},
+                'ExpressionAttributeValues': {
+                    ':false': False, ':true': True, ':loan': loan['loanId'], ':user': user_id,
+                },
+                # Koşul tutmazsa mevcut kayıt döner: kitap var ama ödünçte mi, hiç yok mu?
+                'ReturnValuesOnConditionCheckFailure': 'ALL_OLD',
+            }},
+            {'Put': {
+                'TableName': self._loans_table,
+                'Item': loan,
+                'ConditionExpression': 'attribute_not_exists(loanId)',
+            }},
+        ]
+        error = self._transact(items)
+        if error:
+            self.stats['rejected'] += 1
+            book_reason = error.response['CancellationReasons'][0]
+            if book_reason.get('Code') == 'ConditionalCheckFailed' and not book_reason.get('Item'):
+                raise BookNotFound('Kitap bulunamadı.')
+            raise BookUnavailable('Kitap şu anda ödünçte.')
+        self.stats['checkouts'] += 1
+        return loan
+
+    def return_loans(self, user_id, loan_ids):
+        """
+        Birden fazla ödüncü iade eder (50'lik transaction'lar). Dönüş:
+        {'returned': [loanId, ...], 'failed': {loanId: sebep}}. Ödünç kaydının
+        koşulu tutmazsa (zaten iade edilmiş) yalnızca o kayıt çıkarılır;
+        kitabın koşulu tutmazsa (kitap artık bu ödünce bağlı değil) kayıt
+        kitaba dokunmadan kapatılır. Kalanlar yeniden denenir.
+        """
+        loan_ids = list(dict.fromkeys(str(loan_id) for loan_id in loan_ids))
+        loans = self._active_loans(user_id, loan_ids)
+        failed = {loan_id: 'Aktif ödünç bulunamadı.' for loan_id in loan_ids if loan_id not in loans}
+        returned = []
+
+        pending = [loans[loan_id] for loan_id in loan_ids if loan_id in loans]
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        for start in range(0, len(pending), RETURNS_PER_TRANSACTION):
+            group = pending[start:start + RETURNS_PER_TRANSACTION]
+            # Kitabı artık bu ödünce bağlı olmayan kayıtlar: sadece ödünç kaydı kapatılır
+            detached = set()
+            while group:
+                actions, owners = [], []
+                for i, loan in enumerate(group):
+                    for row, action in self._return_actions(loan, now, release_book=loan['loanId'] not in detached):
+                        actions.append(action)
+                        owners.append((i, row))
+                error = self._transact(actions)
+                if not error:
+                    returned.extend(loan['loanId'] for loan in group)
+                    self.stats['detachedReturns'] += sum(1 for loan in group if loan['loanId'] in detached)
+                    break
+                rejected = {_LOAN_ROW: set(), _BOOK_ROW: set()}
+                for (i, row), code in zip(owners, _reasons(error)):
+                    if code == 'ConditionalCheckFailed':
+                        rejected[row].add(i)
+                if not (rejected[_LOAN_ROW] or rejected[_BOOK_ROW]):
+                    # Çakışma denemeleri tükendi; grubun tamamı başarısız
+                    failed.update({loan['loanId']: 'Eşzamanlı işlem nedeniyle tamamlanamadı.' for loan in group})
+                    break
+                for i in rejected[_LOAN_ROW]:
+                    failed[group[i]['loanId']] = 'Ödünç zaten iade edilmiş.'
+                for i in rejected[_BOOK_ROW] - rejected[_LOAN_ROW]:
+                    print(f"Loan Warning: {group[i]['bookId']} kitabı {group[i]['loanId']} ödüncüne bağlı değil; "
+                          f"sadece ödünç kaydı kapatılıyor.")
+                    detached.add(group[i]['loanId'])
+                group = [loan for i, loan in enumerate(group) if i not in rejected[_LOAN_ROW]]
+
+        self.stats['returns'] += len(returned)
+        return {'returned': returned, 'failed': failed}
+
+    def list_loans(self, user_id, active_only=False, limit=50, start_key=None):
+        """Kullanıcının ödünçleri, yeniden eskiye; tek bölümde Query."""
+        kwargs = {
+            'TableName': self._loans_table,
+            'KeyConditionExpression': 'userId = :user',
+            'ExpressionAttributeValues': {':user': user_id},
+            'ScanIndexForward': False,
+            'Limit': limit,
+        }
+        if active_only:
+            kwargs['FilterExpression'] = '#status = :active'
+            kwargs['ExpressionAttributeNames'] = {'#status': 'status'}
+            kwargs['ExpressionAttributeValues'][':active'] = ACTIVE
+        if start_key:
+            kwargs['ExclusiveStartKey'] = start_key
+        response = self._client.query(**kwargs)
+        return response.get('Items', []), response.get('LastEvaluatedKey')
+
+    # -- İç yardımcılar ---------------------------------------------------------
+
+    def _return_actions(self, loan, now, release_book=True):
+        """(kayıt türü, işlem) çiftleri; `release_book` False ise kitaba dokunulmaz."""
+        actions = [
+            (_LOAN_ROW, {'Update': {
+                'TableName': self._loans_table,
+                'Key': {'userId': loan['userId'], 'loanId': loan['loanId']},
+                'UpdateExpression': 'SET #status = :returned, returnedAt = :now',
+                'ConditionExpression': '#status = :active',
+                'ExpressionAttributeNames': {'#status': 'status'},
+                'ExpressionAttributeValues': {':returned': RETURNED, ':active': ACTIVE, ':now': now},
+            }}),
+        ]
+        if release_book:
+            actions.append((_BOOK_ROW, {'Update': {
+                'TableName': self._books_table,
+                'Key': {'bookId': loan['bookId']},
+                'UpdateExpression': 'SET #avail = :true REMOVE currentLoanId, loanedBy',
+                'ConditionExpression': 'currentLoanId = :loan',
+                'ExpressionAttributeNames': {'#avail': 'isAvailable'},
+                'ExpressionAttributeValues': {':true': True, ':loan': loan['loanId']},
+            }}))
+        return actions
+
+    def _active_loans(self, user_id, loan_ids):
+        """İade edilecek kayıtlar (bookId için); 100'lük BatchGetItem grupları."""
+        loans = {}
+        for start in range(0, len(loan_ids), 100):
+            request = {self._loans_table: {
+                'Keys': [{'userId': user_id, 'loanId': loan_id} for loan_id in loan_ids[start:start + 100]],
+            }}
+            while request:
+                response = self._client.batch_get_item(RequestItems=request)
+                for item in response['Responses'].get(self._loans_table, []):
+                    if item.get('status') == ACTIVE:
+                        loans[item['loanId']] = item
+                request = response.get('UnprocessedKeys')
+        return loans
+
+    def _transact(self, items):
+        """
+        Transaction'ı yazar. Koşul hatasında iptal istisnasını döner (None =
+        başarılı). Başka bir transaction aynı kayda dokunuyorsa
+        (TransactionConflict) kısa bir jitter'lı beklemeyle yeniden dener.
+        """
+        for attempt in range(self._max_attempts):
+            try:
+                self._client.transact_write_items(TransactItems=items)
+                return None
+            except Exception as e:
+                if not _is_cancelled(e):
+                    raise
+                codes = _reasons(e)
+                if 'ConditionalCheckFailed' in codes or attempt == self._max_attempts - 1:
+                    return e
+                self.stats['conflictRetries'] += 1
+                time.sleep(random.uniform(0, self._base_delay * 2 ** attempt))
+        return None
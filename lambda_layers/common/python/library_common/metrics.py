@@ -0,0 +1,216 @@
+"""
+Handler'lar için aşama süreleri, token kullanımı ve CloudWatch Embedded
+Metric Format (EMF) çıktısı.
+
+Her çağrı bir `Trace` açar; aşamalar `tracer.stage('Intent')` ile ölçülür
+(aynı aşama birden fazla kez çalışırsa süreler toplanır). Çağrı bitince tek
+bir EMF satırı yazılır; CloudWatch bu satırdan `<Aşama>Latency`,
+`InputTokens`, `OutputTokens` gibi metrikleri ek API çağrısı olmadan üretir.
+
+- METRICS_SAMPLE_RATE (0-1): başarılı çağrıların ne kadarının yazılacağı.
+  Hatalı çağrılar her zaman yazılır.
+- METRICS_NAMESPACE: CloudWatch namespace'i (varsayılan LibraryProject).
+
+Ek boyutlu değerler (örn. model başına kısıtlama, istem sürümü başına
+token) `count_for` ile tutulur ve her boyut değeri için ayrı bir EMF satırı
+yazılır. `always=True` ile kaydedilenler (kısıtlama gibi nadir olaylar)
+örneklemeden bağımsız yazılır.
+
+İstek gövdesi veya olayın tamamı loglanmaz; sadece süreler, sayılar ve
+kısa özellikler (route, cache katmanı vb.) yazılır.
+"""
+import functools
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'LibraryProject')
+SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', '1.0'))
+
+# Dashboard ve alarmların beklediği aşama adları (stacks/observability.py ile aynı)
+STAGES = ('Parse', 'Session', 'Cache', 'Router', 'Intent', 'FastCall', 'Model', 'Tool', 'DynamoDB', 'RAG',
+          'SecondCall', 'Serialize', 'Total')
+
+
+class Trace:
+
+    def __init__(self, service, operation, sampled):
+        self.service = service
+        self.operation = operation
+        self.sampled = sampled
+        self.error = False
+        self._durations = {}
+        self._counts = {}
+        self._properties = {}
+        self._dimension_counts = {}
+        self._dimension_units = {}
+        self._always = set()
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+
+    @contextmanager
+    def stage(self, name):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, (time.monotonic() - started) * 1000)
+
+    def record(self, name, elapsed_ms):
+        with self._lock:
+            self._durations[name] = self._durations.get(name, 0.0) + elapsed_ms
+
+    def count(self, name, value=1):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + value
+
+    def count_for(self, dimensions, name, value=1, unit='Count', always=False):
+        """Ek boyutlu değer, örn. count_for({'ModelId': model}, 'Throttles', always=True)."""
+        key = tuple(sorted(dimensions.items()))
+        with self._lock:
+            counts = self._dimension_counts.setdefault(key, {})
+            counts[name] = counts.get(name, 0) + value
+            self._dimension_units[name] = unit
+            if always:
+                self._always.add(key)
+
+    def add_usage(self, usage):
+        """Converse (`inputTokens`) veya Anthropic Messages (`input_tokens`) kullanım bilgisi."""
+        if not usage:
+            return
+        self.count('InputTokens', usage.get('inputTokens', usage.get('input_tokens', 0)))
+        self.count('OutputTokens', usage.get('outputTokens', usage.get('output_tokens', 0)))
+        # Prompt caching: önbellekten okunan / önbelleğe yazılan giriş token'ları
+        self.count('CacheReadInputTokens', usage.get('cacheReadInputTokens', usage.get('cache_read_input_tokens', 0)))
+        self.count('CacheWriteInputTokens',
+                   usage.get('cacheWriteInputTokens', usage.get('cache_creation_input_tokens', 0)))
+        self.count('ModelCalls')
+
+    def set(self, key, value):
+        with self._lock:
+            self._properties[key] = value
+
+    def to_emf(self):
+        with self._lock:
+            durations = dict(self._durations)
+            counts = dict(self._counts)
+            properties = dict(self._properties)
+        durations['Total'] = (time.monotonic() - self._started) * 1000
+        counts['Errors'] = int(self.error)
+
+        metrics = [{'Name': f"{name}Latency", 'Unit': 'Milliseconds'} for name in durations]
+        metrics += [{'Name': name, 'Unit': 'Count'} for name in counts]
+        record = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': NAMESPACE,
+                    'Dimensions': [['Service']],
+                    'Metrics': metrics,
+                }],
+            },
+            'Service': self.service,
+            'Operation': self.operation,
+            **properties,
+        }
+        record.update({f"{name}Latency": round(ms, 2) for name, ms in durations.items()})
+        record.update(counts)
+        return record
+
+    def dimension_records(self):
+        with self._lock:
+            write_all = self.sampled or self.error
+            groups = {key: dict(counts) for key, counts in self._dimension_counts.items()
+                      if write_all or key in self._always}
+            units = dict(self._dimension_units)
+        records = []
+        for key, counts in groups.items():
+            dimensions = dict(key)
+            records.append({
+                '_aws': {
+                    'Timestamp': int(time.time() * 1000),
+                    'CloudWatchMetrics': [{
+                        'Namespace': NAMESPACE,
+                        'Dimensions': [['Service', *dimensions]],
+                        'Metrics': [{'Name': name, 'Unit': units[name]} for name in counts],
+                    }],
+                },
+                'Service': self.service,
+                **dimensions,
+                **{name: round(value, 2) if isinstance(value, float) else value for name, value in counts.items()},
+            })
+        return records
+
+    def emit(self):
+        if self.sampled or self.error:
+            print(json.dumps(self.to_emf(), default=str))
+        for record in self.dimension_records():
+            print(json.dumps(record, default=str))
+
+
+class _NullTrace(Trace):
+    """Trace açılmadan çağrılan yardımcılar (örn. yerel scriptler) için sessiz yedek."""
+
+    def __init__(self):
+        super().__init__('', '', False)
+
+    def emit(self):
+        pass
+
+
+class Tracer:
+
+    def __init__(self, service, sample_rate=None):
+        self._service = service
+        self._sample_rate = SAMPLE_RATE if sample_rate is None else sample_rate
+        # Lambda bir ortamda aynı anda tek çağrı işler; aktif trace modül
+        # seviyesinde tutulur ve araç thread'lerinden de kullanılabilir.
+        self._current = _NullTrace()
+        self._cold = True
+
+    @property
+    def current(self):
+        return self._current
+
+    def stage(self, name):
+        return self._current.stage(name)
+
+    def add_usage(self, usage):
+        self._current.add_usage(usage)
+
+    def set(self, key, value):
+        self._current.set(key, value)
+
+    def start(self, operation):
+        trace = Trace(self._service, operation, random.random() < self._sample_rate)
+        trace.set('ColdStart', self._cold)
+        self._cold = False
+        self._current = trace
+        return trace
+
+    def wrap(self, handler):
+        """Handler'ı bir trace ile sarar; 5xx veya istisnada çağrı hatalı sayılır."""
+        @functools.wraps(handler)
+        def wrapped(event, context):
+            request_context = (event or {}).get('requestContext', {})
+            operation = request_context.get('routeKey') or (event or {}).get('httpMethod') or 'invoke'
+            trace = self.start(operation)
+            # WebSocket bağlantı olayları gecikme metriklerini çarpıtmasın
+            if operation in ('$connect', '$disconnect'):
+                trace.sampled = False
+            try:
+                result = handler(event, context)
+            except Exception:
+                trace.error = True
+                raise
+            else:
+                if isinstance(result, dict) and result.get('statusCode', 200) >= 500:
+                    trace.error = True
+                return result
+            finally:
+                trace.emit()
+                self._current = _NullTrace()
+        return wrapped
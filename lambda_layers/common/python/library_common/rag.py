@@ -0,0 +1,131 @@
+"""
+Önce getir, sonra tek seferde üret (retrieve-then-generate) RAG yardımcıları.
+
+`retrieve_and_generate` kendi içinde ayrı bir model çağrısı yaptığı için,
+önce cevabı üreten bir `converse` çağrısının ardından kullanıldığında her
+genel soru iki üretim demekti. Burada Knowledge Base'den sadece `retrieve`
+ile parçalar (chunk) alınır, tekrarlar ayıklanıp token bütçesine kırpılır
+ve sistem mesajına eklenir; cevap tek bir `converse` çağrısıyla üretilir.
+En iyi parçanın skoru eşiğin altındaysa bağlam eklenmez.
+
+Aynı (normalize edilmiş) soru için getirilen parçalar konteyner içinde
+sınırlı bir LRU'da tutulur.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from library_common.text import estimate_tokens, normalize_prompt
+
+
+class Chunk(NamedTuple):
+    text: str
+    score: float
+    source: str
+
+
+class ChunkCache:
+
+    def __init__(self, max_entries=256, ttl_seconds=900):
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def put(self, key, chunks):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, chunks)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class Retriever:
+
+    def __init__(self, client, knowledge_base_id, cache=None, number_of_results=8):
+        self._client = client
+        self._knowledge_base_id = knowledge_base_id
+        self._cache = cache
+        self._number_of_results = number_of_results
+
+    def retrieve(self, query):
+        """Skora göre (büyükten küçüğe) sıralı parçalar ve önbellekten gelip gelmediği."""
+        key = normalize_prompt(query)
+        if self._cache:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached, True
+
+        response = self._client.retrieve(
+            knowledgeBaseId=self._knowledge_base_id,
+            retrievalQuery={'text': query},
+            retrievalConfiguration={'vectorSearchConfiguration': {'numberOfResults': self._number_of_results}}
+        )
+        chunks = tuple(sorted(
+            (Chunk(result['content']['text'], float(result.get('score', 0.0)), _source(result))
+             for result in response.get('retrievalResults', []) if result.get('content', {}).get('text')),
+            key=lambda chunk: chunk.score, reverse=True
+        ))
+        if self._cache:
+            self._cache.put(key, chunks)
+        return chunks, False
+
+
+def select_context(chunks, token_budget, min_score):
+    """
+    Eşiğin üstündeki parçaları skor sırasıyla, aynı metni iki kez almadan
+    ve toplam token bütçesini aşmadan seçer.
+    """
+    selected = []
+    seen = set()
+    used = 0
+    for chunk in chunks:
+        if chunk.score < min_score:
+            break
+        fingerprint = normalize_prompt(chunk.text)
+        if fingerprint in seen:
+            continue
+        tokens = estimate_tokens(chunk.text)
+        if used + tokens > token_budget:
+            # Bütçeye sığmayan ilk parça, yer varsa kırpılarak eklenir
+            remaining = token_budget - used
+            if remaining >= 50:
+                selected.append(chunk._replace(text=chunk.text[:remaining * 4]))
+            break
+        seen.add(fingerprint)
+        selected.append(chunk)
+        used += tokens
+    return selected
+
+
+def context_prompt(chunks):
+    """Seçilen parçalardan sistem mesajına eklenecek bağlam metni."""
+    parts = [f"[{i}] ({chunk.source})\n{chunk.text}" for i, chunk in enumerate(chunks, 1)]
+    return ("Aşağıda kütüphane belgelerinden soruyla ilgili alıntılar var. Genel sorularda yanıtını "
+            "bu alıntılara dayandır; alıntılarda cevap yoksa bilmediğini söyle.\n\n" + "\n\n".join(parts))
+
+
+def _source(result):
+    # Parça parça yüklenen (CUSTOM veri kaynağı) belgelerde asıl S3 adresi metadata'dadır
+    source = (result.get('metadata') or {}).get('source')
+    if source:
+        return source
+    location = result.get('location', {})
+    return location.get('s3Location', {}).get('uri') or location.get('type', 'kb')
@@ -0,0 +1,303 @@
+"""
+Kitap önerileri için gömme (embedding) indeksi.
+
+Her kitabın Titan Text Embeddings vektörü çevrimdışı üretilir
+(`tools/build_recommendations.py`) ve S3'e L2 normalize edilmiş bir NumPy
+float32 matrisi (`.npy`) olarak yazılır. Satırlar birim uzunlukta olduğu için
+kosinüs benzerliği tek bir matris-vektör çarpımıdır; en yakın k kitap
+`argpartition` ile tüm liste sıralanmadan seçilir.
+
+Lambda konteynerinde dosya `/tmp`'ye indirilip `np.load(mmap_mode='r')` ile
+açılır: matris Python nesnelerine dönüşmez, sayfalar işletim sisteminin
+önbelleğinden okunur ve sıcak konteynerde tekrar indirilmez.
+
+S3 düzeni (her üretim yeni bir sürümdür; okuyucular yarım yazılmış sürüm görmez):
+
+    <önek>current.json                 {"version", "model", "dimensions", "count", "builtAt"}
+    <önek><sürüm>/embeddings.npy       N x D float32, satırlar books.json sırasıyla
+    <önek><sürüm>/books.json           [{"id", "title", "author", "genre", "cover", "textHash"}]
+"""
+import concurrent.futures
+import datetime
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_MODEL_ID = 'amazon.titan-embed-text-v2:0'
+DEFAULT_DIMENSIONS = 256
+# Titan v2 girdisi en fazla 8k token; başlık, yazar, tür ve açıklamanın başı yeterli
+MAX_TEXT_CHARS = 2000
+# "Ödünçlerime göre": son ödünçler daha ağırlıklı (i. ödünç RECENCY_DECAY ** i)
+RECENCY_DECAY = 0.9
+# S3'te tutulan sürüm sayısı (güncel + bir önceki; indirmesi süren okuyucular için)
+KEEP_VERSIONS = 2
+
+_NOT_MODIFIED = {'304', 'NotModified'}
+_NOT_FOUND = {'404', 'NoSuchKey'}
+
+
+def _error_code(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+
+def book_text(item):
+    """Kitabın gömülen metni; değişmediği sürece vektörü yeniden hesaplanmaz."""
+    parts = (item.get('title'), item.get('author'), item.get('genre'), item.get('description'))
+    return '. '.join(str(part).strip() for part in parts if part)[:MAX_TEXT_CHARS]
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def to_entry(item, text):
+    """DynamoDB kaydı -> books.json satırı (yanıtta dönen alanlar + metin özeti)."""
+    entry = {
+        'id': str(item.get('bookId', item.get('id'))),
+        'title': item.get('title') or '',
+        'author': item.get('author') or '',
+        'genre': item.get('genre') or '',
+        'textHash': text_hash(text),
+    }
+    if item.get('cover'):
+        entry['cover'] = item['cover']
+    return entry
+
+
+def titan_embedder(client, model_id=DEFAULT_MODEL_ID, dimensions=DEFAULT_DIMENSIONS):
+    """Metin -> vektör; `client` bedrock-runtime istemcisi veya BedrockScheduler."""
+    def embed(text):
+        response = client.invoke_model(
+            modelId=model_id,
+            body=json.dumps({'inputText': text, 'dimensions': dimensions, 'normalize': True})
+        )
+        return json.loads(response['body'].read())['embedding']
+    return embed
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    matrix /= norms
+    return matrix
+
+
+def build_matrix(items, embed, dimensions=DEFAULT_DIMENSIONS, previous=None, workers=8, on_progress=None):
+    """
+    Kitaplar -> (matris, books.json satırları, modele gönderilen kitap sayısı).
+    Metni değişmemiş kitapların vektörü önceki sürümden (`previous`,
+    EmbeddingIndex) alınır; sadece yeni ve değişen kitaplar gömülür.
+    """
+    entries, texts, seen = [], [], set()
+    for item in items:
+        text = book_text(item)
+        entry = to_entry(item, text)
+        if not text or entry['id'] in seen:
+            continue
+        seen.add(entry['id'])
+        entries.append(entry)
+        texts.append(text)
+
+    matrix = np.zeros((len(entries), dimensions), dtype=np.float32)
+    reusable = previous is not None and previous.dimensions == dimensions
+    pending = []
+    for row, entry in enumerate(entries):
+        vector = previous.vector(entry['id'], entry['textHash']) if reusable else None
+        if vector is None:
+            pending.append(row)
+        else:
+            matrix[row] = vector
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        vectors = pool.map(lambda row: embed(texts[row]), pending)
+        for done, (row, vector) in enumerate(zip(pending, vectors), 1):
+            matrix[row] = vector
+            if on_progress and (done % 1000 == 0 or done == len(pending)):
+                on_progress(done, len(pending))
+    return normalize_rows(matrix), entries, len(pending)
+
+
+class EmbeddingIndex:
+
+    def __init__(self, matrix, books, version=None):
+        """`matrix`: N x D float32 (satırlar birim uzunlukta, mmap olabilir); `books`: satır sırasıyla."""
+        if len(matrix) != len(books):
+            raise ValueError('Gömme matrisi ile kitap listesi uyuşmuyor.')
+        self.matrix = matrix
+        self.books = books
+        self.version = version
+        self.dimensions = matrix.shape[1]
+        self._rows = {book['id']: row for row, book in enumerate(books)}
+
+    def __len__(self):
+        return len(self.books)
+
+    def vector(self, book_id, expected_hash=None):
+        """Kitabın vektörü; kitap yoksa veya metni değiştiyse (`expected_hash`) None."""
+        row = self._rows.get(str(book_id))
+        if row is None or (expected_hash and self.books[row].get('textHash') != expected_hash):
+            return None
+        return self.matrix[row]
+
+    def similar(self, book_id, k=10):
+        """Kitaba en benzer k kitap (kendisi hariç); kitap indekste yoksa None."""
+        row = self._rows.get(str(book_id))
+        if row is None:
+            return None
+        return self.nearest(self.matrix[row], k, exclude=[row])
+
+    def for_books(self, book_ids, k=10):
+        """
+        Kitap listesinin (yeniden eskiye, örn. kullanıcının ödünçleri) ağırlıklı
+        ortalamasına en yakın k kitap; listedeki kitaplar hariç.
+        """
+        rows = list(dict.fromkeys(self._rows[book_id] for book_id in map(str, book_ids) if book_id in self._rows))
+        if not rows:
+            return []
+        weights = RECENCY_DECAY ** np.arange(len(rows), dtype=np.float32)
+        profile = weights @ self.matrix[rows]
+        return self.nearest(profile, k, exclude=rows)
+
+    def nearest(self, vector, k=10, exclude=()):
+        """Vektöre kosinüs benzerliği en yüksek k kitap, skorlarıyla (yüksekten düşüğe)."""
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        if not norm or not self.books:
+            return []
+        scores = self.matrix @ (vector / norm)
+        if len(exclude):
+            scores[list(exclude)] = -np.inf
+        k = min(k, len(scores) - len(exclude))
+        if k <= 0:
+            return []
+        top = np.argpartition(scores, len(scores) - k)[-k:]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [self._result(self.books[row], scores[row]) for row in top]
+
+    @staticmethod
+    def _result(book, score):
+        result = {key: value for key, value in book.items() if key != 'textHash'}
+        result['score'] = round(float(score), 4)
+        return result
+
+
+class EmbeddingStore:
+    """S3'teki gömme sürümleri: konteyner içinde önbellekli okuma ve yeni sürüm yayınlama."""
+
+    def __init__(self, s3, bucket, prefix='recommendations/', local_dir='/tmp', check_interval=300):
+        self._s3 = s3
+        self._bucket = bucket
+        self._prefix = prefix
+        self._local_dir = local_dir
+        self._check_interval = check_interval
+        self._index = None
+        self._etag = None
+        self._local_files = []
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'loads': 0, 'checks': 0}
+
+    def current(self):
+        """
+        Konteynerdeki indeks; en fazla `check_interval` saniyede bir
+        current.json koşullu GET (If-None-Match) ile kontrol edilir. Henüz
+        yayınlanmış bir sürüm yoksa None.
+        """
+        if self._index is not None and time.monotonic() < self._next_check:
+            return self._index
+        with self._lock:
+            if self._index is not None and time.monotonic() < self._next_check:
+                return self._index
+            kwargs = {'Bucket': self._bucket, 'Key': self._prefix + 'current.json'}
+            if self._etag:
+                kwargs['IfNoneMatch'] = self._etag
+            self.stats['checks'] += 1
+            try:
+                response = self._s3.get_object(**kwargs)
+            except Exception as e:
+                code = _error_code(e)
+                if code in _NOT_MODIFIED:
+                    self._next_check = time.monotonic() + self._check_interval
+                    return self._index
+                if code in _NOT_FOUND:
+                    return None
+                raise
+            manifest = json.loads(response['Body'].read())
+            if self._index is None or self._index.version != manifest['version']:
+                self._load(manifest['version'])
+            self._etag = response['ETag']
+            self._next_check = time.monotonic() + self._check_interval
+            return self._index
+
+    def load_latest(self):
+        """Yayınlanmış son sürüm, belleğe okunmuş olarak (üretim aracı için); yoksa None."""
+        try:
+            response = self._s3.get_object(Bucket=self._bucket, Key=self._prefix + 'current.json')
+        except Exception as e:
+            if _error_code(e) in _NOT_FOUND:
+                return None
+            raise
+        version = json.loads(response['Body'].read())['version']
+        matrix = np.load(io.BytesIO(self._read(version, 'embeddings.npy')))
+        books = json.loads(self._read(version, 'books.json'))
+        return EmbeddingIndex(matrix, books, version)
+
+    def publish(self, matrix, books, model_id):
+        """Yeni sürümü yazar, sonra current.json'u ona çevirir; eski sürümleri siler."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        version = now.strftime('%Y%m%dT%H%M%S%fZ')
+        buffer = io.BytesIO()
+        np.save(buffer, np.ascontiguousarray(matrix, dtype=np.float32), allow_pickle=False)
+        self._put(f"{self._prefix}{version}/embeddings.npy", buffer.getvalue(), 'application/octet-stream')
+        self._put(f"{self._prefix}{version}/books.json",
+                  json.dumps(books, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+                  'application/json')
+        manifest = {
+            'version': version,
+            'model': model_id,
+            'dimensions': int(matrix.shape[1]),
+            'count': len(books),
+            'builtAt': now.isoformat(),
+        }
+        self._put(self._prefix + 'current.json', json.dumps(manifest).encode('utf-8'), 'application/json')
+        self._prune()
+        return manifest
+
+    # -- İç yardımcılar ---------------------------------------------------------
+
+    def _read(self, version, name):
+        return self._s3.get_object(Bucket=self._bucket, Key=f"{self._prefix}{version}/{name}")['Body'].read()
+
+    def _put(self, key, data, content_type):
+        self._s3.put_object(Bucket=self._bucket, Key=key, Body=data, ContentType=content_type)
+
+    def _load(self, version):
+        matrix_path = os.path.join(self._local_dir, f"recommendations-{version}.npy")
+        partial = matrix_path + '.part'
+        response = self._s3.get_object(Bucket=self._bucket, Key=f"{self._prefix}{version}/embeddings.npy")
+        with open(partial, 'wb') as f:
+            for chunk in response['Body'].iter_chunks(1 << 20):
+                f.write(chunk)
+        os.replace(partial, matrix_path)
+        books = json.loads(self._read(version, 'books.json'))
+        self._index = EmbeddingIndex(np.load(matrix_path, mmap_mode='r'), books, version)
+        # Eski sürümün mmap'i açık kalsa da dosyası silinebilir; /tmp dolmaz
+        for path in self._local_files:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._local_files = [matrix_path]
+        self.stats['loads'] += 1
+
+    def _prune(self):
+        response = self._s3.list_objects_v2(Bucket=self._bucket, Prefix=self._prefix, Delimiter='/')
+        versions = sorted(entry['Prefix'] for entry in response.get('CommonPrefixes', []))
+        for version_prefix in versions[:-KEEP_VERSIONS]:
+            for name in ('embeddings.npy', 'books.json'):
+                self._s3.delete_object(Bucket=self._bucket, Key=version_prefix + name)
@@ -0,0 +1,255 @@
+"""
+Asistan yanıtları için iki katmanlı önbellek.
+
+1. Konteyner içi LRU (ağ çağrısı yok)
+2. DynamoDB tablosu (AssistantResponseCache, TTL ile kendiliğinden silinir)
+
+Anahtar, normalize edilmiş soru metninin özetidir; böylece "Kütüphane kaçta
+açılıyor?" ile "kütüphane kaçta açılıyor" aynı kaydı bulur. İsteğe bağlı
+olarak (embedder verilirse) anlamca yakın sorular da konteyner içindeki
+kayıtların embedding'leri ile eşleştirilir. Araç sonucuna dayanan yanıtlar
+anlamsal eşleşmeye katılmaz: "Suç ve Ceza var mı?" ile "Sefiller var mı?"
+birbirine çok benzer ama yanıtları farklı kitaplara bağlıdır. Önbellekte
+bulunamayan sorunun embedding'i saklanır; yanıt yazılırken yeniden
+hesaplanmaz.
+
+Araç (kitap durumu) sonucuna dayanan yanıtlar, kullandıkları kitaplara
+bağımlılık kaydı ile yazılır:
+
+    pk              | sk         |
+    ----------------+------------+----------------------------
+    resp#<özet>     | entry      | yanıt, gecikme, expiresAt
+    book#<bookId>   | resp#<özet>| (bağımlılık)
+    book#*          | resp#<özet>| (katalog yapısı değişirse)
+
+Kitap değiştiğinde catalog_indexer `invalidate_book_dependencies` ile ilgili
+kayıtları siler.
+"""
+import array
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from boto3.dynamodb.conditions import Key
+
+from library_common.text import normalize_prompt
+
+ENTRY_SORT_KEY = 'entry'
+ANY_BOOK = '*'
+
+
+def cache_key(prompt):
+    digest = hashlib.sha256(normalize_prompt(prompt).encode('utf-8')).hexdigest()
+    return f"resp#{digest[:32]}"
+
+
+def invalidate_book_dependencies(table, book_ids):
+    """
+    Verilen kitaplara dayanan yanıtları siler. Silinen yanıt sayısını döner.
+    Katalog yapısı değiştiyse book_ids içine ANY_BOOK ('*') eklenmelidir.
+    """
+    deleted = 0
+    with table.batch_writer(overwrite_by_pkeys=['pk', 'sk']) as writer:
+        for book_id in book_ids:
+            kwargs = {'KeyConditionExpression': Key('pk').eq(f"book#{book_id}"), 'ProjectionExpression': 'pk, sk'}
+            while True:
+                response = table.query(**kwargs)
+                for dependency in response.get('Items', []):
+                    writer.delete_item(Key={'pk': dependency['sk'], 'sk': ENTRY_SORT_KEY})
+                    writer.delete_item(Key={'pk': dependency['pk'], 'sk': dependency['sk']})
+                    deleted += 1
+                if 'LastEvaluatedKey' not in response:
+                    break
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return deleted
+
+
+class CachedResponse:
+    __slots__ = ('key', 'prompt', 'response', 'latency_ms', 'book_ids', 'expires_at', 'embedding')
+
+    def __init__(self, key, prompt, response, latency_ms, book_ids, expires_at, embedding=None):
+        self.key = key
+        self.prompt = prompt
+        self.response = response
+        self.latency_ms = latency_ms
+        self.book_ids = book_ids
+        self.expires_at = expires_at
+        self.embedding = embedding
+
+    @property
+    def tool_backed(self):
+        return self.book_ids is not None
+
+
+class ResponseCache:
+
+    def __init__(self, table, ttl_seconds=86400, tool_ttl_seconds=600, max_entries=512,
+                 embedder=None, similarity_threshold=0.92):
+        self._table = table
+        self._ttl = ttl_seconds
+        self._tool_ttl = tool_ttl_seconds
+        self._max_entries = max_entries
+        self._embedder = embedder
+        self._threshold = similarity_threshold
+        self._entries = OrderedDict()
+        # Anlamsal aramada hesaplanan, put() ile yazılmayı bekleyen soru embedding'leri
+        self._query_embeddings = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'lookups': 0, 'hits': 0, 'memoryHits': 0, 'tableHits': 0, 'semanticHits': 0, 'savedMs': 0}
+
+    def get(self, prompt):
+        """
+        Önbellekteki yanıtı döner: (CachedResponse, katman) ya da (None, None).
+        Katman 'memory', 'dynamodb' veya 'semantic' olabilir.
+        """
+        key = cache_key(prompt)
+        now = time.time()
+        self.stats['lookups'] += 1
+
+        entry = self._memory_get(key, now)
+        layer = 'memory'
+        if entry is None:
+            entry = self._table_get(key, now)
+            layer = 'dynamodb'
+        if entry is None and self._embedder:
+            entry = self._semantic_get(key, prompt, now)
+            layer = 'semantic'
+        if entry is None:
+            return None, None
+
+        self.stats['hits'] += 1
+        self.stats[f"{'table' if layer == 'dynamodb' else layer}Hits"] += 1
+        self.stats['savedMs'] += entry.latency_ms
+        return entry, layer
+
+    def put(self, prompt, response, latency_ms, book_ids=None):
+        """
+        Yanıtı iki katmana da yazar. `book_ids` verilirse (araç kullanılan
+        yanıtlar) kısa TTL ile ve kitap bağımlılıkları ile saklanır.
+        """
+        key = cache_key(prompt)
+        tool_backed = book_ids is not None
+        expires_at = int(time.time()) + (self._tool_ttl if tool_backed else self._ttl)
+        # get() sırasında hesaplanan embedding yeniden kullanılır; araç yanıtlarına embedding yazılmaz
+        embedding = self._pop_query_embedding(key)
+        if tool_backed:
+            embedding = None
+        elif embedding is None and self._embedder:
+            embedding = self._embed(prompt)
+        entry = CachedResponse(key, normalize_prompt(prompt), response, int(latency_ms),
+                               frozenset(book_ids) if tool_backed else None, expires_at, embedding)
+        self._memory_put(entry)
+
+        item = {
+            'pk': key,
+            'sk': ENTRY_SORT_KEY,
+            'prompt': entry.prompt,
+            'response': response,
+            'latencyMs': entry.latency_ms,
+            'expiresAt': expires_at,
+        }
+        if tool_backed:
+            item['bookIds'] = sorted(entry.book_ids) or [ANY_BOOK]
+        if embedding is not None:
+            item['embedding'] = embedding.tobytes()
+
+        with self._table.batch_writer() as writer:
+            writer.put_item(Item=item)
+            if tool_backed:
+                for book_id in sorted(entry.book_ids | {ANY_BOOK}):
+                    writer.put_item(Item={'pk': f"book#{book_id}", 'sk': key, 'expiresAt': expires_at})
+        return entry
+
+    def invalidate_books(self, book_ids):
+        """
+        Konteyner içindeki araç yanıtlarını düşürür. book_ids None ise
+        (katalog yapısı değişti) tüm araç yanıtları düşürülür.
+        """
+        with self._lock:
+            stale = [key for key, entry in self._entries.items()
+                     if entry.tool_backed and (book_ids is None or entry.book_ids & set(book_ids) or not entry.book_ids)]
+            for key in stale:
+                del self._entries[key]
+
+    def report(self, layer, entry):
+        """İstek başına loglanacak önbellek özeti."""
+        lookups = self.stats['lookups'] or 1
+        return {
+            'hit': entry is not None,
+            'layer': layer,
+            'savedMs': entry.latency_ms if entry else 0,
+            'hitRatio': round(self.stats['hits'] / lookups, 3),
+            'totalSavedMs': self.stats['savedMs'],
+            'size': len(self._entries),
+        }
+
+    def _memory_get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at < now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _memory_put(self, entry):
+        with self._lock:
+            self._entries[entry.key] = entry
+            self._entries.move_to_end(entry.key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def _table_get(self, key, now):
+        item = self._table.get_item(Key={'pk': key, 'sk': ENTRY_SORT_KEY}).get('Item')
+        # TTL silmesi gecikmeli olabildiği için süreyi burada da kontrol et
+        if not item or int(item.get('expiresAt', 0)) < now:
+            return None
+        book_ids = item.get('bookIds')
+        embedding = None
+        if 'embedding' in item:
+            embedding = array.array('f')
+            embedding.frombytes(bytes(item['embedding']))
+        entry = CachedResponse(
+            key, item.get('prompt', ''), item['response'], int(item.get('latencyMs', 0)),
+            frozenset(b for b in book_ids if b != ANY_BOOK) if book_ids is not None else None,
+            int(item['expiresAt']), embedding
+        )
+        self._memory_put(entry)
+        return entry
+
+    def _semantic_get(self, key, prompt, now):
+        query = self._embed(prompt)
+        if query is None:
+            return None
+        best, best_score = None, self._threshold
+        with self._lock:
+            self._query_embeddings[key] = query
+            while len(self._query_embeddings) > self._max_entries:
+                self._query_embeddings.popitem(last=False)
+            candidates = [e for e in self._entries.values()
+                          if e.embedding is not None and not e.tool_backed and e.expires_at >= now]
+        for entry in candidates:
+            score = _cosine(query, entry.embedding)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def _pop_query_embedding(self, key):
+        with self._lock:
+            return self._query_embeddings.pop(key, None)
+
+    def _embed(self, prompt):
+        try:
+            return array.array('f', self._embedder(normalize_prompt(prompt)))
+        except Exception as e:
+            print(f"Embedding Error: {e}")
+            return None
+
+
+def _cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
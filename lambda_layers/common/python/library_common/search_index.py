@@ -0,0 +1,514 @@
+"""
+Kitap araması için S3'te tutulan kompakt indeks (GET /books/search).
+
+Tarayıcı tüm kataloğu indirip süzüyordu; birkaç bin kitaptan sonra bu
+yavaşlar. İndeks tek bir ikili dosyadır ve Lambda konteynerinde `/tmp`'ye
+indirilip `mmap` ile açılır. Sayısal diziler kopyalanmadan doğrudan dosya
+üzerinden okunur (`memoryview.cast`); sadece başlık metni ve kelime listesi
+belleğe çözülür.
+
+    LBSI | sürüm | başlık uzunluğu | başlık (JSON) | bölümler (8 bayt hizalı)
+
+Satırlar normalize edilmiş başlığa göre sıralıdır. Bölümler:
+
+- titles / title_starts: '\\n' ile birleştirilmiş normalize başlıklar ve her
+  satırın başlangıcı. Önek araması ikili arama (bisect), alt dize araması
+  birleşik metinde `str.find` ile yapılır.
+- ids, records / record_starts: kitap id'leri ve yanıtta dönen alanlar
+  (satır başına JSON); sadece sonuç sayfasındaki satırlar çözülür.
+- genre_ids, author_ids, available: facet sayıları için satır başına
+  değerler (tür / yazar adları başlıktadır).
+- genre_starts / genre_rows, author_starts / author_rows: her tür ve
+  yazarın satırları. Filtreler bu kümelerin kesişimidir; satır satır
+  Python döngüsüyle tüm katalog gezilmez.
+- tokens / posting_starts / postings: başlık ve yazar kelimelerinin sıralı
+  listesi ve her kelimenin geçtiği satırlar (ters indeks). Sorgunun son
+  kelimesi önek olarak eşleşir ("orhan pa" -> "Orhan Pamuk").
+
+Sıralama: başlığı sorguyla başlayanlar, başlığında sorguyu içerenler,
+sonra kelimeleri başlık/yazarda geçenler; her grup içinde alfabetik.
+
+İndeks LibraryBooks stream'inden güncellenir: değişen kayıtlar mevcut
+indeksin satırlarıyla birleştirilip dosya yeniden yazılır (tablo taranmaz;
+değişmeyen satırların kodlanmış kaydı ve normalize başlığı aynen kullanılır).
+Eşzamanlı yazımlar S3 koşullu PUT (If-Match / If-None-Match) ile ayrılır.
+"""
+import array
+import bisect
+import collections
+import datetime
+import itertools
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import threading
+import time
+
+from library_common.text import normalize, split_words, tokenize
+
+MAGIC = b'LBSI'
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct('<4sII')
+_ALIGN = 8
+
+# Sorgunun son kelimesi önek olarak genişletilirken bakılan en fazla kelime
+MAX_PREFIX_TOKENS = 256
+
+# Müsaitlik bayrağını (0/1) tersine çevirir; ödünçtekileri C hızında seçmek için
+_INVERT = bytes([1, 0]) + bytes(254)
+
+_NOT_MODIFIED = {'304', 'NotModified'}
+_NOT_FOUND = {'404', 'NoSuchKey'}
+_WRITE_CONFLICTS = {'412', 'PreconditionFailed', '409', 'ConditionalRequestConflict'}
+
+
+def _error_code(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+
+def _aligned(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def to_record(item):
+    """DynamoDB kaydı (veya indeks kaydı) -> indekste saklanan alanlar."""
+    record = {
+        'id': str(item.get('bookId', item.get('id'))),
+        'title': item.get('title') or '',
+        'author': item.get('author') or '',
+        'genre': item.get('genre') or '',
+        'isAvailable': bool(item.get('isAvailable', True)),
+    }
+    if item.get('cover'):
+        record['cover'] = item['cover']
+    return record
+
+
+class _Facet:
+    """
+    Normalize edilmiş değer -> sıra numarası ve o değere sahip satırlar;
+    görünen ad ilk karşılaşılan yazımdır.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self.rows = []
+        self._raw = {}
+
+    def add(self, value, row):
+        facet_id = self._raw.get(value)
+        if facet_id is None:
+            key = normalize(value)
+            facet_id = self.ids.get(key)
+            if facet_id is None:
+                facet_id = self.ids[key] = len(self.names)
+                self.names.append(value)
+                self.rows.append(array.array('I'))
+            self._raw[value] = facet_id
+        self.rows[facet_id].append(row)
+        return facet_id
+
+    def counts(self):
+        return [len(rows) for rows in self.rows]
+
+
+def _flatten(lists):
+    """Satır listeleri -> (başlangıçlar, birleşik liste); i. liste starts[i]:starts[i + 1]."""
+    starts, flat = array.array('I', [0]), array.array('I')
+    for rows in lists:
+        flat.extend(rows)
+        starts.append(len(flat))
+    return starts, flat
+
+
+def _entry(item):
+    """
+    Kayıt -> indeks satırı: (normalize başlık, id, kodlanmış kayıt, tür,
+    yazar, müsait mi). Güncellemede değişmeyen satırlar bu biçimde mevcut
+    indeksten alınır; kayıtlar yeniden çözülüp normalize edilmez.
+    """
+    record = to_record(item)
+    encoded = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return (normalize(record['title']), record['id'], encoded,
+            record['genre'], record['author'], 1 if record['isAvailable'] else 0)
+
+
+def build_index(items, built_at=None):
+    """Kayıtlardan indeks dosyasını (bytes) üretir."""
+    entries = {}
+    for item in items:
+        entry = _entry(item)
+        entries[entry[1]] = entry
+    return _build(entries.values(), built_at)
+
+
+def _build(entries, built_at=None):
+    rows = sorted(entries, key=lambda entry: (entry[0], entry[1]))
+
+    genres, authors = _Facet(), _Facet()
+    genre_ids, author_ids = array.array('I'), array.array('I')
+    available = array.array('B')
+    title_starts, record_starts = array.array('I', [0]), array.array('I', [0])
+    postings = {}
+    author_words = {}
+    title_offset = record_offset = 0
+    for row, (title, _, encoded, genre, author, flag) in enumerate(rows):
+        title_offset += len(title) + 1
+        title_starts.append(title_offset)
+        record_offset += len(encoded)
+        record_starts.append(record_offset)
+        genre_ids.append(genres.add(genre, row))
+        author_ids.append(authors.add(author, row))
+        available.append(flag)
+        words = author_words.get(author)
+        if words is None:
+            words = author_words[author] = frozenset(tokenize(author, drop_stopwords=False))
+        for word in words.union(split_words(title)):
+            postings.setdefault(word, array.array('I')).append(row)
+
+    vocabulary = sorted(postings)
+    posting_starts, flat_postings = _flatten(postings[word] for word in vocabulary)
+    genre_starts, genre_rows = _flatten(genres.rows)
+    author_starts, author_rows = _flatten(authors.rows)
+
+    sections = [
+        ('titles', ''.join(entry[0] + '\n' for entry in rows).encode('utf-8'), 's'),
+        ('title_starts', title_starts.tobytes(), 'I'),
+        ('ids', '\n'.join(entry[1] for entry in rows).encode('utf-8'), 's'),
+        ('records', b''.join(entry[2] for entry in rows), 's'),
+        ('record_starts', record_starts.tobytes(), 'I'),
+        ('genre_ids', genre_ids.tobytes(), 'I'),
+        ('author_ids', author_ids.tobytes(), 'I'),
+        ('available', available.tobytes(), 'B'),
+        ('genre_starts', genre_starts.tobytes(), 'I'),
+        ('genre_rows', genre_rows.tobytes(), 'I'),
+        ('author_starts', author_starts.tobytes(), 'I'),
+        ('author_rows', author_rows.tobytes(), 'I'),
+        ('tokens', '\n'.join(vocabulary).encode('utf-8'), 's'),
+        ('posting_starts', posting_starts.tobytes(), 'I'),
+        ('postings', flat_postings.tobytes(), 'I'),
+    ]
+    layout, offset = {}, 0
+    for name, data, typecode in sections:
+        layout[name] = [offset, len(data), typecode]
+        offset = _aligned(offset + len(data))
+    header = json.dumps({
+        'builtAt': built_at or datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'count': len(rows),
+        'byteorder': sys.byteorder,
+        'genres': genres.names,
+        'genreCounts': genres.counts(),
+        'authors': authors.names,
+        'authorCounts': authors.counts(),
+        'available': sum(available),
+        'sections': layout,
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    start = _aligned(_PREFIX.size + len(header))
+    out = bytearray(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)) + header)
+    for name, data, _ in sections:
+        out.extend(b'\0' * (start + layout[name][0] - len(out)))
+        out.extend(data)
+    return bytes(out)
+
+
+class SearchIndex:
+
+    def __init__(self, buffer):
+        """`buffer`: indeks dosyasının içeriği (bytes veya mmap)."""
+        magic, version, header_size = _PREFIX.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError('Geçersiz arama indeksi dosyası.')
+        header = json.loads(bytes(buffer[_PREFIX.size:_PREFIX.size + header_size]))
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError('Arama indeksi farklı bayt sıralı bir makinede üretilmiş.')
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._start = _aligned(_PREFIX.size + header_size)
+        self._header = header
+        self.count = header['count']
+        self.built_at = header['builtAt']
+        self._genre_ids = {normalize(name): i for i, name in enumerate(header['genres'])}
+        self._author_ids = {normalize(name): i for i, name in enumerate(header['authors'])}
+        # str.find ve bisect için bu ikisi belleğe çözülür; gerisi dosya üzerinden okunur
+        self._titles = bytes(self._section('titles')).decode('utf-8')
+        tokens = bytes(self._section('tokens')).decode('utf-8')
+        self._tokens = tokens.split('\n') if tokens else []
+        self._title_starts = self._section('title_starts')
+        self._records = self._section('records')
+        self._record_starts = self._section('record_starts')
+        self._genres = self._section('genre_ids')
+        self._authors = self._section('author_ids')
+        self._available = self._section('available')
+        self._facet_rows = {
+            'genre': (self._section('genre_starts'), self._section('genre_rows')),
+            'author': (self._section('author_starts'), self._section('author_rows')),
+        }
+        self._posting_starts = self._section('posting_starts')
+        self._postings = self._section('postings')
+
+    def _section(self, name):
+        offset, length, typecode = self._header['sections'][name]
+        chunk = self._view[self._start + offset:self._start + offset + length]
+        return chunk if typecode == 's' else chunk.cast(typecode)
+
+    def record(self, row):
+        return json.loads(bytes(self._records[self._record_starts[row]:self._record_starts[row + 1]]))
+
+    def records(self):
+        for row in range(self.count):
+            yield self.record(row)
+
+    def entries(self):
+        """Satırlar, `_entry` biçiminde (kayıtlar çözülmeden)."""
+        ids = bytes(self._section('ids')).decode('utf-8').split('\n')
+        genres, authors = self._header['genres'], self._header['authors']
+        starts = self._record_starts
+        for row in range(self.count):
+            yield (self._title(row), ids[row], bytes(self._records[starts[row]:starts[row + 1]]),
+                   genres[self._genres[row]], authors[self._authors[row]], self._available[row])
+
+    def search(self, query='', genre=None, author=None, available=None, offset=0, limit=24, facet_limit=20):
+        """
+        Eşleşen kayıtların bir sayfası, toplam sayı ve facet sayıları. Her
+        facet kendi filtresi hariç diğer filtreler uygulanarak sayılır
+        (örn. tür seçiliyken diğer türlerin sayıları da görünür).
+        """
+        phrase = normalize(query)
+        matched = self._match(phrase) if phrase else None
+        # Her kısıt bir satır kümesi; None = kısıt yok (tüm satırlar)
+        base = set(matched) if matched is not None else None
+        genre_rows = self._rows_with('genre', self._facet_id(self._genre_ids, genre))
+        author_rows = self._rows_with('author', self._facet_id(self._author_ids, author))
+
+        results = self._restrict((base, genre_rows, author_rows), available)
+        if results is None:
+            total = self.count
+            page = range(offset, min(offset + limit, total))
+        else:
+            if matched is not None:
+                ordered = [row for row in matched if row in results] if len(results) < len(matched) else matched
+            else:
+                ordered = sorted(results)
+            total = len(ordered)
+            page = ordered[offset:offset + limit]
+
+        genre_counts = self._counts(self._genres, self._restrict((base, author_rows), available),
+                                    self._header['genreCounts'])
+        author_counts = self._counts(self._authors, self._restrict((base, genre_rows), available),
+                                     self._header['authorCounts'])
+        rows = self._restrict((base, genre_rows, author_rows), None)
+        if rows is None:
+            available_count = self._header['available']
+            loaned_count = self.count - available_count
+        else:
+            available_count = sum(map(self._available.__getitem__, rows))
+            loaned_count = len(rows) - available_count
+        return {
+            'items': [self.record(row) for row in page],
+            'total': total,
+            'facets': {
+                'genre': self._top(self._header['genres'], genre_counts, facet_limit),
+                'author': self._top(self._header['authors'], author_counts, facet_limit),
+                'availability': {'available': available_count, 'loaned': loaned_count},
+            },
+        }
+
+    # -- İç yardımcılar ---------------------------------------------------------
+
+    @staticmethod
+    def _facet_id(ids, value):
+        """None = filtre yok; bilinmeyen değer -1 (hiçbir satır eşleşmez)."""
+        if value is None or value == '':
+            return None
+        return ids.get(normalize(value), -1)
+
+    @staticmethod
+    def _top(names, counts, limit):
+        entries = sorted(((count, names[i]) for i, count in counts.items() if count and names[i]),
+                         key=lambda entry: (-entry[0], entry[1]))
+        return [{'value': name, 'count': count} for count, name in entries[:limit]]
+
+    @staticmethod
+    def _counts(values, rows, precomputed):
+        """Satırlardaki facet değerlerinin sayısı; kısıt yoksa dosyadaki hazır sayılar."""
+        if rows is None:
+            return dict(enumerate(precomputed))
+        return collections.Counter(map(values.__getitem__, rows))
+
+    def _rows_with(self, facet, facet_id):
+        if facet_id is None:
+            return None
+        if facet_id < 0:
+            return set()
+        starts, rows = self._facet_rows[facet]
+        return set(rows[starts[facet_id]:starts[facet_id + 1]])
+
+    def _restrict(self, sets, available):
+        """
+        Kümelerin kesişimi ve müsaitlik filtresi. Kesişim en küçük kümeden
+        başlar; müsaitlik sadece kalan satırlarda kontrol edilir. Hiç kısıt
+        yoksa None (tüm satırlar).
+        """
+        sets = sorted((rows for rows in sets if rows is not None), key=len)
+        flags = self._available
+        if sets:
+            rows = sets[0].intersection(*sets[1:])
+            if available is None:
+                return rows
+            return {row for row in rows if flags[row] == available}
+        if available is None:
+            return None
+        selectors = flags if available else bytes(flags).translate(_INVERT)
+        return list(itertools.compress(range(self.count), selectors))
+
+    def _title(self, row):
+        return self._titles[self._title_starts[row]:self._title_starts[row + 1] - 1]
+
+    def _match(self, phrase):
+        starts = self._title_starts
+        # 1. Başlığı sorguyla başlayanlar: sıralı başlıklarda bitişik bir aralık
+        rows = range(self.count)
+        first = bisect.bisect_left(rows, phrase, key=self._title)
+        last = bisect.bisect_left(rows, phrase + '\uffff', first, key=self._title)
+        matched = list(range(first, last))
+        seen = set(matched)
+
+        # 2. Başlığında sorguyu içerenler: birleşik metinde C hızında arama
+        # (1. adımın aralığı atlanır)
+        for low, high in ((0, starts[first]), (starts[last], len(self._titles))):
+            position = self._titles.find(phrase, low, high)
+            while position != -1:
+                row = bisect.bisect_right(starts, position) - 1
+                matched.append(row)
+                seen.add(row)
+                position = self._titles.find(phrase, starts[row + 1], high)
+
+        # 3. Tüm kelimeleri başlık veya yazarda geçenler (son kelime önek)
+        words = tokenize(phrase)
+        if words:
+            sets = [self._word_rows(word, prefix=i == len(words) - 1) for i, word in enumerate(words)]
+            sets.sort(key=len)
+            rows = sets[0].intersection(*sets[1:]) - seen
+            matched.extend(sorted(rows))
+        return matched
+
+    def _word_rows(self, word, prefix):
+        tokens = self._tokens
+        low = bisect.bisect_left(tokens, word)
+        if prefix:
+            high = min(bisect.bisect_left(tokens, word + '\uffff', low), low + MAX_PREFIX_TOKENS)
+        else:
+            high = low + 1 if low < len(tokens) and tokens[low] == word else low
+        rows = set()
+        starts = self._posting_starts
+        for i in range(low, high):
+            rows.update(self._postings[starts[i]:starts[i + 1]])
+        return rows
+
+
+class SearchIndexStore:
+    """S3'teki indeks nesnesi: konteyner içinde önbellekli okuma ve koşullu güncelleme."""
+
+    def __init__(self, s3, bucket, key, local_path='/tmp/book-search.idx', check_interval=30,
+                 max_attempts=5, base_delay=0.2):
+        self._s3 = s3
+        self._bucket = bucket
+        self._key = key
+        self._path = local_path
+        self._check_interval = check_interval
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._index = None
+        self._etag = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'loads': 0, 'checks': 0, 'writes': 0, 'writeConflicts': 0}
+
+    def current(self):
+        """
+        Konteynerdeki indeks; en fazla `check_interval` saniyede bir S3'e
+        koşullu GET (If-None-Match) ile değişip değişmediği sorulur.
+        İndeks henüz oluşturulmadıysa None.
+        """
+        if self._index is not None and time.monotonic() < self._next_check:
+            return self._index
+        with self._lock:
+            if self._index is not None and time.monotonic() < self._next_check:
+                return self._index
+            kwargs = {'Bucket': self._bucket, 'Key': self._key}
+            if self._etag:
+                kwargs['IfNoneMatch'] = self._etag
+            self.stats['checks'] += 1
+            try:
+                response = self._s3.get_object(**kwargs)
+            except Exception as e:
+                code = _error_code(e)
+                if code in _NOT_MODIFIED:
+                    self._next_check = time.monotonic() + self._check_interval
+                    return self._index
+                if code in _NOT_FOUND:
+                    return None
+                raise
+            # Eski dosyayı açık tutan mmap'ler os.replace'ten etkilenmez
+            partial = self._path + '.part'
+            with open(partial, 'wb') as f:
+                for chunk in response['Body'].iter_chunks(1 << 20):
+                    f.write(chunk)
+            os.replace(partial, self._path)
+            with open(self._path, 'rb') as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._index = SearchIndex(buffer)
+            self._etag = response['ETag']
+            self._next_check = time.monotonic() + self._check_interval
+            self.stats['loads'] += 1
+            return self._index
+
+    def update(self, changes):
+        """
+        {bookId: DynamoDB kaydı veya None (silindi)} değişikliklerini mevcut
+        indeksin kayıtlarıyla birleştirip yeniden yazar. Başka bir yazım araya
+        girerse (412/409) en güncel indeksi okuyup tekrar dener.
+        """
+        for attempt in range(self._max_attempts):
+            index, etag = self._read_latest()
+            entries = {entry[1]: entry for entry in index.entries()} if index else {}
+            for book_id, item in changes.items():
+                if item is None:
+                    entries.pop(book_id, None)
+                else:
+                    entries[book_id] = _entry(item)
+            condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+            try:
+                self._put(_build(entries.values()), **condition)
+                return len(entries)
+            except Exception as e:
+                if _error_code(e) not in _WRITE_CONFLICTS or attempt == self._max_attempts - 1:
+                    raise
+                self.stats['writeConflicts'] += 1
+                time.sleep(random.uniform(0, self._base_delay * 2 ** attempt))
+        return None
+
+    def replace(self, items):
+        """İndeksi kayıtların tamamından baştan yazar (rebuild)."""
+        data = build_index(items)
+        self._put(data)
+        return SearchIndex(data).count
+
+    def _read_latest(self):
+        try:
+            response = self._s3.get_object(Bucket=self._bucket, Key=self._key)
+        except Exception as e:
+            if _error_code(e) in _NOT_FOUND:
+                return None, None
+            raise
+        return SearchIndex(response['Body'].read()), response['ETag']
+
+    def _put(self, data, **condition):
+        self._s3.put_object(Bucket=self._bucket, Key=self._key, Body=data,
+                            ContentType='application/octet-stream', **condition)
+        self.stats['writes'] += 1
@@ -0,0 +1,167 @@
+"""
+Oturum (session) bazlı konuşma hafızası.
+
+Geçmiş tablosu (sessionId + timestamp) her tur için bir kayıt tutar. Eski
+turlar, aynı bölümde (partition) `timestamp = "~summary"` anahtarlı tek bir
+özet kaydında toplanır. "~" karakteri ISO tarihlerden büyük sıralandığı için
+yeni->eski tek bir Query, önce özeti sonra son N turu getirir:
+
+    Query(sessionId = :s, ScanIndexForward=False, Limit=N + 2)
+
+Böylece konuşma ne kadar uzun olursa olsun her istekte geçmiş okuma tek bir
+ağ çağrısıdır. Pencereden taşan ya da token bütçesine sığmayan turlar özete
+eklenir ve modele giden istem (prompt) sınırlı kalır.
+"""
+import datetime
+from boto3.dynamodb.conditions import Key
+
+from library_common.text import estimate_tokens
+
+SUMMARY_SORT_KEY = '~summary'
+KEY_NAMES = ('sessionId', 'timestamp')
+
+# Özette tek bir tur için tutulan en fazla karakter sayısı
+_SUMMARY_LINE_CHARS = 200
+
+
+class Turn:
+    __slots__ = ('timestamp', 'user_message', 'bot_response')
+
+    def __init__(self, timestamp, user_message, bot_response):
+        self.timestamp = timestamp
+        self.user_message = user_message
+        self.bot_response = bot_response
+
+    @property
+    def tokens(self):
+        return estimate_tokens(self.user_message) + estimate_tokens(self.bot_response)
+
+
+class SessionContext:
+    """Bir isteğe ait geçmiş: özet + modele gönderilecek turlar (eskiden yeniye)."""
+
+    def __init__(self, session_id, summary, covered_until, turns, overflow):
+        self.session_id = session_id
+        self.summary = summary
+        self.covered_until = covered_until
+        self.turns = turns
+        # Pencere/bütçe dışında kalan ve henüz özete eklenmemiş turlar
+        self.overflow = overflow
+
+    @property
+    def is_empty(self):
+        return not (self.summary or self.turns)
+
+    def converse_messages(self, user_message):
+        """Bedrock Converse API formatında mesaj listesi."""
+        messages = []
+        for turn in self.turns:
+            messages.append({"role": "user", "content": [{"text": turn.user_message}]})
+            messages.append({"role": "assistant", "content": [{"text": turn.bot_response}]})
+        messages.append({"role": "user", "content": [{"text": user_message}]})
+        return messages
+
+    def anthropic_messages(self, user_message):
+        """invoke_model (Anthropic Messages) formatında mesaj listesi."""
+        messages = []
+        for turn in self.turns:
+            messages.append({"role": "user", "content": [{"type": "text", "text": turn.user_message}]})
+            messages.append({"role": "assistant", "content": [{"type": "text", "text": turn.bot_response}]})
+        messages.append({"role": "user", "content": [{"type": "text", "text": user_message}]})
+        return messages
+
+    def summary_prompt(self):
+        """Sistem mesajına eklenecek özet metni (özet yoksa boş)."""
+        if not self.summary:
+            return ''
+        return "Bu kullanıcıyla önceki konuşmanın özeti:\n" + self.summary
+
+
+class SessionMemory:
+
+    def __init__(self, table, max_turns=10, token_budget=3000, summary_max_chars=2000):
+        self._table = table
+        self._max_turns = max_turns
+        self._token_budget = token_budget
+        self._summary_max_chars = summary_max_chars
+
+    def load(self, session_id, user_message=''):
+        """Özet ve son turları tek bir Query ile okur, token bütçesine göre kırpar."""
+        response = self._table.query(
+            KeyConditionExpression=Key('sessionId').eq(session_id),
+            ScanIndexForward=False,
+            Limit=self._max_turns + 2
+        )
+        summary, covered_until = '', ''
+        turns = []
+        for item in response.get('Items', []):
+            if item['timestamp'] == SUMMARY_SORT_KEY:
+                summary = item.get('summary', '')
+                covered_until = item.get('coveredUntil', '')
+            elif item.get('user_message') and item.get('bot_response'):
+                turns.append(Turn(item['timestamp'], item['user_message'], item['bot_response']))
+        turns.reverse()
+
+        # Pencereye sığmayanlar ve bütçeyi aşanlar (en eskiden başlayarak) özete gider
+        dropped = turns[:-self._max_turns] if len(turns) > self._max_turns else []
+        kept = turns[len(dropped):]
+        budget = self._token_budget - estimate_tokens(summary) - estimate_tokens(user_message)
+        while kept and sum(turn.tokens for turn in kept) > budget:
+            dropped.append(kept.pop(0))
+
+        overflow = [turn for turn in dropped if turn.timestamp > covered_until]
+        return SessionContext(session_id, summary, covered_until, kept, overflow)
+
+    def new_turn_item(self, session_id, user_message, bot_response):
+        timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        return {
+            'sessionId': session_id,
+            'timestamp': timestamp,
+            'user_message': user_message,
+            'bot_response': bot_response
+        }
+
+    def summary_item(self, context):
+        """
+        Taşan turlar varsa güncellenmiş özet kaydını döner, yoksa None.
+        Özet çıkarımsaldır (model çağrısı yok): her tur kısaltılarak eklenir,
+        en yeni kısım `summary_max_chars` kadar tutulur.
+        """
+        if not context.overflow:
+            return None
+        lines = [context.summary] if context.summary else []
+        for turn in context.overflow:
+            lines.append(f"Kullanıcı: {_shorten(turn.user_message)}")
+            lines.append(f"Asistan: {_shorten(turn.bot_response)}")
+        summary = '\n'.join(lines)
+        if len(summary) > self._summary_max_chars:
+            summary = summary[-self._summary_max_chars:].split('\n', 1)[-1]
+        return {
+            'sessionId': context.session_id,
+            'timestamp': SUMMARY_SORT_KEY,
+            'summary': summary,
+            'coveredUntil': context.overflow[-1].timestamp
+        }
+
+    def turn_items(self, context, user_message, bot_response):
+        """Yazılacak kayıtlar: yeni tur ve (gerekirse) güncellenmiş özet."""
+        items = [self.new_turn_item(context.session_id, user_message, bot_response)]
+        summary = self.summary_item(context)
+        if summary:
+            items.append(summary)
+        return items
+
+    def save(self, context, user_message, bot_response):
+        """Yeni turu ve (gerekirse) güncellenmiş özeti senkron olarak yazar."""
+        items = self.turn_items(context, user_message, bot_response)
+        with self._table.batch_writer() as writer:
+            for item in items:
+                writer.put_item(Item=item)
+        return items
+
+
+def _shorten(text):
+    text = ' '.join((text or '').split())
+    if len(text) <= _SUMMARY_LINE_CHARS:
+        return text
+    return text[:_SUMMARY_LINE_CHARS - 1] + '…'
@@ -0,0 +1,59 @@
+import math
+import re
+import unicodedata
+
+# Türkçe büyük/küçük harf dönüşümü: Python'un varsayılan lower() fonksiyonu
+# 'I' -> 'i' ve 'İ' -> 'i̇' (noktalı) üretir, bu yüzden önce elle çeviriyoruz.
+_TR_LOWER = str.maketrans({'I': 'ı', 'İ': 'i'})
+
+# Aramada aksanlı ve aksansız yazımın aynı sonucu vermesi için sadeleştirme
+# ("Şeker" == "seker", "Ilgaz" == "ılgaz" == "ilgaz").
+_TR_FOLD = str.maketrans({'ı': 'i', 'ş': 's', 'ğ': 'g', 'ç': 'c', 'ö': 'o', 'ü': 'u'})
+
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
+STOPWORDS = frozenset({
+    've', 'ile', 'bir', 'bu', 'su', 'o', 'da', 'de', 'mi', 'mu', 'icin',
+    'the', 'of', 'and', 'a', 'an', 'in', 'on', 'to',
+})
+
+
+def normalize(text):
+    """
+    Metni arama için normalize eder: Türkçe kurallarına göre küçük harfe
+    çevirir, Türkçe karakterleri ve aksanları sadeleştirir, boşlukları tekler.
+    """
+    if not text:
+        return ''
+    text = str(text).translate(_TR_LOWER).lower().translate(_TR_FOLD)
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.split())
+
+
+def tokenize(text, drop_stopwords=True):
+    """
+    Normalize edilmiş metni kelimelere böler. Sadece stopword'lerden oluşan
+    sorgularda (örn. "Bir") kelimeleri atmak yerine olduğu gibi döner.
+    """
+    tokens = split_words(normalize(text))
+    if drop_stopwords:
+        filtered = [t for t in tokens if t not in STOPWORDS]
+        if filtered:
+            return filtered
+    return tokens
+
+
+def split_words(normalized):
+    """normalize() çıktısını kelimelere böler (metni tekrar normalize etmez)."""
+    return _TOKEN_RE.findall(normalized)
+
+
+def normalize_prompt(prompt):
+    """Noktalama ve büyük/küçük harf farklarını yok sayan soru metni."""
+    return ' '.join(tokenize(prompt, drop_stopwords=False))
+
+
+def estimate_tokens(text):
+    """Kaba token tahmini (~4 karakter = 1 token)."""
+    return math.ceil(len(text or '') / 4)
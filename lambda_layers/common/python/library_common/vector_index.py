@@ -0,0 +1,309 @@
+"""
+OpenSearch (Serverless) vektör indeksinin kurulumu ve güncellenmesi.
+
+Bedrock bilgi bankası, AOSS koleksiyonunda hazır bir k-NN indeksi bekler;
+CDK bu indeksi oluşturmaz. `ensure_index` indeksi istenen tanıma getirir ve
+tekrar tekrar çağrılabilir (idempotent):
+
+- indeks yoksa oluşturulur,
+- sadece dinamik ayarlar (ef_search) veya yeni alanlar farklıysa indeks
+  yerinde güncellenir,
+- değiştirilemeyen parametreler (boyut, motor, uzay, m, ef_construction,
+  vektör alanı) farklıysa indeks göç ettirilir: belgeler (vektörleriyle)
+  `<ad>-migration` indeksine kopyalanır, indeks yeni tanımla baştan
+  oluşturulur ve belgeler geri kopyalanır. Yarıda kalan bir göç bir sonraki
+  çağrıda kaldığı yerden tamamlanır. Göç sırasında arama kısa süre boş döner.
+
+Parametreler (`spec`):
+    indexName, dimensions, engine (faiss | nmslib), spaceType (l2 |
+    innerproduct | cosinesimil), m, efConstruction, efSearch, vectorField,
+    textField, metadataField
+
+HNSW: m, düğüm başına bağlantı sayısıdır (bellek ve recall artar);
+ef_construction, grafik kurulurken incelenen aday sayısıdır (kurulum yavaşlar,
+grafik iyileşir); ef_search, sorguda incelenen aday sayısıdır (recall ile
+gecikme arasındaki ayar, indeks yeniden kurulmadan değiştirilebilir).
+"""
+import hashlib
+import json
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+DEFAULT_SPEC = {
+    'indexName': 'bedrock-knowledge-base-default-index',
+    'dimensions': 1024,
+    'engine': 'faiss',
+    'spaceType': 'l2',
+    'm': 16,
+    'efConstruction': 512,
+    'efSearch': 512,
+    'vectorField': 'bedrock-knowledge-base-default-vector',
+    'textField': 'AMAZON_BEDROCK_TEXT_CHUNK',
+    'metadataField': 'AMAZON_BEDROCK_METADATA',
+}
+ENGINES = {'faiss', 'nmslib'}
+SPACE_TYPES = {'l2', 'innerproduct', 'cosinesimil'}
+# Göçte from/size ile okunabilen en fazla belge (OpenSearch index.max_result_window)
+MAX_MIGRATION_DOCUMENTS = 10000
+COPY_BATCH_SIZE = 500
+EF_SEARCH_SETTING = 'index.knn.algo_param.ef_search'
+
+
+class VectorIndexError(Exception):
+    """OpenSearch'ün 2xx dışında döndüğü yanıt."""
+
+    def __init__(self, status, body):
+        super().__init__(f"OpenSearch {status}: {json.dumps(body, ensure_ascii=False)[:500]}")
+        self.status = status
+        self.body = body
+
+
+class OpenSearchClient:
+    """
+    Bağımlılıksız küçük REST istemcisi. `credentials` verilirse istekler
+    SigV4 ile imzalanır (AOSS için servis adı 'aoss'); verilmezse imzasız
+    gönderilir (yerel OpenSearch / taklit).
+    """
+
+    def __init__(self, endpoint, region=None, credentials=None, service='aoss', timeout=60):
+        self.endpoint = endpoint.rstrip('/')
+        self.region = region
+        self.credentials = credentials
+        self.service = service
+        self.timeout = timeout
+
+    def request(self, method, path, body=None, params=None, allow=()):
+        """(durum kodu, JSON gövde) döner; 2xx ya da `allow` dışındaki durumlar VectorIndexError fırlatır."""
+        url = self.endpoint + path
+        if params:
+            url += '?' + urllib.parse.urlencode(params)
+        if body is None:
+            data = None
+        elif isinstance(body, (bytes, str)):
+            data = body.encode('utf-8') if isinstance(body, str) else body
+        else:
+            data = json.dumps(body).encode('utf-8')
+        content_type = 'application/x-ndjson' if path.endswith('/_bulk') else 'application/json'
+        headers = {'Content-Type': content_type} if data is not None else {}
+        if self.credentials is not None:
+            headers = self._sign(method, url, data, headers)
+
+        request = urllib.request.Request(url, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                status, raw = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, raw = e.code, e.read()
+        try:
+            payload = json.loads(raw) if raw else {}
+        except ValueError:
+            payload = {'raw': raw.decode('utf-8', 'replace')}
+        if not 200 <= status < 300 and status not in allow:
+            raise VectorIndexError(status, payload)
+        return status, payload
+
+    def _sign(self, method, url, data, headers):
+        from botocore.auth import SigV4Auth
+        from botocore.awsrequest import AWSRequest
+        # AOSS imzada gövde hash'ini başlık olarak ister
+        headers = dict(headers, **{'x-amz-content-sha256': hashlib.sha256(data or b'').hexdigest()})
+        aws_request = AWSRequest(method=method, url=url, data=data, headers=headers)
+        SigV4Auth(self.credentials.get_frozen_credentials(), self.service, self.region).add_auth(aws_request)
+        return dict(aws_request.headers.items())
+
+    def get_index(self, name):
+        status, payload = self.request('GET', f"/{name}", allow=(404,))
+        if status == 404:
+            return None
+        return payload.get(name) or next(iter(payload.values()), None)
+
+    def count(self, name):
+        return self.request('GET', f"/{name}/_count")[1].get('count', 0)
+
+    def bulk_index(self, name, documents):
+        lines = []
+        for source in documents:
+            lines.append(json.dumps({'index': {'_index': name}}))
+            lines.append(json.dumps(source))
+        _, payload = self.request('POST', f"/{name}/_bulk", '\n'.join(lines) + '\n')
+        if payload.get('errors'):
+            failed = [item for item in payload.get('items', []) if next(iter(item.values())).get('error')]
+            raise VectorIndexError(400, {'bulkErrors': failed[:3], 'failed': len(failed)})
+
+
+def normalize_spec(spec):
+    """Varsayılanları tamamlar, sayıları int'e çevirir (CloudFormation özellikleri metin gelir) ve doğrular."""
+    spec = dict(DEFAULT_SPEC, **{key: value for key, value in (spec or {}).items() if value not in (None, '')})
+    for key in ('dimensions', 'm', 'efConstruction', 'efSearch'):
+        spec[key] = int(spec[key])
+    if spec['engine'] not in ENGINES:
+        raise ValueError(f"Desteklenmeyen motor: {spec['engine']}")
+    if spec['spaceType'] not in SPACE_TYPES:
+        raise ValueError(f"Desteklenmeyen uzay: {spec['spaceType']}")
+    if not 1 <= spec['dimensions'] <= 16000:
+        raise ValueError('dimensions 1-16000 olmalıdır')
+    if not 2 <= spec['m'] <= 100:
+        raise ValueError('m 2-100 olmalıdır')
+    if spec['efConstruction'] < spec['m'] or spec['efSearch'] < 1:
+        raise ValueError('efConstruction >= m ve efSearch >= 1 olmalıdır')
+    return spec
+
+
+def vector_mapping(spec):
+    return {
+        'type': 'knn_vector',
+        'dimension': spec['dimensions'],
+        'method': {
+            'name': 'hnsw',
+            'engine': spec['engine'],
+            'space_type': spec['spaceType'],
+            'parameters': {'m': spec['m'], 'ef_construction': spec['efConstruction']},
+        },
+    }
+
+
+def index_body(spec):
+    """Bedrock'un beklediği alan eşlemesiyle indeks tanımı."""
+    return {
+        'settings': {'index': {'knn': True, 'knn.algo_param.ef_search': spec['efSearch']}},
+        'mappings': {'properties': {
+            spec['vectorField']: vector_mapping(spec),
+            spec['textField']: {'type': 'text', 'index': True},
+            spec['metadataField']: {'type': 'text', 'index': False},
+        }},
+    }
+
+
+def _flatten(settings, prefix=''):
+    flat = {}
+    for key, value in (settings or {}).items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def immutable_changes(current, spec):
+    """İndeksi yeniden kurmadan değiştirilemeyen farklar (boşsa yerinde güncellenebilir)."""
+    properties = current.get('mappings', {}).get('properties', {})
+    vector = properties.get(spec['vectorField'])
+    if not vector or vector.get('type') != 'knn_vector':
+        return [f"vectorField {spec['vectorField']} yok"]
+    method = vector.get('method', {})
+    parameters = method.get('parameters', {})
+    actual = {
+        'dimensions': vector.get('dimension'),
+        'engine': method.get('engine'),
+        'spaceType': method.get('space_type'),
+        'm': parameters.get('m'),
+        'efConstruction': parameters.get('ef_construction'),
+    }
+    return [f"{key}: {value} -> {spec[key]}" for key, value in actual.items()
+            if value is not None and str(value) != str(spec[key])]
+
+
+def _update_in_place(client, name, current, spec):
+    changed = []
+    settings = _flatten(current.get('settings', {}))
+    if str(settings.get(EF_SEARCH_SETTING)) != str(spec['efSearch']):
+        client.request('PUT', f"/{name}/_settings", {'index': {'knn.algo_param.ef_search': spec['efSearch']}})
+        changed.append(f"efSearch -> {spec['efSearch']}")
+    properties = current.get('mappings', {}).get('properties', {})
+    missing = {field: mapping for field, mapping in index_body(spec)['mappings']['properties'].items()
+               if field not in properties}
+    if missing:
+        client.request('PUT', f"/{name}/_mapping", {'properties': missing})
+        changed.append('alanlar: ' + ', '.join(sorted(missing)))
+    return changed
+
+
+def _wait_for(check, timeout, interval=2):
+    deadline = time.monotonic() + timeout
+    while not check():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(interval)
+    return True
+
+
+def _create(client, name, body, settle_seconds):
+    client.request('PUT', f"/{name}", body)
+    # AOSS'ta yeni indeks birkaç saniye sonra görünür hale gelir
+    if not _wait_for(lambda: client.get_index(name) is not None, timeout=max(settle_seconds, 1) * 6):
+        raise VectorIndexError(504, {'error': f"{name} oluşturuldu ama görünmüyor"})
+    if settle_seconds:
+        time.sleep(settle_seconds)
+
+
+def _copy(client, source, target, expected, settle_seconds):
+    offset = 0
+    while offset < expected:
+        _, payload = client.request('POST', f"/{source}/_search", {
+            'query': {'match_all': {}}, 'sort': ['_doc'],
+            'from': offset, 'size': min(COPY_BATCH_SIZE, expected - offset),
+        })
+        hits = payload.get('hits', {}).get('hits', [])
+        if not hits:
+            break
+        client.bulk_index(target, [hit['_source'] for hit in hits])
+        offset += len(hits)
+    client.request('POST', f"/{target}/_refresh", allow=(400, 404))
+    # AOSS'ta sayım yenileme aralığından sonra güncellenir
+    if not _wait_for(lambda: client.count(target) >= expected, timeout=max(settle_seconds, 1) * 12):
+        raise VectorIndexError(500, {'error': f"{target}: {client.count(target)}/{expected} belge kopyalandı"})
+
+
+def _migrate(client, name, current, spec, max_documents, settle_seconds):
+    backup = f"{name}-migration"
+    if current is not None:
+        # Yarıda kalmış bir kopya varsa güvenilmez; baştan alınır
+        if client.get_index(backup) is not None:
+            client.request('DELETE', f"/{backup}")
+        expected = client.count(name)
+        if expected > max_documents:
+            raise VectorIndexError(409, {'error': f"{name} {expected} belge içeriyor; yerinde göç en fazla "
+                                                  f"{max_documents} belge için yapılır. Yeni bir indexName verin."})
+        _create(client, backup, {'settings': {'index': {'knn': True}},
+                                 'mappings': current.get('mappings', {})}, settle_seconds)
+        _copy(client, name, backup, expected, settle_seconds)
+        client.request('DELETE', f"/{name}")
+    # Buradan sonra belgeler sadece yedekte; yarıda kalırsa sonraki çağrı buradan devam eder
+    expected = client.count(backup)
+    if client.get_index(name) is None:
+        _create(client, name, index_body(spec), settle_seconds)
+    _copy(client, backup, name, expected, settle_seconds)
+    client.request('DELETE', f"/{backup}")
+    return expected
+
+
+def ensure_index(client, spec, max_documents=MAX_MIGRATION_DOCUMENTS, settle_seconds=10):
+    """
+    İndeksi `spec` tanımına getirir. {'action': created | unchanged | updated |
+    migrated, 'changes': [...], 'documents': n} döner.
+    """
+    spec = normalize_spec(spec)
+    name = spec['indexName']
+    current = client.get_index(name)
+    changes = immutable_changes(current, spec) if current is not None else None
+    if not changes and client.get_index(f"{name}-migration") is not None:
+        # Geri kopyalama yarıda kalmış: indeks yedekten baştan doldurulur
+        if current is not None:
+            client.request('DELETE', f"/{name}")
+        documents = _migrate(client, name, None, spec, max_documents, settle_seconds)
+        return {'action': 'migrated', 'changes': ['yarıda kalan göç tamamlandı'], 'documents': documents}
+    if current is None:
+        _create(client, name, index_body(spec), settle_seconds)
+        return {'action': 'created', 'changes': [], 'documents': 0}
+
+    if changes:
+        documents = _migrate(client, name, current, spec, max_documents, settle_seconds)
+        return {'action': 'migrated', 'changes': changes, 'documents': documents}
+    changes = _update_in_place(client, name, current, spec)
+    return {'action': 'updated' if changes else 'unchanged', 'changes': changes, 'documents': None}
+
+
+def delete_index(client, name):
+    client.request('DELETE', f"/{name}", allow=(404,))
@@ -0,0 +1,62 @@
+"""
+API Gateway WebSocket üzerinden parça parça (streaming) yanıt gönderme.
+
+Python Lambda çalışma ortamı, Function URL response streaming özelliğini
+desteklemediği için model çıktısı her parça geldikçe `post_to_connection`
+ile tarayıcıya iletilir. Gönderilen çerçeveler (frame) JSON'dur:
+
+    {"type": "start"}
+    {"type": "delta", "text": "..."}
+    {"type": "tool", "name": "check_book_availability"}
+    {"type": "done", "response": "<tam metin>", ...}
+    {"type": "error", "error": "..."}
+
+İstemcinin gönderdiği `requestId` her çerçeveye eklenir.
+"""
+import json
+
+from library_common.clients import get_client
+
+
+def is_websocket_event(event):
+    """Olay API Gateway WebSocket API'sinden mi geliyor?"""
+    return bool(event.get('requestContext', {}).get('connectionId'))
+
+
+def _management_client(endpoint_url):
+    # Endpoint başına tek istemci (kayıt defterinde saklanır)
+    return get_client('apigatewaymanagementapi', endpoint_url=endpoint_url)
+
+
+class WebSocketSender:
+    """Tek bir WebSocket bağlantısına çerçeve gönderir."""
+
+    def __init__(self, event, request_id=None):
+        request_context = event['requestContext']
+        self.connection_id = request_context['connectionId']
+        endpoint_url = f"https://{request_context['domainName']}/{request_context['stage']}"
+        self._client = _management_client(endpoint_url)
+        self._request_id = request_id
+        self.closed = False
+
+    def send(self, frame):
+        """Çerçeveyi gönderir; bağlantı kapanmışsa sessizce vazgeçer."""
+        if self.closed:
+            return False
+        if self._request_id:
+            frame = dict(frame, requestId=self._request_id)
+        try:
+            self._client.post_to_connection(
+                ConnectionId=self.connection_id,
+                Data=json.dumps(frame).encode('utf-8')
+            )
+            return True
+        except self._client.exceptions.GoneException:
+            # Kullanıcı sayfayı kapattı; kalan parçaları göndermeye gerek yok
+            print(f"WebSocket bağlantısı kapanmış: {self.connection_id}")
+            self.closed = True
+            return False
+
+    def delta(self, text):
+        if text:
+            self.send({'type': 'delta', 'text': text})
@@ -2,15 +2,23 @@
 const CONFIG = {
     userPoolId: 'eu-north-1_mSgPpFbTd', 
     clientId: '358evs3lh5npe0nea2uiu9tp5i', 
-    apiUrl: 'https://f2s450v279.execute-api.eu-north-1.amazonaws.com/dev' 
+    apiUrl: 'https://f2s450v279.execute-api.eu-north-1.amazonaws.com/dev', 
+    streamUrl: '', // Outputs'daki LibraryStreamUrl (wss://...). Boşsa normal /chat kullanılır.
+    streamRoute: 'assistant'
 };
 
 // --- YÖNETİCİ AYARI ---
-// Bu kullanıcı adıyla giriş yaparsan SÜPER YETKİLİ olursun.
-const ADMIN_USERNAME = "admin"; 
+// Cognito'da bu gruba eklenen kullanıcılar yöneticidir (sunucu da aynı grubu kontrol eder).
+const ADMIN_GROUP = "admins";
 
 // --- DEĞİŞKENLER ---
 let books = [];
+let booksCursor = null; // Sonraki kitap sayfasının imleci (null = son sayfa)
+const BOOKS_PAGE_SIZE = 24;
+let searchActive = false; // Liste /books/search sonuçlarını mı gösteriyor?
+let searchTimer = null;
+let searchSeq = 0; // Geç gelen eski arama yanıtlarını yok saymak için
+const SEARCH_DEBOUNCE_MS = 250;
 let idToken = null; 
 let currentUsername = null; 
 let isAdmin = false; 
@@ -54,14 +62,66 @@ function showFavorites() {
 // ==========================================
 // 2. KİTAP İŞLEMLERİ (DÜZELTİLEN KISIM)
 // ==========================================
-async function fetchBooks() {
+// Kitaplar sayfa sayfa gelir; "Daha Fazla" butonu sonraki sayfayı ekler
+async function fetchBooks(append = false) {
+    if (!append) { searchActive = false; searchSeq++; }
     try {
-        const response = await fetch(`${CONFIG.apiUrl}/books`);
-        books = await response.json();
+        const params = new URLSearchParams({ limit: BOOKS_PAGE_SIZE });
+        if (append && booksCursor) params.set('cursor', booksCursor);
+        const response = await fetch(`${CONFIG.apiUrl}/books?${params}`);
+        const page = await response.json();
+        books = append ? books.concat(page.items) : page.items;
+        booksCursor = page.nextCursor;
         renderBooks(books);
+        document.getElementById('btn-load-more')?.classList.toggle('hidden', !booksCursor);
     } catch (err) { console.error(err); }
 }
 
+function loadMoreBooks() { searchActive ? searchBooks(true) : fetchBooks(true); }
+
+// Liste sayfası açıklama/ISBN gibi alanları içermez; detay gerektiğinde tek kitap okunur
+async function fetchBookDetails(id) {
+    const book = books.find(b => b.id.toString() === id.toString());
+    if (book && book._detailed) return book;
+    const response = await fetch(`${CONFIG.apiUrl}/books/${encodeURIComponent(id)}`);
+    if (!response.ok) return book;
+    const detail = Object.assign(book || {}, await response.json(), { _detailed: true });
+    return detail;
+}
+
+// Kişisel rotalar (okuma listeleri, katalog yazımı) kullanıcıyı sadece Cognito token'ından alır
+function authHeaders(extra = {}) {
+    return idToken ? { ...extra, 'Authorization': idToken } : extra;
+}
+
+// ID token'daki Cognito grupları (yönetici menüsünü göstermek için; yetkiyi sunucu denetler)
+function tokenGroups(token) {
+    try {
+        const payload = token.split('.')[1].replace(/-/g, '+').replace(/_/g, '/');
+        return JSON.parse(decodeURIComponent(escape(atob(payload))))['cognito:groups'] || [];
+    } catch (err) { return []; }
+}
+
+// Sayfalı bir listenin tüm sayfalarını toplar (kullanıcı listeleri için)
+async function fetchAllPages(url) {
+    let items = [];
+    let cursor = null;
+    do {
+        const sep = url.includes('?') ? '&' : '?';
+        const response = await fetch(cursor ? `${url}${sep}cursor=${encodeURIComponent(cursor)}` : url, { headers: authHeaders() });
+        const page = await response.json();
+        items = items.concat(page.items || []);
+        cursor = page.nextCursor;
+    } while (cursor);
+    return items;
+}
+
+function readingListsUrl(userId, fields) {
+    const params = new URLSearchParams({ userId });
+    if (fields) params.set('fields', fields);
+    return `${CONFIG.apiUrl}/reading-lists?${params}`;
+}
+
 // 👇 YENİ FONKSİYON: Butona tıklayınca bu çalışacak (Form submit yerine)
 async function submitAddBook() {
     // 1. Yetki Kontrolü
@@ -98,7 +158,7 @@ async function submitAddBook() {
     try {
         const response = await fetch(`${CONFIG.apiUrl}/books`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: authHeaders({ 'Content-Type': 'application/json' }),
             body: JSON.stringify(newBook)
         });
         
@@ -124,34 +184,53 @@ async function submitAddBook() {
 async function deleteBookFromBackend(id) {
     if (!isAdmin) { alert("Yetkisiz işlem."); return; }
     try {
-        const response = await fetch(`${CONFIG.apiUrl}/books/${id}`, { method: 'DELETE' });
+        const response = await fetch(`${CONFIG.apiUrl}/books/${id}`, { method: 'DELETE', headers: authHeaders() });
         if (response.ok) { alert("Kitap silindi."); fetchBooks(); }
+        else if (response.status === 409) { alert("Ödünçteki kitap silinemez; önce iade edilmelidir."); }
+        else if (response.status === 401 || response.status === 403) { alert("Yetkisiz işlem."); }
     } catch (err) { alert("Hata: " + err.message); }
 }
 
 // ==========================================
 // 3. ADMİN PANELİ
 // ==========================================
+// Sayılar sunucuda önceden hesaplanır (/stats); tüm listeler indirilmez
+let adminListsCursor = null;
+const ADMIN_LISTS_PAGE_SIZE = 20;
+
 async function loadAdminDashboard() {
-    document.getElementById('admin-total-books').textContent = books.length;
+    loadAdminLists();
     try {
-        const res = await fetch(`${CONFIG.apiUrl}/reading-lists`);
-        const allLists = await res.json();
-        const validLists = allLists.filter(l => l.name && l.name !== 'undefined');
-        
-        document.getElementById('admin-total-lists').textContent = validLists.length;
-        const uniqueUsers = [...new Set(validLists.map(l => l.userId))];
-        document.getElementById('admin-total-users').textContent = uniqueUsers.length;
+        const response = await fetch(`${CONFIG.apiUrl}/stats`);
+        const stats = await response.json();
+
+        document.getElementById('admin-total-books').textContent = stats.books.total;
+        document.getElementById('admin-book-availability').textContent = `${stats.books.available} müsait, ${stats.books.loaned} ödünçte`;
+        document.getElementById('admin-total-lists').textContent = stats.lists.total;
+        document.getElementById('admin-total-users').textContent = stats.lists.users;
 
-        const usersTable = document.getElementById('admin-users-table');
-        usersTable.innerHTML = uniqueUsers.map(u => `
+        const genresTable = document.getElementById('admin-genres-table');
+        genresTable.innerHTML = stats.genres.map(g => `
             <tr class="bg-white border-b hover:bg-slate-50">
-                <td class="px-6 py-4 font-medium">${u}</td>
-                <td class="px-6 py-4"><span class="bg-green-100 text-green-800 text-xs px-2 py-1 rounded">Aktif</span></td>
+                <td class="px-6 py-4 font-medium">${g.genre}</td>
+                <td class="px-6 py-4 text-right"><span class="bg-blue-100 text-blue-800 text-xs px-2 py-1 rounded">${g.count} Kitap</span></td>
             </tr>`).join('');
+    } catch (err) { console.error("Admin verisi hatası", err); }
+}
+
+// Koleksiyon tablosu sayfa sayfa dolar
+async function loadAdminLists(append = false) {
+    try {
+        const params = new URLSearchParams({ scope: 'all', limit: ADMIN_LISTS_PAGE_SIZE });
+        if (append && adminListsCursor) params.set('cursor', adminListsCursor);
+        const response = await fetch(`${CONFIG.apiUrl}/reading-lists?${params}`, { headers: authHeaders() });
+        const page = await response.json();
+        adminListsCursor = page.nextCursor;
+        document.getElementById('btn-admin-more-lists')?.classList.toggle('hidden', !adminListsCursor);
+        const validLists = (page.items || []).filter(l => l.name && l.name !== 'undefined');
 
         const listsTable = document.getElementById('admin-lists-table');
-        listsTable.innerHTML = validLists.map(list => `
+        const rows = validLists.map(list => `
             <tr class="bg-white border-b hover:bg-slate-50">
                 <td class="px-6 py-4 font-bold text-slate-700">${list.name}</td>
                 <td class="px-6 py-4 text-xs text-slate-500">${list.userId}</td>
@@ -159,9 +238,10 @@ async function loadAdminDashboard() {
                 <td class="px-6 py-4 text-xs">${new Date(list.createdAt).toLocaleDateString()}</td>
                 <td class="px-6 py-4 text-right">
                     <button onclick="openListDetails('${list.id}', '${list.name}', '', '', '${list.userId}')" class="text-blue-600 hover:underline mr-3 text-xs font-bold">GİT</button>
-                    <button onclick="deleteReadingList('${list.id}')" class="text-red-600 hover:underline text-xs font-bold">SİL</button>
+                    <button onclick="deleteReadingList('${list.id}', '${list.userId}')" class="text-red-600 hover:underline text-xs font-bold">SİL</button>
                 </td>
             </tr>`).join('');
+        listsTable.innerHTML = append ? listsTable.innerHTML + rows : rows;
     } catch (err) { console.error("Admin verisi hatası", err); }
 }
 
@@ -175,10 +255,9 @@ async function getReadingLists() {
     grid.innerHTML = '<div class="col-span-full text-center py-12"><div class="animate-spin rounded-full h-8 w-8 border-b-2 border-violet-600 mx-auto"></div></div>';
 
     try {
-        const response = await fetch(`${CONFIG.apiUrl}/reading-lists`);
-        const allLists = await response.json();
         // Sadece benim listelerim (Admin olsam bile koleksiyonlar sayfasında kendi listemi göreyim)
-        const myLists = allLists.filter(l => l.userId === currentUsername && l.name && l.name !== 'undefined');
+        const allLists = await fetchAllPages(readingListsUrl(currentUsername));
+        const myLists = allLists.filter(l => l.name && l.name !== 'undefined');
         renderAllLists(myLists);
     } catch (err) { console.error(err); }
 }
@@ -210,10 +289,10 @@ async function createReadingList() {
     if (!currentUsername) { alert("Giriş yapın."); showLoginModal(); return; }
     const listName = prompt("Koleksiyon Adı:");
     if (!listName) return;
-    const newListData = { userId: currentUsername, name: listName, description: "Kullanıcı koleksiyonu", bookIds: [] };
+    const newListData = { name: listName, description: "Kullanıcı koleksiyonu", bookIds: [] };
     try {
         const response = await fetch(`${CONFIG.apiUrl}/reading-lists`, {
-            method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify(newListData)
+            method: "POST", headers: authHeaders({ "Content-Type": "application/json" }), body: JSON.stringify(newListData)
         });
         if (response.ok) {
             if (document.getElementById('add-to-folder-modal') && !document.getElementById('add-to-folder-modal').classList.contains('hidden')) {
@@ -237,7 +316,7 @@ async function openListDetails(listId, name, desc, date, ownerId) {
     if (isAdmin || ownerId === currentUsername) {
         deleteBtn.classList.remove('hidden');
         deleteBtn.replaceWith(deleteBtn.cloneNode(true));
-        document.getElementById('btn-delete-list').onclick = () => deleteReadingList(listId);
+        document.getElementById('btn-delete-list').onclick = () => deleteReadingList(listId, ownerId);
     } else {
         deleteBtn.classList.add('hidden');
     }
@@ -246,16 +325,13 @@ async function openListDetails(listId, name, desc, date, ownerId) {
     grid.innerHTML = '<p class="col-span-full text-center py-10 text-slate-400">Yükleniyor...</p>';
 
     try {
-        const listsRes = await fetch(`${CONFIG.apiUrl}/reading-lists`);
-        const allLists = await listsRes.json();
-        const currentList = allLists.find(l => String(l.id) === String(listId));
-        if (!currentList) { grid.innerHTML = 'Liste bulunamadı.'; return; }
+        // Liste ve içindeki kitaplar tek istekte gelir
+        const params = new URLSearchParams({ userId: ownerId, include: 'books' });
+        const listRes = await fetch(`${CONFIG.apiUrl}/reading-lists/${encodeURIComponent(listId)}?${params}`, { headers: authHeaders() });
+        if (!listRes.ok) { grid.innerHTML = 'Liste bulunamadı.'; return; }
+        const currentList = await listRes.json();
         document.getElementById('detail-book-count').textContent = currentList.bookIds ? currentList.bookIds.length : 0;
-
-        const booksRes = await fetch(`${CONFIG.apiUrl}/books`);
-        const allBooks = await booksRes.json();
-        const listBooks = allBooks.filter(book => (currentList.bookIds || []).includes(String(book.id)));
-        renderListBooks(listBooks, listId, ownerId); 
+        renderListBooks(currentList.books || [], listId, ownerId); 
     } catch (err) { console.error(err); }
 }
 
@@ -273,15 +349,16 @@ function renderListBooks(bookList, listId, ownerId) {
 
 async function removeItemFromList(listId, bookId, ownerId) {
     if(!confirm("Kitabı çıkarmak istiyor musun?")) return;
-    await toggleBookInFolder(listId, bookId, true); 
+    await toggleBookInFolder(listId, bookId, true, ownerId); 
     const name = document.getElementById('detail-list-name').textContent;
     openListDetails(listId, name, '', '', ownerId);
 }
 
-async function deleteReadingList(listId) {
+async function deleteReadingList(listId, ownerId) {
     if (!confirm("Bu listeyi silmek istediğine emin misin?")) return;
     try {
-        const response = await fetch(`${CONFIG.apiUrl}/reading-lists/${listId}`, { method: "DELETE" });
+        const params = new URLSearchParams({ userId: ownerId || currentUsername });
+        const response = await fetch(`${CONFIG.apiUrl}/reading-lists/${listId}?${params}`, { method: "DELETE", headers: authHeaders() });
         if (response.ok) { 
             alert("Liste silindi."); 
             if(document.getElementById('view-admin').classList.contains('hidden')) getReadingLists();
@@ -312,15 +389,40 @@ function renderBooks(bookList) {
         </div>`).join('');
 }
 
+// Arama sunucuda yapılır (/books/search); her tuşta değil, yazma durunca istek atılır
 function filterBooks() {
-    const searchTerm = document.getElementById('search-input')?.value.toLowerCase() || '';
-    const genreFilter = document.getElementById('genre-filter')?.value || '';
-    const filtered = books.filter(book => {
-        const matchesSearch = (book.title || '').toLowerCase().includes(searchTerm) || (book.author || '').toLowerCase().includes(searchTerm);
-        const matchesGenre = genreFilter === '' || book.genre === genreFilter;
-        return matchesSearch && matchesGenre;
-    });
-    renderBooks(filtered);
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => searchBooks(false), SEARCH_DEBOUNCE_MS);
+}
+
+function searchParams() {
+    const params = new URLSearchParams();
+    const q = document.getElementById('search-input')?.value.trim() || '';
+    const genre = document.getElementById('genre-filter')?.value || '';
+    const status = document.getElementById('status-filter')?.value || '';
+    if (q) params.set('q', q);
+    if (genre) params.set('genre', genre);
+    if (status) params.set('status', status);
+    return params;
+}
+
+async function searchBooks(append = false) {
+    const params = searchParams();
+    if ([...params].length === 0) { fetchBooks(); return; } // Filtre temizlendi: normal liste
+    params.set('limit', BOOKS_PAGE_SIZE);
+    if (append && booksCursor) params.set('cursor', booksCursor);
+    const seq = ++searchSeq;
+    try {
+        const response = await fetch(`${CONFIG.apiUrl}/books/search?${params}`);
+        const page = await response.json();
+        if (seq !== searchSeq) return;
+        if (!response.ok) { console.error(page.error); return; }
+        searchActive = true;
+        books = append ? books.concat(page.items) : page.items;
+        booksCursor = page.nextCursor;
+        renderBooks(books);
+        document.getElementById('btn-load-more')?.classList.toggle('hidden', !booksCursor);
+    } catch (err) { console.error(err); }
 }
 function toggleFilterDropdown() { document.getElementById('filter-dropdown').classList.toggle('hidden'); }
 
@@ -336,9 +438,8 @@ async function openAddToFolderModal(bookId) {
     container.innerHTML = '<div class="text-center py-4"><div class="animate-spin rounded-full h-6 w-6 border-b-2 border-violet-600 mx-auto"></div></div>';
     
     try {
-        const response = await fetch(`${CONFIG.apiUrl}/reading-lists`);
-        const allLists = await response.json();
-        const myLists = allLists.filter(l => l.userId === currentUsername && l.name && l.name !== 'undefined');
+        const allLists = await fetchAllPages(readingListsUrl(currentUsername, 'name,bookIds'));
+        const myLists = allLists.filter(l => l.name && l.name !== 'undefined');
         if (myLists.length === 0) { container.innerHTML = '<p class="text-center text-sm text-slate-400">Henüz listen yok.</p>'; return; }
         container.innerHTML = myLists.map(list => {
             const isAdded = list.bookIds && list.bookIds.includes(String(bookId));
@@ -357,17 +458,18 @@ async function openAddToFolderModal(bookId) {
 
 function closeFolderModal() { document.getElementById('add-to-folder-modal').classList.add('hidden'); }
 
-async function toggleBookInFolder(listId, bookId, isAdded) {
+async function toggleBookInFolder(listId, bookId, isAdded, ownerId) {
     const action = isAdded ? "remove" : "add"; 
-    await fetch(`${CONFIG.apiUrl}/reading-lists/${listId}`, { method: "PUT", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ action, bookId: String(bookId) }) });
+    const userId = ownerId || currentUsername;
+    await fetch(`${CONFIG.apiUrl}/reading-lists/${listId}`, { method: "PUT", headers: authHeaders({ "Content-Type": "application/json" }), body: JSON.stringify({ action, bookId: String(bookId), userId }) });
     if(!document.getElementById('add-to-folder-modal').classList.contains('hidden')) openAddToFolderModal(bookId);
 }
 
 // ==========================================
 // 8. MODAL YÖNETİMİ
 // ==========================================
-function openBookDetails(id) {
-    const book = books.find(b => b.id.toString() === id.toString());
+async function openBookDetails(id) {
+    const book = await fetchBookDetails(id);
     if (!book) return;
     document.getElementById('modal-book-image').src = book.cover;
     document.getElementById('modal-book-title').textContent = book.title;
@@ -382,6 +484,27 @@ function openBookDetails(id) {
         actionsDiv.innerHTML = `<button onclick="openAddToFolderModal('${book.id}'); closeBookModal()" class="w-full bg-violet-600 text-white py-3 rounded-lg hover:bg-violet-700 font-bold transition">Koleksiyona Ekle</button>`;
     }
     document.getElementById('book-modal').classList.remove('hidden');
+    loadSimilarBooks(book.id);
+}
+
+// Öneri indeksi henüz yoksa (503) veya kitap indekste değilse bölüm gizli kalır
+async function loadSimilarBooks(id) {
+    const section = document.getElementById('modal-similar');
+    const list = document.getElementById('modal-similar-list');
+    if (!section || !list) return;
+    section.classList.add('hidden');
+    try {
+        const response = await fetch(`${CONFIG.apiUrl}/books/${encodeURIComponent(id)}/similar?limit=6`);
+        if (!response.ok) return;
+        const page = await response.json();
+        if (!page.items.length) return;
+        list.innerHTML = page.items.map(item => `
+            <button onclick="openBookDetails('${item.id}')" class="w-24 flex-shrink-0 text-left group">
+                <img src="${item.cover || 'https://placehold.co/300x450'}" class="h-32 w-full object-contain bg-slate-50 rounded shadow-sm group-hover:shadow-md transition">
+                <span class="block text-xs font-bold text-slate-700 mt-1 line-clamp-2">${item.title}</span>
+            </button>`).join('');
+        section.classList.remove('hidden');
+    } catch (err) { console.error(err); }
 }
 
 function closeBookModal() { document.getElementById('book-modal').classList.add('hidden'); }
@@ -394,8 +517,8 @@ function closeAddBookModal() { document.getElementById('add-book-modal').classLi
 
 // DİKKAT: Eski event listener kaldırıldı. HTML'deki onclick="submitAddBook()" çalışacak.
 
-function openEditBookModal(id) {
-    const book = books.find(b => b.id.toString() === id.toString());
+async function openEditBookModal(id) {
+    const book = await fetchBookDetails(id);
     if (!book) return;
     document.getElementById('edit-book-id').value = book.id;
     document.getElementById('edit-book-title').value = book.title;
@@ -421,14 +544,13 @@ document.getElementById('edit-book-form')?.addEventListener('submit', (e) => {
         cover: document.getElementById('edit-book-cover').value,
         description: document.getElementById('edit-book-desc').value,
         genre: document.getElementById('edit-book-genre').value,
-        isbn: document.getElementById('edit-book-isbn').value,
-        status: document.getElementById('edit-book-status').value
+        isbn: document.getElementById('edit-book-isbn').value
     };
     
     // Eski save fonksiyonu yerine fetch ile gönderiyoruz
     fetch(`${CONFIG.apiUrl}/books`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers: authHeaders({ 'Content-Type': 'application/json' }),
         body: JSON.stringify(updatedBook)
     }).then(async (res) => {
         if(res.ok) {
@@ -496,7 +618,7 @@ document.getElementById('login-form')?.addEventListener('submit', async (e) => {
         onSuccess: function(result) {
             idToken = result.getIdToken().getJwtToken();
             currentUsername = u;
-            isAdmin = (u.toLowerCase() === ADMIN_USERNAME.toLowerCase()); 
+            isAdmin = tokenGroups(idToken).includes(ADMIN_GROUP);
             updateAuthUI(true, u);
             closeLoginModal();
             fetchBooks(); 
@@ -514,7 +636,7 @@ function checkAuthStatus() {
             if (session.isValid()) {
                 idToken = session.getIdToken().getJwtToken();
                 currentUsername = currentUser.getUsername();
-                isAdmin = (currentUsername.toLowerCase() === ADMIN_USERNAME.toLowerCase());
+                isAdmin = tokenGroups(idToken).includes(ADMIN_GROUP);
                 updateAuthUI(true, currentUsername);
             }
         });
@@ -526,6 +648,7 @@ function logout() {
     const currentUser = userPool.getCurrentUser();
     if (currentUser) currentUser.signOut();
     idToken = null; currentUsername = null; isAdmin = false;
+    if (chatSocket) chatSocket.close(); // Bağlantı eski kullanıcının token'ıyla açılmıştı
     updateAuthUI(false);
     fetchBooks();
     showLibraryView();
@@ -565,16 +688,101 @@ document.getElementById('chat-form')?.addEventListener('submit', async (e) => {
     addMessage(msg, 'user');
     inp.value = '';
     const loadId = addLoading();
+    if (CONFIG.streamUrl) {
+        try { await sendStreamingMessage(msg, loadId); return; }
+        catch (err) {
+            // Hız sınırı / yoğunluk: normal isteğe dönmek de aynı yanıtı alır
+            if (err.retryAfter) { removeMessage(loadId); addMessage(retryMessage(err.message, err.retryAfter), 'bot'); return; }
+            console.warn("Streaming başarısız, normal isteğe dönülüyor.", err);
+        }
+    }
     try {
         const res = await fetch(`${CONFIG.apiUrl}/chat`, {
-            method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify({ message: msg })
+            method: 'POST', headers: authHeaders({ 'Content-Type': 'application/json' }), body: JSON.stringify({ message: msg, session_id: chatSessionId || undefined })
         });
+        if (res.status === 401) { removeMessage(loadId); addMessage("Asistanı kullanmak için giriş yapın.", 'bot'); return; }
         const data = await res.json();
         removeMessage(loadId);
+        // 429 (kullanıcı hız sınırı) ve 503 (model yoğun) Retry-After ile döner
+        if (res.status === 429 || res.status === 503) { addMessage(retryMessage(data.error, data.retryAfter), 'bot'); return; }
+        rememberChatSession(data.session_id);
         addMessage(data.response || "...", 'bot');
     } catch (err) { removeMessage(loadId); addMessage("Hata.", 'bot'); }
 });
 
+function retryMessage(error, retryAfter) {
+    return `${error || "Asistan şu anda yoğun."} (${retryAfter || 1} sn sonra tekrar deneyin)`;
+}
+
+// --- STREAMING (WebSocket) ---
+// CONFIG.streamUrl tanımlıysa yanıt parça parça gelir ve baloncuğa eklenir.
+let chatSocket = null;
+const pendingStreams = {};
+
+// Sunucu son turları bu ID ile hatırlar (sekme kapanana kadar aynı oturum)
+let chatSessionId = sessionStorage.getItem('chatSessionId');
+
+function rememberChatSession(id) {
+    if (!id || id === chatSessionId) return;
+    chatSessionId = id;
+    sessionStorage.setItem('chatSessionId', id);
+}
+
+function openChatSocket() {
+    return new Promise((resolve, reject) => {
+        if (chatSocket && chatSocket.readyState === WebSocket.OPEN) { resolve(chatSocket); return; }
+        // WebSocket başlık gönderemez: $connect yetkilendiricisi ID token'ı sorgu parametresinden okur
+        const ws = new WebSocket(`${CONFIG.streamUrl}?token=${encodeURIComponent(idToken || '')}`);
+        ws.onopen = () => { chatSocket = ws; resolve(ws); };
+        ws.onerror = (err) => reject(err);
+        ws.onclose = () => {
+            chatSocket = null;
+            Object.keys(pendingStreams).forEach(id => {
+                pendingStreams[id].onError(new Error('Bağlantı kapandı'));
+                delete pendingStreams[id];
+            });
+        };
+        ws.onmessage = (e) => {
+            const frame = JSON.parse(e.data);
+            const pending = pendingStreams[frame.requestId];
+            if (!pending) return;
+            if (frame.type === 'delta') {
+                pending.onDelta(frame.text);
+            } else if (frame.type === 'done') {
+                delete pendingStreams[frame.requestId];
+                rememberChatSession(frame.session_id);
+                pending.onDone(frame);
+            } else if (frame.type === 'error') {
+                delete pendingStreams[frame.requestId];
+                const err = new Error(frame.error);
+                err.retryAfter = frame.retryAfter;
+                pending.onError(err);
+            }
+        };
+    });
+}
+
+async function streamChat(message, onDelta) {
+    const ws = await openChatSocket();
+    const requestId = 'r-' + Date.now() + '-' + Math.random().toString(36).slice(2, 8);
+    return new Promise((resolve, reject) => {
+        pendingStreams[requestId] = { onDelta, onDone: resolve, onError: reject };
+        ws.send(JSON.stringify({ action: CONFIG.streamRoute || 'assistant', requestId, message, session_id: chatSessionId || undefined }));
+    });
+}
+
+// Yanıtı parça parça yazar; ilk parça gelince yükleniyor animasyonu kalkar
+async function sendStreamingMessage(msg, loadId) {
+    let bubble = null;
+    const frame = await streamChat(msg, (text) => {
+        if (!bubble) { removeMessage(loadId); bubble = addMessage('', 'bot'); }
+        bubble.textContent += text;
+        const msgs = document.getElementById('messages');
+        if (msgs) msgs.scrollTop = msgs.scrollHeight;
+    });
+    if (!bubble) { removeMessage(loadId); addMessage(frame.response || "...", 'bot'); }
+}
+
 function addMessage(text, sender) {
     const msgs = document.getElementById('messages');
     if(!msgs) return;
@@ -584,6 +792,7 @@ function addMessage(text, sender) {
     div.innerHTML = `<div class="${bubbleColor} rounded-2xl ${sender === 'user' ? 'rounded-tr-none' : 'rounded-tl-none'} py-3 px-4 max-w-[85%] shadow-sm text-sm"><p>${text}</p></div>`;
     msgs.appendChild(div);
     msgs.scrollTop = msgs.scrollHeight;
+    return div.querySelector('p');
 }
 function addLoading() {
     const id = 'l-'+Date.now();
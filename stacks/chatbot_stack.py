@@ -1,10 +1,14 @@
 import json
 from aws_cdk import (
     Stack,
+    BundlingOptions,
+    CfnOutput,
     Duration,
     RemovalPolicy,
     aws_lambda as _lambda,
     aws_apigateway as apigw,
+    aws_apigatewayv2 as apigwv2,
+    aws_apigatewayv2_integrations as apigwv2_integrations,
     aws_dynamodb as dynamodb,
     aws_cognito as cognito,
     aws_iam as iam,
@@ -14,10 +18,15 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+from stacks.observability import METRICS_NAMESPACE, add_latency_dashboard
+from stacks.vector_index import VectorIndexProps, add_vector_index
+
 class ChatbotStack(Stack):
 
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str, vector_index: VectorIndexProps = None, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
+        # Titan Text Embeddings v1 1536 boyutlu vektör üretir
+        vector_index = vector_index or VectorIndexProps(dimensions=1536)
 
         # 1. Cognito User Pool
         user_pool = cognito.UserPool(self, "ChatbotUserPool",
@@ -35,12 +44,39 @@ class ChatbotStack(Stack):
             removal_policy=RemovalPolicy.DESTROY # Geliştirme ortamı için
         )
 
+        # 2b. Kullanıcı başına hız sınırı ve aynı isteklerin birleştirilmesi (TTL ile silinir)
+        admission_table = dynamodb.Table(self, "ChatRequestAdmissionTable",
+            table_name="ChatRequestAdmission",
+            partition_key=dynamodb.Attribute(name="pk", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="sk", type=dynamodb.AttributeType.STRING),
+            time_to_live_attribute="expiresAt",
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+
         # 3. Knowledge Base Data Source (S3 Bucket)
         kb_bucket = s3.Bucket(self, "KnowledgeBaseBucket",
             removal_policy=RemovalPolicy.DESTROY,
             auto_delete_objects=True
         )
 
+        # Lambda fonksiyonlarının ortak kodu (library_common)
+        common_layer = _lambda.LayerVersion(self, "ChatbotCommonLayer",
+            code=_lambda.Code.from_asset("lambda_layers/common"),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_11],
+            description="Shared helpers for library Lambda functions"
+        )
+
+        # orjson katmanı (library_common.codec hızlı JSON yolu; katman yoksa standart kütüphane kullanılır)
+        json_layer = _lambda.LayerVersion(self, "ChatbotOrjsonLayer",
+            code=_lambda.Code.from_asset("lambda_layers/orjson", bundling=BundlingOptions(
+                image=_lambda.Runtime.PYTHON_3_11.bundling_image,
+                command=["bash", "-c", "pip install -r requirements.txt -t /asset-output/python"]
+            )),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_11],
+            description="orjson for the chat handler"
+        )
+
         # 4. OpenSearch Serverless Collection
         # Encryption Policy
         encryption_policy = aoss.CfnSecurityPolicy(self, "AossEncryptionPolicy",
@@ -87,6 +123,11 @@ class ChatbotStack(Stack):
             resources=[collection.attr_arn]
         ))
 
+        # Vektör indeksi (Custom Resource): HNSW ayarları `vector_index` ile verilir
+        vector_index_resource, vector_index_handler = add_vector_index(self, "ChatbotKbVectorIndex",
+            collection, vector_index, common_layer
+        )
+
         # Data Access Policy for AOSS (Allowing Bedrock Role)
         access_policy = aoss.CfnAccessPolicy(self, "AossAccessPolicy",
             name="chatbot-kb-access",
@@ -105,15 +146,14 @@ class ChatbotStack(Stack):
                             "Permission": ["aoss:CreateIndex", "aoss:DeleteIndex", "aoss:UpdateIndex", "aoss:DescribeIndex", "aoss:ReadDocument", "aoss:WriteDocument"]
                         }
                     ],
-                    "Principal": [kb_role.role_arn]
+                    "Principal": [kb_role.role_arn, vector_index_handler.role.role_arn]
                 }
             ])
         )
 
+        vector_index_resource.node.add_dependency(access_policy)
+
         # 5. Bedrock Knowledge Base
-        # Not: Vektör indeksinin AOSS içinde oluşturulması gerekir. CDK bu indeksi otomatik oluşturmaz.
-        # Bu örnekte konfigürasyonu tanımlıyoruz, ancak deploy sonrası indeksin manuel veya Custom Resource ile oluşturulması gerekebilir.
-        
         knowledge_base = bedrock.CfnKnowledgeBase(self, "ChatbotKnowledgeBase",
             name="ChatbotKB",
             role_arn=kb_role.role_arn,
@@ -127,17 +167,14 @@ class ChatbotStack(Stack):
                 type="OPENSEARCH_SERVERLESS",
                 opensearch_serverless_configuration=bedrock.CfnKnowledgeBase.OpenSearchServerlessConfigurationProperty(
                     collection_arn=collection.attr_arn,
-                    vector_index_name="bedrock-knowledge-base-default-index",
-                    field_mapping=bedrock.CfnKnowledgeBase.OpenSearchServerlessFieldMappingProperty(
-                        vector_field="bedrock-knowledge-base-default-vector",
-                        text_field="AMAZON_BEDROCK_TEXT_CHUNK",
-                        metadata_field="AMAZON_BEDROCK_METADATA"
-                    )
+                    vector_index_name=vector_index.index_name,
+                    field_mapping=vector_index.field_mapping()
                 )
             )
         )
         knowledge_base.add_dependency(collection)
         knowledge_base.add_dependency(access_policy)
+        knowledge_base.node.add_dependency(vector_index_resource)
 
         # 6. Data Source
         data_source = bedrock.CfnDataSource(self, "ChatbotKbDataSource",
@@ -156,9 +193,21 @@ class ChatbotStack(Stack):
             runtime=_lambda.Runtime.PYTHON_3_11,
             code=_lambda.Code.from_asset("lambda_functions/chat_handler"),
             handler="index.handler",
+            layers=[common_layer, json_layer],
             timeout=Duration.seconds(30), # Bedrock yanıtı uzun sürebilir
             environment={
                 "TABLE_NAME": table.table_name,
+                "SESSION_MAX_TURNS": "10",
+                "SESSION_TOKEN_BUDGET": "3000",
+                "ADMISSION_TABLE_NAME": admission_table.table_name,
+                "RATE_LIMIT_PER_MINUTE": "10",
+                "RATE_LIMIT_BURST": "5",
+                "COALESCE_WINDOW_SECONDS": "10",
+                "METRICS_NAMESPACE": METRICS_NAMESPACE,
+                "METRICS_SAMPLE_RATE": "1.0",
+                "AWS_MAX_ATTEMPTS_BEDROCK_RUNTIME": "1", # Yeniden denemeler BedrockScheduler'da
+                "MODEL_DEFAULT_RATE": "5", # Konteyner başına model istek/sn (kısıtlandıkça düşer)
+                "FALLBACK_MODEL_ID": "anthropic.claude-3-haiku-20240307-v1:0",
                 "BEDROCK_MODEL_ID": "anthropic.claude-3-sonnet-20240229-v1:0",
                 "KNOWLEDGE_BASE_ID": knowledge_base.attr_knowledge_base_id
             }
@@ -166,10 +215,11 @@ class ChatbotStack(Stack):
 
         # Grant Lambda permissions to read/write DynamoDB
         table.grant_read_write_data(chat_handler)
+        admission_table.grant_read_write_data(chat_handler)
 
         # Grant Lambda permissions to invoke Bedrock and Query Knowledge Base
         chat_handler.add_to_role_policy(iam.PolicyStatement(
-            actions=["bedrock:InvokeModel", "bedrock:Retrieve", "bedrock:RetrieveAndGenerate"],
+            actions=["bedrock:InvokeModel", "bedrock:InvokeModelWithResponseStream", "bedrock:Retrieve", "bedrock:RetrieveAndGenerate"],
             resources=["*"] 
         ))
 
@@ -186,3 +236,32 @@ class ChatbotStack(Stack):
         # Define API resources and methods
         chat_resource = api.root.add_resource("chat")
         chat_resource.add_method("POST") # POST /chat
+
+        # WebSocket API (Streaming yanıtlar)
+        # Python Lambda'ları Function URL response streaming desteklemediği için
+        # model çıktısı parça parça post_to_connection ile gönderilir.
+        stream_integration = apigwv2_integrations.WebSocketLambdaIntegration("ChatbotStreamIntegration", chat_handler)
+        stream_api = apigwv2.WebSocketApi(self, "ChatbotStreamApi",
+            route_selection_expression="$request.body.action",
+            connect_route_options=apigwv2.WebSocketRouteOptions(integration=stream_integration),
+            disconnect_route_options=apigwv2.WebSocketRouteOptions(integration=stream_integration)
+        )
+        stream_api.add_route("chat", integration=stream_integration)
+        stream_stage = apigwv2.WebSocketStage(self, "ChatbotStreamStage",
+            web_socket_api=stream_api,
+            stage_name="dev",
+            auto_deploy=True
+        )
+        stream_api.grant_manage_connections(chat_handler)
+
+        CfnOutput(self, "ChatbotStreamUrl", value=stream_stage.url)
+
+        # 9. Gecikme Dashboard'u ve Alarmlar (aşama bazında p50 / p99)
+        add_latency_dashboard(self, "ChatHandler", "ChatHandler",
+            stages=["Total", "Parse", "Session", "Model", "Serialize"],
+            thresholds={
+                "Total": (4000, 12000),
+                "Model": (3500, 11000),
+                "Session": (30, 300),
+            }
+        )
@@ -0,0 +1,128 @@
+from aws_cdk import (
+    Duration,
+    aws_cloudwatch as cloudwatch,
+)
+from constructs import Construct
+
+# Lambda'ların EMF satırlarında kullandığı namespace (library_common.metrics)
+METRICS_NAMESPACE = "LibraryProject"
+
+
+def stage_metric(service, stage, statistic):
+    return cloudwatch.Metric(
+        namespace=METRICS_NAMESPACE,
+        metric_name=f"{stage}Latency",
+        dimensions_map={"Service": service},
+        statistic=statistic,
+        period=Duration.minutes(1),
+        label=f"{stage} {statistic}"
+    )
+
+
+def add_latency_dashboard(scope: Construct, construct_id: str, service: str, stages, thresholds):
+    """
+    Servisin aşama sürelerini (p50 / p99), token kullanımını, model başına
+    başarılı / kısıtlanan çağrıları, reddedilen / birleştirilen istekleri ve
+    hataları gösteren bir CloudWatch dashboard'u oluşturur.
+
+    `thresholds`: {aşama: (p50 ms, p99 ms)} — verilen aşamalar için 5 dakikanın
+    3'ünde eşik aşılırsa alarm çalar.
+    """
+    dashboard = cloudwatch.Dashboard(scope, f"{construct_id}Dashboard",
+        dashboard_name=f"{service}-latency"
+    )
+
+    widgets = [
+        cloudwatch.GraphWidget(
+            title=f"{stage} (ms)",
+            left=[stage_metric(service, stage, "p50"), stage_metric(service, stage, "p99")],
+            width=8
+        )
+        for stage in stages
+    ]
+    widgets.append(cloudwatch.GraphWidget(
+        title="Bedrock token kullanımı",
+        left=[
+            cloudwatch.Metric(namespace=METRICS_NAMESPACE, metric_name=name, dimensions_map={"Service": service},
+                              statistic="Sum", period=Duration.minutes(1))
+            for name in ("InputTokens", "OutputTokens")
+        ],
+        width=8
+    ))
+    errors = cloudwatch.Metric(namespace=METRICS_NAMESPACE, metric_name="Errors",
+                               dimensions_map={"Service": service}, statistic="Sum", period=Duration.minutes(1))
+    widgets.append(cloudwatch.GraphWidget(title="Hatalar", left=[errors], width=8))
+    # BedrockScheduler'ın model başına sayaçları (ModelId boyutu; model listesi sabit değil)
+    widgets.append(cloudwatch.GraphWidget(
+        title="Bedrock model çağrıları",
+        left=[
+            cloudwatch.MathExpression(
+                expression=f"SEARCH('{{{METRICS_NAMESPACE},Service,ModelId}} Service=\"{service}\" "
+                           f"MetricName=\"{name}\"', 'Sum', 60)",
+                label=name,
+                period=Duration.minutes(1)
+            )
+            for name in ("Successes", "Throttles", "Fallbacks", "Rejected")
+        ],
+        width=8
+    ))
+    # RequestAdmission sayaçları (Admission boyutu: Rejected / Coalesced / WaitTimeouts)
+    widgets.append(cloudwatch.GraphWidget(
+        title="İstek kabulü (429 / birleştirilen)",
+        left=[
+            cloudwatch.MathExpression(
+                expression=f"SEARCH('{{{METRICS_NAMESPACE},Service,Admission}} Service=\"{service}\" "
+                           f"MetricName=\"Requests\"', 'Sum', 60)",
+                label="Requests",
+                period=Duration.minutes(1)
+            )
+        ],
+        width=8
+    ))
+    for i in range(0, len(widgets), 3):
+        dashboard.add_widgets(*widgets[i:i + 3])
+
+    alarms = []
+    for stage, (p50_ms, p99_ms) in thresholds.items():
+        for statistic, threshold in (("p50", p50_ms), ("p99", p99_ms)):
+            alarms.append(cloudwatch.Alarm(scope, f"{construct_id}{stage}{statistic.upper()}Alarm",
+                alarm_description=f"{service} {stage} {statistic} gecikmesi {threshold} ms üzerinde",
+                metric=stage_metric(service, stage, statistic),
+                threshold=threshold,
+                evaluation_periods=5,
+                datapoints_to_alarm=3,
+                comparison_operator=cloudwatch.ComparisonOperator.GREATER_THAN_THRESHOLD,
+                treat_missing_data=cloudwatch.TreatMissingData.NOT_BREACHING
+            ))
+    alarms.append(cloudwatch.Alarm(scope, f"{construct_id}ErrorsAlarm",
+        alarm_description=f"{service} 5 dakikada 5'ten fazla hatalı çağrı",
+        metric=errors.with_(period=Duration.minutes(5)),
+        threshold=5,
+        evaluation_periods=1,
+        comparison_operator=cloudwatch.ComparisonOperator.GREATER_THAN_THRESHOLD,
+        treat_missing_data=cloudwatch.TreatMissingData.NOT_BREACHING
+    ))
+    return dashboard, alarms
+
+
+def add_prompt_version_widgets(dashboard, service):
+    """
+    İstem sürümü (PromptVersion boyutu) başına model gecikmesi ve token
+    kullanımı: A/B sürümlerinin ve prompt caching kazancının karşılaştırması.
+    """
+    def search(metric_name, statistic):
+        return cloudwatch.MathExpression(
+            expression=f"SEARCH('{{{METRICS_NAMESPACE},Service,PromptVersion}} Service=\"{service}\" "
+                       f"MetricName=\"{metric_name}\"', '{statistic}', 300)",
+            label=metric_name,
+            period=Duration.minutes(5)
+        )
+    dashboard.add_widgets(
+        cloudwatch.GraphWidget(title="İstem sürümü: model gecikmesi (ms, ortalama)",
+                               left=[search("ModelLatency", "Average")], width=8),
+        cloudwatch.GraphWidget(title="İstem sürümü: giriş token'ları",
+                               left=[search("InputTokens", "Sum"), search("CacheReadInputTokens", "Sum"),
+                                     search("CacheWriteInputTokens", "Sum")], width=8),
+        cloudwatch.GraphWidget(title="İstem sürümü: çağrı sayısı",
+                               left=[search("ModelCalls", "Sum")], width=8)
+    )
@@ -1,40 +1,280 @@
 import json
 from aws_cdk import (
     Stack,
+    ArnFormat,
+    BundlingOptions,
+    CfnOutput,
     Duration,
     RemovalPolicy,
     aws_dynamodb as dynamodb,
     aws_lambda as _lambda,
+    aws_lambda_event_sources as lambda_event_sources,
     aws_iam as iam,
     aws_apigateway as apigw,
+    aws_apigatewayv2 as apigwv2,
+    aws_apigatewayv2_integrations as apigwv2_integrations,
+    aws_apigatewayv2_authorizers as apigwv2_authorizers,
     aws_s3 as s3,
+    aws_s3_notifications as s3n,
     aws_opensearchserverless as aoss,
     aws_bedrock as bedrock,
     aws_cognito as cognito,
 )
 from constructs import Construct
 
+from stacks.observability import METRICS_NAMESPACE, add_latency_dashboard, add_prompt_version_widgets
+from stacks.vector_index import VectorIndexProps, add_vector_index
+
+# Katalog yazımı ve tüm okuma listeleri gibi yönetim işlemlerine izin verilen Cognito grubu
+ADMIN_GROUP = "admins"
+
 class ServerlessProjectStack(Stack):
 
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    def __init__(self, scope: Construct, construct_id: str, vector_index: VectorIndexProps = None, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
+        vector_index = vector_index or VectorIndexProps()
 
         # 1. LibraryBooks Table
         books_table = dynamodb.Table(self, "LibraryBooksTable",
             table_name="LibraryBooks",
             partition_key=dynamodb.Attribute(name="bookId", type=dynamodb.AttributeType.STRING),
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY,
+            stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES # İndeks güncellemesi için
+        )
+
+        # 1b. LibraryBookIndex Table (normalize edilmiş başlık/yazar kelimeleri -> bookId)
+        index_table = dynamodb.Table(self, "LibraryBookIndexTable",
+            table_name="LibraryBookIndex",
+            partition_key=dynamodb.Attribute(name="token", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="bookId", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+
+        # 1c. AssistantResponseCache Table (sık sorulan soruların yanıtları, TTL ile silinir)
+        response_cache_table = dynamodb.Table(self, "AssistantResponseCacheTable",
+            table_name="AssistantResponseCache",
+            partition_key=dynamodb.Attribute(name="pk", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="sk", type=dynamodb.AttributeType.STRING),
+            time_to_live_attribute="expiresAt",
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+
+        # 1d. AssistantChatHistory Table (oturum bazlı konuşma geçmişi + özet kaydı)
+        assistant_history_table = dynamodb.Table(self, "AssistantChatHistoryTable",
+            table_name="AssistantChatHistory",
+            partition_key=dynamodb.Attribute(name="sessionId", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="timestamp", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+
+        # 1e. AssistantRequestAdmission Table (kullanıcı başına token bucket + aynı isteklerin birleştirilmesi)
+        admission_table = dynamodb.Table(self, "AssistantRequestAdmissionTable",
+            table_name="AssistantRequestAdmission",
+            partition_key=dynamodb.Attribute(name="pk", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="sk", type=dynamodb.AttributeType.STRING),
+            time_to_live_attribute="expiresAt",
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
             removal_policy=RemovalPolicy.DESTROY
         )
 
-        # 2. UserLoans Table
+        # Lambda fonksiyonlarının ortak kodu (library_common)
+        common_layer = _lambda.LayerVersion(self, "LibraryCommonLayer",
+            code=_lambda.Code.from_asset("lambda_layers/common"),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_11],
+            description="Shared helpers for library Lambda functions"
+        )
+
+        # orjson katmanı (library_common.codec hızlı JSON yolu; katman yoksa standart kütüphane kullanılır)
+        json_layer = _lambda.LayerVersion(self, "OrjsonLayer",
+            code=_lambda.Code.from_asset("lambda_layers/orjson", bundling=BundlingOptions(
+                image=_lambda.Runtime.PYTHON_3_11.bundling_image,
+                command=["bash", "-c", "pip install -r requirements.txt -t /asset-output/python"]
+            )),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_11],
+            description="orjson for JSON-heavy library Lambda functions"
+        )
+
+        # PyJWT katmanı (WebSocket $connect yetkilendiricisi Cognito ID token imzasını doğrular)
+        jwt_layer = _lambda.LayerVersion(self, "PyJwtLayer",
+            code=_lambda.Code.from_asset("lambda_layers/jwt", bundling=BundlingOptions(
+                image=_lambda.Runtime.PYTHON_3_11.bundling_image,
+                command=["bash", "-c", "pip install -r requirements.txt -t /asset-output/python"]
+            )),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_11],
+            description="PyJWT for the WebSocket authorizer"
+        )
+
+        # Catalog Indexer Lambda (LibraryBooks Stream -> LibraryBookIndex)
+        indexer_handler = _lambda.Function(self, "CatalogIndexerHandler",
+            runtime=_lambda.Runtime.PYTHON_3_11,
+            code=_lambda.Code.from_asset("lambda_functions/catalog_indexer"),
+            handler="index.handler",
+            layers=[common_layer],
+            timeout=Duration.minutes(5), # Yeniden indeksleme (rebuild) tüm tabloyu tarar
+            environment={
+                "BOOKS_TABLE_NAME": books_table.table_name,
+                "INDEX_TABLE_NAME": index_table.table_name,
+                "RESPONSE_CACHE_TABLE_NAME": response_cache_table.table_name
+            }
+        )
+        books_table.grant_read_data(indexer_handler)
+        index_table.grant_read_write_data(indexer_handler)
+        response_cache_table.grant_read_write_data(indexer_handler)
+        indexer_handler.add_event_source(lambda_event_sources.DynamoEventSource(books_table,
+            starting_position=_lambda.StartingPosition.TRIM_HORIZON,
+            batch_size=100,
+            bisect_batch_on_error=True,
+            retry_attempts=5
+        ))
+
+        # 2. UserLoans Table (userId + loanId; loanId zaman sıralı, ödünç/iade transaction ile yazılır)
         loans_table = dynamodb.Table(self, "UserLoansTable",
             table_name="UserLoans",
             partition_key=dynamodb.Attribute(name="userId", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="loanId", type=dynamodb.AttributeType.STRING),
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
             removal_policy=RemovalPolicy.DESTROY
         )
 
+        # 2b. ReadingLists Table (kullanıcı başına listeler: userId + listId)
+        lists_table = dynamodb.Table(self, "ReadingListsTable",
+            table_name="ReadingLists",
+            partition_key=dynamodb.Attribute(name="userId", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="listId", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY,
+            stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES # Özet sayaçları için
+        )
+
+        # 2c. LibraryStats Table (yönetim paneli için önceden hesaplanmış sayaçlar)
+        stats_table = dynamodb.Table(self, "LibraryStatsTable",
+            table_name="LibraryStats",
+            partition_key=dynamodb.Attribute(name="statId", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+
+        # Catalog Stats Lambda (LibraryBooks + ReadingLists Stream -> LibraryStats)
+        stats_handler = _lambda.Function(self, "CatalogStatsHandler",
+            runtime=_lambda.Runtime.PYTHON_3_11,
+            code=_lambda.Code.from_asset("lambda_functions/catalog_stats"),
+            handler="index.handler",
+            layers=[common_layer],
+            timeout=Duration.minutes(5), # Yeniden hesaplama (rebuild) iki tabloyu tarar
+            environment={
+                "BOOKS_TABLE_NAME": books_table.table_name,
+                "READING_LISTS_TABLE_NAME": lists_table.table_name,
+                "STATS_TABLE_NAME": stats_table.table_name
+            }
+        )
+        books_table.grant_read_data(stats_handler)
+        lists_table.grant_read_data(stats_handler)
+        stats_table.grant_read_write_data(stats_handler)
+        for source_table in (books_table, lists_table):
+            stats_handler.add_event_source(lambda_event_sources.DynamoEventSource(source_table,
+                starting_position=_lambda.StartingPosition.TRIM_HORIZON,
+                batch_size=100,
+                bisect_batch_on_error=True,
+                retry_attempts=5
+            ))
+
+        # Catalog API Lambda (/books, /reading-lists, /loans ve /stats)
+        catalog_api_handler = _lambda.Function(self, "CatalogApiHandler",
+            runtime=_lambda.Runtime.PYTHON_3_11,
+            code=_lambda.Code.from_asset("lambda_functions/catalog_api"),
+            handler="index.handler",
+            layers=[common_layer, json_layer],
+            timeout=Duration.seconds(10),
+            environment={
+                "BOOKS_TABLE_NAME": books_table.table_name,
+                "READING_LISTS_TABLE_NAME": lists_table.table_name,
+                "LOANS_TABLE_NAME": loans_table.table_name,
+                "LOAN_DAYS": "14",
+                "STATS_TABLE_NAME": stats_table.table_name,
+                "STATS_MAX_AGE_SECONDS": "60",
+                "ADMIN_GROUP": ADMIN_GROUP
+            }
+        )
+        books_table.grant_read_write_data(catalog_api_handler)
+        lists_table.grant_read_write_data(catalog_api_handler)
+        loans_table.grant_read_write_data(catalog_api_handler)
+        stats_table.grant_read_data(catalog_api_handler)
+
+        # Arama indeksi (LibraryBooks -> S3'te tek ikili dosya, /books/search bunu okur)
+        index_bucket = s3.Bucket(self, "LibraryIndexBucket",
+            removal_policy=RemovalPolicy.DESTROY,
+            auto_delete_objects=True
+        )
+        search_environment = {
+            "BOOKS_TABLE_NAME": books_table.table_name,
+            "INDEX_BUCKET_NAME": index_bucket.bucket_name,
+            "SEARCH_INDEX_KEY": "search/books.idx"
+        }
+
+        # Book Search Indexer Lambda (S3 arama indeksi). LibraryBooks Stream'ini
+        # okumaz: bir shard'ın en fazla iki okuyucusu olabilir (CatalogIndexer ve
+        # CatalogStats). CatalogIndexer aramayı etkileyen kitap ID'leriyle bunu asenkron çağırır.
+        search_indexer_handler = _lambda.Function(self, "BookSearchIndexerHandler",
+            runtime=_lambda.Runtime.PYTHON_3_11,
+            code=_lambda.Code.from_asset("lambda_functions/book_search"),
+            handler="index.index_handler",
+            layers=[common_layer],
+            memory_size=1024, # İndeks her grupta yeniden yazılır
+            timeout=Duration.minutes(5),
+            environment=search_environment
+        )
+        books_table.grant_read_data(search_indexer_handler)
+        index_bucket.grant_read_write(search_indexer_handler)
+        # Eşzamanlı çağrılar çakışırsa koşullu PUT en güncel indeksi okuyup tekrar dener
+        indexer_handler.add_environment("SEARCH_INDEXER_FUNCTION_NAME", search_indexer_handler.function_name)
+        search_indexer_handler.grant_invoke(indexer_handler)
+
+        # Book Search Lambda (GET /books/search)
+        search_handler = _lambda.Function(self, "BookSearchHandler",
+            runtime=_lambda.Runtime.PYTHON_3_11,
+            code=_lambda.Code.from_asset("lambda_functions/book_search"),
+            handler="index.handler",
+            layers=[common_layer],
+            memory_size=512,
+            timeout=Duration.seconds(10),
+            environment=dict(search_environment, SEARCH_INDEX_CHECK_SECONDS="30")
+        )
+        index_bucket.grant_read(search_handler)
+
+        # NumPy katmanı (öneri servisi); deploy sırasında Lambda imajında pip ile kurulur
+        numpy_layer = _lambda.LayerVersion(self, "NumpyLayer",
+            code=_lambda.Code.from_asset("lambda_layers/numpy", bundling=BundlingOptions(
+                image=_lambda.Runtime.PYTHON_3_11.bundling_image,
+                command=["bash", "-c", "pip install -r requirements.txt -t /asset-output/python"]
+            )),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_11],
+            description="NumPy for the recommendation Lambda"
+        )
+
+        # Recommendations Lambda (GET /books/{bookId}/similar, GET /recommendations)
+        # Gömme matrisi tools/build_recommendations.py ile index_bucket'a yayınlanır
+        recommendations_handler = _lambda.Function(self, "RecommendationsHandler",
+            runtime=_lambda.Runtime.PYTHON_3_11,
+            code=_lambda.Code.from_asset("lambda_functions/recommendations"),
+            handler="index.handler",
+            layers=[common_layer, numpy_layer],
+            memory_size=1024, # Matris (100k x 256 float32 ~ 100 MB) sayfa önbelleğinde kalır
+            timeout=Duration.seconds(15),
+            environment={
+                "BOOKS_TABLE_NAME": books_table.table_name,
+                "LOANS_TABLE_NAME": loans_table.table_name,
+                "INDEX_BUCKET_NAME": index_bucket.bucket_name,
+                "EMBEDDINGS_PREFIX": "recommendations/",
+                "EMBEDDINGS_CHECK_SECONDS": "300"
+            }
+        )
+        index_bucket.grant_read(recommendations_handler)
+        loans_table.grant_read_data(recommendations_handler)
+
         # 3. Knowledge Base Data Source (S3 Bucket)
         kb_bucket = s3.Bucket(self, "LibraryDocumentsBucket",
             bucket_name="library-documents-bucket-unique-id", # Bucket isimleri global unique olmalı, buraya rastgelelik eklemek iyi olur ama basitlik için böyle bırakıyorum. Çakışırsa değiştirilmeli.
@@ -42,6 +282,36 @@ class ServerlessProjectStack(Stack):
             auto_delete_objects=True
         )
 
+        # Catalog Import Lambda (catalog-imports/*.csv|*.jsonl -> LibraryBooks)
+        import_handler = _lambda.Function(self, "CatalogImportHandler",
+            runtime=_lambda.Runtime.PYTHON_3_11,
+            code=_lambda.Code.from_asset("lambda_functions/catalog_import"),
+            handler="index.handler",
+            layers=[common_layer],
+            memory_size=1024, # Ayrıştırma CPU'su bellekle ölçeklenir
+            timeout=Duration.minutes(15),
+            environment={
+                "BOOKS_TABLE_NAME": books_table.table_name,
+                "DOCUMENTS_BUCKET_NAME": kb_bucket.bucket_name,
+                "IMPORT_WORKERS": "16"
+            }
+        )
+        books_table.grant_write_data(import_handler)
+        kb_bucket.grant_read_write(import_handler) # Kontrol noktaları da aynı bucket'a yazılır
+        # Süre dolunca kendini devam çağrısıyla tetikler (kendi ARN'ine referans döngü yaratmasın diye desen)
+        import_handler.add_to_role_policy(iam.PolicyStatement(
+            actions=["lambda:InvokeFunction"],
+            resources=[self.format_arn(service="lambda", resource="function",
+                                       resource_name="*CatalogImportHandler*",
+                                       arn_format=ArnFormat.COLON_RESOURCE_NAME)]
+        ))
+        for suffix in (".csv", ".jsonl"):
+            kb_bucket.add_event_notification(
+                s3.EventType.OBJECT_CREATED,
+                s3n.LambdaDestination(import_handler),
+                s3.NotificationKeyFilter(prefix="catalog-imports/", suffix=suffix)
+            )
+
         # 4. OpenSearch Serverless Collection
         # Encryption Policy
         encryption_policy = aoss.CfnSecurityPolicy(self, "LibraryKbEncryptionPolicy",
@@ -88,14 +358,124 @@ class ServerlessProjectStack(Stack):
             resources=[collection.attr_arn]
         ))
 
+        # Permissions for the embedding model
+        embedding_model_arn = f"arn:aws:bedrock:{self.region}::foundation-model/amazon.titan-embed-text-v2:0"
+        kb_role.add_to_policy(iam.PolicyStatement(
+            actions=["bedrock:InvokeModel"],
+            resources=[embedding_model_arn]
+        ))
+
+        # 5. Bedrock Knowledge Base
+        knowledge_base = bedrock.CfnKnowledgeBase(self, "LibraryKnowledgeBase",
+            name="LibraryKB",
+            role_arn=kb_role.role_arn,
+            knowledge_base_configuration=bedrock.CfnKnowledgeBase.KnowledgeBaseConfigurationProperty(
+                type="VECTOR",
+                vector_knowledge_base_configuration=bedrock.CfnKnowledgeBase.VectorKnowledgeBaseConfigurationProperty(
+                    embedding_model_arn=embedding_model_arn,
+                    # Titan v2 çıktı boyutu indeksin boyutuyla aynı olmalı (256 / 512 / 1024)
+                    embedding_model_configuration=bedrock.CfnKnowledgeBase.EmbeddingModelConfigurationProperty(
+                        bedrock_embedding_model_configuration=bedrock.CfnKnowledgeBase.BedrockEmbeddingModelConfigurationProperty(
+                            dimensions=vector_index.dimensions
+                        )
+                    )
+                )
+            ),
+            storage_configuration=bedrock.CfnKnowledgeBase.StorageConfigurationProperty(
+                type="OPENSEARCH_SERVERLESS",
+                opensearch_serverless_configuration=bedrock.CfnKnowledgeBase.OpenSearchServerlessConfigurationProperty(
+                    collection_arn=collection.attr_arn,
+                    vector_index_name=vector_index.index_name,
+                    field_mapping=vector_index.field_mapping()
+                )
+            )
+        )
+        knowledge_base.add_dependency(collection)
+
+        # 6. Data Source (CUSTOM): belgeler KnowledgeBaseIngestHandler tarafından parça parça
+        # yüklenir, Bedrock tekrar bölmez; tam senkronizasyon gerekmez
+        data_source = bedrock.CfnDataSource(self, "LibraryKbDataSource",
+            knowledge_base_id=knowledge_base.attr_knowledge_base_id,
+            name="LibraryDocumentChunks",
+            data_source_configuration=bedrock.CfnDataSource.DataSourceConfigurationProperty(
+                type="CUSTOM"
+            ),
+            vector_ingestion_configuration=bedrock.CfnDataSource.VectorIngestionConfigurationProperty(
+                chunking_configuration=bedrock.CfnDataSource.ChunkingConfigurationProperty(
+                    chunking_strategy="NONE"
+                )
+            )
+        )
+
+        # KB Ingest Lambda (documents/* değişince sadece değişen parçalar gömülür)
+        kb_ingest_handler = _lambda.Function(self, "KnowledgeBaseIngestHandler",
+            runtime=_lambda.Runtime.PYTHON_3_11,
+            code=_lambda.Code.from_asset("lambda_functions/kb_ingest"),
+            handler="index.handler",
+            layers=[common_layer],
+            timeout=Duration.minutes(5),
+            environment={
+                "DOCUMENTS_BUCKET_NAME": kb_bucket.bucket_name,
+                "DOCUMENTS_PREFIX": "documents/",
+                "KB_MANIFEST_PREFIX": "kb-manifests/",
+                "KNOWLEDGE_BASE_ID": knowledge_base.attr_knowledge_base_id,
+                "KB_DATA_SOURCE_ID": data_source.attr_data_source_id,
+                "KB_INGEST_WORKERS": "4"
+            }
+        )
+        kb_bucket.grant_read(kb_ingest_handler, "documents/*")
+        kb_bucket.grant_read_write(kb_ingest_handler, "kb-manifests/*")
+        kb_bucket.grant_delete(kb_ingest_handler, "kb-manifests/*")
+        kb_ingest_handler.add_to_role_policy(iam.PolicyStatement(
+            actions=["bedrock:IngestKnowledgeBaseDocuments", "bedrock:DeleteKnowledgeBaseDocuments"],
+            resources=[knowledge_base.attr_knowledge_base_arn]
+        ))
+        for event_type in (s3.EventType.OBJECT_CREATED, s3.EventType.OBJECT_REMOVED):
+            kb_bucket.add_event_notification(
+                event_type,
+                s3n.LambdaDestination(kb_ingest_handler),
+                s3.NotificationKeyFilter(prefix="documents/")
+            )
+
         # 7. Library Assistant Lambda Function
         assistant_handler = _lambda.Function(self, "LibraryAssistantHandler",
             runtime=_lambda.Runtime.PYTHON_3_11,
             code=_lambda.Code.from_asset("lambda_functions/library_assistant"),
             handler="index.handler",
+            layers=[common_layer, json_layer],
             timeout=Duration.seconds(30),
             environment={
                 "BOOKS_TABLE_NAME": books_table.table_name,
+                "INDEX_TABLE_NAME": index_table.table_name,
+                "CATALOG_CACHE_TTL_SECONDS": "300",
+                "CATALOG_CACHE_MAX_ENTRIES": "1024",
+                "MAX_TOOL_ROUNDS": "3",
+                "RESPONSE_CACHE_TABLE_NAME": response_cache_table.table_name,
+                "RESPONSE_CACHE_TTL_SECONDS": "86400",
+                "RESPONSE_CACHE_TOOL_TTL_SECONDS": "600",
+                "RESPONSE_CACHE_EMBEDDING_MODEL_ID": "", # Örn. amazon.titan-embed-text-v2:0 (anlamsal eşleşme için)
+                "HISTORY_TABLE_NAME": assistant_history_table.table_name,
+                "SESSION_MAX_TURNS": "10",
+                "SESSION_TOKEN_BUDGET": "3000",
+                "ADMISSION_TABLE_NAME": admission_table.table_name,
+                "RATE_LIMIT_PER_MINUTE": "10", # Kullanıcı başına sürekli hız
+                "RATE_LIMIT_BURST": "5", # Art arda izin verilen istek
+                "COALESCE_WINDOW_SECONDS": "10", # Aynı soru bu süre içinde tekrar gelirse yanıt paylaşılır
+                "RAG_MIN_SCORE": "0.4", # En iyi parça bu skorun altındaysa bağlam eklenmez
+                "RAG_CONTEXT_TOKENS": "1500",
+                "RAG_CACHE_TTL_SECONDS": "900",
+                "ROUTER_ENABLED": "true",
+                "ROUTER_MIN_CONFIDENCE": "0.75",
+                "ROUTER_MODEL_ID": "", # Kurallar emin değilse sınıflandırma için küçük model (örn. Haiku)
+                "FAST_MODEL_ID": "anthropic.claude-3-haiku-20240307-v1:0",
+                "AWS_MAX_ATTEMPTS_BEDROCK_RUNTIME": "1", # Yeniden denemeler BedrockScheduler'da
+                "MODEL_DEFAULT_RATE": "5", # Konteyner başına model istek/sn (kısıtlandıkça düşer)
+                "MODEL_FALLBACKS": json.dumps({ # Kısıtlanan model -> sırayla denenecek yedekler
+                    "anthropic.claude-3-sonnet-20240229-v1:0": ["anthropic.claude-3-haiku-20240307-v1:0"]
+                }),
+                "METRICS_NAMESPACE": METRICS_NAMESPACE,
+                "METRICS_SAMPLE_RATE": "1.0", # Başarılı çağrıların EMF ile yazılma oranı
+                "PROMPT_VERSION": "", # Boşsa prompts.json'daki varsayılan ve A/B trafik ağırlıkları kullanılır
                 "MODEL_ID": "anthropic.claude-3-sonnet-20240229-v1:0",
                 "KNOWLEDGE_BASE_ID": knowledge_base.attr_knowledge_base_id
             }
@@ -103,12 +483,21 @@ class ServerlessProjectStack(Stack):
 
         # Grant permissions
         books_table.grant_read_data(assistant_handler)
+        index_table.grant_read_data(assistant_handler)
+        response_cache_table.grant_read_write_data(assistant_handler)
+        assistant_history_table.grant_read_write_data(assistant_handler)
+        admission_table.grant_read_write_data(assistant_handler)
         
         assistant_handler.add_to_role_policy(iam.PolicyStatement(
-            actions=["bedrock:InvokeModel", "bedrock:Converse", "bedrock:Retrieve", "bedrock:RetrieveAndGenerate"],
+            actions=["bedrock:InvokeModel", "bedrock:InvokeModelWithResponseStream", "bedrock:Converse", "bedrock:Retrieve", "bedrock:RetrieveAndGenerate"],
             resources=["*"]
         ))
 
+        # AOSS vektör indeksi (Custom Resource): HNSW ayarları `vector_index` ile verilir
+        vector_index_resource, vector_index_handler = add_vector_index(self, "LibraryKbVectorIndex",
+            collection, vector_index, common_layer
+        )
+
         # Data Access Policy for AOSS (Updated to include Lambda Role)
         access_policy = aoss.CfnAccessPolicy(self, "LibraryKbAccessPolicy",
             name="library-kb-access",
@@ -127,10 +516,13 @@ class ServerlessProjectStack(Stack):
                             "Permission": ["aoss:CreateIndex", "aoss:DeleteIndex", "aoss:UpdateIndex", "aoss:DescribeIndex", "aoss:ReadDocument", "aoss:WriteDocument"]
                         }
                     ],
-                    "Principal": [kb_role.role_arn, assistant_handler.role.role_arn]
+                    "Principal": [kb_role.role_arn, assistant_handler.role.role_arn, vector_index_handler.role.role_arn]
                 }
             ])
         )
+        knowledge_base.add_dependency(access_policy)
+        vector_index_resource.node.add_dependency(access_policy)
+        knowledge_base.node.add_dependency(vector_index_resource)
 
         # 9. Cognito User Pool
         user_pool = cognito.UserPool(self, "LibraryUserPool",
@@ -140,12 +532,31 @@ class ServerlessProjectStack(Stack):
         )
         
         user_pool_client = user_pool.add_client("LibraryAppClient")
+        # Yöneticiler bu gruba eklenir (token'da cognito:groups claim'i olarak gelir)
+        cognito.CfnUserPoolGroup(self, "LibraryAdminsGroup",
+            user_pool_id=user_pool.user_pool_id,
+            group_name=ADMIN_GROUP,
+            description="Katalog yazımı ve tüm okuma listeleri"
+        )
 
         # 10. API Gateway Authorizer
         authorizer = apigw.CognitoUserPoolsAuthorizer(self, "LibraryAuthorizer",
             cognito_user_pools=[user_pool]
         )
 
+        # WebSocket API'de Cognito yetkilendiricisi yok: $connect'te ID token'ı doğrulayan Lambda
+        ws_authorizer_handler = _lambda.Function(self, "StreamAuthorizerHandler",
+            runtime=_lambda.Runtime.PYTHON_3_11,
+            code=_lambda.Code.from_asset("lambda_functions/ws_authorizer"),
+            handler="index.handler",
+            layers=[jwt_layer],
+            timeout=Duration.seconds(10),
+            environment={
+                "USER_POOL_ID": user_pool.user_pool_id,
+                "APP_CLIENT_ID": user_pool_client.user_pool_client_id
+            }
+        )
+
         # 8. API Gateway
         api = apigw.LambdaRestApi(self, "LibraryApi",
             handler=assistant_handler,
@@ -156,9 +567,12 @@ class ServerlessProjectStack(Stack):
             )
         )
 
-        # /assistant endpoint
+        # /assistant endpoint (Secured): hız sınırı ve yanıt birleştirme kullanıcı başınadır
         assistant_resource = api.root.add_resource("assistant")
-        assistant_resource.add_method("POST")
+        assistant_resource.add_method("POST",
+            authorizer=authorizer,
+            authorization_type=apigw.AuthorizationType.COGNITO
+        )
 
         # /chat endpoint (Secured)
         chat_resource = api.root.add_resource("chat")
@@ -166,3 +580,102 @@ class ServerlessProjectStack(Stack):
             authorizer=authorizer,
             authorization_type=apigw.AuthorizationType.COGNITO
         )
+
+        # /books ve /reading-lists endpointleri (sayfalı, ETag destekli)
+        # Okumalar herkese açık; yazımlar (Secured) ayrıca yönetici grubu ister
+        catalog_integration = apigw.LambdaIntegration(catalog_api_handler)
+        books_resource = api.root.add_resource("books")
+        books_resource.add_method("GET", catalog_integration)
+        for method in ("POST", "DELETE"):
+            books_resource.add_method(method, catalog_integration,
+                authorizer=authorizer,
+                authorization_type=apigw.AuthorizationType.COGNITO
+            )
+        book_resource = books_resource.add_resource("{bookId}")
+        book_resource.add_method("GET", catalog_integration)
+        book_resource.add_method("DELETE", catalog_integration,
+            authorizer=authorizer,
+            authorization_type=apigw.AuthorizationType.COGNITO
+        )
+        # /books/search (başlık/yazar araması, filtreler ve facet sayıları)
+        books_resource.add_resource("search").add_method("GET", apigw.LambdaIntegration(search_handler))
+
+        # Öneriler: benzer kitaplar ve kullanıcının ödünçlerine göre
+        recommendations_integration = apigw.LambdaIntegration(recommendations_handler)
+        book_resource.add_resource("similar").add_method("GET", recommendations_integration)
+        # Kullanıcının ödünç geçmişine dayanır: kullanıcı Cognito token'ından alınır
+        api.root.add_resource("recommendations").add_method("GET", recommendations_integration,
+            authorizer=authorizer,
+            authorization_type=apigw.AuthorizationType.COGNITO
+        )
+
+        # /reading-lists (Secured): listeler token'daki kullanıcıya aittir; scope=all sadece yöneticiler
+        lists_resource = api.root.add_resource("reading-lists")
+        for method in ("GET", "POST"):
+            lists_resource.add_method(method, catalog_integration,
+                authorizer=authorizer,
+                authorization_type=apigw.AuthorizationType.COGNITO
+            )
+        list_resource = lists_resource.add_resource("{listId}")
+        for method in ("GET", "PUT", "DELETE"):
+            list_resource.add_method(method, catalog_integration,
+                authorizer=authorizer,
+                authorization_type=apigw.AuthorizationType.COGNITO
+            )
+
+        # /loans ve /loans/return (Secured): ödünç işlemleri sadece token'daki kullanıcı adına yapılır
+        loans_resource = api.root.add_resource("loans")
+        for method in ("GET", "POST"):
+            loans_resource.add_method(method, catalog_integration,
+                authorizer=authorizer,
+                authorization_type=apigw.AuthorizationType.COGNITO
+            )
+        loans_resource.add_resource("return").add_method("POST", catalog_integration,
+            authorizer=authorizer,
+            authorization_type=apigw.AuthorizationType.COGNITO
+        )
+
+        # /stats (yönetim paneli özeti; Cache-Control ile kısa süre önbelleğe alınabilir)
+        api.root.add_resource("stats").add_method("GET", catalog_integration)
+
+        # WebSocket API (Streaming yanıtlar)
+        # Python Lambda'ları Function URL response streaming desteklemediği için
+        # model çıktısı parça parça post_to_connection ile gönderilir.
+        stream_integration = apigwv2_integrations.WebSocketLambdaIntegration("LibraryStreamIntegration", assistant_handler)
+        stream_api = apigwv2.WebSocketApi(self, "LibraryStreamApi",
+            route_selection_expression="$request.body.action",
+            # Bağlantı sadece geçerli bir Cognito ID token'ı ile açılır (?token=<idToken>)
+            connect_route_options=apigwv2.WebSocketRouteOptions(
+                integration=stream_integration,
+                authorizer=apigwv2_authorizers.WebSocketLambdaAuthorizer("LibraryStreamAuthorizer",
+                    ws_authorizer_handler,
+                    identity_source=["route.request.querystring.token"]
+                )
+            ),
+            disconnect_route_options=apigwv2.WebSocketRouteOptions(integration=stream_integration)
+        )
+        stream_api.add_route("assistant", integration=stream_integration)
+        stream_stage = apigwv2.WebSocketStage(self, "LibraryStreamStage",
+            web_socket_api=stream_api,
+            stage_name="dev",
+            auto_deploy=True
+        )
+        stream_api.grant_manage_connections(assistant_handler)
+
+        CfnOutput(self, "LibraryStreamUrl", value=stream_stage.url)
+
+        # 11. Gecikme Dashboard'u ve Alarmlar (aşama bazında p50 / p99, EMF metrikleri)
+        assistant_dashboard, _ = add_latency_dashboard(self, "LibraryAssistant", "LibraryAssistant",
+            stages=["Total", "Parse", "Session", "Cache", "Router", "Intent", "FastCall", "Tool",
+                    "DynamoDB", "RAG", "SecondCall", "Serialize"],
+            thresholds={
+                "Total": (4000, 12000),
+                "Intent": (2000, 8000),
+                "SecondCall": (2000, 8000),
+                "FastCall": (1000, 4000),
+                "RAG": (400, 2000),
+                "DynamoDB": (50, 400),
+                "Session": (30, 300),
+            }
+        )
+        add_prompt_version_widgets(assistant_dashboard, "LibraryAssistant")
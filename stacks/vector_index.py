@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+
+from aws_cdk import (
+    CustomResource,
+    Duration,
+    aws_bedrock as bedrock,
+    aws_iam as iam,
+    aws_lambda as _lambda,
+    aws_logs as logs,
+    aws_opensearchserverless as aoss,
+    custom_resources as cr,
+)
+from constructs import Construct
+
+
+@dataclass(frozen=True)
+class VectorIndexProps:
+    """
+    Bilgi bankasının AOSS vektör indeksi. `dimensions`, gömme modelinin
+    çıktısıyla aynı olmalıdır (Titan v2: 256 / 512 / 1024, Titan v1: 1536).
+    m / ef_construction / motor / uzay / boyut değişirse indeks göç ettirilir
+    (belgeler kopyalanıp yeni tanımla geri yazılır); ef_search yerinde güncellenir.
+    Değerler `benchmarks/vector_index_bench.py` ile seçilebilir.
+    """
+    index_name: str = "bedrock-knowledge-base-default-index"
+    dimensions: int = 1024
+    engine: str = "faiss"
+    space_type: str = "l2"
+    m: int = 16
+    ef_construction: int = 512
+    ef_search: int = 512
+    vector_field: str = "bedrock-knowledge-base-default-vector"
+    text_field: str = "AMAZON_BEDROCK_TEXT_CHUNK"
+    metadata_field: str = "AMAZON_BEDROCK_METADATA"
+
+    def field_mapping(self):
+        return bedrock.CfnKnowledgeBase.OpenSearchServerlessFieldMappingProperty(
+            vector_field=self.vector_field,
+            text_field=self.text_field,
+            metadata_field=self.metadata_field
+        )
+
+    def resource_properties(self):
+        """Custom Resource özellikleri (library_common.vector_index spec alanları)."""
+        return {
+            "indexName": self.index_name,
+            "dimensions": self.dimensions,
+            "engine": self.engine,
+            "spaceType": self.space_type,
+            "m": self.m,
+            "efConstruction": self.ef_construction,
+            "efSearch": self.ef_search,
+            "vectorField": self.vector_field,
+            "textField": self.text_field,
+            "metadataField": self.metadata_field,
+        }
+
+
+def add_vector_index(scope: Construct, construct_id: str, collection: aoss.CfnCollection,
+                     props: VectorIndexProps, layer: _lambda.ILayerVersion):
+    """
+    Koleksiyonda `props` tanımındaki vektör indeksini oluşturan / güncelleyen
+    Custom Resource'u ekler; (kaynak, Lambda) döner. Lambda'nın rolü AOSS veri
+    erişim politikasına eklenmeli, bilgi bankası da kaynağa bağımlı olmalıdır.
+    """
+    function = _lambda.Function(scope, f"{construct_id}Handler",
+        runtime=_lambda.Runtime.PYTHON_3_11,
+        code=_lambda.Code.from_asset("lambda_functions/vector_index"),
+        handler="index.handler",
+        layers=[layer],
+        timeout=Duration.minutes(15), # Erişim politikasının yayılması ve göç sırasında kopyalama
+        environment={
+            "AOSS_ACCESS_WAIT_SECONDS": "300",
+            "VECTOR_INDEX_SETTLE_SECONDS": "10"
+        }
+    )
+    function.add_to_role_policy(iam.PolicyStatement(
+        actions=["aoss:APIAccessAll"],
+        resources=[collection.attr_arn]
+    ))
+
+    provider = cr.Provider(scope, f"{construct_id}Provider",
+        on_event_handler=function,
+        log_retention=logs.RetentionDays.ONE_WEEK
+    )
+    resource = CustomResource(scope, construct_id,
+        service_token=provider.service_token,
+        resource_type="Custom::AossVectorIndex",
+        properties={"CollectionEndpoint": collection.attr_collection_endpoint, **props.resource_properties()}
+    )
+    return resource, function
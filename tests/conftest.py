@@ -0,0 +1,35 @@
+"""
+Ortak test kurulumu: ortak katman (library_common) ve benchmarks/ altındaki
+AWS taklitleri import yoluna eklenir. Testler ağa çıkmaz; DynamoDB / S3 /
+Bedrock çağrıları `aws_standins` ile bellek içinde yanıtlanır.
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'lambda_layers', 'common', 'python'), os.path.join(ROOT, 'benchmarks')]
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'test')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'test')
+
+
+@pytest.fixture
+def aws():
+    """Taklitlere bağlı boto3 oturumu; library_common.clients bu oturumu kullanır."""
+    import boto3
+    from aws_standins import AwsStandIns
+    from library_common import clients
+
+    stand_ins = AwsStandIns()
+    session = boto3.session.Session(region_name='us-east-1')
+    stand_ins.install(session)
+    clients.reset()
+    clients._session = session
+    stand_ins.session = session
+    yield stand_ins
+    clients.reset()
@@ -0,0 +1,38 @@
+"""İstek kabulü: hız sınırı anahtarı sadece doğrulanmış kimlikten alınır."""
+import pytest
+
+from library_common import admission
+from library_common.admission import requester
+from library_common.http import Unauthorized
+
+
+def event(headers=None, claims=None, source_ip='203.0.113.7'):
+    context = {'identity': {'sourceIp': source_ip}}
+    if claims:
+        context['authorizer'] = {'claims': claims}
+    return {'headers': headers or {}, 'queryStringParameters': {'userId': 'sorgu'},
+            'body': '{"userId": "govde"}', 'requestContext': context}
+
+
+def test_requester_uses_cognito_claims():
+    assert requester(event(claims={'cognito:username': 'ayse', 'sub': 'sub-1'})) == 'user#ayse'
+    assert requester(event(claims={'sub': 'sub-1'})) == 'user#sub-1'
+
+
+def test_requester_reads_websocket_authorizer_context():
+    # ws_authorizer'ın context'i requestContext.authorizer altında doğrudan gelir
+    ws_event = {'requestContext': {'authorizer': {'principalId': 'sub-1', 'sub': 'sub-1', 'cognito:username': 'ayse'}}}
+    assert requester(ws_event) == 'user#ayse'
+
+
+def test_requester_rejects_anonymous_requests():
+    with pytest.raises(Unauthorized):
+        requester(event(headers={'X-User-ID': 'u1'}))
+
+
+def test_requester_ignores_client_supplied_ids(monkeypatch):
+    # Yerelde (ALLOW_ANONYMOUS) her istekte farklı X-User-ID gönderen istemci aynı IP kovasına düşer
+    monkeypatch.setattr(admission, 'ALLOW_ANONYMOUS', True)
+    assert requester(event(headers={'X-User-ID': 'u1'})) == 'ip#203.0.113.7'
+    assert requester(event(headers={'X-User-ID': 'u2'})) == 'ip#203.0.113.7'
+    assert requester(event(source_ip=None)) == 'ip#unknown'
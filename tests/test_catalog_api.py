@@ -0,0 +1,134 @@
+"""catalog_api handler: ödünç ve liste rotalarında kimlik, yönetici yetkisi ve kitap kaydetme kuralları."""
+import json
+
+import pytest
+
+from load_test import load_handler
+
+
+@pytest.fixture
+def handler(aws):
+    aws.dynamodb.put('LibraryBooks', {'bookId': 'b1', 'title': 'Suç ve Ceza', 'isAvailable': True})
+    return load_handler('catalog_api')
+
+
+def call(handler, method, resource, body=None, user=None, headers=None, groups=None, params=None, path=None):
+    event = {'httpMethod': method, 'resource': resource, 'headers': headers or {},
+             'queryStringParameters': params, 'pathParameters': path,
+             'body': json.dumps(body) if body is not None else None}
+    if user:
+        claims = {'cognito:username': user, 'sub': f"sub-{user}"}
+        if groups:
+            claims['cognito:groups'] = groups
+        event['requestContext'] = {'authorizer': {'claims': claims}}
+    response = handler(event, None)
+    return response['statusCode'], json.loads(response['body'] or 'null')
+
+
+@pytest.mark.parametrize('method, resource, body', [
+    ('GET', '/loans', None),
+    ('POST', '/loans', {'bookId': 'b1', 'userId': 'u1'}),
+    ('POST', '/loans/return', {'loanIds': ['x'], 'userId': 'u1'}),
+])
+def test_loan_routes_ignore_client_supplied_user(handler, method, resource, body):
+    status, _ = call(handler, method, resource, body, headers={'X-User-ID': 'u1'})
+    assert status == 401
+
+
+def test_loans_use_token_user(handler):
+    status, loan = call(handler, 'POST', '/loans', {'bookId': 'b1', 'userId': 'baskasi'}, user='u1')
+    assert status == 201 and loan['userId'] == 'u1'
+
+    # Başka bir kullanıcı ödüncü göremez ve iade edemez
+    status, body = call(handler, 'POST', '/loans/return', {'loanIds': [loan['loanId']]}, user='u2')
+    assert status == 409 and body['returned'] == []
+    status, body = call(handler, 'GET', '/loans', user='u2')
+    assert body['items'] == []
+
+    status, body = call(handler, 'POST', '/loans/return', {'loanIds': [loan['loanId']]}, user='u1')
+    assert status == 200 and body['returned'] == [loan['loanId']]
+
+
+def test_save_book_does_not_change_availability(aws, handler):
+    _, loan = call(handler, 'POST', '/loans', {'bookId': 'b1'}, user='u1')
+
+    for field, value in (('status', 'Müsait'), ('isAvailable', True)):
+        status, _ = call(handler, 'POST', '/books', {'id': 'b1', 'title': 'Suç ve Ceza', field: value},
+                         user='admin', groups='admins')
+        assert status == 400
+
+    status, book = call(handler, 'POST', '/books', {'id': 'b1', 'title': 'Suç ve Ceza (2. baskı)'},
+                        user='admin', groups='admins')
+    assert status == 200
+    assert book['isAvailable'] is False and book['currentLoanId'] == loan['loanId']
+
+
+@pytest.mark.parametrize('method, resource, params, body', [
+    ('GET', '/reading-lists', {'userId': 'u1'}, None),
+    ('POST', '/reading-lists', None, {'userId': 'u1', 'name': 'Liste'}),
+])
+def test_reading_lists_require_token(handler, method, resource, params, body):
+    status, _ = call(handler, method, resource, body, params=params, headers={'X-User-ID': 'u1'})
+    assert status == 401
+
+
+def test_reading_lists_are_isolated_per_user(handler):
+    status, _ = call(handler, 'POST', '/reading-lists', {'userId': 'baskasi', 'name': 'Okunacaklar'}, user='u1')
+    assert status == 403
+    status, created = call(handler, 'POST', '/reading-lists', {'userId': 'u1', 'name': 'Okunacaklar'}, user='u1')
+    assert status == 201 and created['userId'] == 'u1'
+    path = {'listId': created['id']}
+
+    _, page = call(handler, 'GET', '/reading-lists', user='u1')
+    assert [item['id'] for item in page['items']] == [created['id']]
+    _, page = call(handler, 'GET', '/reading-lists', user='u2')
+    assert page['items'] == []
+
+    # userId ile başkasının listesine erişmek yönetici ister
+    for method in ('GET', 'DELETE'):
+        status, _ = call(handler, method, '/reading-lists/{listId}', user='u2', params={'userId': 'u1'}, path=path)
+        assert status == 403
+    status, _ = call(handler, 'GET', '/reading-lists/{listId}', user='u2', path=path)
+    assert status == 404
+
+    status, listed = call(handler, 'GET', '/reading-lists/{listId}', user='admin', groups='admins',
+                          params={'userId': 'u1'}, path=path)
+    assert status == 200 and listed['name'] == 'Okunacaklar'
+
+
+def test_scope_all_requires_admin_group(handler):
+    call(handler, 'POST', '/reading-lists', {'name': 'A'}, user='u1')
+    call(handler, 'POST', '/reading-lists', {'name': 'B'}, user='u2')
+
+    status, _ = call(handler, 'GET', '/reading-lists', user='u1', params={'scope': 'all'})
+    assert status == 403
+    status, page = call(handler, 'GET', '/reading-lists', user='admin', groups='[admins, editors]',
+                        params={'scope': 'all'})
+    assert status == 200 and sorted(item['name'] for item in page['items']) == ['A', 'B']
+
+
+@pytest.mark.parametrize('method, resource, body, path', [
+    ('POST', '/books', {'id': 'b2', 'title': 'Yeni'}, None),
+    ('DELETE', '/books', {'id': 'b1'}, None),
+    ('DELETE', '/books/{bookId}', None, {'bookId': 'b1'}),
+])
+def test_book_writes_require_admin_group(handler, method, resource, body, path):
+    status, _ = call(handler, method, resource, body, path=path)
+    assert status == 401
+    status, _ = call(handler, method, resource, body, path=path, user='u1', groups='editors')
+    assert status == 403
+    status, _ = call(handler, method, resource, body, path=path, user='admin', groups='admins')
+    assert status == 200
+
+
+def test_delete_book_on_loan_conflicts(aws, handler):
+    _, loan = call(handler, 'POST', '/loans', {'bookId': 'b1'}, user='u1')
+
+    status, _ = call(handler, 'DELETE', '/books/{bookId}', path={'bookId': 'b1'}, user='admin', groups='admins')
+    assert status == 409
+    status, _ = call(handler, 'GET', '/books/{bookId}', path={'bookId': 'b1'})
+    assert status == 200
+
+    call(handler, 'POST', '/loans/return', {'loanIds': [loan['loanId']]}, user='u1')
+    status, _ = call(handler, 'DELETE', '/books/{bookId}', path={'bookId': 'b1'}, user='admin', groups='admins')
+    assert status == 200
@@ -0,0 +1,106 @@
+"""Ters indeks araması: catalog_indexer ile indeksleme, sıralama ve Türkçe sadeleştirme."""
+import pytest
+
+from library_common.catalog_index import CATALOG_VERSION_KEY, read_catalog_version, search_books
+from library_common.codec import decode_item, encode_item
+from library_common.text import normalize, tokenize
+from load_test import load_handler
+
+BOOKS = [
+    {'bookId': 'b-suc', 'title': 'Suç ve Ceza', 'author': 'Fyodor Dostoyevski', 'isAvailable': True},
+    {'bookId': 'b-ceza', 'title': 'Ceza Hukuku Dersleri', 'author': 'Ayşe Yılmaz', 'isAvailable': True},
+    {'bookId': 'b-kurk', 'title': 'Kürk Mantolu Madonna', 'author': 'Sabahattin Ali', 'isAvailable': False},
+    {'bookId': 'b-ali', 'title': 'Ali ile Ayşe', 'author': 'Orhan Veli', 'isAvailable': True},
+    {'bookId': 'b-istanbul', 'title': 'İSTANBUL HATIRASI', 'author': 'Ahmet Ümit', 'isAvailable': True},
+    {'bookId': 'b-isik', 'title': 'Işığın Dağları', 'author': 'Şule Öztürk', 'isAvailable': True},
+]
+
+
+@pytest.fixture
+def catalog(aws):
+    aws.dynamodb.put('LibraryBookIndex', dict(CATALOG_VERSION_KEY, v=1, sv=1, log={}))
+    for book in BOOKS:
+        aws.dynamodb.put('LibraryBooks', book)
+    indexer = load_handler('catalog_indexer')
+    assert indexer({'action': 'rebuild'}, None) == {'indexed': len(BOOKS)}
+    return indexer
+
+
+@pytest.fixture
+def search(aws):
+    client = aws.session.resource('dynamodb').meta.client
+    return lambda query, limit=5: [book['bookId'] for book in
+                                   search_books(query, client, 'LibraryBookIndex', 'LibraryBooks', limit)]
+
+
+def postings(aws, book_id):
+    rows = [decode_item(item) for item in aws.dynamodb.items('LibraryBookIndex')]
+    return {row['token']: row['w'] for row in rows if row['bookId'] == book_id}
+
+
+def stream_record(old=None, new=None):
+    change = {'OldImage': encode_item(old)} if old else {}
+    if new:
+        change['NewImage'] = encode_item(new)
+    return {'dynamodb': change}
+
+
+def test_normalize_folds_turkish_characters():
+    assert normalize('İSTANBUL') == normalize('istanbul') == 'istanbul'
+    assert normalize('IŞIK') == normalize('ışık') == 'isik'
+    assert normalize('Dağ  Çiçeği') == 'dag cicegi'
+    assert tokenize('Suç ve Ceza') == ['suc', 'ceza']
+
+
+def test_rebuild_indexes_titles_and_authors(aws, catalog, search):
+    assert postings(aws, 'b-suc') == {'suc': 2, 've': 2, 'ceza': 2, 'fyodor': 1, 'dostoyevski': 1}
+    assert read_catalog_version(aws.session.resource('dynamodb').Table('LibraryBookIndex'))['sv'] == 2
+
+    assert search('Dostoyevski') == ['b-suc']
+    assert search('madonna')[0] == 'b-kurk'
+    assert search('olmayan kitap') == []
+
+
+def test_exact_title_ranks_above_partial_match(catalog, search):
+    assert search('Suç ve Ceza') == ['b-suc', 'b-ceza']
+    assert search('ceza hukuku') == ['b-ceza', 'b-suc']
+
+
+def test_title_match_ranks_above_author_match(catalog, search):
+    # "ali" başlıkta (ağırlık 2) yazardakinden (ağırlık 1) önce gelir
+    assert search('ali') == ['b-ali', 'b-kurk']
+    assert search('ali', limit=1) == ['b-ali']
+
+
+@pytest.mark.parametrize('query, book_id', [
+    ('istanbul hatırası', 'b-istanbul'),
+    ('İstanbul', 'b-istanbul'),
+    ('ISIGIN', 'b-isik'),
+    ('ışığın dağları', 'b-isik'),
+    ('DAĞLARI', 'b-isik'),
+    ('sule ozturk', 'b-isik'),
+    ('SUC', 'b-suc'),
+])
+def test_turkish_folded_queries_match(catalog, search, query, book_id):
+    assert search(query)[0] == book_id
+
+
+def test_stream_update_replaces_changed_tokens(aws, catalog, search):
+    old = BOOKS[1]
+    new = dict(old, title='Ceza Muhakemesi')
+
+    catalog({'Records': [stream_record(old, new)]}, None)
+
+    assert postings(aws, 'b-ceza') == {'ceza': 2, 'muhakemesi': 2, 'ayse': 1, 'yilmaz': 1}
+    assert search('hukuku') == []
+    assert search('muhakemesi') == ['b-ceza']
+
+
+def test_stream_remove_deletes_postings(aws, catalog, search):
+    catalog({'Records': [stream_record(old=BOOKS[0])]}, None)
+
+    assert postings(aws, 'b-suc') == {}
+    assert search('Dostoyevski') == []
+    version = read_catalog_version(aws.session.resource('dynamodb').Table('LibraryBookIndex'))
+    assert version['log'][version['v']] == {'b-suc'}
+    assert version['sv'] == version['v']
@@ -0,0 +1,72 @@
+"""chat_handler: REST ve WebSocket yollarında session_id doğrulaması."""
+import json
+import sys
+
+import pytest
+
+from load_test import load_handler
+
+CLAIMS = {'sub': 'u1', 'cognito:username': 'u1'}
+
+
+@pytest.fixture
+def chat(aws, monkeypatch):
+    monkeypatch.setenv('TABLE_NAME', 'ChatHistory')
+    frames = []
+    aws.register('apigatewaymanagementapi', 'PostToConnection',
+                 lambda params: frames.append(json.loads(params['Data'])) or {})
+    load_handler('chat_handler')
+    module = sys.modules['chat_handler_index']
+    module.frames = frames
+    return module
+
+
+def rest(chat, body):
+    return chat.handler({'httpMethod': 'POST', 'body': json.dumps(body),
+                         'requestContext': {'authorizer': {'claims': CLAIMS}}}, None)
+
+
+def websocket(chat, body):
+    return chat.handler({'body': json.dumps(body), 'requestContext': {
+        'routeKey': 'sendMessage', 'eventType': 'MESSAGE', 'connectionId': 'c1', 'domainName': 'localhost',
+        'stage': 'local', 'authorizer': CLAIMS}}, None)
+
+
+@pytest.mark.parametrize('session_id', [123, ['s1'], {'id': 's1'}, True])
+def test_rest_rejects_non_string_session_id(aws, chat, session_id):
+    response = rest(chat, {'message': 'Merhaba', 'session_id': session_id})
+
+    assert response['statusCode'] == 400
+    assert json.loads(response['body']) == {'error': chat.SESSION_ID_ERROR}
+    assert aws.calls.get('bedrock-runtime.InvokeModel', 0) == 0
+
+
+@pytest.mark.parametrize('session_id', [None, ''])
+def test_rest_creates_session_for_null_or_empty_id(chat, session_id):
+    response = rest(chat, {'message': 'Merhaba', 'session_id': session_id})
+
+    assert response['statusCode'] == 200
+    created = json.loads(response['body'])['session_id']
+    assert isinstance(created, str) and len(created) == 36
+
+
+def test_rest_keeps_given_session_id(chat):
+    response = rest(chat, {'message': 'Merhaba', 'session_id': 's1'})
+
+    assert json.loads(response['body'])['session_id'] == 's1'
+
+
+def test_websocket_rejects_non_string_session_id(aws, chat):
+    response = websocket(chat, {'message': 'Merhaba', 'session_id': 42, 'requestId': 'r1'})
+
+    assert response == {'statusCode': 400}
+    assert chat.frames == [{'type': 'error', 'error': chat.SESSION_ID_ERROR, 'requestId': 'r1'}]
+    assert aws.calls.get('bedrock-runtime.InvokeModelWithResponseStream', 0) == 0
+
+
+def test_websocket_creates_session_for_null_id(chat):
+    assert websocket(chat, {'message': 'Merhaba', 'session_id': None})['statusCode'] == 200
+
+    start = chat.frames[0]
+    assert start['type'] == 'start' and isinstance(start['session_id'], str) and start['session_id']
+    assert chat.frames[-1]['type'] == 'done' and chat.frames[-1]['session_id'] == start['session_id']
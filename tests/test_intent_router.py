@@ -0,0 +1,46 @@
+"""Niyet yönlendirici: kurallarla verilen kararlar (model sınıflandırıcısı olmadan)."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'lambda_functions', 'library_assistant'))
+
+from intent_router import CATALOG, CHAT, KNOWLEDGE, UNSURE, IntentRouter, extract_title  # noqa: E402
+
+CASES = [
+    # (mesaj, niyet, başlıklar)
+    ('Suç ve Ceza var mı?', CATALOG, ('Suç ve Ceza',)),
+    ('Suç ve Ceza kitabı müsait mi?', CATALOG, ('Suç ve Ceza',)),
+    ("Sefiller'i ödünç alabilir miyim?", CATALOG, ('Sefiller',)),
+    ('Kütüphanede "Kaç Kişiyiz" var mı?', CATALOG, ('Kaç Kişiyiz',)),
+    ('Acaba 1984 rafta mı?', CATALOG, ('1984',)),
+    ('Kaç kitap ödünç alabilirim?', KNOWLEDGE, ()),
+    ('Üyelik kartımı kaybettim, kitap alabilir miyim?', KNOWLEDGE, ()),
+    ('Kitabı kaç gün tutabilirim?', KNOWLEDGE, ()),
+    ('Gecikme cezası ne kadar?', KNOWLEDGE, ()),
+    ('Kütüphane kaçta açılıyor?', KNOWLEDGE, ()),
+    ('Merhaba', CHAT, ()),
+    ('Teşekkürler, görüşürüz', CHAT, ()),
+    ('Bu kitap var mı?', UNSURE, ()),
+    ('Bana bir şey öner', UNSURE, ()),
+]
+
+
+@pytest.mark.parametrize('message, intent, titles', CASES)
+def test_route(message, intent, titles):
+    route = IntentRouter().route(message)
+
+    assert (route.intent, route.titles) == (intent, titles)
+    assert route.confidence == (0.0 if intent == UNSURE else 1.0)
+
+
+@pytest.mark.parametrize('message', [
+    'Kaç kitap ödünç alabilirim?',
+    'Hangi kitap var mı?',
+    'Üyelik kartımı kaybettim, kitap alabilir miyim?',
+    'Kütüphane kartı var mı?',
+])
+def test_questions_and_stop_phrases_are_not_titles(message):
+    assert extract_title(message) is None
@@ -0,0 +1,58 @@
+"""library_assistant: yönlendiricinin katalog hızlı yolu."""
+import sys
+
+import pytest
+
+from load_test import load_handler, seed
+from library_common.session_memory import SessionContext
+
+
+@pytest.fixture
+def assistant(aws):
+    seed(aws, 0)
+    load_handler('library_assistant')
+    return sys.modules['library_assistant_index']
+
+
+def answer(assistant, *titles):
+    route = assistant.intent_router.route(f"{titles[0]} var mı?")._replace(intent=assistant.CATALOG, titles=titles)
+    session = SessionContext('s1', '', '', [], [])
+    prompts = assistant.prompt_registry.select(session_id='s1')
+    return assistant.routed_answer(route, f"{titles[0]} var mı?", session, prompts)
+
+
+def converse_calls(aws):
+    return aws.calls.get('bedrock-runtime.Converse', 0) + aws.calls.get('bedrock-runtime.ConverseStream', 0)
+
+
+@pytest.mark.parametrize('title', ['Suç ve Ceza', 'suc ve ceza', 'Suç ve Cezaa'])
+def test_exact_title_is_answered_from_catalog(aws, assistant, title):
+    text, touched_ids, cacheable = answer(assistant, title)
+
+    assert text.startswith('Katalogda bulduklarım:') and 'ID: b-suc' in text
+    assert touched_ids == {'b-suc'} and cacheable
+    assert converse_calls(aws) == 0
+
+
+def test_partial_title_goes_to_fast_model(aws, assistant):
+    text, touched_ids, _ = answer(assistant, 'Madonna')
+
+    assert not text.startswith('Katalogda bulduklarım:')
+    assert touched_ids == {'b-kurk'}
+    assert converse_calls(aws) == 1
+
+
+def test_unknown_title_goes_to_sonnet(aws, assistant):
+    assert answer(assistant, 'Olmayan Kitap') is None
+
+
+def test_anonymous_request_is_rejected_before_the_model(aws, monkeypatch):
+    monkeypatch.setenv('ADMISSION_TABLE_NAME', 'AssistantAdmission')
+    seed(aws, 0)
+    load_handler('library_assistant')
+    assistant = sys.modules['library_assistant_index']
+    response = assistant.handler({'httpMethod': 'POST', 'body': '{"message": "Merhaba"}',
+                                  'requestContext': {'identity': {'sourceIp': '203.0.113.7'}}}, None)
+
+    assert response['statusCode'] == 401
+    assert converse_calls(aws) == 0
@@ -0,0 +1,136 @@
+"""LoanService: ödünç, iade ve eşzamanlı istekler (DynamoDB taklidi ile)."""
+import concurrent.futures
+import threading
+
+import pytest
+
+from library_common.codec import decode_item
+from library_common.loans import ACTIVE, RETURNED, BookNotFound, BookUnavailable, LoanService
+
+
+@pytest.fixture
+def service(aws):
+    aws.dynamodb.put('LibraryBooks', {'bookId': 'b1', 'title': 'Suç ve Ceza', 'isAvailable': True})
+    aws.dynamodb.put('LibraryBooks', {'bookId': 'b2', 'title': 'Sefiller', 'isAvailable': True})
+    return LoanService(aws.session.resource('dynamodb').meta.client, base_delay=0)
+
+
+def rows(aws, table):
+    return [decode_item(item) for item in aws.dynamodb.items(table)]
+
+
+def book(aws, book_id):
+    return next(item for item in rows(aws, 'LibraryBooks') if item['bookId'] == book_id)
+
+
+def loan_row(aws, loan_id):
+    return next(item for item in rows(aws, 'UserLoans') if item['loanId'] == loan_id)
+
+
+def test_checkout_lends_book(aws, service):
+    loan = service.checkout('u1', 'b1')
+
+    assert loan['status'] == ACTIVE
+    assert book(aws, 'b1')['isAvailable'] is False
+    assert book(aws, 'b1')['currentLoanId'] == loan['loanId']
+    assert loan_row(aws, loan['loanId'])['userId'] == 'u1'
+
+
+def test_checkout_rejects_lent_and_missing_books(aws, service):
+    service.checkout('u1', 'b1')
+
+    with pytest.raises(BookUnavailable):
+        service.checkout('u2', 'b1')
+    with pytest.raises(BookNotFound):
+        service.checkout('u2', 'yok')
+    assert len(aws.dynamodb.items('UserLoans')) == 1
+
+
+def test_return_releases_book(aws, service):
+    loan = service.checkout('u1', 'b1')
+
+    result = service.return_loans('u1', [loan['loanId']])
+
+    assert result == {'returned': [loan['loanId']], 'failed': {}}
+    assert loan_row(aws, loan['loanId'])['status'] == RETURNED
+    assert book(aws, 'b1')['isAvailable'] is True
+    assert 'currentLoanId' not in book(aws, 'b1')
+
+
+def test_return_twice_and_unknown_loans_fail(aws, service):
+    loan = service.checkout('u1', 'b1')
+    service.return_loans('u1', [loan['loanId']])
+
+    result = service.return_loans('u1', [loan['loanId'], 'yok'])
+
+    assert result['returned'] == []
+    assert set(result['failed']) == {loan['loanId'], 'yok'}
+    # Başka kullanıcının ödüncü de bulunamaz
+    other = service.checkout('u2', 'b2')
+    assert service.return_loans('u1', [other['loanId']])['returned'] == []
+
+
+def test_return_closes_loan_when_book_no_longer_points_at_it(aws, service):
+    loan = service.checkout('u1', 'b1')
+    # Kitabın ödünç bağı kaybolmuş (örn. elle düzenleme) ve kitap başkasına verilmiş
+    aws.dynamodb.put('LibraryBooks', dict(book(aws, 'b1'), currentLoanId='baska-odunc'))
+
+    result = service.return_loans('u1', [loan['loanId']])
+
+    assert result == {'returned': [loan['loanId']], 'failed': {}}
+    assert loan_row(aws, loan['loanId'])['status'] == RETURNED
+    # Kitap diğer ödünçte kalır; müsait yapılmaz
+    assert book(aws, 'b1')['currentLoanId'] == 'baska-odunc'
+    assert book(aws, 'b1')['isAvailable'] is False
+    assert service.stats['detachedReturns'] == 1
+
+
+def test_batch_return_separates_returned_detached_and_normal_loans(aws, service):
+    aws.dynamodb.put('LibraryBooks', {'bookId': 'b3', 'title': 'Nutuk', 'isAvailable': True})
+    returned_before = service.checkout('u1', 'b1')
+    service.return_loans('u1', [returned_before['loanId']])
+    detached = service.checkout('u1', 'b2')
+    normal = service.checkout('u1', 'b3')
+    aws.dynamodb.put('LibraryBooks', {key: value for key, value in book(aws, 'b2').items()
+                                      if key != 'currentLoanId'})
+
+    result = service.return_loans('u1', [returned_before['loanId'], detached['loanId'], normal['loanId']])
+
+    assert sorted(result['returned']) == sorted([detached['loanId'], normal['loanId']])
+    assert list(result['failed']) == [returned_before['loanId']]
+    assert book(aws, 'b3')['isAvailable'] is True
+
+
+def test_concurrent_checkouts_lend_book_once(aws, service):
+    start = threading.Barrier(16)
+
+    def checkout(user):
+        start.wait()
+        try:
+            return service.checkout(f"u{user}", 'b1')['loanId']
+        except BookUnavailable:
+            return None
+
+    with concurrent.futures.ThreadPoolExecutor(16) as pool:
+        loans = [loan_id for loan_id in pool.map(checkout, range(16)) if loan_id]
+
+    assert len(loans) == 1
+    assert book(aws, 'b1')['currentLoanId'] == loans[0]
+    assert [item['status'] for item in rows(aws, 'UserLoans')] == [ACTIVE]
+
+
+def test_concurrent_returns_return_loan_once(aws, service):
+    loan = service.checkout('u1', 'b1')
+    start = threading.Barrier(8)
+
+    def give_back(_):
+        start.wait()
+        return service.return_loans('u1', [loan['loanId']])
+
+    with concurrent.futures.ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(give_back, range(8)))
+
+    assert sum(len(result['returned']) for result in results) == 1
+    assert book(aws, 'b1')['isAvailable'] is True
+    # Tekrar ödünç verilebilir
+    assert service.checkout('u2', 'b1')['status'] == ACTIVE
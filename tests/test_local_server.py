@@ -0,0 +1,27 @@
+"""Yerel sunucu: CDK'daki "module.handler" değerine göre handler yükleme."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tools'))
+
+from cdk_routes import Function  # noqa: E402
+from local_server import ROOT, LocalFunction  # noqa: E402
+
+
+def function(module, handler):
+    return Function('BookSearch', os.path.join(ROOT, 'lambda_functions', 'book_search'), module, handler, {})
+
+
+def test_loads_named_handler_attribute(aws):
+    # BookSearchIndexerHandler: handler="index.index_handler"
+    loaded = LocalFunction(function('index', 'index_handler'), concurrency=1).load()
+
+    assert loaded._handler is sys.modules['book_search_index'].index_handler
+
+
+@pytest.mark.parametrize('module, handler', [('indexer', 'handler'), ('index', 'missing')])
+def test_unknown_module_or_handler_names_the_handler(aws, module, handler):
+    with pytest.raises(ValueError, match=f"book_search: '{module}.{handler}'"):
+        LocalFunction(function(module, handler), concurrency=1).load()
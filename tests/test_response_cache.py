@@ -0,0 +1,39 @@
+"""Yanıt önbelleği: anlamsal eşleşme ve embedding çağrı sayısı."""
+import pytest
+
+from library_common.clients import get_resource
+from library_common.response_cache import ResponseCache
+
+
+class CountingEmbedder:
+    """Her soruyu aynı yöne gömer: tüm sorular anlamca 'aynı' sayılır."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text):
+        self.calls += 1
+        return [1.0, 0.0, 0.0]
+
+
+@pytest.fixture
+def cache(aws):
+    return ResponseCache(get_resource('dynamodb').Table('AssistantResponseCache'), embedder=CountingEmbedder())
+
+
+def test_miss_embeds_query_once(cache):
+    assert cache.get('Kütüphane kaçta açılıyor?') == (None, None)
+    cache.put('Kütüphane kaçta açılıyor?', 'Saat 09:00.', 1200)
+
+    assert cache._embedder.calls == 1
+    entry, layer = cache.get('Kütüphane saat kaçta açılır?')
+    assert (entry.response, layer) == ('Saat 09:00.', 'semantic')
+
+
+def test_tool_backed_answers_are_not_semantic_matches(cache):
+    cache.get('Suç ve Ceza var mı?')
+    cache.put('Suç ve Ceza var mı?', 'Suç ve Ceza müsait.', 1500, book_ids={'b-suc'})
+
+    assert cache.get('Sefiller var mı?') == (None, None)
+    # Aynı soru anahtar üzerinden yine bulunur
+    assert cache.get('suç ve ceza var mı')[1] == 'memory'
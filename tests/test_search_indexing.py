@@ -0,0 +1,79 @@
+"""Arama indeksi güncellemesi: catalog_indexer bildirir, book_search tablodan okur."""
+import json
+import sys
+
+import pytest
+
+from load_test import load_handler, seed
+from library_common.codec import encode_item
+
+
+def stream_record(old=None, new=None):
+    change = {}
+    if old:
+        change['OldImage'] = encode_item(old)
+    if new:
+        change['NewImage'] = encode_item(new)
+    return {'eventName': 'INSERT' if old is None else 'REMOVE' if new is None else 'MODIFY', 'dynamodb': change}
+
+
+@pytest.fixture
+def invocations(aws, monkeypatch):
+    monkeypatch.setenv('SEARCH_INDEXER_FUNCTION_NAME', 'BookSearchIndexerHandler')
+    calls = []
+
+    def invoke(params):
+        calls.append((params['FunctionName'], params['InvocationType'], json.loads(params['Payload'])))
+        return {'StatusCode': 202}
+
+    aws.register('lambda', 'Invoke', invoke)
+    seed(aws, 0)
+    return calls
+
+
+def test_indexer_notifies_search_for_search_fields_only(invocations):
+    indexer = load_handler('catalog_indexer')
+    book = {'bookId': 'b-suc', 'title': 'Suç ve Ceza', 'author': 'Fyodor Dostoyevski', 'isAvailable': True}
+
+    indexer({'Records': [
+        stream_record(new={'bookId': 'b-yeni', 'title': 'Yeni Kitap', 'author': 'Yazar'}),
+        # Açıklama aramada yok: arama indeksi yeniden yazılmaz
+        stream_record(old=book, new=dict(book, description='Yeni açıklama')),
+        stream_record(old=dict(book, bookId='b-kurk'), new=dict(book, bookId='b-kurk', isAvailable=False)),
+        stream_record(old=dict(book, bookId='b-sefiller')),
+    ]}, None)
+
+    assert invocations == [('BookSearchIndexerHandler', 'Event', {'bookIds': ['b-kurk', 'b-sefiller', 'b-yeni']})]
+
+
+def test_indexer_without_changes_does_not_invoke(invocations):
+    indexer = load_handler('catalog_indexer')
+    book = {'bookId': 'b-suc', 'title': 'Suç ve Ceza', 'author': 'Fyodor Dostoyevski'}
+
+    indexer({'Records': [stream_record(old=book, new=dict(book, description='x'))]}, None)
+
+    assert invocations == []
+
+
+def test_search_indexer_writes_current_table_state(aws, monkeypatch):
+    monkeypatch.setenv('INDEX_BUCKET_NAME', 'library-index')
+    seed(aws, 0)
+    index_handler = load_handler('book_search', handler='index_handler')
+    search = sys.modules['book_search_index']
+    index_handler({'action': 'rebuild'}, None)
+
+    # Çağrı sırasız gelse de tablodaki son hal yazılır: silinen kitap indeksten çıkar
+    aws.dynamodb.put('LibraryBooks', {'bookId': 'b-yeni', 'title': 'Yeni Kitap', 'author': 'Yazar',
+                                      'isAvailable': True})
+    table = search.dynamodb.Table('LibraryBooks')
+    table.delete_item(Key={'bookId': 'b-sefiller'})
+    assert index_handler({'bookIds': ['b-yeni', 'b-sefiller']}, None) == {'indexed': 2}
+
+    def titles(query):
+        response = search.handler({'httpMethod': 'GET', 'resource': '/books/search',
+                                  'queryStringParameters': {'q': query}}, None)
+        return [book['title'] for book in json.loads(response['body'])['items']]
+
+    assert titles('yeni') == ['Yeni Kitap']
+    assert titles('sefiller') == []
+    assert titles('suç') == ['Suç ve Ceza']
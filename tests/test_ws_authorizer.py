@@ -0,0 +1,72 @@
+"""ws_authorizer: WebSocket $connect'te Cognito ID token doğrulaması."""
+import sys
+import time
+
+import pytest
+
+jwt = pytest.importorskip('jwt')
+rsa = pytest.importorskip('cryptography.hazmat.primitives.asymmetric.rsa')
+
+from load_test import load_handler  # noqa: E402
+
+ARN = 'arn:aws:execute-api:us-east-1:000000000000:api/dev/$connect'
+
+
+@pytest.fixture
+def authorizer(monkeypatch):
+    monkeypatch.setenv('USER_POOL_ID', 'us-east-1_pool')
+    monkeypatch.setenv('APP_CLIENT_ID', 'client-1')
+    monkeypatch.setenv('AWS_REGION', 'us-east-1')
+    load_handler('ws_authorizer')
+    module = sys.modules['ws_authorizer_index']
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    class SigningKey:
+        def __init__(self, public_key):
+            self.key = public_key
+
+    # JWKS indirmek yerine test anahtarının açık kısmı döner
+    monkeypatch.setattr(module.jwks_client, 'get_signing_key_from_jwt', lambda token: SigningKey(key.public_key()))
+    return module, key
+
+
+def token(key, **overrides):
+    claims = {'sub': 'sub-1', 'cognito:username': 'ayse', 'cognito:groups': ['admins'], 'token_use': 'id',
+              'aud': 'client-1', 'iss': 'https://cognito-idp.us-east-1.amazonaws.com/us-east-1_pool',
+              'exp': int(time.time()) + 300}
+    claims.update(overrides)
+    return jwt.encode(claims, key, algorithm='RS256', headers={'kid': 'k1'})
+
+
+def connect(module, value):
+    return module.handler({'methodArn': ARN, 'queryStringParameters': {'token': value} if value else None}, None)
+
+
+def effect(result):
+    return result['policyDocument']['Statement'][0]['Effect']
+
+
+def test_valid_id_token_is_allowed_with_user_context(authorizer):
+    module, key = authorizer
+    result = connect(module, token(key))
+
+    assert effect(result) == 'Allow' and result['principalId'] == 'sub-1'
+    assert result['context'] == {'sub': 'sub-1', 'cognito:username': 'ayse', 'cognito:groups': 'admins'}
+
+
+@pytest.mark.parametrize('overrides', [
+    {'exp': int(time.time()) - 10},
+    {'aud': 'baska-istemci'},
+    {'iss': 'https://cognito-idp.us-east-1.amazonaws.com/baska-havuz'},
+    {'token_use': 'access'},
+])
+def test_invalid_tokens_are_denied(authorizer, overrides):
+    module, key = authorizer
+    assert effect(connect(module, token(key, **overrides))) == 'Deny'
+
+
+def test_missing_or_foreign_signature_is_denied(authorizer):
+    module, _ = authorizer
+    assert effect(connect(module, None)) == 'Deny'
+    foreign = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    assert effect(connect(module, token(foreign))) == 'Deny'
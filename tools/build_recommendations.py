@@ -0,0 +1,83 @@
+"""
+Öneri servisi için kitapların gömme vektörlerini üretip S3'e yayınlar.
+
+LibraryBooks taranır, her kitabın metni (başlık, yazar, tür, açıklama) Titan
+Text Embeddings ile vektöre çevrilir ve sonuç NumPy float32 matrisi olarak
+`LibraryIndexBucket` içinde `recommendations/` altına yazılır. Metni
+değişmemiş kitapların vektörü yayınlanmış son sürümden alınır; sadece yeni
+ve değişen kitaplar modele gönderilir (--full ile hepsi).
+
+    python tools/build_recommendations.py --bucket <LibraryIndexBucket adı>
+    python tools/build_recommendations.py --bucket <...> --rate 20 --workers 16 --full
+
+Bedrock çağrıları BedrockScheduler ile hız sınırlı yapılır (kısıtlanınca hız
+düşer, yeniden denenir).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'lambda_layers', 'common', 'python'))
+
+from library_common.bedrock_scheduler import BedrockScheduler  # noqa: E402
+from library_common.clients import get_client, get_resource  # noqa: E402
+from library_common.recommendations import (  # noqa: E402
+    DEFAULT_DIMENSIONS, DEFAULT_MODEL_ID, EmbeddingStore, build_matrix, titan_embedder,
+)
+
+
+def scan_books(table_name):
+    table = get_resource('dynamodb').Table(table_name)
+    kwargs = {
+        'ProjectionExpression': 'bookId, title, author, genre, cover, description',
+    }
+    while True:
+        response = table.scan(**kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bucket', required=True, help='LibraryIndexBucket adı')
+    parser.add_argument('--prefix', default='recommendations/')
+    parser.add_argument('--table', default='LibraryBooks')
+    parser.add_argument('--model', default=DEFAULT_MODEL_ID)
+    parser.add_argument('--dimensions', type=int, default=DEFAULT_DIMENSIONS, choices=(256, 512, 1024))
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=10.0, help='Modele saniyede en fazla istek')
+    parser.add_argument('--full', action='store_true', help='Önceki vektörleri kullanmadan hepsini üret')
+    args = parser.parse_args()
+
+    store = EmbeddingStore(get_client('s3'), args.bucket, args.prefix)
+    previous = None if args.full else store.load_latest()
+    if previous is not None:
+        print(f"Önceki sürüm {previous.version}: {len(previous)} kitap")
+
+    scheduler = BedrockScheduler(get_client('bedrock-runtime'), default_rate=args.rate,
+                                 burst=max(1, args.workers), max_attempts=8)
+    embed = titan_embedder(scheduler, args.model, args.dimensions)
+
+    def progress(done, total):
+        print(f"  {done}/{total} kitap gömüldü")
+
+    started = time.monotonic()
+    matrix, books, embedded = build_matrix(scan_books(args.table), embed, args.dimensions,
+                                           previous=previous, workers=args.workers, on_progress=progress)
+    if not books:
+        print("Tabloda kitap yok; yayınlanmadı.")
+        return 1
+    manifest = store.publish(matrix, books, args.model)
+    print(json.dumps(dict(manifest, embedded=embedded, reused=len(books) - embedded,
+                          seconds=round(time.monotonic() - started, 1),
+                          bedrock=scheduler.snapshot()), indent=2, default=str))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
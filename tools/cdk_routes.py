@@ -0,0 +1,399 @@
+"""
+CDK yığınlarındaki (stacks/*.py) API tanımlarını aws_cdk kurmadan okur.
+
+Yığın modülü içe aktarılmaz; yığın sınıfının `__init__` gövdesi AST olarak
+sembolik yürütülür ve yerel çalıştırma için gerekenler toplanır:
+
+- Lambda fonksiyonları: kod dizini, handler ve ortam değişkenleri
+  (`books_table.table_name` gibi referanslar tablo / bucket adlarına çözülür),
+- REST API rotaları (`add_resource` / `add_method` zinciri, for döngüleri,
+  varsayılan handler, Cognito yetkilendirmesi, CORS),
+- WebSocket API rotaları ($connect, $disconnect, `add_route`) ve $connect
+  Lambda yetkilendiricisinin token kaynağı (`identity_source`),
+- DynamoDB tabloları (anahtar şemaları) ve DynamoDB Stream tetikleyicileri.
+  Ortamdaki fonksiyon adları (`handler.function_name`) construct id'sine
+  çözülür; yerel sunucu lambda.Invoke çağrılarını bu adla yönlendirir.
+
+Sadece bu depodaki kalıplar desteklenir (atama, for, çağrı zinciri). Çözülemeyen
+değerler `Unresolved` kalır; ortam değişkenlerinde `local-<ad>` olur (örn.
+KNOWLEDGE_BASE_ID). Yığında bir rota eklenince yerel sunucu onu kendiliğinden görür.
+
+    python tools/cdk_routes.py                      # ServerlessProjectStack rotaları
+    python tools/cdk_routes.py ChatbotStack
+"""
+import ast
+import json
+import os
+import re
+import sys
+from typing import NamedTuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STACKS_PATH = os.path.join(ROOT, 'stacks')
+
+
+class Table(NamedTuple):
+    name: str
+    partition_key: str
+    sort_key: str
+    stream: bool
+
+
+class Function(NamedTuple):
+    name: str
+    directory: str
+    module: str
+    handler: str
+    environment: dict
+
+
+class Route(NamedTuple):
+    method: str
+    path: str
+    function: Function
+    authorization: str
+
+
+class StreamSource(NamedTuple):
+    table: Table
+    function: Function
+    batch_size: int
+
+
+class Stack(NamedTuple):
+    name: str
+    tables: list
+    functions: list
+    routes: list
+    cors: bool
+    websocket_routes: dict
+    websocket_route_key: str
+    websocket_stage: str
+    stream_sources: list
+    # $connect yetkilendiricisinin token kaynağı (örn. "querystring.token"); yoksa None
+    websocket_authorizer: str = None
+
+
+class Unresolved(str):
+    """Sembolik yürütmede değeri bilinmeyen ifade (metni ifadenin kendisidir)."""
+
+
+def placeholder(value):
+    """Çözülemeyen ortam değişkeni değeri: `knowledge_base.attr_knowledge_base_id` -> `local-knowledge-base-id`."""
+    name = str(value).rsplit('.', 1)[-1].replace('attr_', '')
+    return 'local-' + re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+class _Construct:
+    """Yığında oluşturulan bir CDK nesnesi (tür, construct id ve anahtar kelime argümanları)."""
+
+    def __init__(self, kind, construct_id, kwargs):
+        self.kind = kind
+        self.id = construct_id
+        self.kwargs = kwargs
+        self.value = None
+
+    def attribute(self, name):
+        if self.kind == 'Table' and name == 'table_name':
+            return self.kwargs.get('table_name') or self.id
+        if self.kind == 'Bucket' and name == 'bucket_name':
+            return self.kwargs.get('bucket_name') or self.id.lower()
+        if self.kind == 'Attribute' and name == 'name':
+            return self.kwargs.get('name')
+        if self.kind == 'Function' and name == 'function_name':
+            # Yerel sunucu fonksiyonları construct id'siyle çağırır (lambda.Invoke)
+            return self.id
+        return Unresolved(f"{self.id}.{name}")
+
+
+class _Resource:
+    """REST API kaynağı; `add_resource` alt kaynak, `add_method` rota üretir."""
+
+    def __init__(self, api, path):
+        self.api = api
+        self.path = path
+
+
+class _StackReader:
+
+    def __init__(self, module_scope):
+        self.scope = dict(module_scope)
+        self.tables = {}
+        self.functions = {}
+        self.routes = []
+        self.cors = False
+        self.websocket_routes = {}
+        self.websocket_route_key = None
+        self.websocket_stage = 'dev'
+        self.websocket_authorizer = None
+        self.stream_sources = []
+
+    # -- Deyimler ---------------------------------------------------------------
+
+    def run(self, statements):
+        for statement in statements:
+            if isinstance(statement, ast.Assign):
+                value = self.evaluate(statement.value)
+                for target in statement.targets:
+                    self.bind(target, value)
+            elif isinstance(statement, ast.AnnAssign) and statement.value is not None:
+                self.bind(statement.target, self.evaluate(statement.value))
+            elif isinstance(statement, ast.Expr):
+                self.evaluate(statement.value)
+            elif isinstance(statement, ast.For):
+                values = self.evaluate(statement.iter)
+                for value in values if isinstance(values, list) else []:
+                    self.bind(statement.target, value)
+                    self.run(statement.body)
+
+    def bind(self, target, value):
+        if isinstance(target, ast.Name):
+            self.scope[target.id] = value
+        elif isinstance(target, (ast.Tuple, ast.List)):
+            values = value if isinstance(value, list) and len(value) == len(target.elts) else None
+            for i, element in enumerate(target.elts):
+                self.bind(element, values[i] if values else Unresolved(ast.unparse(element)))
+
+    # -- İfadeler ---------------------------------------------------------------
+
+    def evaluate(self, node):
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Name):
+            return self.scope.get(node.id, Unresolved(node.id))
+        if isinstance(node, (ast.Tuple, ast.List)):
+            return [self.evaluate(element) for element in node.elts]
+        if isinstance(node, ast.Dict):
+            return {self.evaluate(key): self.evaluate(value)
+                    for key, value in zip(node.keys, node.values) if key is not None}
+        if isinstance(node, ast.Attribute):
+            owner = self.evaluate(node.value)
+            if isinstance(owner, _Construct):
+                if owner.kind == 'RestApi' and node.attr == 'root':
+                    return _Resource(owner, '')
+                return owner.attribute(node.attr)
+            return Unresolved(f"{owner}.{node.attr}")
+        if isinstance(node, ast.JoinedStr):
+            parts = [self.evaluate(value.value if isinstance(value, ast.FormattedValue) else value)
+                     for value in node.values]
+            if all(isinstance(part, str) and not isinstance(part, Unresolved) for part in parts):
+                return ''.join(parts)
+        if isinstance(node, ast.Call):
+            return self.call(node)
+        return Unresolved(ast.unparse(node))
+
+    def call(self, node):
+        args = [self.evaluate(arg) for arg in node.args if not isinstance(arg, ast.Starred)]
+        kwargs = {keyword.arg: self.evaluate(keyword.value) for keyword in node.keywords if keyword.arg}
+        function = node.func
+        if isinstance(function, ast.Name):
+            if function.id == 'dict' and all(isinstance(arg, dict) for arg in args):
+                return dict(*args, **kwargs)
+            return Unresolved(ast.unparse(node))
+        if not isinstance(function, ast.Attribute):
+            return Unresolved(ast.unparse(node))
+        owner = self.evaluate(function.value)
+        name = function.attr
+        if isinstance(owner, _Resource):
+            return self.resource_call(owner, name, args, kwargs)
+        if isinstance(owner, _Construct):
+            return self.construct_call(owner, name, args, kwargs)
+        if isinstance(owner, Unresolved):
+            return self.create(str(owner), name, args, kwargs, node)
+        return Unresolved(ast.unparse(node))
+
+    def create(self, namespace, name, args, kwargs, node):
+        """`dynamodb.Table(self, "Id", ...)` gibi kurucular ve birkaç yardımcı çağrı."""
+        if namespace == 'json' and name == 'dumps' and args and not _has_unresolved(args[0]):
+            return json.dumps(args[0], **{k: v for k, v in kwargs.items() if not isinstance(v, Unresolved)})
+        if name == 'from_asset' and args and isinstance(args[0], str):
+            return {'asset': args[0]}
+        if name == 'Attribute':
+            return _Construct('Attribute', kwargs.get('name'), kwargs)
+        if name == 'LambdaIntegration' and args:
+            return _Construct('Integration', None, {'function': args[0]})
+        if name == 'WebSocketLambdaIntegration' and len(args) > 1:
+            return _Construct('Integration', args[0], {'function': args[1]})
+        if name == 'WebSocketLambdaAuthorizer' and len(args) > 1:
+            return _Construct('WebSocketAuthorizer', args[0],
+                              {'function': args[1], 'identity_source': kwargs.get('identity_source')})
+        if name == 'WebSocketRouteOptions':
+            integration, authorizer = kwargs.get('integration'), kwargs.get('authorizer')
+            if isinstance(integration, _Construct) and isinstance(authorizer, _Construct):
+                return _Construct('Integration', integration.id, dict(integration.kwargs, authorizer=authorizer))
+            return integration
+        if name == 'DynamoEventSource' and args:
+            return _Construct('DynamoEventSource', None, dict(kwargs, table=args[0]))
+        construct_id = args[1] if len(args) > 1 and isinstance(args[1], str) else None
+        if construct_id is None:
+            return Unresolved(ast.unparse(node))
+        kinds = {'Table': 'Table', 'Bucket': 'Bucket', 'Function': 'Function', 'LambdaRestApi': 'RestApi',
+                 'RestApi': 'RestApi', 'WebSocketApi': 'WebSocketApi', 'WebSocketStage': 'WebSocketStage'}
+        construct = _Construct(kinds.get(name, name), construct_id, kwargs)
+        if construct.kind == 'Table':
+            self.tables[construct_id] = construct
+        elif construct.kind == 'Function':
+            self.functions[construct_id] = construct
+        elif construct.kind == 'RestApi':
+            self.cors = self.cors or 'default_cors_preflight_options' in kwargs
+        elif construct.kind == 'WebSocketApi':
+            expression = kwargs.get('route_selection_expression') or ''
+            self.websocket_route_key = expression.rsplit('.', 1)[-1] if expression else None
+            for route_key, option in (('$connect', 'connect_route_options'),
+                                      ('$disconnect', 'disconnect_route_options'),
+                                      ('$default', 'default_route_options')):
+                if isinstance(kwargs.get(option), _Construct):
+                    self.websocket_routes[route_key] = kwargs[option].kwargs['function']
+            authorizer = getattr(kwargs.get('connect_route_options'), 'kwargs', {}).get('authorizer')
+            if authorizer is not None:
+                # API Gateway varsayılanı: route.request.header.Authorization
+                source = (authorizer.kwargs.get('identity_source') or ['route.request.header.Authorization'])[0]
+                self.websocket_authorizer = str(source).removeprefix('route.request.')
+        elif construct.kind == 'WebSocketStage' and isinstance(kwargs.get('stage_name'), str):
+            self.websocket_stage = kwargs['stage_name']
+        return construct
+
+    def resource_call(self, resource, name, args, kwargs):
+        if name == 'add_resource' and args:
+            return _Resource(resource.api, f"{resource.path}/{args[0]}")
+        if name == 'add_method' and args and isinstance(args[0], str):
+            integration = args[1] if len(args) > 1 else kwargs.get('integration')
+            function = (integration.kwargs['function'] if isinstance(integration, _Construct)
+                        else resource.api.kwargs.get('handler'))
+            authorization = str(kwargs.get('authorization_type') or 'NONE').rsplit('.', 1)[-1]
+            self.routes.append((args[0], resource.path or '/', function, authorization))
+        return Unresolved(f"{resource.path}.{name}")
+
+    def construct_call(self, construct, name, args, kwargs):
+        if name == 'add_route' and construct.kind == 'WebSocketApi' and args:
+            integration = kwargs.get('integration')
+            if isinstance(integration, _Construct):
+                self.websocket_routes[args[0]] = integration.kwargs['function']
+        elif name == 'add_environment' and construct.kind == 'Function' and len(args) > 1:
+            environment = construct.kwargs.get('environment')
+            construct.kwargs['environment'] = dict(environment if isinstance(environment, dict) else {},
+                                                   **{args[0]: args[1]})
+        elif name == 'add_event_source' and construct.kind == 'Function' and args:
+            source = args[0]
+            if isinstance(source, _Construct) and source.kind == 'DynamoEventSource':
+                self.stream_sources.append((source.kwargs['table'], construct, source.kwargs.get('batch_size', 100)))
+        return Unresolved(f"{construct.id}.{name}")
+
+    # -- Sonuç ------------------------------------------------------------------
+
+    def result(self, name):
+        tables = {}
+        for construct in self.tables.values():
+            partition = construct.kwargs.get('partition_key')
+            sort = construct.kwargs.get('sort_key')
+            tables[construct.id] = Table(
+                construct.attribute('table_name'),
+                partition.attribute('name') if isinstance(partition, _Construct) else None,
+                sort.attribute('name') if isinstance(sort, _Construct) else None,
+                'stream' in construct.kwargs
+            )
+        functions = {}
+        for construct in self.functions.values():
+            code = construct.kwargs.get('code')
+            if not isinstance(code, dict):
+                continue
+            module, _, handler = str(construct.kwargs.get('handler', 'index.handler')).rpartition('.')
+            environment = construct.kwargs.get('environment')
+            environment = environment if isinstance(environment, dict) else {}
+            functions[construct.id] = Function(
+                construct.id, os.path.join(ROOT, code['asset']), module, handler,
+                {key: placeholder(value) if _has_unresolved(value) else str(value)
+                 for key, value in environment.items()}
+            )
+
+        def function_of(construct):
+            return functions.get(construct.id) if isinstance(construct, _Construct) else None
+
+        routes = [Route(method, path, function_of(construct), authorization)
+                  for method, path, construct, authorization in self.routes if function_of(construct)]
+        websocket_routes = {key: function_of(construct) for key, construct in self.websocket_routes.items()
+                            if function_of(construct)}
+        streams = [StreamSource(tables[table.id], function_of(construct), batch_size)
+                   for table, construct, batch_size in self.stream_sources
+                   if isinstance(table, _Construct) and table.id in tables and function_of(construct)]
+        return Stack(name, list(tables.values()), list(functions.values()), routes, self.cors,
+                     websocket_routes, self.websocket_route_key, self.websocket_stage, streams,
+                     self.websocket_authorizer)
+
+
+def _has_unresolved(value):
+    if isinstance(value, Unresolved) or isinstance(value, (_Construct, _Resource)):
+        return True
+    if isinstance(value, dict):
+        return any(_has_unresolved(k) or _has_unresolved(v) for k, v in value.items())
+    if isinstance(value, list):
+        return any(_has_unresolved(v) for v in value)
+    return False
+
+
+def _module_scope(tree, seen=None):
+    """Modül seviyesindeki sabitler ve `from stacks.x import AD` ile gelen sabitler."""
+    seen = seen if seen is not None else set()
+    scope = {}
+    for statement in tree.body:
+        if isinstance(statement, ast.Assign) and isinstance(statement.value, ast.Constant):
+            for target in statement.targets:
+                if isinstance(target, ast.Name):
+                    scope[target.id] = statement.value.value
+        elif isinstance(statement, ast.ImportFrom) and (statement.module or '').startswith('stacks.'):
+            path = os.path.join(ROOT, *statement.module.split('.')) + '.py'
+            if path in seen or not os.path.exists(path):
+                continue
+            seen.add(path)
+            with open(path, encoding='utf-8') as f:
+                imported = _module_scope(ast.parse(f.read()), seen)
+            for alias in statement.names:
+                if alias.name in imported:
+                    scope[alias.asname or alias.name] = imported[alias.name]
+    return scope
+
+
+def stack_classes():
+    """{sınıf adı: dosya yolu}; `Stack`'ten türeyen sınıflar."""
+    classes = {}
+    for name in sorted(os.listdir(STACKS_PATH)):
+        if not name.endswith('.py'):
+            continue
+        path = os.path.join(STACKS_PATH, name)
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in tree.body:
+            if isinstance(node, ast.ClassDef) and any(ast.unparse(base).endswith('Stack') for base in node.bases):
+                classes[node.name] = path
+    return classes
+
+
+def load_stack(name='ServerlessProjectStack'):
+    """Yığın sınıfını okur ve `Stack` döner; sınıf yoksa KeyError."""
+    path = stack_classes()[name]
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    node = next(node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == name)
+    init = next(item for item in node.body if isinstance(item, ast.FunctionDef) and item.name == '__init__')
+    reader = _StackReader(_module_scope(tree))
+    reader.run(init.body)
+    return reader.result(name)
+
+
+def main():
+    name = sys.argv[1] if len(sys.argv) > 1 else 'ServerlessProjectStack'
+    stack = load_stack(name)
+    print(f"{stack.name}: {len(stack.functions)} fonksiyon, {len(stack.tables)} tablo")
+    for route in stack.routes:
+        auth = '' if route.authorization == 'NONE' else f"  [{route.authorization}]"
+        print(f"  {route.method:<7} {route.path:<32} -> {route.function.name}{auth}")
+    for key, function in stack.websocket_routes.items():
+        auth = f"  [LAMBDA {stack.websocket_authorizer}]" if key == '$connect' and stack.websocket_authorizer else ''
+        print(f"  WS      {key:<32} -> {function.name}{auth}")
+    for source in stack.stream_sources:
+        print(f"  STREAM  {source.table.name:<32} -> {source.function.name} (grup {source.batch_size})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
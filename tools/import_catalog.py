@@ -0,0 +1,64 @@
+"""
+Kataloğu yerel bir dosyadan veya S3'ten doğrudan LibraryBooks tablosuna yükler.
+Lambda ile aynı yükleyiciyi (library_common.catalog_import) kullanır.
+
+    python tools/import_catalog.py books.csv
+    python tools/import_catalog.py s3://<bucket>/catalog-imports/books.jsonl --workers 32
+    python tools/import_catalog.py books.csv --resume     # kontrol noktasından devam
+
+Kontrol noktası `<dosya>.checkpoint.json` olarak yerelde tutulur.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'lambda_layers', 'common', 'python'))
+
+from library_common.catalog_import import CatalogLoader, detect_format, iter_records  # noqa: E402
+from library_common.clients import get_client, get_resource  # noqa: E402
+
+
+def open_source(source):
+    if source.startswith('s3://'):
+        bucket, _, key = source[5:].partition('/')
+        return get_client('s3').get_object(Bucket=bucket, Key=key)['Body'], key
+    return open(source, 'rb'), source
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help='Yerel dosya veya s3://bucket/key (.csv, .jsonl)')
+    parser.add_argument('--table', default='LibraryBooks')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--resume', action='store_true', help='Kontrol noktasından devam et')
+    args = parser.parse_args()
+
+    checkpoint_path = os.path.basename(args.source.rstrip('/')) + '.checkpoint.json'
+    start_row = 0
+    if args.resume and os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as f:
+            start_row = json.load(f)['committedRows']
+        print(f"{start_row}. satırdan devam ediliyor.")
+
+    def save_checkpoint(rows, result):
+        with open(checkpoint_path, 'w') as f:
+            json.dump({**result, 'committedRows': rows}, f)
+        print(f"  {rows} satır | {result['written']} yazıldı | {result['itemsPerSecond']} kayıt/sn "
+              f"| eşzamanlılık {result['concurrency']} | throttle {result['throttles']}")
+
+    stream, key = open_source(args.source)
+    loader = CatalogLoader(get_resource('dynamodb').meta.client, args.table, workers=args.workers,
+                           on_checkpoint=save_checkpoint)
+    try:
+        result = loader.load(iter_records(stream, detect_format(key)), start_row=start_row)
+    except KeyboardInterrupt:
+        print("Durduruldu; --resume ile devam edebilirsiniz.")
+        return 1
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
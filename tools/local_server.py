@@ -0,0 +1,913 @@
+"""
+API'nin tamamını AWS hesabı olmadan tek makinede çalıştıran yerel sunucu.
+
+Rotalar CDK yığınından okunur (`tools/cdk_routes.py`, aws_cdk gerekmez) ve
+Lambda handler'ları gerçek kodlarıyla, API Gateway proxy olaylarıyla çağrılır:
+
+- REST: /assistant, /chat, /books, /books/search, /reading-lists, /loans, /stats ...
+  (yol parametreleri, sorgu dizgisi, CORS ön kontrolü, Cognito rotalarında
+  Authorization başlığındaki JWT'nin claim'leri - imza doğrulanmaz)
+- WebSocket: ws://<host>/<stage> ($connect / $disconnect / `action` rotası);
+  handler'ların `post_to_connection` çağrıları bağlantıya yazılır. $connect
+  yetkilendiricisinin token'ı (örn. `?token=`) REST'teki gibi imzasız okunur.
+- Token'sız asistan istekleri hız sınırı için kaynak IP'ye düşer (sadece
+  yerelde); `--require-auth` ile üretimdeki gibi 401 alır.
+- DynamoDB Stream tetikleyicileri: yazımlar toplanıp `--stream-interval`
+  aralıklarla indeksleyici / istatistik / arama indeksi Lambda'larına verilir.
+- Aynı sunucu `index.html` / `script.js`'i de sunar; script.js'teki apiUrl ve
+  streamUrl bu sunucuya çevrilir (tarayıcıdan uçtan uca test ve yük testi).
+
+DynamoDB, S3 ve Bedrock `benchmarks/aws_standins.py` taklitleridir: model
+deterministiktir (hazır metin veya `--answer echo` ile sorunun yankısı),
+servis başına gecikme ayarlanabilir. `--data-dir` verilirse tablolar kapanışta
+`<dizin>/dynamodb.json`'a, S3 nesneleri `<dizin>/s3/` altına yazılır ve sonraki
+açılışta oradan okunur; verilmezse her açılışta `--books` kadar sentetik kitap
+(veya `--catalog` dosyası) yüklenir.
+
+Her fonksiyon bir kez yüklenir (soğuk başlangıç süresi raporlanır) ve en fazla
+`--concurrency` isteği aynı anda işler; fazlası sırada bekler. Handler'lar
+tek süreçte thread'lerle çalışır: CPU'ya bağlı kısımlar GIL yüzünden
+paralelleşmez (CPU ölçümü için `benchmarks/load_test.py` süreç kullanır).
+Ortam değişkenleri her fonksiyon yüklenirken kendi değerleriyle kurulur;
+çalışma anında okunan değerler fonksiyonlar arasında ortaktır.
+
+Taklit edilmeyenler: S3 olay bildirimleri (katalog içe aktarma, bilgi bankası
+senkronizasyonu), Bedrock Agent API'leri ve stream kayıtlarının hata
+durumunda yeniden denenmesi (hata yazılır, kayıtlar atlanır).
+
+    python tools/local_server.py                         # http://127.0.0.1:3000
+    python tools/local_server.py --port 8080 --books 5000 --bedrock-latency-ms 800
+    python tools/local_server.py --data-dir .local --catalog books.csv
+    python tools/local_server.py --stack ChatbotStack
+    python tools/local_server.py --env MODEL_DEFAULT_RATE=1000 --env RATE_LIMIT_PER_MINUTE=100000
+    python tools/local_server.py --self-test              # rotaları uçtan uca dener, hata varsa 1 ile çıkar
+"""
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import socket
+import struct
+import sys
+import threading
+import time
+import traceback
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'lambda_layers', 'common', 'python'), os.path.join(ROOT, 'benchmarks'),
+                os.path.dirname(os.path.abspath(__file__))]
+
+from cdk_routes import load_stack  # noqa: E402
+from load_test import load_handler  # noqa: E402
+
+ENVIRONMENT = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'local',
+    'AWS_SECRET_ACCESS_KEY': 'local',
+}
+STREAM_ARN = 'arn:aws:dynamodb:us-east-1:000000000000:table/{table}/stream/local'
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+# API Gateway'in CORS ön kontrolüne (Cors.ALL_METHODS, varsayılan başlıklar) verdiği yanıt
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'OPTIONS,GET,PUT,POST,DELETE,PATCH,HEAD',
+    'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,'
+                                    'X-Amz-User-Agent,If-None-Match',
+}
+STATIC_TYPES = {'.html': 'text/html; charset=utf-8', '.js': 'text/javascript; charset=utf-8',
+                '.css': 'text/css; charset=utf-8', '.png': 'image/png', '.jpg': 'image/jpeg',
+                '.svg': 'image/svg+xml', '.ico': 'image/x-icon'}
+WS_TEXT, WS_CLOSE, WS_PING, WS_PONG = 0x1, 0x8, 0x9, 0xA
+
+
+class _Context:
+    """Lambda context nesnesinin handler'ların kullandığı kısmı."""
+
+    def __init__(self, function_name, timeout_seconds):
+        self.function_name = function_name
+        self.aws_request_id = str(uuid.uuid4())
+        self._deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+class LocalFunction:
+    """Bir Lambda fonksiyonu: tek seferde yüklenir, en fazla `concurrency` çağrıyı aynı anda işler."""
+
+    def __init__(self, spec, concurrency, timeout_seconds=30, overrides=None):
+        self.spec = spec
+        self.name = spec.name
+        self.environment = dict(spec.environment, **(overrides or {}))
+        self.timeout = timeout_seconds
+        self.init_ms = None
+        self._handler = None
+        self._slots = threading.BoundedSemaphore(concurrency)
+
+    def load(self):
+        """CDK'daki "module.handler" değerine göre (örn. index.index_handler) handler'ı yükler."""
+        started = time.perf_counter()
+        os.environ.update(self.environment)
+        self._handler = load_handler(os.path.basename(self.spec.directory), self.spec.module, self.spec.handler)
+        self.init_ms = (time.perf_counter() - started) * 1000
+        return self
+
+    def invoke(self, event):
+        with self._slots:
+            return self._handler(event, _Context(self.name, self.timeout))
+
+
+class StreamPump:
+    """
+    DynamoDB Stream taklidi: taklit tablonun yazım günlüğünü okur ve stream'i
+    açık tablolardaki değişiklikleri, bağlı fonksiyonlara `batch_size`'lık
+    gruplar halinde (NEW_AND_OLD_IMAGES) verir.
+    """
+
+    def __init__(self, dynamodb, sources, interval):
+        self._dynamodb = dynamodb
+        self._sources = sources
+        self._interval = interval
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name='stream-pump', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.wait(self._interval):
+            self.flush()
+
+    def flush(self):
+        """Birikmiş değişiklikleri hemen işler; işlenen kayıt sayısını döner."""
+        with self._lock:
+            records = {}
+            for table, old, new in self._dynamodb.drain_journal():
+                if old is None and new is None:
+                    continue
+                self._sequence += 1
+                records.setdefault(table, []).append((old, new, self._sequence))
+            delivered = 0
+            for source, function in self._sources:
+                changes = records.get(source.table.name, [])
+                keys = [name for name in (source.table.partition_key, source.table.sort_key) if name]
+                for start in range(0, len(changes), source.batch_size):
+                    batch = [_stream_record(source.table.name, keys, *change)
+                             for change in changes[start:start + source.batch_size]]
+                    try:
+                        function.invoke({'Records': batch})
+                        delivered += len(batch)
+                    except Exception as e:
+                        print(f"Stream Error ({function.name}): {e}")
+                        traceback.print_exc()
+            return delivered
+
+
+def _stream_record(table, keys, old, new, sequence):
+    image = new or old
+    change = {
+        'ApproximateCreationDateTime': time.time(),
+        'Keys': {name: image[name] for name in keys if name in image},
+        'SequenceNumber': str(sequence).zfill(21),
+        'StreamViewType': 'NEW_AND_OLD_IMAGES',
+    }
+    if new is not None:
+        change['NewImage'] = new
+    if old is not None:
+        change['OldImage'] = old
+    return {
+        'eventID': uuid.uuid4().hex,
+        'eventName': 'INSERT' if old is None else 'REMOVE' if new is None else 'MODIFY',
+        'eventSource': 'aws:dynamodb',
+        'awsRegion': 'us-east-1',
+        'eventSourceARN': STREAM_ARN.format(table=table),
+        'dynamodb': change,
+    }
+
+
+# -- WebSocket çerçeveleri (RFC 6455, sadece metin) ----------------------------------
+
+def read_frame(stream):
+    """(opcode, fin, payload); bağlantı kapandıysa ConnectionError."""
+    header = stream.read(2)
+    if len(header) < 2:
+        raise ConnectionError('WebSocket kapandı')
+    fin, opcode = header[0] & 0x80, header[0] & 0x0F
+    masked, length = header[1] & 0x80, header[1] & 0x7F
+    if length == 126:
+        length, = struct.unpack('!H', stream.read(2))
+    elif length == 127:
+        length, = struct.unpack('!Q', stream.read(8))
+    mask = stream.read(4) if masked else None
+    payload = stream.read(length)
+    if len(payload) < length:
+        raise ConnectionError('WebSocket kapandı')
+    if mask:
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return opcode, bool(fin), payload
+
+
+def encode_frame(opcode, payload, mask=False):
+    """Tek parçalı çerçeve; istemci tarafı (mask=True) self-test içindir."""
+    length = len(payload)
+    header = bytes([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header += bytes([mask_bit | length])
+    elif length < 1 << 16:
+        header += bytes([mask_bit | 126]) + struct.pack('!H', length)
+    else:
+        header += bytes([mask_bit | 127]) + struct.pack('!Q', length)
+    if mask:
+        key = os.urandom(4)
+        return header + key + bytes(byte ^ key[i % 4] for i, byte in enumerate(payload))
+    return header + payload
+
+
+class WebSocketConnection:
+
+    def __init__(self, connection_id, stream):
+        self.id = connection_id
+        self._stream = stream
+        self._lock = threading.Lock()
+        self.open = True
+
+    def send(self, opcode, payload):
+        with self._lock:
+            if not self.open:
+                raise ConnectionError(self.id)
+            self._stream.write(encode_frame(opcode, payload))
+            self._stream.flush()
+
+
+# -- Sunucu --------------------------------------------------------------------------
+
+class LocalApi:
+    """Yığının rotaları, fonksiyonları ve açık WebSocket bağlantıları."""
+
+    def __init__(self, stack, functions, frontend=None, require_auth=False, quiet=False):
+        self.stack = stack
+        self.functions = functions
+        self.frontend = frontend
+        self.require_auth = require_auth
+        self.quiet = quiet
+        self.connections = {}
+        self._lock = threading.Lock()
+        # API Gateway gibi: sabit segmentler yol parametrelerinden önce eşleşir
+        self.routes = sorted(
+            ((route.method, [segment for segment in route.path.split('/') if segment], route)
+             for route in stack.routes),
+            key=lambda entry: [segment.startswith('{') for segment in entry[1]]
+        )
+
+    def match(self, method, path):
+        """(rota, yol parametreleri); eşleşme yoksa (None, None) - API Gateway bunu 403 ile yanıtlar."""
+        segments = [urllib.parse.unquote(segment) for segment in path.split('/') if segment]
+        for route_method, pattern, route in self.routes:
+            if len(pattern) != len(segments) or route_method not in (method, 'ANY'):
+                continue
+            params = {}
+            for expected, actual in zip(pattern, segments):
+                if expected.startswith('{'):
+                    params[expected[1:-1]] = actual
+                elif expected != actual:
+                    break
+            else:
+                return route, params
+        return None, None
+
+    def resource_exists(self, path):
+        segments = [segment for segment in path.split('/') if segment]
+        return any(len(pattern) == len(segments) and all(p.startswith('{') or p == s for p, s in zip(pattern, segments))
+                   for _, pattern, _ in self.routes)
+
+    def websocket_function(self, route_key):
+        routes = self.stack.websocket_routes
+        spec = routes.get(route_key) or (routes.get('$default') if not route_key.startswith('$') else None)
+        return self.functions[spec.name] if spec else None
+
+    # -- API Gateway Management API taklidi ---------------------------------------
+
+    def post_to_connection(self, params):
+        from aws_standins import StandInError
+        connection = self.connections.get(params['ConnectionId'])
+        data = params['Data']
+        try:
+            if connection is None:
+                raise ConnectionError(params['ConnectionId'])
+            connection.send(WS_TEXT, data if isinstance(data, bytes) else data.encode('utf-8'))
+        except (ConnectionError, OSError):
+            raise StandInError('GoneException', f"Bağlantı yok: {params['ConnectionId']}", status=410)
+        return {}
+
+    def invoke_function(self, params):
+        """
+        lambda.Invoke taklidi (fonksiyon adı = construct id). Yerelde Event
+        çağrıları da çağıranın içinde sırayla çalışır; stream boşaltıldığında
+        zincirdeki güncellemeler (örn. arama indeksi) de bitmiş olur.
+        """
+        from botocore.response import StreamingBody
+        from aws_standins import StandInError
+        function = self.functions.get(params['FunctionName'])
+        if function is None:
+            raise StandInError('ResourceNotFoundException', f"Fonksiyon yok: {params['FunctionName']}", status=404)
+        payload = params.get('Payload') or b'{}'
+        event = json.loads(payload.read() if hasattr(payload, 'read') else payload)
+        try:
+            result = function.invoke(event)
+        except Exception as e:
+            if params.get('InvocationType') != 'Event':
+                raise
+            print(f"Handler Error ({function.name}): {e}")
+            traceback.print_exc()
+            return {'StatusCode': 202}
+        if params.get('InvocationType') == 'Event':
+            return {'StatusCode': 202}
+        data = json.dumps(result).encode('utf-8')
+        return {'StatusCode': 200, 'Payload': StreamingBody(io.BytesIO(data), len(data))}
+
+    def delete_connection(self, params):
+        connection = self.connections.get(params['ConnectionId'])
+        if connection:
+            try:
+                connection.send(WS_CLOSE, b'')
+            except (ConnectionError, OSError):
+                pass
+        return {}
+
+    def log(self, line):
+        if not self.quiet:
+            sys.stderr.write(line + '\n')
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'LibraryLocal/1.0'
+    api = None
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def do_OPTIONS(self):
+        self._dispatch('OPTIONS')
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self, method):
+        started = time.perf_counter()
+        parsed = urllib.parse.urlsplit(self.path)
+        if self.headers.get('Upgrade', '').lower() == 'websocket':
+            return self._websocket(parsed)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        route, params = self.api.match(method, parsed.path)
+        function = route.function.name if route else '-'
+        if route is not None:
+            status, headers, payload = self._invoke(route, params, method, parsed, body)
+        elif method == 'OPTIONS' and self.api.stack.cors and self.api.resource_exists(parsed.path):
+            status, headers, payload = 204, dict(CORS_HEADERS), b''
+        elif method == 'GET':
+            status, headers, payload = self._static(parsed.path)
+        else:
+            status, headers, payload = _gateway_error(403, 'Missing Authentication Token')
+        self._send(status, headers, payload)
+        self.api.log(f"{self.client_address[0]} {method} {self.path} {status} "
+                     f"{(time.perf_counter() - started) * 1000:.1f} ms {function}")
+
+    def _invoke(self, route, params, method, parsed, body):
+        claims = _jwt_claims(self.headers.get('Authorization'))
+        if route.authorization == 'COGNITO' and claims is None and self.api.require_auth:
+            return _gateway_error(401, 'Unauthorized')
+        query = urllib.parse.parse_qs(parsed.query, keep_blank_values=True)
+        headers = {name: value for name, value in self.headers.items()}
+        try:
+            text, encoded = body.decode('utf-8'), False
+        except UnicodeDecodeError:
+            text, encoded = base64.b64encode(body).decode('ascii'), True
+        request_context = {
+            'resourcePath': route.path, 'httpMethod': method, 'path': f"/local{parsed.path}", 'stage': 'local',
+            'requestId': str(uuid.uuid4()), 'requestTimeEpoch': int(time.time() * 1000),
+            'identity': {'sourceIp': self.client_address[0], 'userAgent': self.headers.get('User-Agent')},
+        }
+        if claims is not None:
+            request_context['authorizer'] = {'claims': claims}
+        event = {
+            'resource': route.path, 'path': parsed.path, 'httpMethod': method,
+            'headers': headers, 'multiValueHeaders': {name: self.headers.get_all(name) for name in headers},
+            'queryStringParameters': {name: values[-1] for name, values in query.items()} or None,
+            'multiValueQueryStringParameters': query or None,
+            'pathParameters': params or None, 'stageVariables': None,
+            'requestContext': request_context, 'body': text if body else None, 'isBase64Encoded': encoded,
+        }
+        try:
+            result = self.api.functions[route.function.name].invoke(event)
+        except Exception as e:
+            print(f"Handler Error ({route.function.name}): {e}")
+            traceback.print_exc()
+            return _gateway_error(502, 'Internal server error')
+        if not isinstance(result, dict) or 'statusCode' not in result:
+            return _gateway_error(502, 'Internal server error')
+        headers = dict(result.get('headers') or {})
+        for name, values in (result.get('multiValueHeaders') or {}).items():
+            headers[name] = ', '.join(str(value) for value in values)
+        payload = result.get('body') or ''
+        payload = base64.b64decode(payload) if result.get('isBase64Encoded') else payload.encode('utf-8')
+        return int(result['statusCode']), headers, payload
+
+    def _static(self, path):
+        """index.html, script.js ve yanındaki statik dosyalar (sadece bilinen uzantılar)."""
+        frontend = self.api.frontend
+        name = urllib.parse.unquote(path).lstrip('/') or 'index.html'
+        extension = os.path.splitext(name)[1]
+        file_path = os.path.normpath(os.path.join(frontend or '', name))
+        if (not frontend or extension not in STATIC_TYPES or name.startswith('.')
+                or not file_path.startswith(os.path.abspath(frontend) + os.sep) or not os.path.isfile(file_path)):
+            return _gateway_error(403, 'Missing Authentication Token')
+        with open(file_path, 'rb') as f:
+            payload = f.read()
+        if name == 'script.js':
+            payload = frontend_script(payload.decode('utf-8'), self.api.stack).encode('utf-8')
+        return 200, {'Content-Type': STATIC_TYPES[extension], 'Cache-Control': 'no-cache'}, payload
+
+    def _send(self, status, headers, payload):
+        self.send_response(status)
+        for name, value in headers.items():
+            if name.lower() not in ('content-length', 'connection', 'transfer-encoding'):
+                self.send_header(name, str(value))
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if payload and self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    # -- WebSocket ------------------------------------------------------------------
+
+    def _websocket(self, parsed):
+        api = self.api
+        stage = api.stack.websocket_stage
+        if not api.stack.websocket_routes or parsed.path.rstrip('/') != f"/{stage}":
+            return self._send(*_gateway_error(403, 'Forbidden'))
+        connection_id = base64.b64encode(uuid.uuid4().bytes[:12]).decode('ascii')
+        request_context = {'connectionId': connection_id, 'domainName': self.headers.get('Host', 'localhost'),
+                           'stage': stage, 'connectedAt': int(time.time() * 1000),
+                           'identity': {'sourceIp': self.client_address[0]}}
+        query = urllib.parse.parse_qs(parsed.query)
+        # $connect Lambda yetkilendiricisi: token'ın claim'leri (imza doğrulanmadan) bağlantının
+        # tüm olaylarına requestContext.authorizer olarak eklenir
+        source = api.stack.websocket_authorizer
+        if source:
+            kind, _, name = source.partition('.')
+            claims = _jwt_claims(query.get(name, [None])[-1] if kind == 'querystring' else self.headers.get(name))
+            if claims is None and api.require_auth:
+                return self._send(*_gateway_error(401, 'Unauthorized'))
+            if claims is not None:
+                request_context['authorizer'] = dict(claims, principalId=claims.get('sub'))
+
+        def event(route_key, event_type, body=None):
+            context = dict(request_context, routeKey=route_key, eventType=event_type,
+                           requestId=str(uuid.uuid4()), messageId=uuid.uuid4().hex)
+            return {'requestContext': context, 'headers': dict(self.headers.items()),
+                    'queryStringParameters': {name: values[-1] for name, values in query.items()} or None,
+                    'body': body, 'isBase64Encoded': False}
+
+        connect = api.websocket_function('$connect')
+        if connect:
+            result = connect.invoke(event('$connect', 'CONNECT'))
+            if isinstance(result, dict) and int(result.get('statusCode', 200)) >= 400:
+                return self._send(*_gateway_error(int(result['statusCode']), 'Forbidden'))
+        accept = base64.b64encode(hashlib.sha1((self.headers['Sec-WebSocket-Key'] + WEBSOCKET_GUID)
+                                               .encode('ascii')).digest()).decode('ascii')
+        self.send_response(101, 'Switching Protocols')
+        self.send_header('Upgrade', 'websocket')
+        self.send_header('Connection', 'Upgrade')
+        self.send_header('Sec-WebSocket-Accept', accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        connection = WebSocketConnection(connection_id, self.wfile)
+        api.connections[connection_id] = connection
+        api.log(f"{self.client_address[0]} WS {parsed.path} bağlandı {connection_id}")
+        fragments = []
+        try:
+            while True:
+                opcode, fin, payload = read_frame(self.rfile)
+                if opcode == WS_CLOSE:
+                    connection.send(WS_CLOSE, payload[:2])
+                    break
+                if opcode == WS_PING:
+                    connection.send(WS_PONG, payload)
+                    continue
+                if opcode not in (WS_TEXT, 0x0):
+                    continue
+                fragments.append(payload)
+                if fin:
+                    message = b''.join(fragments).decode('utf-8')
+                    fragments = []
+                    threading.Thread(target=self._on_message, args=(connection, message, event),
+                                     daemon=True).start()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            connection.open = False
+            api.connections.pop(connection_id, None)
+            disconnect = api.websocket_function('$disconnect')
+            if disconnect:
+                disconnect.invoke(event('$disconnect', 'DISCONNECT'))
+            api.log(f"{self.client_address[0]} WS {parsed.path} kapandı {connection_id}")
+
+    def _on_message(self, connection, message, event):
+        started = time.perf_counter()
+        route_key = '$default'
+        selection = self.api.stack.websocket_route_key
+        try:
+            route_key = json.loads(message).get(selection) or '$default'
+        except (ValueError, AttributeError):
+            pass
+        function = self.api.websocket_function(route_key)
+        if function is None:
+            self._ws_error(connection, 'Forbidden')
+            return
+        try:
+            function.invoke(event(route_key, 'MESSAGE', message))
+        except Exception as e:
+            print(f"Handler Error ({function.name}): {e}")
+            traceback.print_exc()
+            self._ws_error(connection, 'Internal server error')
+        self.api.log(f"{self.client_address[0]} WS {route_key} {(time.perf_counter() - started) * 1000:.1f} ms "
+                     f"{function.name}")
+
+    @staticmethod
+    def _ws_error(connection, message):
+        try:
+            connection.send(WS_TEXT, json.dumps({'message': message, 'connectionId': connection.id}).encode('utf-8'))
+        except (ConnectionError, OSError):
+            pass
+
+
+def _gateway_error(status, message):
+    return status, {'Content-Type': 'application/json'}, json.dumps({'message': message}).encode('utf-8')
+
+
+def _jwt_claims(authorization):
+    """Bearer / çıplak JWT'nin claim'leri (yerel geliştirme: imza doğrulanmaz); yoksa None."""
+    if not authorization:
+        return None
+    token = authorization.split()[-1]
+    try:
+        payload = token.split('.')[1]
+        return json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+    except (IndexError, ValueError):
+        return None
+
+
+def _unsigned_token(claims):
+    """Yerel rotalar için imzasız JWT (`_jwt_claims` sadece claim'leri okur)."""
+    def part(value):
+        return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).rstrip(b'=').decode('ascii')
+    return f"{part({'alg': 'none', 'typ': 'JWT'})}.{part(claims)}."
+
+
+def frontend_script(text, stack):
+    """script.js'teki CONFIG'i bu sunucuya çevirir (apiUrl, streamUrl, streamRoute)."""
+    text = re.sub(r"apiUrl:\s*'[^']*'", 'apiUrl: window.location.origin', text, count=1)
+    route = next((key for key in stack.websocket_routes if not key.startswith('$')), None)
+    if route:
+        stream_url = (f"(location.protocol === 'https:' ? 'wss://' : 'ws://') + location.host + "
+                      f"'/{stack.websocket_stage}'")
+        text = re.sub(r"streamUrl:\s*'[^']*'", f"streamUrl: {stream_url}", text, count=1)
+        text = re.sub(r"streamRoute:\s*'[^']*'", f"streamRoute: '{route}'", text, count=1)
+    return text
+
+
+# -- Kurulum -------------------------------------------------------------------------
+
+def parse_overrides(values):
+    overrides = {}
+    for value in values or []:
+        name, separator, setting = value.partition('=')
+        if not separator:
+            raise SystemExit(f"--env AD=DEĞER biçiminde olmalı: {value}")
+        overrides[name] = setting
+    return overrides
+
+
+def seed_catalog(aws, table, args):
+    """Boş kitap tablosunu `--catalog` dosyasından veya sentetik kitaplarla doldurur."""
+    if aws.dynamodb.items(table):
+        return 0
+    if args.catalog:
+        from library_common.catalog_import import CatalogLoader, detect_format, iter_records
+        from library_common.clients import get_client
+        with open(args.catalog, 'rb') as f:
+            result = CatalogLoader(get_client('dynamodb'), table, workers=4).load(
+                iter_records(f, detect_format(args.catalog)))
+        return result['written']
+    from search_bench import make_catalog
+    rng = random.Random(args.seed)
+    for book in make_catalog(args.books, rng):
+        aws.dynamodb.put(table, dict(book, description=f"{book['genre']} türünde bir {book['author']} eseri."))
+    return args.books
+
+
+def publish_recommendations(functions):
+    """Öneri fonksiyonu varsa ve yayınlanmış matris yoksa gömmeleri (taklit model) üretip S3'e yazar."""
+    spec = next((function for function in functions.values() if 'EMBEDDINGS_PREFIX' in function.environment), None)
+    if spec is None:
+        return None
+    try:
+        from library_common.recommendations import (
+            DEFAULT_DIMENSIONS, DEFAULT_MODEL_ID, EmbeddingStore, build_matrix, titan_embedder,
+        )
+    except ImportError:
+        print("NumPy kurulu değil; öneri matrisi üretilmedi (/recommendations 503 döner).")
+        return None
+    from build_recommendations import scan_books
+    from library_common.clients import get_client
+    environment = spec.environment
+    store = EmbeddingStore(get_client('s3'), environment['INDEX_BUCKET_NAME'], environment['EMBEDDINGS_PREFIX'])
+    if store.load_latest() is not None:
+        return 0
+    matrix, books, _ = build_matrix(scan_books(environment['BOOKS_TABLE_NAME']),
+                                    titan_embedder(get_client('bedrock-runtime')), DEFAULT_DIMENSIONS, workers=4)
+    if books:
+        store.publish(matrix, books, DEFAULT_MODEL_ID)
+    return len(books)
+
+
+def build(args):
+    """Ortam, taklitler, fonksiyonlar ve başlangıç verisi; (LocalApi, AwsStandIns, StreamPump)."""
+    stack = load_stack(args.stack)
+    overrides = parse_overrides(args.env)
+    os.environ.update(ENVIRONMENT)
+    # Token'sız asistan istekleri yerelde IP kovasına düşer; --require-auth ile üretimdeki gibi 401
+    os.environ['ALLOW_ANONYMOUS_REQUESTS'] = '0' if args.require_auth else '1'
+    import boto3
+    from aws_standins import AwsStandIns, BedrockStandIn, DynamoDBStandIn, S3StandIn
+    from library_common import clients
+
+    dynamodb = DynamoDBStandIn(key_schemas={table.name: (table.partition_key, table.sort_key)
+                                            for table in stack.tables}, journal=True)
+    snapshot = os.path.join(args.data_dir, 'dynamodb.json') if args.data_dir else None
+    if snapshot and os.path.exists(snapshot):
+        print(f"{snapshot}: {dynamodb.load(snapshot)} kayıt yüklendi")
+    s3 = S3StandIn(root=os.path.join(args.data_dir, 's3') if args.data_dir else None)
+    bedrock = BedrockStandIn(answer_chars=args.answer_chars, echo=args.answer == 'echo',
+                             chunk_delay_ms=args.chunk_delay_ms)
+    # Başlangıç verisi gecikmesiz hazırlanır; servis gecikmeleri sunucu açılmadan önce eklenir
+    aws = AwsStandIns(jitter=args.jitter, dynamodb=dynamodb, bedrock=bedrock, s3=s3)
+    session = boto3.session.Session(region_name='us-east-1')
+    aws.install(session)
+    clients._session = session
+
+    specs = {}
+    for spec in ([route.function for route in stack.routes] + list(stack.websocket_routes.values())
+                 + [source.function for source in stack.stream_sources]):
+        specs.setdefault(spec.name, spec)
+    # Ortamında adı geçen (lambda.Invoke ile çağrılan) fonksiyonlar da yüklenir
+    by_name = {function.name: function for function in stack.functions}
+    for spec in list(specs.values()):
+        for value in spec.environment.values():
+            if value in by_name:
+                specs.setdefault(value, by_name[value])
+    functions = {}
+    for name, spec in specs.items():
+        try:
+            functions[name] = LocalFunction(spec, args.concurrency, overrides=overrides).load()
+        except ValueError as e:
+            raise SystemExit(f"{name} yüklenemedi: {e}")
+        print(f"{name:<28} yüklendi: {functions[name].init_ms:7.1f} ms ({os.path.basename(spec.directory)})")
+    shared = {}
+    for function in functions.values():
+        for key, value in function.environment.items():
+            if shared.setdefault(key, value) != value:
+                print(f"Not: {key} fonksiyonlar arasında farklı; çalışma anında son yüklenen değer görülür.")
+
+    api = LocalApi(stack, functions, frontend=args.frontend, require_auth=args.require_auth, quiet=args.quiet)
+    aws.register('apigatewaymanagementapi', 'PostToConnection', api.post_to_connection)
+    aws.register('apigatewaymanagementapi', 'DeleteConnection', api.delete_connection)
+    aws.register('lambda', 'Invoke', api.invoke_function)
+    pump = StreamPump(dynamodb, [(source, functions[source.function.name]) for source in stack.stream_sources],
+                      args.stream_interval)
+
+    books_table = next((function.environment['BOOKS_TABLE_NAME'] for function in functions.values()
+                        if 'BOOKS_TABLE_NAME' in function.environment), None)
+    if books_table:
+        seeded = seed_catalog(aws, books_table, args)
+        if seeded:
+            print(f"{books_table}: {seeded} kitap yüklendi")
+    print(f"Stream: {pump.flush()} kayıt işlendi")
+    published = publish_recommendations(functions)
+    if published:
+        print(f"Öneriler: {published} kitabın gömmesi yayınlandı")
+
+    aws.latency_ms.update({
+        'dynamodb': args.ddb_latency_ms,
+        's3': args.s3_latency_ms,
+        'bedrock-runtime': args.bedrock_latency_ms,
+        'bedrock-agent-runtime': args.kb_latency_ms,
+    })
+    return api, aws, pump
+
+
+# -- Self-test -----------------------------------------------------------------------
+
+def _request(base, method, path, body=None, headers=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = urllib.request.Request(base + path, data=data, method=method,
+                                     headers=dict({'Content-Type': 'application/json'}, **(headers or {})))
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, response.read().decode('utf-8')
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode('utf-8')
+
+
+def _websocket_round_trip(host, port, stage, payload, token=None):
+    """Sunucuya istemci olarak bağlanır, mesajı gönderir ve done / error çerçevesine kadar okur."""
+    query = f"?token={urllib.parse.quote(token)}" if token else ''
+    with socket.create_connection((host, port), timeout=30) as sock:
+        key = base64.b64encode(os.urandom(16)).decode('ascii')
+        sock.sendall((f"GET /{stage}{query} HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\n"
+                      f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n")
+                     .encode('ascii'))
+        stream = sock.makefile('rb')
+        status = stream.readline().decode('ascii')
+        while stream.readline() not in (b'\r\n', b''):
+            pass
+        if ' 101 ' not in status:
+            return status.strip(), []
+        sock.sendall(encode_frame(WS_TEXT, json.dumps(payload).encode('utf-8'), mask=True))
+        frames = []
+        while True:
+            opcode, _, data = read_frame(stream)
+            if opcode != WS_TEXT:
+                continue
+            frame = json.loads(data)
+            frames.append(frame)
+            if frame.get('type') in ('done', 'error') or 'message' in frame:
+                sock.sendall(encode_frame(WS_CLOSE, b'', mask=True))
+                return '101', frames
+
+
+def self_test(api, pump, host, port):
+    """Yığındaki rotaları gerçek HTTP / WebSocket üzerinden dener; başarısız kontrol sayısını döner."""
+    base = f"http://{host}:{port}"
+    routes = {(route.method, route.path) for route in api.stack.routes}
+    failures = 0
+
+    def check(label, ok, detail=''):
+        nonlocal failures
+        failures += 0 if ok else 1
+        sys.stderr.write(f"  {'OK  ' if ok else 'HATA'} {label}{'' if ok else f': {detail}'}\n")
+
+    sys.stderr.write(f"\nSelf-test ({base})\n")
+    if api.frontend and os.path.exists(os.path.join(api.frontend, 'index.html')):
+        status, text = _request(base, 'GET', '/')
+        check('GET / (index.html)', status == 200 and '<html' in text.lower(), status)
+        status, text = _request(base, 'GET', '/script.js')
+        check('GET /script.js (apiUrl bu sunucu)', status == 200 and 'window.location.origin' in text, status)
+    status, _ = _request(base, 'GET', '/bilinmeyen-yol')
+    check('Bilinmeyen rota 403', status == 403, status)
+
+    book_id = None
+    if ('GET', '/books') in routes:
+        status, text = _request(base, 'GET', '/books?limit=5')
+        items = json.loads(text).get('items', []) if status == 200 else []
+        check('GET /books?limit=5', status == 200 and len(items) == 5, f"{status} {text[:200]}")
+        book_id = items[0]['id'] if items and 'id' in items[0] else (items[0].get('bookId') if items else None)
+    if book_id and ('GET', '/books/{bookId}') in routes:
+        status, text = _request(base, 'GET', f"/books/{urllib.parse.quote(str(book_id))}")
+        check('GET /books/{bookId}', status == 200, f"{status} {text[:200]}")
+        status, _ = _request(base, 'OPTIONS', f"/books/{urllib.parse.quote(str(book_id))}")
+        check('OPTIONS /books/{bookId} (CORS)', status == 204 or not api.stack.cors, status)
+    if ('GET', '/books/search') in routes:
+        status, text = _request(base, 'GET', '/books/search?q=a&limit=5')
+        check('GET /books/search', status == 200, f"{status} {text[:200]}")
+    if book_id and ('GET', '/books/{bookId}/similar') in routes:
+        status, text = _request(base, 'GET', f"/books/{urllib.parse.quote(str(book_id))}/similar?limit=3")
+        check('GET /books/{bookId}/similar', status in (200, 503), f"{status} {text[:200]}")
+    if ('POST', '/reading-lists') in routes:
+        token = {'Authorization': f"Bearer {_unsigned_token({'cognito:username': 'self-test'})}"}
+        status, text = _request(base, 'POST', '/reading-lists',
+                                {'name': 'Self-test', 'bookIds': [str(book_id)] if book_id else []}, token)
+        check('POST /reading-lists', status in (200, 201), f"{status} {text[:200]}")
+        status, text = _request(base, 'GET', '/reading-lists', headers=token)
+        check('GET /reading-lists', status == 200 and 'Self-test' in text, f"{status} {text[:200]}")
+    if ('GET', '/stats') in routes:
+        pump.flush()
+        status, text = _request(base, 'GET', '/stats')
+        check('GET /stats', status == 200, f"{status} {text[:200]}")
+    for path in ('/chat', '/assistant'):
+        if ('POST', path) in routes:
+            status, text = _request(base, 'POST', path, {'message': 'Kütüphane kaçta açılıyor?', 'userId': 'self-test'},
+                                    {'Authorization': f"Bearer {_unsigned_token({'sub': 'self-test'})}"})
+            check(f"POST {path}", status == 200 and 'response' in text, f"{status} {text[:200]}")
+    route = next((key for key in api.stack.websocket_routes if not key.startswith('$')), None)
+    if route:
+        status, frames = _websocket_round_trip(host, port, api.stack.websocket_stage, {
+            'action': route, 'requestId': 'self-test', 'message': 'Üyelik nasıl yapılır?'},
+            token=_unsigned_token({'sub': 'self-test-ws'}))
+        deltas = sum(1 for frame in frames if frame.get('type') == 'delta')
+        done = frames[-1].get('type') == 'done' if frames else False
+        check(f"WebSocket {route} ({deltas} parça)", status == '101' and done, f"{status} {frames[-1:]}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stack', default='ServerlessProjectStack', help='stacks/ altındaki yığın sınıfı')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--concurrency', type=int, default=10, help='Fonksiyon başına eşzamanlı çağrı')
+    parser.add_argument('--books', type=int, default=500, help='Boş tabloya yüklenecek sentetik kitap sayısı')
+    parser.add_argument('--catalog', help='Sentetik kitaplar yerine yüklenecek .csv / .jsonl katalog')
+    parser.add_argument('--data-dir', help='Tabloları ve S3 nesnelerini bu dizinde kalıcı tut')
+    parser.add_argument('--answer', choices=('canned', 'echo'), default='echo',
+                        help='Model yanıtı: hazır metin veya sorunun yankısı')
+    parser.add_argument('--answer-chars', type=int, default=400, help='Hazır yanıtın uzunluğu')
+    parser.add_argument('--bedrock-latency-ms', type=float, default=300, help='Model çağrısı (ilk parçaya kadar)')
+    parser.add_argument('--chunk-delay-ms', type=float, default=20, help='Akışta parçalar arası bekleme')
+    parser.add_argument('--kb-latency-ms', type=float, default=80, help='Knowledge Base Retrieve')
+    parser.add_argument('--ddb-latency-ms', type=float, default=0)
+    parser.add_argument('--s3-latency-ms', type=float, default=0)
+    parser.add_argument('--jitter', type=float, default=0.2, help='Gecikmelerin ± oranı')
+    parser.add_argument('--stream-interval', type=float, default=1.0, help='DynamoDB Stream grupları arası (sn)')
+    parser.add_argument('--env', action='append', metavar='AD=DEĞER', help='Tüm fonksiyonlarda ortam değişkeni')
+    parser.add_argument('--frontend', default=ROOT, help='index.html / script.js dizini')
+    parser.add_argument('--require-auth', action='store_true',
+                        help='Cognito rotalarında ve WebSocket $connect\'te token yoksa 401 dön')
+    parser.add_argument('--quiet', action='store_true', help='Handler çıktısını ve erişim kayıtlarını gizle')
+    parser.add_argument('--self-test', action='store_true', help='Rotaları dene ve çık (port verilmezse boş port)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.quiet:
+        sys.stdout = open(os.devnull, 'w', encoding='utf-8')
+    api, aws, pump = build(args)
+    RequestHandler.api = api
+    port = 0 if args.self_test and '--port' not in sys.argv else args.port
+    server = ThreadingHTTPServer((args.host, port), RequestHandler)
+    server.daemon_threads = True
+    host, port = server.server_address[:2]
+    pump.start()
+
+    sys.stderr.write(f"\n{api.stack.name}: http://{host}:{port}\n")
+    for route in api.stack.routes:
+        sys.stderr.write(f"  {route.method:<7} {route.path:<30} -> {route.function.name}\n")
+    for key, function in api.stack.websocket_routes.items():
+        sys.stderr.write(f"  WS      ws://{host}:{port}/{api.stack.websocket_stage} {key:<10} -> {function.name}\n")
+
+    if args.self_test:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            failures = self_test(api, pump, host, port)
+        finally:
+            server.shutdown()
+            pump.stop()
+        sys.stderr.write(f"\nAWS çağrıları: {dict(sorted(aws.calls.items()))}\n")
+        sys.stderr.write("Self-test başarılı.\n" if not failures else f"Self-test: {failures} kontrol başarısız.\n")
+        return 1 if failures else 0
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pump.stop()
+        pump.flush()
+        if args.data_dir:
+            os.makedirs(args.data_dir, exist_ok=True)
+            aws.dynamodb.save(os.path.join(args.data_dir, 'dynamodb.json'))
+            sys.stderr.write(f"Tablolar {args.data_dir} dizinine kaydedildi.\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())